@@ -1,11 +1,20 @@
+import time
+_import_start = time.perf_counter()
+
 from flask import Flask
 from flask_cors import CORS
 from routes.api import api_bp
+from routes.events import socketio
+from services.warmup import warmup
 
 app = Flask(__name__)
 CORS(app)  # Activer CORS pour permettre les requêtes depuis le frontend
 
 app.register_blueprint(api_bp, url_prefix='/api')
+socketio.init_app(app)  # Événements temps réel (sessions, streaming du layout)
+
+# Préparation en arrière-plan avec WARM_START=1 (pool de processus, graphe de démonstration)
+warmup.start(import_seconds=time.perf_counter() - _import_start)
 
 @app.route('/')
 def index():
@@ -13,20 +22,45 @@ def index():
     <h1>API de Visualisation de Graphes 3D Immersifs</h1>
     <p>Endpoints disponibles :</p>
     <ul>
-        <li><b>GET /api/health</b> - Vérification de l'API</li>
-        <li><b>POST /api/graph/import/csv</b> - Importer un graphe depuis CSV</li>
-        <li><b>POST /api/graph/import/json</b> - Importer un graphe depuis JSON</li>
+        <li><b>GET /api/health</b> - Vérification de l'API (durées du démarrage)</li>
+        <li><b>POST /api/graph/import/csv</b> - Importer un graphe depuis CSV (JSON, multipart ou flux brut)</li>
+        <li><b>POST /api/graph/import/json</b> - Importer un graphe depuis JSON (JSON, multipart ou flux brut ; <i>base_graph_id</i> : réimport incrémental)</li>
+        <li><b>GET /api/layout-cache</b> - Statistiques du cache de layouts</li>
+        <li><b>GET /api/response-cache</b> - Statistiques du cache de réponses (ETag, compression)</li>
+        <li><b>GET /api/metrics</b> - Métriques Prometheus (étapes, routes, caches)</li>
+        <li><b>GET /api/debug/profiles</b> - Profils des requêtes lentes</li>
         <li><b>GET /api/graph/demo</b> - Générer un graphe de démonstration</li>
-        <li><b>GET /api/graph/list</b> - Lister tous les graphes</li>
-        <li><b>GET /api/graph/&lt;id&gt;</b> - Récupérer un graphe spécifique</li>
-        <li><b>POST /api/graph/&lt;id&gt;/filter</b> - Filtrer un graphe</li>
+        <li><b>GET /api/graph/list</b> - Lister tous les graphes (et état du stockage)</li>
+        <li><b>GET /api/graph/&lt;id&gt;</b> - Récupérer un graphe spécifique (binaire : Accept: application/x-graph-binary, flux : Accept: application/x-ndjson)</li>
+        <li><b>GET /api/graph/&lt;id&gt;/nodes</b>, <b>/edges</b> - Pages de nœuds / d'arêtes (?cursor=&amp;limit=)</li>
+        <li><b>DELETE /api/graph/&lt;id&gt;</b> - Supprimer un graphe</li>
+        <li><b>POST /api/graph/&lt;id&gt;/viewport</b> - Nœuds visibles (boîte ou frustum, triés par distance)</li>
+        <li><b>PATCH /api/graph/&lt;id&gt;/positions</b> - Déplacer des nœuds</li>
+        <li><b>POST /api/graph/&lt;id&gt;/append</b> - Ajouter nœuds et arêtes (layout incrémental)</li>
+        <li><b>POST /api/graph/&lt;id&gt;/ops</b> - Appliquer des opérations versionnées</li>
+        <li><b>GET /api/graph/&lt;id&gt;/ops?since=N</b> - Opérations depuis une version</li>
+        <li><b>GET /api/graph/&lt;id&gt;/lod</b> - Niveau de détail (clusters agrégés)</li>
+        <li><b>GET /api/graph/&lt;id&gt;/lod/&lt;cluster&gt;/children</b> - Développer un cluster</li>
+        <li><b>GET /api/graph/&lt;id&gt;/preview?budget=N</b> - Aperçu représentatif d'un grand graphe</li>
+        <li><b>GET /api/graph/&lt;id&gt;/neighborhood?node=...&amp;hops=k</b> - Voisinage à k sauts d'un nœud</li>
+        <li><b>GET /api/graph/&lt;id&gt;/path?source=...&amp;target=...</b> - Plus court chemin entre deux nœuds</li>
+        <li><b>GET /api/graph/&lt;id&gt;/analytics</b> - Métriques du graphe (degrés, composantes, centralités)</li>
+        <li><b>GET /api/graph/&lt;id&gt;/analytics/&lt;metric&gt;</b> - Valeurs d'une métrique par nœud</li>
+        <li><b>POST /api/graph/&lt;id&gt;/filter</b> - Filtrer un graphe (égalité, intervalles, ensembles, degré, métriques)</li>
         <li><b>POST /api/graph/&lt;id&gt;/save-state</b> - Sauvegarder un état</li>
+        <li><b>GET /api/graph/&lt;id&gt;/states</b> - Lister les états sauvegardés</li>
         <li><b>GET /api/graph/&lt;id&gt;/load-state/&lt;state_id&gt;</b> - Charger un état</li>
         <li><b>POST /api/session/create</b> - Créer une session collaborative</li>
         <li><b>POST /api/session/&lt;id&gt;/join</b> - Rejoindre une session</li>
         <li><b>GET /api/session/list</b> - Lister les sessions actives</li>
+        <li><b>GET /api/jobs/&lt;id&gt;</b> - État d'un import asynchrone</li>
+        <li><b>POST /api/jobs/&lt;id&gt;/cancel</b> - Annuler un import asynchrone</li>
     </ul>
+    <p>Événements Socket.IO : <b>stream_layout</b> (trames <i>layout_frame</i> / <i>layout_done</i>),
+    <b>join_session</b>, <b>cursor_move</b>, <b>select_node</b> (lots <i>session_batch</i> à acquitter),
+    <b>watch_graph</b>, <b>graph_ops</b>, <b>resync</b> (deltas versionnés du graphe)</p>
     """
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    socketio.run(app, debug=True, host='0.0.0.0', port=5000,
+                 allow_unsafe_werkzeug=True)
\ No newline at end of file
@@ -0,0 +1,114 @@
+"""
+Benchmark du layout force-directed : moteur NumPy natif vs nx.spring_layout
+
+Usage (depuis le dossier backend) :
+    python benchmarks/bench_layout.py --sizes 200 1000 5000 20000 100000
+
+Pour chaque taille, un graphe aléatoire (degré moyen ~4) est généré et les
+implémentations (force native, multilevel, networkx) sont chronométrées. La qualité est estimée par le
+rapport longueur moyenne des arêtes / distance moyenne entre paires
+aléatoires (plus bas = voisins mieux regroupés).
+--iterations s'applique aux trois implémentations ; pour le multilevel, ce
+sont les itérations du niveau le plus grossier (les niveaux plus fins
+gardent leur raffinement court).
+networkx utilise scipy au-delà de 500 nœuds ; sans scipy, ou au-delà de
+--max-networkx nœuds, seule la mesure native est effectuée.
+"""
+import argparse
+import os
+import sys
+import time
+
+import networkx as nx
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.layout_engine import force_layout, multilevel_layout
+
+
+def random_graph(n: int, avg_degree: float, seed: int) -> np.ndarray:
+    """Graphe aléatoire connexe : un arbre couvrant + arêtes aléatoires"""
+    rng = np.random.default_rng(seed)
+    tree = np.column_stack([np.arange(1, n), rng.integers(0, np.arange(1, n))])
+    extra = rng.integers(0, n, size=(int(n * (avg_degree / 2 - 1)), 2))
+    edges = np.vstack([tree, extra])
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    return np.unique(np.sort(edges, axis=1), axis=0)
+
+
+def layout_quality(pos: np.ndarray, edges: np.ndarray, seed: int) -> float:
+    """Longueur moyenne des arêtes rapportée à la distance moyenne des paires"""
+    rng = np.random.default_rng(seed)
+    pairs = rng.integers(0, len(pos), size=(min(100000, len(pos) * 10), 2))
+    edge_len = np.linalg.norm(pos[edges[:, 0]] - pos[edges[:, 1]], axis=1).mean()
+    pair_len = np.linalg.norm(pos[pairs[:, 0]] - pos[pairs[:, 1]], axis=1).mean()
+    return float(edge_len / pair_len)
+
+
+def bench_native(n: int, edges: np.ndarray, iterations: int, seed: int):
+    start = time.perf_counter()
+    pos = force_layout(n, edges, iterations=iterations, seed=seed)
+    return time.perf_counter() - start, pos
+
+
+def bench_multilevel(n: int, edges: np.ndarray, iterations: int, seed: int):
+    start = time.perf_counter()
+    pos = multilevel_layout(n, edges, iterations=iterations, seed=seed)
+    return time.perf_counter() - start, pos
+
+
+def bench_networkx(n: int, edges: np.ndarray, iterations: int, seed: int):
+    G = nx.Graph()
+    G.add_nodes_from(range(n))
+    G.add_edges_from(map(tuple, edges))
+    start = time.perf_counter()
+    pos = nx.spring_layout(G, dim=3, iterations=iterations, seed=seed)
+    elapsed = time.perf_counter() - start
+    return elapsed, np.array([pos[i] for i in range(n)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[200, 1000, 5000, 20000])
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--avg-degree', type=float, default=4.0)
+    parser.add_argument('--max-native', type=int, default=50000,
+                        help="taille maximale mesurée avec la force native "
+                             "(au-delà seul le multilevel est mesuré)")
+    parser.add_argument('--max-networkx', type=int, default=5000,
+                        help="taille maximale mesurée avec networkx")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'nœuds':>8} {'arêtes':>8} {'natif (s)':>10} {'qualité':>8} "
+          f"{'multilevel (s)':>15} {'qualité':>8} "
+          f"{'networkx (s)':>13} {'qualité':>8} {'gain':>6}")
+
+    for n in args.sizes:
+        edges = random_graph(n, args.avg_degree, args.seed)
+        native_time = None
+        native_cols = f"{'-':>10} {'-':>8}"
+        if n <= args.max_native:
+            native_time, native_pos = bench_native(n, edges, args.iterations, args.seed)
+            native_quality = layout_quality(native_pos, edges, args.seed)
+            native_cols = f"{native_time:>10.3f} {native_quality:>8.3f}"
+
+        ml_time, ml_pos = bench_multilevel(n, edges, args.iterations, args.seed)
+        ml_cols = f"{ml_time:>15.3f} {layout_quality(ml_pos, edges, args.seed):>8.3f}"
+
+        nx_cols = f"{'-':>13} {'-':>8} {'-':>6}"
+        if n <= args.max_networkx and native_time is not None:
+            try:
+                nx_time, nx_pos = bench_networkx(n, edges, args.iterations, args.seed)
+                nx_quality = layout_quality(nx_pos, edges, args.seed)
+                nx_cols = (f"{nx_time:>13.3f} {nx_quality:>8.3f} "
+                           f"{nx_time / native_time:>5.1f}x")
+            except ImportError as e:
+                nx_cols = f"{'(' + e.name + ' absent)':>29}"
+
+        print(f"{n:>8} {len(edges):>8} {native_cols} {ml_cols} {nx_cols}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+"""
+Benchmark du pipeline complet sur des graphes synthétiques reproductibles
+
+Usage (depuis le dossier backend) :
+    python benchmarks/bench_pipeline.py --edges 1000 10000 100000
+    python benchmarks/bench_pipeline.py --generators grid sbm --edges 1000000 \\
+        --layouts multilevel circular --output results.json
+    python benchmarks/bench_pipeline.py --output new.json --compare results.json
+
+Pour chaque générateur (benchmarks/generators.py) et chaque nombre
+d'arêtes, les étapes sont chronométrées une à une :
+    parse_csv     graph_service.parse_csv_to_graph
+    ingest_csv    services.ingest.parse_csv_stream (import en flux)
+    parse_json    graph_service.parse_json_to_graph
+    ingest_json   services.ingest.parse_json_stream (import JSON en flux)
+    layout:<type> graph_service.compute_layout, pour chaque type demandé
+                  (cache de layouts désactivé)
+    store         graph_service.save_graph (conversion en colonnes)
+    filter        graph_service.filter_graph, première requête (construction
+                  des index)
+    filter_warm   même filtre, index déjà construits
+    json          GET /graph/<id> (jsonify), cache de réponses vidé
+    json_cached   même requête servie par le cache de réponses (gzip)
+    binary        GET /graph/<id> au format binaire, cache de réponses vidé
+    ndjson        GET /graph/<id> en flux NDJSON
+Mesures : temps (meilleur de --repeat), pic de mémoire pendant l'étape
+(RSS échantillonnée sous Linux : pic absolu et hausse par rapport au
+début de l'étape ; allocations suivies par tracemalloc ailleurs) et débit
+en arêtes par seconde.
+
+--output écrit les résultats en JSON (avec commit, versions et paramètres) ;
+--compare les compare à un fichier précédent et signale les étapes plus
+lentes de plus de --tolerance (code de sortie 1 en cas de régression ;
+les étapes de moins de --min-seconds ne sont pas signalées).
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+# Mesures sans effets de bord : ni disque, ni cache de layouts, ni
+# métriques calculées en arrière-plan pendant les étapes suivantes
+os.environ['GRAPH_STORE_DIR'] = ''
+os.environ['LAYOUT_CACHE_MB'] = '0'
+os.environ['LAYOUT_CACHE_DIR'] = ''
+os.environ['ANALYTICS_ON_IMPORT'] = '0'
+os.environ['PREVIEW_ON_IMPORT'] = '0'
+os.environ['LOD_ON_IMPORT'] = '0'
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from services.graph_service import graph_service
+from services.ingest import parse_csv_stream, parse_json_stream
+from services.response_cache import response_cache
+from benchmarks.generators import GENERATORS, node_count, to_csv, to_json
+
+LAYOUTS = ('force', 'spring', 'sphere', 'multilevel', 'circular', 'random')
+
+# Layouts force-directed plein graphe : limités par défaut (voir --max-force-edges)
+FORCE_LAYOUTS = ('force', 'spring', 'sphere')
+
+FILTER = {'edge_property': {'weight': {'$gte': 5}}, 'min_connections': 2}
+
+SAMPLE_INTERVAL = 0.002
+
+
+def _rss() -> Optional[int]:
+    """RSS courante du processus (Linux), None si indisponible"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class MemoryProbe:
+    """Pic de mémoire pendant une étape (octets au-dessus du niveau de départ)"""
+
+    def __init__(self):
+        self.source = 'rss' if _rss() is not None else 'tracemalloc'
+        self.start = self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        if self.source == 'rss':
+            self.start = self.peak = _rss()
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        else:
+            tracemalloc.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            self.peak = max(self.peak, _rss())
+
+    def __exit__(self, *exc):
+        if self.source == 'rss':
+            self._stop.set()
+            self._thread.join()
+            self.peak = max(self.peak, _rss())
+        else:
+            self.peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    @property
+    def used(self) -> int:
+        return max(0, self.peak - self.start)
+
+
+def measure(stage: Callable[[], Any], repeat: int):
+    """
+    (meilleur temps, plus grand pic au-dessus du niveau de départ, plus
+    grand pic absolu, résultat de la dernière exécution)
+    """
+    best, used, peak, result = None, 0, 0, None
+    for _ in range(repeat):
+        result = None
+        with MemoryProbe() as probe:
+            start = time.perf_counter()
+            result = stage()
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        used = max(used, probe.used)
+        peak = max(peak, probe.peak)
+    return best, used, peak, result
+
+
+def run_graph(generator: str, edge_target: int, args, client) -> List[Dict[str, Any]]:
+    """Mesure toutes les étapes pour un graphe généré"""
+    edges = GENERATORS[generator](edge_target, args.seed)
+    m, n = len(edges), node_count(edges)
+    csv_text = to_csv(edges, args.seed)
+    json_text = to_json(edges, args.seed)
+    csv_bytes = csv_text.encode('utf-8')
+    json_bytes = json_text.encode('utf-8')
+    results = []
+
+    def record(stage: str, func: Callable[[], Any], repeat: int = args.repeat):
+        seconds, used, peak, result = measure(func, repeat)
+        results.append({
+            'generator': generator,
+            'edges': m,
+            'nodes': n,
+            'stage': stage,
+            'seconds': seconds,
+            'memory_mb': used / 1e6,
+            'peak_rss_mb': peak / 1e6,
+            'edges_per_second': m / seconds if seconds > 0 else None
+        })
+        print(f"{generator:>16} {m:>9} {stage:>18} {seconds:>10.4f} "
+              f"{used / 1e6:>10.1f} {m / seconds if seconds > 0 else 0:>14.0f}", flush=True)
+        return result
+
+    record('parse_csv', lambda: graph_service.parse_csv_to_graph(csv_text))
+    record('ingest_csv', lambda: parse_csv_stream(io.BytesIO(csv_bytes)))
+    graph_data = record('parse_json', lambda: graph_service.parse_json_to_graph(json_text))
+    record('ingest_json', lambda: parse_json_stream(io.BytesIO(json_bytes)))
+
+    for layout in args.layouts:
+        if layout in FORCE_LAYOUTS and m > args.max_force_edges:
+            continue
+        # Une seule exécution : les layouts dominent la durée du benchmark
+        record(f'layout:{layout}',
+               lambda: graph_service.compute_layout(graph_data, layout,
+                                                    {'seed': args.seed}), repeat=1)
+
+    graph_id = f'bench-{generator}-{m}'
+    record('store', lambda: graph_service.save_graph(graph_id, graph_data))
+    graph = graph_service.get_stored(graph_id)
+
+    # Première requête : construction des index (degrés, colonnes filtrées)
+    record('filter', lambda: graph_service.filter_graph(graph, FILTER), repeat=1)
+    record('filter_warm', lambda: graph_service.filter_graph(graph, FILTER))
+
+    url = f'/api/graph/{graph_id}'
+    def uncached(*args, **kwargs):
+        response_cache.clear()
+        return client.get(*args, **kwargs).get_data()
+
+    record('json', lambda: uncached(url))
+    client.get(url, headers={'Accept-Encoding': 'gzip'})
+    record('json_cached', lambda: client.get(url, headers={'Accept-Encoding': 'gzip'}).get_data())
+    record('binary', lambda: uncached(url, headers={'Accept': 'application/x-graph-binary'}))
+    record('ndjson', lambda: client.get(f'{url}?format=ndjson').get_data())
+
+    graph_service.delete_graph(graph_id)
+    return results
+
+
+def environment(args) -> Dict[str, Any]:
+    """Contexte des mesures (pour comparer des résultats entre commits)"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                                capture_output=True, text=True, timeout=10,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'commit': commit or None,
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'memory': MemoryProbe().source,
+        'seed': args.seed,
+        'repeat': args.repeat
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, tolerance: float,
+            min_seconds: float) -> int:
+    """Affiche l'évolution par rapport à une référence ; nombre de régressions"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    reference = {(r['generator'], r['edges'], r['stage']): r for r in baseline['results']}
+    print(f"\nComparaison avec {baseline_path} (commit {baseline['meta'].get('commit')})")
+    print(f"{'générateur':>16} {'arêtes':>9} {'étape':>18} {'avant (s)':>10} "
+          f"{'après (s)':>10} {'ratio':>7}")
+    regressions = 0
+    for result in results:
+        before = reference.get((result['generator'], result['edges'], result['stage']))
+        if before is None or not before['seconds']:
+            continue
+        ratio = result['seconds'] / before['seconds']
+        flag = ''
+        # Étapes trop courtes : variations dominées par le bruit de mesure
+        if ratio > 1 + tolerance and max(result['seconds'], before['seconds']) >= min_seconds:
+            flag = '  RÉGRESSION'
+            regressions += 1
+        print(f"{result['generator']:>16} {result['edges']:>9} {result['stage']:>18} "
+              f"{before['seconds']:>10.4f} {result['seconds']:>10.4f} {ratio:>6.2f}x{flag}")
+    print(f"{regressions} régression(s) au-delà de +{tolerance:.0%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--generators', nargs='+', choices=list(GENERATORS),
+                        default=list(GENERATORS))
+    parser.add_argument('--edges', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help="nombres d'arêtes visés (jusqu'à 1000000)")
+    parser.add_argument('--layouts', nargs='+', choices=LAYOUTS, default=list(LAYOUTS))
+    parser.add_argument('--max-force-edges', type=int, default=100000,
+                        help="taille maximale mesurée avec les layouts force / spring / sphere")
+    parser.add_argument('--repeat', type=int, default=1,
+                        help="exécutions par étape (meilleur temps retenu, hors layouts)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="fichier JSON des résultats")
+    parser.add_argument('--compare', help="résultats de référence (JSON) à comparer")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="ralentissement toléré avant de signaler une régression")
+    parser.add_argument('--min-seconds', type=float, default=0.01,
+                        help="durée en dessous de laquelle une étape n'est pas signalée")
+    args = parser.parse_args()
+
+    client = app.test_client()
+    print(f"{'générateur':>16} {'arêtes':>9} {'étape':>18} {'temps (s)':>10} "
+          f"{'mémoire (Mo)':>10} {'arêtes/s':>14}")
+    results = []
+    for generator in args.generators:
+        for edge_target in args.edges:
+            results.extend(run_graph(generator, edge_target, args, client))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'meta': environment(args), 'results': results}, f, indent=1)
+        print(f"Résultats écrits dans {args.output}")
+
+    if args.compare and compare(results, args.compare, args.tolerance, args.min_seconds):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark du démarrage à froid : processus serveur neuf, premières requêtes
+
+Usage (depuis le dossier backend) :
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --modes cold warm --output startup.json
+
+Chaque mesure lance un nouvel interpréteur (comme un conteneur ou un worker
+qui démarre) avec WARM_START=0 (cold) ou WARM_START=1 (warm), puis relève :
+    interpreter   lancement du processus -> début du script
+    import_app    import de l'application (blueprints, services)
+    health        lancement -> première réponse de /api/health
+    ready         lancement -> fin de la préparation (warm uniquement)
+    demo          première requête GET /api/graph/demo
+    async_demo    premier import asynchrone (GET /api/graph/demo?async=1
+                  jusqu'à la fin du job : démarrage du pool compris en cold)
+    circular      premier layout circular (import de networkx en cold)
+En warm, les requêtes sont faites une fois la préparation terminée
+(le temps jusqu'au premier /api/health n'en dépend pas). Résultat :
+médiane et minimum sur --runs processus.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Script exécuté dans le processus mesuré (horloge murale commune)
+CHILD = r"""
+import json, time
+started = time.time()
+from app import app
+from services.warmup import warmup
+imported = time.time()
+client = app.test_client()
+client.get('/api/health')
+health = time.time()
+result = {'started': started, 'imported': imported, 'health': health}
+while not warmup.ready:
+    time.sleep(0.005)
+result['ready'] = time.time()
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+def async_demo():
+    job_id = client.get('/api/graph/demo?async=1').get_json()['graph_id']
+    while client.get(f'/api/jobs/{job_id}').get_json()['phase'] not in ('done', 'failed'):
+        time.sleep(0.002)
+
+result['demo'] = timed(lambda: client.get('/api/graph/demo'))
+result['async_demo'] = timed(async_demo)
+result['circular'] = timed(lambda: client.post('/api/graph/import/json', json={
+    'json_content': {'nodes': [{'id': i} for i in range(50)], 'edges': []},
+    'layout': 'circular'}))
+from services.job_service import job_service
+job_service.shutdown()
+print(json.dumps(result))
+"""
+
+STAGES = ('interpreter', 'import_app', 'health', 'ready', 'demo', 'async_demo', 'circular')
+
+
+def run_once(mode: str) -> dict:
+    """Mesures d'un processus neuf (secondes)"""
+    env = dict(os.environ, WARM_START='1' if mode == 'warm' else '0',
+               GRAPH_STORE_DIR='', LAYOUT_CACHE_DIR='', ANALYTICS_ON_IMPORT='0',
+               PREVIEW_ON_IMPORT='0', LOD_ON_IMPORT='0',
+               PYTHONPATH=BACKEND_DIR)
+    launched = time.time()
+    output = subprocess.run([sys.executable, '-c', CHILD], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    child = json.loads(output.strip().splitlines()[-1])
+    return {
+        'interpreter': child['started'] - launched,
+        'import_app': child['imported'] - child['started'],
+        'health': child['health'] - launched,
+        'ready': child['ready'] - launched if mode == 'warm' else None,
+        'demo': child['demo'],
+        'async_demo': child['async_demo'],
+        'circular': child['circular']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--modes', nargs='+', choices=('cold', 'warm'), default=['cold', 'warm'])
+    parser.add_argument('--runs', type=int, default=3, help="processus lancés par mode")
+    parser.add_argument('--output', help="fichier JSON des résultats")
+    args = parser.parse_args()
+
+    print(f"{'mode':>6} {'étape':>12} {'médiane (ms)':>13} {'min (ms)':>10}")
+    results = []
+    for mode in args.modes:
+        runs = [run_once(mode) for _ in range(args.runs)]
+        for stage in STAGES:
+            values = [run[stage] for run in runs if run[stage] is not None]
+            if not values:
+                continue
+            median, best = statistics.median(values), min(values)
+            results.append({'mode': mode, 'stage': stage, 'median_seconds': median,
+                            'min_seconds': best, 'runs': len(values)})
+            print(f"{mode:>6} {stage:>12} {median * 1000:>13.1f} {best * 1000:>10.1f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'runs': args.runs, 'python': sys.version.split()[0],
+                       'cpu_count': os.cpu_count(), 'results': results}, f, indent=1)
+        print(f"Résultats écrits dans {args.output}")
+
+
+if __name__ == '__main__':
+    main()
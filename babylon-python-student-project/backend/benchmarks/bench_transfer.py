@@ -0,0 +1,77 @@
+"""
+Benchmark du transfert d'un graphe : GET /graph/<id> en JSON vs binaire
+
+Usage (depuis le dossier backend) :
+    python benchmarks/bench_transfer.py --sizes 1000 10000 100000
+
+Pour chaque taille, un graphe aléatoire positionné (une propriété par
+arête) est enregistré puis demandé dans les deux formats via le client de
+test Flask ; on mesure le temps de réponse et la taille du corps. La
+première requête binaire construit la table des ids (mise en cache), elle
+est mesurée séparément.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from services.graph_service import graph_service
+from services.graph_store import StoredGraph
+from services.columns import Column
+from benchmarks.bench_layout import random_graph
+
+
+def build_graph(n: int, avg_degree: float, seed: int) -> StoredGraph:
+    """Graphe stocké aléatoire avec positions et poids"""
+    rng = np.random.default_rng(seed)
+    edges = random_graph(n, avg_degree, seed).astype(np.int32)
+    weights = Column('weight', 'float', rng.random(len(edges)))
+    graph = StoredGraph([f'node_{i}' for i in range(n)], n,
+                        edges[:, 0].copy(), edges[:, 1].copy(),
+                        edge_columns={'weight': weights},
+                        metadata={'node_count': n, 'edge_count': len(edges)})
+    graph.set_positions(rng.uniform(-10, 10, size=(n, 3)))
+    return graph
+
+
+def timed_get(client, url: str, headers=None):
+    start = time.perf_counter()
+    response = client.get(url, headers=headers)
+    size = len(response.get_data())
+    return time.perf_counter() - start, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--avg-degree', type=float, default=4.0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    client = app.test_client()
+    binary = {'Accept': 'application/x-graph-binary'}
+
+    print(f"{'nœuds':>8} {'arêtes':>8} {'json (s)':>9} {'json (Mo)':>10} "
+          f"{'bin 1re (s)':>11} {'bin (s)':>8} {'bin (Mo)':>9} {'gain t.':>7} {'gain Mo':>7}")
+    for n in args.sizes:
+        graph = build_graph(n, args.avg_degree, args.seed)
+        graph_service.save_graph('bench', graph)
+        url = '/api/graph/bench'
+
+        json_time, json_size = timed_get(client, url)
+        first_time, _ = timed_get(client, url, binary)
+        bin_time, bin_size = timed_get(client, url, binary)
+
+        print(f"{n:>8} {graph.edge_count:>8} {json_time:>9.3f} {json_size / 1e6:>10.2f} "
+              f"{first_time:>11.3f} {bin_time:>8.4f} {bin_size / 1e6:>9.2f} "
+              f"{json_time / bin_time:>6.0f}x {json_size / bin_size:>6.1f}x")
+        graph_service.delete_graph('bench')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Générateurs de graphes synthétiques reproductibles pour les benchmarks
+
+Chaque générateur produit, pour une graine donnée, toujours les mêmes
+arêtes (tableau (m, 2) d'indices, sans boucles ni doublons) pour un nombre
+d'arêtes visé ; le nombre de nœuds en découle (degré moyen AVG_DEGREE,
+sauf pour la grille) :
+- erdos_renyi : paires tirées uniformément (graphe G(n, m))
+- barabasi_albert : attachement préférentiel (degrés en loi de puissance)
+- sbm : modèle à blocs stochastiques (communautés denses, peu de liens
+  entre blocs)
+- grid : grille 2D (diamètre élevé, degrés constants)
+Les graphes sont sérialisés en CSV et en JSON aux formats acceptés par
+les imports (colonnes source, target, weight, relationship).
+"""
+import json
+from typing import Callable, Dict
+
+import numpy as np
+
+AVG_DEGREE = 8
+SBM_BLOCK_SIZE = 1000
+SBM_INTRA_FRACTION = 0.9
+
+RELATIONSHIPS = ('friend', 'colleague', 'family', 'other')
+
+
+def _distinct(edges: np.ndarray) -> np.ndarray:
+    """Arêtes (min, max) sans boucles ni doublons"""
+    edges = np.sort(edges, axis=1)
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    return np.unique(edges, axis=0)
+
+
+def _sample(n: int, m: int, draw: Callable[[int], np.ndarray]) -> np.ndarray:
+    """Complète des tirages d'arêtes jusqu'à m arêtes distinctes"""
+    edges = np.zeros((0, 2), dtype=np.int64)
+    while len(edges) < m:
+        edges = _distinct(np.vstack([edges, draw(int((m - len(edges)) * 1.1) + 1)]))
+    return edges[:m]
+
+
+def erdos_renyi(edge_count: int, seed: int = 0) -> np.ndarray:
+    """Graphe G(n, m) : m paires distinctes tirées uniformément"""
+    n = max(2, edge_count * 2 // AVG_DEGREE)
+    rng = np.random.default_rng(seed)
+    m = min(edge_count, n * (n - 1) // 2)
+    return _sample(n, m, lambda k: rng.integers(0, n, size=(k, 2)))
+
+
+def barabasi_albert(edge_count: int, seed: int = 0) -> np.ndarray:
+    """
+    Attachement préférentiel : chaque nouveau nœud se relie à AVG_DEGREE / 2
+    nœuds existants choisis proportionnellement à leur degré
+    """
+    k = AVG_DEGREE // 2
+    n = max(k + 1, edge_count // k + 1)
+    rng = np.random.default_rng(seed)
+    # Extrémités de toutes les arêtes : tirer une entrée = tirer selon le degré
+    ends = np.empty(2 * k * n, dtype=np.int64)
+    ends[:k] = np.arange(k)
+    filled = k
+    edges = np.empty((k * (n - k), 2), dtype=np.int64)
+    for node in range(k, n):
+        targets = np.unique(ends[rng.integers(0, filled, size=k)])
+        count = len(targets)
+        row = (node - k) * k
+        edges[row:row + count, 0] = node
+        edges[row:row + count, 1] = targets
+        edges[row + count:row + k] = node  # boucles retirées ensuite
+        ends[filled:filled + count] = targets
+        ends[filled + count:filled + 2 * count] = node
+        filled += 2 * count
+    return _distinct(edges)[:edge_count]
+
+
+def sbm(edge_count: int, seed: int = 0) -> np.ndarray:
+    """
+    Blocs stochastiques : blocs de SBM_BLOCK_SIZE nœuds consécutifs,
+    SBM_INTRA_FRACTION des arêtes à l'intérieur d'un bloc
+    """
+    n = max(2, edge_count * 2 // AVG_DEGREE)
+    size = min(SBM_BLOCK_SIZE, n)
+    rng = np.random.default_rng(seed)
+
+    def draw(k: int) -> np.ndarray:
+        source = rng.integers(0, n, size=k)
+        block = source // size * size
+        inside = rng.random(k) < SBM_INTRA_FRACTION
+        # Le dernier bloc peut être incomplet
+        offset = (rng.random(k) * np.minimum(size, n - block)).astype(np.int64)
+        target = np.where(inside, block + offset, rng.integers(0, n, size=k))
+        return np.column_stack([source, target])
+
+    return _sample(n, min(edge_count, n * (n - 1) // 2), draw)
+
+
+def grid(edge_count: int, seed: int = 0) -> np.ndarray:
+    """Grille 2D carrée (liens droite et bas) d'environ edge_count arêtes"""
+    side = max(2, int(np.ceil(np.sqrt(edge_count / 2 + 1))))
+    ids = np.arange(side * side).reshape(side, side)
+    right = np.column_stack([ids[:, :-1].ravel(), ids[:, 1:].ravel()])
+    down = np.column_stack([ids[:-1, :].ravel(), ids[1:, :].ravel()])
+    return _distinct(np.vstack([right, down]))[:edge_count]
+
+
+GENERATORS: Dict[str, Callable[[int, int], np.ndarray]] = {
+    'erdos_renyi': erdos_renyi,
+    'barabasi_albert': barabasi_albert,
+    'sbm': sbm,
+    'grid': grid
+}
+
+
+def node_count(edges: np.ndarray) -> int:
+    return int(edges.max()) + 1 if len(edges) else 0
+
+
+def edge_properties(edges: np.ndarray, seed: int = 0):
+    """Poids entiers 1..10 et type de relation de chaque arête"""
+    rng = np.random.default_rng(seed + 1)
+    weights = rng.integers(1, 11, size=len(edges))
+    kinds = rng.integers(0, len(RELATIONSHIPS), size=len(edges))
+    return weights, kinds
+
+
+def to_csv(edges: np.ndarray, seed: int = 0) -> str:
+    """CSV source,target,weight,relationship (identifiants 'n<i>')"""
+    weights, kinds = edge_properties(edges, seed)
+    lines = ['source,target,weight,relationship']
+    lines.extend(f'n{a},n{b},{w},{RELATIONSHIPS[k]}'
+                 for (a, b), w, k in zip(edges.tolist(), weights.tolist(), kinds.tolist()))
+    return '\n'.join(lines) + '\n'
+
+
+def to_json(edges: np.ndarray, seed: int = 0) -> str:
+    """JSON {nodes, edges} (format 1 de parse_json_to_graph, propriétés à plat)"""
+    weights, kinds = edge_properties(edges, seed)
+    nodes = [{'id': f'n{i}', 'label': f'n{i}', 'group': i % 10}
+             for i in range(node_count(edges))]
+    links = [{'source': f'n{a}', 'target': f'n{b}', 'weight': w, 'relationship': RELATIONSHIPS[k]}
+             for (a, b), w, k in zip(edges.tolist(), weights.tolist(), kinds.tolist())]
+    return json.dumps({'nodes': nodes, 'edges': links})
@@ -1,19 +1,87 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, g, jsonify, request
 from services.graph_service import graph_service
+from services.job_service import job_service, JobQueueFull, ACTIVE_PHASES
+from services.ingest import parse_csv_stream, parse_json_data, parse_json_stream
+from services.graph_binary import encode_graph, BINARY_MIMETYPE
+from services.graph_stream import iter_ndjson, page, NDJSON_MIMETYPE, DEFAULT_PAGE_SIZE
+from services.layout_cache import layout_cache
+from services.response_cache import response_cache, graph_etag, COMPRESSORS
+from services.clustering import lod_service
+from services.analytics import analytics_service
+from services.graph_traversal import neighborhood, shortest_path
+from services.sampling import sampling_service
+from services.collaboration import collaboration, SessionFull
+from services.state_store import state_store
+from services.demo import DEMO_GRAPH, build_demo_graph
+from services.warmup import warmup
+from services.metrics import metrics
+from services.profiler import profiler
+from routes.events import broadcast_graph_ops
+import io
 import uuid
 import json
+import time
 
 api_bp = Blueprint('api', __name__)
 
-# Store des sessions collaboratives
-sessions = {}
+
+# === INSTRUMENTATION DES REQUÊTES ===
+
+@api_bp.before_request
+def _start_request_metrics():
+    """Chronomètre la requête, relève ses étapes et la profile si demandé"""
+    g.metrics_start = time.perf_counter()
+    g.metrics_stages = metrics.begin_capture()
+    g.profile = profiler.start(request.method, request.path,
+                               forced=request.args.get('profile') == '1')
+
+@api_bp.after_request
+def _record_request_metrics(response):
+    """
+    Durée, tailles et statut par route ; étapes dans l'en-tête Server-Timing
+    (et X-Profile-Id si un profil a été conservé)
+    """
+    if 'metrics_start' not in g:
+        return response
+    seconds = time.perf_counter() - g.metrics_start
+    stages = g.metrics_stages
+    metrics.end_capture(stages)
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    labels = {'endpoint': endpoint, 'method': request.method}
+    metrics.inc('http_requests_total', status=response.status_code, **labels)
+    metrics.observe('http_request_seconds', seconds, **labels)
+    if request.content_length:
+        metrics.observe('http_request_bytes', request.content_length, **labels)
+    if not response.is_streamed and response.content_length is not None:
+        metrics.observe('http_response_bytes', response.content_length, **labels)
+
+    timings = [f'{stage};dur={duration * 1000:.1f}'
+               + (f';desc="{",".join(map(str, details.values()))}"' if details else '')
+               for stage, details, duration in stages]
+    response.headers['Server-Timing'] = ', '.join(timings + [f'total;dur={seconds * 1000:.1f}'])
+
+    warmup.request_done(request.path, seconds)
+    profile_id = profiler.finish(g.pop('profile', None), seconds, response.status_code, stages)
+    if profile_id:
+        response.headers['X-Profile-Id'] = profile_id
+    return response
+
+@api_bp.teardown_request
+def _end_request_metrics(error=None):
+    """Libère le relevé des étapes si la requête n'a pas produit de réponse"""
+    if 'metrics_stages' in g:
+        metrics.end_capture(g.metrics_stages)
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profiler.finish(profile, 0.0, 500, [])
 
 @api_bp.route('/health', methods=['GET'])
 def health_check():
     """Vérification que l'API fonctionne"""
     return jsonify({
         'status': 'ok',
-        'message': 'API de visualisation de graphes 3D'
+        'message': 'API de visualisation de graphes 3D',
+        'startup': warmup.stats()
     })
 
 @api_bp.route('/data', methods=['GET'])
@@ -41,129 +109,786 @@ def get_item(item_id):
 def import_csv():
     """
     Importe un fichier CSV et génère un graphe
-    Body: {
+    Body JSON: {
         "csv_content": "source,target,weight\nA,B,1\n...",
         "source_col": "source",
         "target_col": "target",
-        "layout": "force"
+        "layout": "force",  # force | spring | sphere | multilevel | circular | random
+        "layout_params": {"iterations": 100, "tol": 0.0001, "seed": 42},
+        "async": false,  # true : réponse 202 immédiate, suivi via /api/jobs/<graph_id>
+        "base_graph_id": null,  # réimport : layout incrémental à partir de ce graphe
+                                # (layout_params : mode fixed | warm, hops, iterations)
+        "include_graph": false  # true : graph_data complet dans la réponse ; sinon
+                                # résumé, graphe à lire par GET /graph/<id> (flux, pages)
     }
+    Ou, pour les gros fichiers, envoi en flux (lu ligne par ligne) :
+    - multipart/form-data avec le fichier dans le champ "file"
+    - corps brut (text/csv)
+    les autres paramètres passant en query string ou champs de formulaire
+    (layout_params encodé en JSON) : ?source_col=from&layout=multilevel&async=1
     """
     try:
+        if not request.is_json:
+            return _import_csv_stream()
+        
         data = request.get_json()
         csv_content = data.get('csv_content')
         source_col = data.get('source_col', 'source')
         target_col = data.get('target_col', 'target')
         layout_type = data.get('layout', 'force')
+        layout_params = data.get('layout_params')
         
         if not csv_content:
             return jsonify({'error': 'csv_content requis'}), 400
         
+        base = _base_graph(data.get('base_graph_id'))
+        if base is False:
+            return jsonify({'error': 'Graphe de base non trouvé'}), 404
+        
+        if data.get('async'):
+            return _submit_import_job('csv', {
+                'csv_content': csv_content,
+                'source_col': source_col,
+                'target_col': target_col,
+                'base': base
+            }, layout_type, layout_params)
+        
         # Parser le CSV
         graph_data = graph_service.parse_csv_to_graph(
             csv_content, source_col, target_col
         )
         
         # Calculer le layout 3D
-        graph_data = graph_service.compute_layout(graph_data, layout_type)
+        graph_data = graph_service.compute_layout(
+            graph_data, layout_type, layout_params, base=base
+        )
         
         # Sauvegarder le graphe
         graph_id = str(uuid.uuid4())
         graph_service.save_graph(graph_id, graph_data)
         
-        return jsonify({
-            'success': True,
-            'graph_id': graph_id,
-            'graph_data': graph_data
-        })
+        return _import_response(graph_id, data.get('include_graph'))
         
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Erreur serveur: {str(e)}'}), 500
 
+def _upload_stream():
+    """
+    Fichier envoyé en flux (champ multipart "file" ou corps brut) et
+    paramètres de l'import (query string ou champs de formulaire,
+    layout_params encodé en JSON)
+    """
+    upload = request.files.get('file')
+    stream = upload.stream if upload is not None else request.stream
+    
+    params = {**request.form.to_dict(), **request.args.to_dict()}
+    if params.get('layout_params'):
+        try:
+            params['layout_params'] = json.loads(params['layout_params'])
+        except json.JSONDecodeError as e:
+            raise ValueError(f"layout_params invalide: {str(e)}")
+    return stream, params
+
+def _import_csv_stream():
+    """Import CSV en flux (multipart ou corps brut), sans charger le fichier en mémoire"""
+    stream, params = _upload_stream()
+    layout_type = params.get('layout', 'force')
+    layout_params = params.get('layout_params')
+    
+    base = _base_graph(params.get('base_graph_id'))
+    if base is False:
+        return jsonify({'error': 'Graphe de base non trouvé'}), 404
+    
+    table = parse_csv_stream(
+        stream,
+        params.get('source_col', 'source'),
+        params.get('target_col', 'target')
+    )
+    if table.edge_count == 0:
+        return jsonify({'error': 'Aucune arête trouvée dans le CSV'}), 400
+    
+    if params.get('async') in ('1', 'true'):
+        return _submit_import_job('table', {'table': table, 'base': base},
+                                  layout_type, layout_params)
+    
+    graph = graph_service.layout_edge_table(table, layout_type, layout_params,
+                                            base=base)
+    
+    graph_id = str(uuid.uuid4())
+    graph_service.save_graph(graph_id, graph)
+    
+    return _import_response(graph_id, params.get('include_graph') in ('1', 'true'))
+
 @api_bp.route('/graph/import/json', methods=['POST'])
 def import_json():
     """
     Importe un fichier JSON et génère un graphe
     Body: {
-        "json_content": "{nodes: [...], edges: [...]}",
-        "layout": "force"
+        "json_content": "{nodes: [...], edges: [...]}",  # texte ou objet déjà décodé
+        "layout": "force",
+        "layout_params": {"iterations": 100, "tol": 0.0001, "seed": 42},
+        "async": false,
+        "base_graph_id": null,  # réimport incrémental (voir import_csv)
+        "include_graph": false
     }
+    Ou, pour les gros fichiers, envoi en flux (multipart, champ "file", ou
+    corps brut non JSON) avec les paramètres en query string, comme pour
+    import_csv : le fichier est parcouru une seule fois, nœud par nœud et
+    arête par arête (voir services/ingest.py)
     """
     try:
+        if not request.is_json:
+            return _import_json_stream()
+        
         data = request.get_json()
         json_content = data.get('json_content')
         layout_type = data.get('layout', 'force')
+        layout_params = data.get('layout_params')
         
         if not json_content:
             return jsonify({'error': 'json_content requis'}), 400
         
-        # Si json_content est déjà un dict, le reconvertir en string
-        if isinstance(json_content, dict):
-            json_content = json.dumps(json_content)
+        base = _base_graph(data.get('base_graph_id'))
+        if base is False:
+            return jsonify({'error': 'Graphe de base non trouvé'}), 404
         
-        # Parser le JSON
-        graph_data = graph_service.parse_json_to_graph(json_content)
+        if isinstance(json_content, str):
+            if data.get('async'):
+                # Texte parsé dans le worker
+                return _submit_import_job('json', {'json_content': json_content,
+                                                   'base': base},
+                                          layout_type, layout_params)
+            graph = parse_json_stream(io.StringIO(json_content), encoding=None)
+        else:
+            # Objet déjà décodé avec le corps de la requête : pas de réencodage
+            graph = parse_json_data(json_content)
+            if data.get('async'):
+                return _submit_import_job('graph', {'graph': graph, 'base': base},
+                                          layout_type, layout_params)
         
         # Calculer le layout 3D
-        graph_data = graph_service.compute_layout(graph_data, layout_type)
+        graph = graph_service.layout_stored(graph, layout_type, layout_params, base=base)
         
         # Sauvegarder le graphe
         graph_id = str(uuid.uuid4())
-        graph_service.save_graph(graph_id, graph_data)
+        graph_service.save_graph(graph_id, graph)
         
-        return jsonify({
-            'success': True,
-            'graph_id': graph_id,
-            'graph_data': graph_data
-        })
+        return _import_response(graph_id, data.get('include_graph'))
         
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Erreur serveur: {str(e)}'}), 500
 
+def _import_json_stream():
+    """Import JSON en flux (multipart ou corps brut), sans charger le fichier en mémoire"""
+    stream, params = _upload_stream()
+    layout_type = params.get('layout', 'force')
+    layout_params = params.get('layout_params')
+    
+    base = _base_graph(params.get('base_graph_id'))
+    if base is False:
+        return jsonify({'error': 'Graphe de base non trouvé'}), 404
+    
+    graph = parse_json_stream(stream)
+    
+    if params.get('async') in ('1', 'true'):
+        return _submit_import_job('graph', {'graph': graph, 'base': base},
+                                  layout_type, layout_params)
+    
+    graph = graph_service.layout_stored(graph, layout_type, layout_params, base=base)
+    
+    graph_id = str(uuid.uuid4())
+    graph_service.save_graph(graph_id, graph)
+    
+    return _import_response(graph_id, params.get('include_graph') in ('1', 'true'))
+
+def _import_response(graph_id, include_graph=False):
+    """
+    Réponse d'un import synchrone : résumé (métadonnées, version) par défaut,
+    graph_data complet seulement sur demande
+    """
+    graph = graph_service.get_stored(graph_id)
+    result = {
+        'success': True,
+        'graph_id': graph_id,
+        'metadata': graph.metadata,
+        'node_count': graph.node_count,
+        'edge_count': graph.edge_count,
+        'version': graph.version
+    }
+    if include_graph:
+        result['graph_data'] = graph.to_dict()
+    return jsonify(result)
+
+def _base_graph(base_graph_id):
+    """Graphe de base d'un réimport : None si absent, False si introuvable"""
+    if not base_graph_id:
+        return None
+    base = graph_service.get_stored(base_graph_id)
+    return base if base is not None else False
+
+def _submit_import_job(kind, payload, layout_type, layout_params):
+    """Soumet un import au pool de processus et répond immédiatement (202)"""
+    graph_id = str(uuid.uuid4())
+    try:
+        job = job_service.submit(graph_id, kind, payload, layout_type, layout_params)
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 429
+    
+    return jsonify({
+        'success': True,
+        'graph_id': graph_id,
+        'job': job
+    }), 202
+
+# === ENDPOINTS POUR LES JOBS D'IMPORT ASYNCHRONES ===
+
+@api_bp.route('/jobs', methods=['GET'])
+def list_jobs():
+    """Liste les jobs d'import"""
+    return jsonify({'jobs': job_service.list_jobs()})
+
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """État d'un job : phase (queued, parsing, layout, saving, done, failed, cancelled) et pourcentage"""
+    job = job_service.get_status(job_id)
+    if job is None:
+        return jsonify({'error': 'Job non trouvé'}), 404
+    
+    return jsonify(job)
+
+@api_bp.route('/jobs/<job_id>/cancel', methods=['POST'])
+@api_bp.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Annule un job en attente ou en cours"""
+    job = job_service.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Job non trouvé'}), 404
+    
+    return jsonify({
+        'success': True,
+        'job': job
+    })
+
 # === ENDPOINTS POUR LA GESTION DES GRAPHES ===
 
 @api_bp.route('/graph/<graph_id>', methods=['GET'])
 def get_graph(graph_id):
-    """Récupère un graphe par son ID"""
-    graph_data = graph_service.get_graph(graph_id)
+    """
+    Récupère un graphe par son ID
+    Format binaire (positions / arêtes en tableaux typés, voir
+    services/graph_binary.py) avec l'en-tête
+    Accept: application/x-graph-binary ou ?format=binary
+    Flux NDJSON par tranches (voir services/graph_stream.py) avec
+    Accept: application/x-ndjson ou ?format=ndjson
+    Chaque réponse porte un ETag (version du graphe) : If-None-Match
+    retourne 304 ; JSON et binaire sont servis depuis le cache de réponses,
+    compressés selon Accept-Encoding (voir services/response_cache.py)
+    """
+    graph = graph_service.get_stored(graph_id)
     
-    if graph_data is None:
+    if graph is None:
+        # Graphe encore en cours de calcul par un job asynchrone
+        job = job_service.get_status(graph_id)
+        if job is not None and job['phase'] in ACTIVE_PHASES:
+            return jsonify({'pending': True, 'job': job}), 202
         return jsonify({'error': 'Graphe non trouvé'}), 404
     
-    return jsonify(graph_data)
+    response_format = _response_format()
+    etag = graph_etag(graph_id, graph, response_format)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    elif response_format == BINARY_MIMETYPE:
+        response = _cached_response(graph_id, graph, BINARY_MIMETYPE,
+                                    lambda: b''.join(encode_graph(graph)))
+    elif response_format == NDJSON_MIMETYPE:
+        # Réponse en flux (chunked) : une tranche sérialisée à la fois, hors cache
+        response = Response(iter_ndjson(graph, graph_id), mimetype=NDJSON_MIMETYPE)
+    else:
+        response = _cached_response(graph_id, graph, 'application/json',
+                                    lambda: jsonify(graph.to_dict()).get_data())
+    response.set_etag(etag, weak=True)
+    response.cache_control.no_cache = True
+    response.vary.add('Accept')
+    return response
+
+def _cached_response(graph_id, graph, mimetype, build, variant=''):
+    """
+    Réponse sérialisée une fois par version du graphe (build() en cas
+    d'absence du cache), compressée avec l'encodage préféré du client
+    """
+    def serialize():
+        with metrics.span('serialize', format=mimetype.rsplit('/', 1)[-1]):
+            return build()
+    
+    entry = response_cache.get(graph_id, graph, mimetype, serialize, variant)
+    # Encodages acceptés par le client, par qualité puis par efficacité
+    accepted = [encoding for encoding in COMPRESSORS if request.accept_encodings[encoding] > 0]
+    accepted.sort(key=lambda encoding: -request.accept_encodings[encoding])
+    body, encoding = response_cache.encode(entry, accepted)
+    
+    response = Response(body, mimetype=mimetype)
+    if encoding:
+        response.content_encoding = encoding
+    response.set_etag(entry.etag, weak=True)
+    response.vary.add('Accept-Encoding')
+    return response
+
+def _response_format():
+    """Négociation du format de réponse d'un graphe (type MIME)"""
+    requested = request.args.get('format')
+    if requested == 'binary':
+        return BINARY_MIMETYPE
+    if requested == 'ndjson':
+        return NDJSON_MIMETYPE
+    # JSON reste le format par défaut (Accept absent ou */*)
+    return request.accept_mimetypes.best_match(
+        ['application/json', BINARY_MIMETYPE, NDJSON_MIMETYPE]
+    ) or 'application/json'
+
+@api_bp.route('/graph/<graph_id>/nodes', methods=['GET'])
+@api_bp.route('/graph/<graph_id>/edges', methods=['GET'])
+def get_graph_page(graph_id):
+    """
+    Parcours paginé des nœuds ou des arêtes d'un graphe
+    Query: ?cursor=<next_cursor de la page précédente>&limit=5000
+    Réponse: {nodes | edges, total, version, next_cursor}
+    """
+    try:
+        graph = graph_service.get_stored(graph_id)
+        if graph is None:
+            return jsonify({'error': 'Graphe non trouvé'}), 404
+        
+        kind = request.path.rsplit('/', 1)[-1]
+        result = page(graph, kind, request.args.get('cursor'),
+                      request.args.get('limit', DEFAULT_PAGE_SIZE))
+        
+        return jsonify({
+            'success': True,
+            'graph_id': graph_id,
+            **result
+        })
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/graph/<graph_id>', methods=['DELETE'])
+def delete_graph(graph_id):
+    """Supprime un graphe (libère sa mémoire)"""
+    if not graph_service.delete_graph(graph_id):
+        return jsonify({'error': 'Graphe non trouvé'}), 404
+    
+    return jsonify({'success': True})
 
 @api_bp.route('/graph/list', methods=['GET'])
 def list_graphs():
-    """Liste tous les graphes disponibles"""
+    """Liste tous les graphes disponibles (et état du stockage : graphes ouverts, évictions)"""
     graphs = graph_service.list_graphs()
-    return jsonify({'graphs': graphs})
+    return jsonify({'graphs': graphs, 'store': graph_service.store_stats()})
 
 @api_bp.route('/graph/<graph_id>/filter', methods=['POST'])
 def filter_graph(graph_id):
     """
     Filtre un graphe selon des critères
     Body: {
-        "node_property": {"type": "person"},
-        "edge_property": {"weight": ">5"},
-        "min_connections": 2
+        "node_property": {"type": "person", "age": {"$between": [25, 35]}},
+        "edge_property": {"weight": ">5", "relationship": ["friend", "family"]},
+        "min_connections": 2,
+        "max_connections": 10,
+        "metrics": {"pagerank": {"$gt": 0.001}, "component": 0}
     }
+    Opérateurs : $eq $ne $gt $gte $lt $lte $in $nin $between, ou texte
+    ">5", ">=5", "<5", "<=5", "!=5" ; une liste vaut $in
     """
     try:
-        graph_data = graph_service.get_graph(graph_id)
-        if graph_data is None:
+        graph = graph_service.get_stored(graph_id)
+        if graph is None:
             return jsonify({'error': 'Graphe non trouvé'}), 404
         
         filters = request.get_json()
-        filtered_graph = graph_service.filter_graph(graph_data, filters)
+        # Même filtre sur la même version du graphe : réponse en cache
+        return _cached_response(
+            graph_id, graph, 'application/json',
+            lambda: jsonify({
+                'success': True,
+                'graph_data': graph_service.filter_graph(graph, filters)
+            }).get_data(),
+            variant='filter:' + json.dumps(filters, sort_keys=True, default=str)
+        )
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/graph/<graph_id>/viewport', methods=['POST'])
+def query_viewport(graph_id):
+    """
+    Nœuds et arêtes visibles depuis la caméra, du plus proche au plus lointain
+    Body: {
+        "box": {"min": [-5, -5, -5], "max": [5, 5, 5]},  # ou
+        "frustum": [[a, b, c, d], ...],  # 6 plans, intérieur : a·x + b·y + c·z + d >= 0
+        "camera": [0, 0, -20],           # ordre de distance (centre de la boîte par défaut)
+        "budget": 2000,                  # nœuds par page
+        "offset": 0                      # page suivante : next_offset de la réponse
+    }
+    """
+    try:
+        graph = graph_service.get_stored(graph_id)
+        if graph is None:
+            return jsonify({'error': 'Graphe non trouvé'}), 404
+        
+        data = request.get_json() or {}
+        result = graph_service.viewport_query(
+            graph,
+            box=data.get('box'),
+            frustum=data.get('frustum'),
+            camera=data.get('camera'),
+            budget=data.get('budget', 2000),
+            offset=data.get('offset', 0)
+        )
+        
+        return jsonify({
+            'success': True,
+            'graph_id': graph_id,
+            **result
+        })
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/graph/<graph_id>/positions', methods=['PATCH'])
+def update_positions(graph_id):
+    """
+    Déplace des nœuds (opérations move_node versionnées, index spatial
+    mis à jour incrémentalement)
+    Body: {
+        "positions": {"Alice": {"x": 1.0, "y": 2.0, "z": 0.5}, ...}
+    }
+    """
+    try:
+        graph = graph_service.get_stored(graph_id)
+        if graph is None:
+            return jsonify({'error': 'Graphe non trouvé'}), 404
+        
+        data = request.get_json() or {}
+        result = graph_service.update_positions(graph_id, graph, data.get('positions') or {})
+        broadcast_graph_ops(graph_id, result)
+        
+        return jsonify({
+            'success': True,
+            'updated': len(result['ops']),
+            'version': result['version']
+        })
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/graph/<graph_id>/ops', methods=['POST'])
+def apply_graph_ops(graph_id):
+    """
+    Modifie un graphe en place par opérations versionnées, diffusées aux
+    clients qui suivent le graphe (événement Socket.IO graph_ops)
+    Body: {
+        "ops": [
+            {"op": "add_node", "id": "Zoé", "properties": {"age": 27}},
+            {"op": "add_edge", "source": "Zoé", "target": "Alice"},
+            {"op": "move_node", "id": "Bob", "position": [1, 2, 3]}
+        ]
+    }
+    Opérations : add_node, remove_node, move_node, update_node,
+    add_edge, remove_edge, update_edge (voir services/graph_ops.py)
+    """
+    try:
+        graph = graph_service.get_stored(graph_id)
+        if graph is None:
+            return jsonify({'error': 'Graphe non trouvé'}), 404
+        
+        data = request.get_json() or {}
+        result = graph_service.apply_ops(graph_id, graph, data.get('ops'))
+        broadcast_graph_ops(graph_id, result)
+        
+        return jsonify({
+            'success': True,
+            'graph_id': graph_id,
+            **result
+        })
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/graph/<graph_id>/append', methods=['POST'])
+def append_to_graph(graph_id):
+    """
+    Ajoute des nœuds et des arêtes à un graphe avec layout incrémental :
+    les nœuds existants gardent leur position (mode fixed) ou seul le
+    voisinage des ajouts est relâché (mode warm)
+    Body: {
+        "nodes": [{"id": "Zoé", "properties": {"age": 27}}],
+        "edges": [{"source": "Zoé", "target": "Alice"}],
+        "layout_params": {"mode": "warm", "hops": 1, "iterations": 50}
+    }
+    Les opérations produites sont diffusées comme celles de /ops
+    """
+    try:
+        graph = graph_service.get_stored(graph_id)
+        if graph is None:
+            return jsonify({'error': 'Graphe non trouvé'}), 404
+        
+        data = request.get_json() or {}
+        result = graph_service.append_to_graph(
+            graph_id, graph, data.get('nodes') or [], data.get('edges') or [],
+            data.get('layout_params')
+        )
+        broadcast_graph_ops(graph_id, result)
+        
+        return jsonify({
+            'success': True,
+            'graph_id': graph_id,
+            **result
+        })
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/graph/<graph_id>/ops', methods=['GET'])
+def get_graph_ops(graph_id):
+    """
+    Opérations postérieures à une version (resynchronisation d'un client)
+    Query: ?since=12
+    Réponse {version, ops} ou {version, resync: true} si le graphe complet
+    doit être rechargé
+    """
+    try:
+        graph = graph_service.get_stored(graph_id)
+        if graph is None:
+            return jsonify({'error': 'Graphe non trouvé'}), 404
+        
+        result = graph_service.ops_since(graph, request.args.get('since', 0))
+        
+        return jsonify({
+            'success': True,
+            'graph_id': graph_id,
+            **result
+        })
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/graph/<graph_id>/lod', methods=['GET'])
+def get_lod(graph_id):
+    """
+    Niveau de détail d'un graphe : clusters agrégés (super-nœuds, super-arêtes)
+    Query: ?level=N (0 : graphe complet)&max_edges=20000
+    Par défaut, le niveau le plus détaillé dont les arêtes tiennent dans
+    max_edges (sinon le plus agrégé, arêtes les plus lourdes seulement)
+    La hiérarchie est calculée après l'import (ou à la première demande)
+    puis conservée
+    """
+    try:
+        graph = graph_service.get_stored(graph_id)
+        if graph is None:
+            return jsonify({'error': 'Graphe non trouvé'}), 404
+        
+        result = lod_service.level(graph, request.args.get('level'),
+                                   request.args.get('max_edges'))
         
         return jsonify({
             'success': True,
-            'graph_data': filtered_graph
+            'graph_id': graph_id,
+            **result
         })
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/graph/<graph_id>/lod/<cluster_id>/children', methods=['GET'])
+def expand_cluster(graph_id, cluster_id):
+    """
+    Développe un cluster 'niveau:index' : éléments du niveau inférieur,
+    arêtes internes et liens agrégés vers les autres clusters
+    """
+    try:
+        graph = graph_service.get_stored(graph_id)
+        if graph is None:
+            return jsonify({'error': 'Graphe non trouvé'}), 404
+        
+        result = lod_service.expand(graph, cluster_id)
+        
+        return jsonify({
+            'success': True,
+            'graph_id': graph_id,
+            **result
+        })
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/graph/<graph_id>/preview', methods=['GET'])
+def get_preview(graph_id):
+    """
+    Aperçu d'un graphe : échantillon représentatif borné, avec positions,
+    pour un premier rendu avant le graphe complet
+    Query: ?strategy=top_degree|random_walk|forest_fire|stratified
+           &budget=2000&max_edges=8000&seed=0
+           &property=<propriété ou métrique>&strata=10 (stratified)
+    Échantillon conservé par révision du graphe (l'aperçu par défaut est
+    calculé à l'import) ; réponse en cache jusqu'à la modification suivante
+    """
+    try:
+        graph = graph_service.get_stored(graph_id)
+        if graph is None:
+            return jsonify({'error': 'Graphe non trouvé'}), 404
+        
+        args = request.args
+        params = sampling_service.params(args.get('strategy'), args.get('budget'),
+                                         args.get('property'), args.get('strata'),
+                                         args.get('seed'), args.get('max_edges'))
+        variant = 'preview:' + json.dumps(params, sort_keys=True)
+        etag = graph_etag(graph_id, graph, 'application/json', variant)
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = _cached_response(
+                graph_id, graph, 'application/json',
+                lambda: jsonify({
+                    'success': True,
+                    'graph_id': graph_id,
+                    **sampling_service.preview(graph, params)
+                }).get_data(),
+                variant=variant
+            )
+        response.set_etag(etag, weak=True)
+        response.cache_control.no_cache = True
+        return response
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/graph/<graph_id>/neighborhood', methods=['GET'])
+def get_neighborhood(graph_id):
+    """
+    Voisinage d'un nœud (réseau ego) sans charger le graphe complet
+    Query: ?node=<id>&hops=1&budget=1000
+    Nœuds à au plus `hops` sauts (champ 'hops' : distance au centre) avec
+    leurs positions, arêtes entre eux ; 'truncated' si le budget est atteint
+    """
+    try:
+        graph = graph_service.get_stored(graph_id)
+        if graph is None:
+            return jsonify({'error': 'Graphe non trouvé'}), 404
+        
+        node_id = request.args.get('node')
+        if node_id is None:
+            return jsonify({'error': 'Paramètre node requis'}), 400
+        
+        result = neighborhood(graph, node_id, request.args.get('hops'),
+                              request.args.get('budget'))
+        
+        return jsonify({
+            'success': True,
+            'graph_id': graph_id,
+            **result
+        })
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/graph/<graph_id>/path', methods=['GET'])
+def get_shortest_path(graph_id):
+    """
+    Plus court chemin entre deux nœuds (parcours en largeur bidirectionnel)
+    Query: ?source=<id>&target=<id>&max_hops=N
+    Retourne les nœuds (avec positions) et arêtes du chemin, dans l'ordre
+    """
+    try:
+        graph = graph_service.get_stored(graph_id)
+        if graph is None:
+            return jsonify({'error': 'Graphe non trouvé'}), 404
+        
+        source = request.args.get('source')
+        target = request.args.get('target')
+        if source is None or target is None:
+            return jsonify({'error': 'Paramètres source et target requis'}), 400
+        
+        result = shortest_path(graph, source, target, request.args.get('max_hops'))
+        
+        return jsonify({
+            'success': True,
+            'graph_id': graph_id,
+            **result
+        })
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/graph/<graph_id>/analytics', methods=['GET'])
+def get_analytics(graph_id):
+    """
+    Résumé des métriques d'un graphe : degrés, composantes connexes et
+    nœuds les plus centraux (degree, pagerank, betweenness)
+    Les métriques sont conservées jusqu'à la prochaine modification du graphe
+    """
+    try:
+        graph = graph_service.get_stored(graph_id)
+        if graph is None:
+            return jsonify({'error': 'Graphe non trouvé'}), 404
+        
+        return jsonify({
+            'success': True,
+            'graph_id': graph_id,
+            **analytics_service.summary(graph)
+        })
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/graph/<graph_id>/analytics/<metric>', methods=['GET'])
+def get_metric(graph_id, metric):
+    """
+    Valeurs d'une métrique (degree, weighted_degree, component, pagerank,
+    betweenness) dans l'ordre des nœuds du graphe, avec min et max
+    """
+    try:
+        graph = graph_service.get_stored(graph_id)
+        if graph is None:
+            return jsonify({'error': 'Graphe non trouvé'}), 404
+        
+        return jsonify({
+            'success': True,
+            'graph_id': graph_id,
+            **analytics_service.values(graph, metric)
+        })
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -175,33 +900,47 @@ def save_graph_state(graph_id):
         "state_name": "Mon état 1",
         "camera": {...},
         "visible_nodes": [...],
-        "filters": {...}
+        "filters": {...},
+        "parent_state_id": "..."  (optionnel, état de référence du delta)
     }
+    visible_nodes est conservé comme un ensemble (ordre et doublons perdus)
     """
     try:
-        graph_data = graph_service.get_graph(graph_id)
-        if graph_data is None:
+        if graph_service.get_stored(graph_id) is None:
             return jsonify({'error': 'Graphe non trouvé'}), 404
         
         state_data = request.get_json()
-        state_id = str(uuid.uuid4())
+        if not isinstance(state_data, dict):
+            return jsonify({'error': 'État invalide: objet JSON attendu'}), 400
+        parent_id = state_data.pop('parent_state_id', None)
         
-        # Ajouter l'état aux métadonnées du graphe
-        if 'states' not in graph_data:
-            graph_data['states'] = {}
+        state = graph_service.add_state(graph_id, state_data,
+                                        name=state_data.get('state_name'),
+                                        timestamp=state_data.get('timestamp'),
+                                        parent_id=parent_id)
         
-        graph_data['states'][state_id] = {
-            'id': state_id,
-            'name': state_data.get('state_name', f'État {len(graph_data["states"]) + 1}'),
-            'timestamp': state_data.get('timestamp'),
-            'data': state_data
-        }
+        return jsonify({
+            'success': True,
+            'state_id': state['id'],
+            'state': state
+        })
         
-        graph_service.save_graph(graph_id, graph_data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/graph/<graph_id>/states', methods=['GET'])
+def list_graph_states(graph_id):
+    """Liste les états sauvegardés d'un graphe (sans leur contenu)"""
+    try:
+        if graph_service.get_stored(graph_id) is None:
+            return jsonify({'error': 'Graphe non trouvé'}), 404
         
         return jsonify({
             'success': True,
-            'state_id': state_id
+            'states': state_store.list(graph_id),
+            'retention': state_store.retention
         })
         
     except Exception as e:
@@ -211,22 +950,33 @@ def save_graph_state(graph_id):
 def load_graph_state(graph_id, state_id):
     """Charge un état sauvegardé du graphe"""
     try:
-        graph_data = graph_service.get_graph(graph_id)
-        if graph_data is None:
+        if graph_service.get_stored(graph_id) is None:
             return jsonify({'error': 'Graphe non trouvé'}), 404
         
-        states = graph_data.get('states', {})
-        if state_id not in states:
+        state = graph_service.get_state(graph_id, state_id)
+        if state is None:
             return jsonify({'error': 'État non trouvé'}), 404
         
         return jsonify({
             'success': True,
-            'state': states[state_id]
+            'state': state
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@api_bp.route('/graph/<graph_id>/states/<state_id>', methods=['DELETE'])
+def delete_graph_state(graph_id, state_id):
+    """Supprime un état sauvegardé du graphe"""
+    try:
+        if not state_store.delete(graph_id, state_id):
+            return jsonify({'error': 'État non trouvé'}), 404
+        
+        return jsonify({'success': True})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # === ENDPOINTS POUR LES SESSIONS COLLABORATIVES ===
 
 @api_bp.route('/session/create', methods=['POST'])
@@ -240,22 +990,18 @@ def create_session():
     }
     """
     try:
-        data = request.get_json()
-        session_id = str(uuid.uuid4())
-        
-        sessions[session_id] = {
-            'id': session_id,
-            'name': data.get('session_name', f'Session {len(sessions) + 1}'),
-            'graph_id': data.get('graph_id'),
-            'max_users': data.get('max_users', 10),
-            'users': [],
-            'created_at': data.get('timestamp')
-        }
+        data = request.get_json() or {}
+        session = collaboration.create_session(
+            data.get('session_name'),
+            data.get('graph_id'),
+            data.get('max_users', 10),
+            data.get('timestamp')
+        )
         
         return jsonify({
             'success': True,
-            'session_id': session_id,
-            'session': sessions[session_id]
+            'session_id': session['id'],
+            'session': session
         })
         
     except Exception as e:
@@ -271,89 +1017,185 @@ def join_session(session_id):
     }
     """
     try:
-        if session_id not in sessions:
+        data = request.get_json() or {}
+        joined = collaboration.join_session(
+            session_id,
+            data.get('user_id', str(uuid.uuid4())),
+            data.get('user_name', 'Anonyme'),
+            data.get('timestamp')
+        )
+        if joined is None:
             return jsonify({'error': 'Session non trouvée'}), 404
         
-        session = sessions[session_id]
-        data = request.get_json()
-        
-        user_info = {
-            'id': data.get('user_id', str(uuid.uuid4())),
-            'name': data.get('user_name', 'Anonyme'),
-            'joined_at': data.get('timestamp')
-        }
-        
-        if len(session['users']) >= session['max_users']:
-            return jsonify({'error': 'Session pleine'}), 403
-        
-        session['users'].append(user_info)
-        
+        session, user_info = joined
         return jsonify({
             'success': True,
             'session': session,
             'user': user_info
         })
         
+    except SessionFull as e:
+        return jsonify({'error': str(e)}), 403
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @api_bp.route('/session/<session_id>', methods=['GET'])
 def get_session(session_id):
     """Récupère les informations d'une session"""
-    if session_id not in sessions:
+    session = collaboration.get_session(session_id)
+    if session is None:
         return jsonify({'error': 'Session non trouvée'}), 404
     
-    return jsonify(sessions[session_id])
+    return jsonify(session)
 
 @api_bp.route('/session/list', methods=['GET'])
 def list_sessions():
     """Liste toutes les sessions actives"""
     return jsonify({
-        'sessions': list(sessions.values())
+        'sessions': collaboration.list_sessions(),
+        'stats': collaboration.stats()
     })
 
+# === CACHE DES LAYOUTS ===
+
+@api_bp.route('/layout-cache', methods=['GET'])
+def get_layout_cache_stats():
+    """Compteurs du cache de layouts (succès, échecs, évictions, mémoire)"""
+    return jsonify(layout_cache.stats())
+
+@api_bp.route('/layout-cache', methods=['DELETE'])
+def clear_layout_cache():
+    """Vide le cache de layouts en mémoire"""
+    layout_cache.clear()
+    return jsonify({
+        'success': True,
+        'stats': layout_cache.stats()
+    })
+
+# === CACHE DES RÉPONSES ===
+
+@api_bp.route('/response-cache', methods=['GET'])
+def get_response_cache_stats():
+    """Compteurs du cache de réponses (succès, compressions, évictions, mémoire)"""
+    return jsonify(response_cache.stats())
+
+@api_bp.route('/response-cache', methods=['DELETE'])
+def clear_response_cache():
+    """Vide le cache de réponses"""
+    response_cache.clear()
+    return jsonify({
+        'success': True,
+        'stats': response_cache.stats()
+    })
+
+# === MÉTRIQUES ET PROFILS ===
+
+@metrics.collector
+def _service_metrics():
+    """Compteurs des caches, du stockage et des jobs, lus à chaque export"""
+    cache = layout_cache.stats()
+    responses = response_cache.stats()
+    store = graph_service.store_stats()
+    states = state_store.stats()
+    startup = warmup.stats()
+    jobs = job_service.list_jobs()
+    samples = [
+        ('layout_cache_lookups_total', 'counter', "Recherches dans le cache de layouts",
+         cache['hits'], {'result': 'hit'}),
+        ('layout_cache_lookups_total', 'counter', "Recherches dans le cache de layouts",
+         cache['disk_hits'], {'result': 'disk_hit'}),
+        ('layout_cache_lookups_total', 'counter', "Recherches dans le cache de layouts",
+         cache['misses'], {'result': 'miss'}),
+        ('layout_cache_evictions_total', 'counter', "Layouts évincés du cache",
+         cache['evictions'], {}),
+        ('layout_cache_bytes', 'gauge', "Mémoire occupée par le cache de layouts",
+         cache['bytes'], {}),
+        ('response_cache_lookups_total', 'counter', "Recherches dans le cache de réponses",
+         responses['hits'], {'result': 'hit'}),
+        ('response_cache_lookups_total', 'counter', "Recherches dans le cache de réponses",
+         responses['misses'], {'result': 'miss'}),
+        ('response_cache_compressions_total', 'counter', "Réponses compressées (une fois par encodage)",
+         responses['compressions'], {}),
+        ('response_cache_bytes', 'gauge', "Mémoire occupée par le cache de réponses",
+         responses['bytes'], {}),
+        ('graph_store_open', 'gauge', "Graphes ouverts en mémoire", store['open'], {}),
+        ('graph_store_dirty', 'gauge', "Graphes modifiés non encore écrits sur disque",
+         store['dirty'], {}),
+        ('graph_store_bytes', 'gauge', "Mémoire estimée des graphes ouverts",
+         store['bytes'], {}),
+        ('graph_store_evictions_total', 'counter', "Graphes fermés pour libérer la mémoire",
+         store['evictions'], {}),
+        ('state_store_snapshots', 'gauge', "États sauvegardés (tous graphes)",
+         states['snapshots'], {}),
+        ('state_store_bytes', 'gauge', "Taille des contenus d'états stockés (dédupliqués)",
+         states['bytes'], {})
+    ]
+    if startup['import_seconds'] is not None:
+        samples.append(('app_startup_seconds', 'gauge', "Durées du démarrage (import, préparation)",
+                        startup['import_seconds'], {'step': 'import'}))
+    samples.extend(('app_startup_seconds', 'gauge', "Durées du démarrage (import, préparation)",
+                    seconds, {'step': step}) for step, seconds in startup['steps'].items())
+    if startup['first_request'] is not None:
+        samples.append(('app_first_request_seconds', 'gauge', "Durée de la première requête servie",
+                        startup['first_request']['seconds'], {}))
+    phases = {}
+    for job in jobs:
+        phases[job['phase']] = phases.get(job['phase'], 0) + 1
+    samples.extend(('import_jobs', 'gauge', "Imports asynchrones connus par phase",
+                    count, {'phase': phase}) for phase, count in sorted(phases.items()))
+    return samples
+
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Métriques au format texte Prometheus"""
+    return Response(metrics.render(), mimetype='text/plain',
+                    content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@api_bp.route('/debug/profiles', methods=['GET'])
+def list_profiles():
+    """Profils des dernières requêtes lentes (ou demandées avec ?profile=1)"""
+    return jsonify({
+        'enabled': profiler.enabled,
+        'slow_ms': profiler.slow_seconds * 1000,
+        'profiles': profiler.list_profiles()
+    })
+
+@api_bp.route('/debug/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """
+    Piles échantillonnées d'une requête au format collapsed (flamegraph.pl,
+    speedscope), ou profil complet avec ?format=json
+    """
+    profile = profiler.get_profile(profile_id)
+    if profile is None:
+        return jsonify({'error': 'Profil non trouvé'}), 404
+    if request.args.get('format') == 'json':
+        return jsonify(profile)
+    return Response(profiler.collapsed(profile), mimetype='text/plain')
+
 # === ENDPOINT POUR GÉNÉRER UN GRAPHE DE DÉMONSTRATION ===
 
 @api_bp.route('/graph/demo', methods=['GET'])
 def create_demo_graph():
-    """Génère un graphe de démonstration"""
+    """
+    Génère un graphe de démonstration (?async=1 : calcul en arrière-plan)
+    Le layout est servi par le cache après le premier appel (calculé au
+    démarrage avec WARM_START=1)
+    """
     try:
-        # Graphe de démonstration avec des données sociales
-        demo_json = {
-            "nodes": [
-                {"id": "Alice", "label": "Alice", "type": "person", "age": 30},
-                {"id": "Bob", "label": "Bob", "type": "person", "age": 25},
-                {"id": "Charlie", "label": "Charlie", "type": "person", "age": 35},
-                {"id": "David", "label": "David", "type": "person", "age": 28},
-                {"id": "Eve", "label": "Eve", "type": "person", "age": 32},
-                {"id": "Frank", "label": "Frank", "type": "person", "age": 40},
-                {"id": "Grace", "label": "Grace", "type": "person", "age": 27},
-                {"id": "Henry", "label": "Henry", "type": "person", "age": 33}
-            ],
-            "edges": [
-                {"source": "Alice", "target": "Bob", "relationship": "friend", "weight": 5},
-                {"source": "Alice", "target": "Charlie", "relationship": "colleague", "weight": 3},
-                {"source": "Bob", "target": "David", "relationship": "friend", "weight": 4},
-                {"source": "Charlie", "target": "Eve", "relationship": "friend", "weight": 5},
-                {"source": "David", "target": "Frank", "relationship": "family", "weight": 10},
-                {"source": "Eve", "target": "Grace", "relationship": "colleague", "weight": 3},
-                {"source": "Frank", "target": "Henry", "relationship": "friend", "weight": 4},
-                {"source": "Grace", "target": "Alice", "relationship": "friend", "weight": 5},
-                {"source": "Bob", "target": "Eve", "relationship": "friend", "weight": 4},
-                {"source": "Charlie", "target": "Frank", "relationship": "colleague", "weight": 2}
-            ]
-        }
-        
-        graph_data = graph_service.parse_json_to_graph(json.dumps(demo_json))
-        graph_data = graph_service.compute_layout(graph_data, 'force')
+        if request.args.get('async') in ('1', 'true'):
+            return _submit_import_job('graph', {'graph': parse_json_data(DEMO_GRAPH)},
+                                      'force', None)
+        
+        graph = build_demo_graph()
         
         graph_id = str(uuid.uuid4())
-        graph_service.save_graph(graph_id, graph_data)
+        graph_service.save_graph(graph_id, graph)
         
         return jsonify({
             'success': True,
             'graph_id': graph_id,
-            'graph_data': graph_data
+            'graph_data': graph.to_dict()
         })
         
     except Exception as e:
@@ -0,0 +1,232 @@
+import threading
+import time
+from functools import partial
+from flask import request
+from flask_socketio import SocketIO, emit, join_room, leave_room
+from services.graph_service import graph_service
+from services.collaboration import collaboration, SessionFull, TICK_HZ
+from services.layout_stream import PositionFrameEncoder
+
+# Serveur Socket.IO (initialisé sur l'application dans app.py)
+socketio = SocketIO(cors_allowed_origins='*')
+
+# === SALLES DE SESSION ===
+
+_ticker_lock = threading.Lock()
+_ticker_started = False
+
+def _ensure_ticker():
+    """Démarre (une seule fois) la tâche de diffusion des états coalescés"""
+    global _ticker_started
+    with _ticker_lock:
+        if _ticker_started:
+            return
+        _ticker_started = True
+    socketio.start_background_task(_broadcast_loop)
+
+def _broadcast_loop():
+    """Tick à fréquence fixe : un lot par membre prêt (voir services/collaboration.py)"""
+    interval = 1.0 / TICK_HZ
+    while True:
+        started = time.monotonic()
+        for sid, batch in collaboration.collect(started):
+            socketio.emit('session_batch', batch, to=sid,
+                          callback=partial(_on_batch_ack, sid, batch['session_id'], batch['tick']))
+        socketio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+def _on_batch_ack(sid, session_id, tick, *args):
+    collaboration.ack(sid, session_id, tick)
+
+@socketio.on('join_session')
+def on_join_session(data):
+    """
+    Rejoint la salle Socket.IO d'une session collaborative (créée si besoin)
+    Data: {"session_id": "ma-session", "user_id": "user_x", "username": "Alice"}
+    L'acquittement contient les curseurs et sélections courants des autres
+    """
+    session_id = data.get('session_id')
+    user_id = data.get('user_id')
+    if not session_id or not user_id:
+        return {'error': 'session_id et user_id requis'}
+
+    try:
+        state = collaboration.connect(session_id, request.sid, user_id, data.get('username'))
+    except SessionFull as e:
+        return {'error': str(e)}
+
+    join_room(session_id)
+    _ensure_ticker()
+    emit('user_joined', {
+        'user_id': user_id,
+        'username': data.get('username')
+    }, to=session_id, include_self=False)
+    return {'success': True, 'tick_hz': TICK_HZ, **state}
+
+@socketio.on('leave_session')
+def on_leave_session(data):
+    """Quitte la salle Socket.IO d'une session"""
+    session_id = data.get('session_id')
+    if not session_id:
+        return {'error': 'session_id requis'}
+
+    leave_room(session_id)
+    _announce_departures(collaboration.disconnect(request.sid, session_id))
+    return {'success': True}
+
+@socketio.on('disconnect')
+def on_disconnect(*args):
+    """Connexion perdue : retrait de toutes les sessions"""
+    _announce_departures(collaboration.disconnect(request.sid))
+
+def _announce_departures(departures):
+    for session_id, user_id in departures:
+        socketio.emit('user_left', {'user_id': user_id}, to=session_id)
+
+@socketio.on('cursor_move')
+def on_cursor_move(data):
+    """Position du curseur : conservée puis diffusée au prochain tick"""
+    collaboration.update_cursor(request.sid, data.get('session_id'), data.get('position'))
+
+@socketio.on('select_node')
+def on_select_node(data):
+    """Sélection d'un nœud : diffusée au prochain tick"""
+    collaboration.update_selection(request.sid, data.get('session_id'), data.get('node_id'))
+
+# === MODIFICATIONS DU GRAPHE (OPÉRATIONS VERSIONNÉES) ===
+
+def _graph_room(graph_id):
+    return f'graph:{graph_id}'
+
+def broadcast_graph_ops(graph_id, result, user_id=None, skip_sid=None):
+    """Diffuse des opérations appliquées aux clients qui suivent le graphe"""
+    if not result['ops']:
+        return
+    socketio.emit('graph_ops', {
+        'graph_id': graph_id,
+        'version': result['version'],
+        'ops': result['ops'],
+        'user_id': user_id
+    }, to=_graph_room(graph_id), skip_sid=skip_sid)
+
+@socketio.on('watch_graph')
+def on_watch_graph(data):
+    """
+    Suit les modifications d'un graphe (événements graph_ops)
+    Data: {"graph_id": "uuid"} ; l'acquittement donne la version courante
+    """
+    graph_id = data.get('graph_id')
+    graph = graph_service.get_stored(graph_id)
+    if graph is None:
+        return {'error': 'Graphe non trouvé'}
+
+    join_room(_graph_room(graph_id))
+    return {'success': True, 'graph_id': graph_id, 'version': graph.version}
+
+@socketio.on('unwatch_graph')
+def on_unwatch_graph(data):
+    """Ne plus suivre un graphe"""
+    leave_room(_graph_room(data.get('graph_id')))
+    return {'success': True}
+
+@socketio.on('graph_ops')
+def on_graph_ops(data):
+    """
+    Applique des opérations au graphe stocké et les diffuse aux autres
+    clients qui le suivent ; l'émetteur reçoit les opérations versionnées
+    dans l'acquittement
+    Data: {"graph_id": "uuid", "user_id": "user_x", "ops": [...]}
+    """
+    graph_id = data.get('graph_id')
+    graph = graph_service.get_stored(graph_id)
+    if graph is None:
+        return {'error': 'Graphe non trouvé'}
+
+    try:
+        result = graph_service.apply_ops(graph_id, graph, data.get('ops'))
+    except ValueError as e:
+        return {'error': str(e)}
+
+    broadcast_graph_ops(graph_id, result, data.get('user_id'), skip_sid=request.sid)
+    return {'success': True, **result}
+
+@socketio.on('resync')
+def on_resync(data):
+    """
+    Opérations manquées depuis une version
+    Data: {"graph_id": "uuid", "since": 12}
+    Acquittement {version, ops} ou {version, resync: true} (recharger le graphe)
+    """
+    graph = graph_service.get_stored(data.get('graph_id'))
+    if graph is None:
+        return {'error': 'Graphe non trouvé'}
+
+    try:
+        return {'success': True, **graph_service.ops_since(graph, data.get('since', 0))}
+    except ValueError as e:
+        return {'error': str(e)}
+
+# === STREAMING DU LAYOUT ===
+
+@socketio.on('stream_layout')
+def on_stream_layout(data):
+    """
+    Calcule le layout d'un graphe stocké en envoyant des trames de positions
+    intermédiaires au client demandeur et à la salle de sa session
+    Data: {
+        "graph_id": "uuid",
+        "layout": "multilevel",       # force | spring | sphere | multilevel
+        "layout_params": {...},
+        "session_id": "ma-session",   # optionnel
+        "frame_interval": 5           # layout force : itérations entre deux trames
+    }
+    Événements émis : layout_frame (trames), layout_done (positions finales
+    et nouvelle version du graphe), layout_error ; graph_version aux clients
+    qui suivent le graphe
+    """
+    graph_id = data.get('graph_id')
+    graph = graph_service.get_stored(graph_id)
+    if graph is None:
+        return {'error': 'Graphe non trouvé'}
+
+    socketio.start_background_task(
+        _stream_layout, request.sid, graph_id, graph,
+        data.get('layout', 'force'), data.get('layout_params'),
+        data.get('session_id'), data.get('frame_interval')
+    )
+    return {'success': True, 'graph_id': graph_id}
+
+def _emit_frame(event, frame, sid, session_id):
+    """Envoie une trame au demandeur et aux autres membres de sa session"""
+    socketio.emit(event, frame, to=sid)
+    if session_id:
+        socketio.emit(event, frame, to=session_id, skip_sid=sid)
+
+def _stream_layout(sid, graph_id, graph, layout_type, layout_params,
+                   session_id, frame_interval):
+    """Tâche de fond : layout avec trames intermédiaires puis positions finales"""
+    encoder = PositionFrameEncoder(graph_id)
+
+    def on_progress(fraction, positions):
+        _emit_frame('layout_frame', encoder.encode(positions, fraction),
+                    sid, session_id)
+        # Laisser le serveur envoyer la trame avant l'itération suivante
+        socketio.sleep(0)
+
+    try:
+        # Les positions finales sont écrites dans le graphe stocké (nouvelle version)
+        result = graph_service.relayout_stored(
+            graph_id, graph, layout_type, layout_params,
+            callback=on_progress,
+            callback_every=int(frame_interval) if frame_interval else None
+        )
+
+        frame = encoder.encode(result['positions'], 1.0, normalize=False, keyframe=True)
+        frame['version'] = result['version']
+        _emit_frame('layout_done', frame, sid, session_id)
+        # Les clients qui suivent le graphe sans avoir reçu les positions le rechargent
+        socketio.emit('graph_version', {'graph_id': graph_id, 'version': result['version']},
+                      to=_graph_room(graph_id), skip_sid=sid)
+
+    except Exception as e:
+        _emit_frame('layout_error', {'graph_id': graph_id, 'error': str(e)},
+                    sid, session_id)
@@ -0,0 +1,319 @@
+"""
+Métriques précalculées des nœuds des graphes stockés
+
+Métriques (une valeur par nœud, dans l'ordre des nœuds du graphe) :
+- degree : nombre de connexions (arêtes multiples comptées)
+- weighted_degree : somme des poids ('weight', 1 par défaut) des arêtes
+- component : composante connexe, 0 étant la plus grande
+- pagerank : PageRank pondéré sur le graphe non orienté (facteur 0.85)
+- betweenness : centralité d'intermédiarité approchée (Brandes à partir de
+  BETWEENNESS_SAMPLES sources tirées au hasard ; exacte sur les petits
+  graphes), normalisée comme networkx
+
+Les noyaux sont vectorisés (NumPy, parcours en largeur niveau par niveau)
+et travaillent sur les arêtes distinctes du graphe. Les résultats sont des
+colonnes typées conservées avec le graphe pour sa révision courante :
+le filtrage (filters['metrics']) et le rendu les réutilisent. Les
+métriques sont calculées en arrière-plan après l'import (ANALYTICS_ON_IMPORT)
+ou à la première demande.
+"""
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from typing import Any, Dict, List
+
+from services.columns import Column
+from services.graph_store import StoredGraph, edge_weights
+
+METRICS = ('degree', 'weighted_degree', 'component', 'pagerank', 'betweenness')
+
+PAGERANK_ALPHA = 0.85
+PAGERANK_TOL = 1e-6
+PAGERANK_MAX_ITERATIONS = 100
+
+# Sources du calcul approché de la centralité d'intermédiarité
+BETWEENNESS_SAMPLES = int(os.environ.get('ANALYTICS_BETWEENNESS_SAMPLES', 64))
+
+# Nœuds listés par métrique dans le résumé
+TOP_COUNT = 10
+
+
+def _adjacency(n: int, edges: np.ndarray):
+    """Adjacence non orientée au format CSR (indptr, voisins)"""
+    heads = np.concatenate([edges[:, 0], edges[:, 1]])
+    tails = np.concatenate([edges[:, 1], edges[:, 0]])
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(heads, minlength=n), out=indptr[1:])
+    return indptr, tails[np.argsort(heads, kind='stable')]
+
+
+def _neighbor_pairs(indptr: np.ndarray, neighbors: np.ndarray, rows: np.ndarray):
+    """Couples (nœud, voisin) de tous les voisins des nœuds demandés"""
+    lengths = indptr[rows + 1] - indptr[rows]
+    owner = np.repeat(rows, lengths)
+    offsets = np.arange(len(owner)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return owner, neighbors[np.repeat(indptr[rows], lengths) + offsets]
+
+
+def weighted_degrees(graph: StoredGraph) -> np.ndarray:
+    """Somme des poids des arêtes de chaque nœud"""
+    n = graph.node_count
+    weights = edge_weights(graph.edge_columns.get('weight'), graph.edge_count)
+    valid = (graph.src < n) & (graph.dst < n)
+    return (np.bincount(graph.src[valid], weights=weights[valid], minlength=n)
+            + np.bincount(graph.dst[valid], weights=weights[valid], minlength=n))
+
+
+def connected_components(n: int, edges: np.ndarray) -> np.ndarray:
+    """
+    Composante connexe de chaque élément (accrochage des racines à la plus
+    petite racine voisine puis compression des chemins, jusqu'à stabilité) ;
+    composantes numérotées par taille décroissante
+    """
+    labels = np.arange(n, dtype=np.int64)
+    if n == 0:
+        return labels
+    a, b = edges[:, 0], edges[:, 1]
+    while True:
+        la, lb = labels[a], labels[b]
+        differ = la != lb
+        if not differ.any():
+            break
+        low = np.minimum(la, lb)[differ]
+        np.minimum.at(labels, la[differ], low)
+        np.minimum.at(labels, lb[differ], low)
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+
+    _, inverse, counts = np.unique(labels, return_inverse=True, return_counts=True)
+    rank = np.empty(len(counts), dtype=np.int64)
+    rank[np.argsort(-counts, kind='stable')] = np.arange(len(counts))
+    return rank[inverse]
+
+
+def pagerank(n: int, edges: np.ndarray, weights: np.ndarray,
+             alpha: float = PAGERANK_ALPHA, tol: float = PAGERANK_TOL,
+             max_iterations: int = PAGERANK_MAX_ITERATIONS) -> np.ndarray:
+    """
+    PageRank pondéré par itération de la puissance ; la masse des nœuds
+    isolés est répartie uniformément (comme networkx)
+    """
+    if n == 0:
+        return np.zeros(0)
+    heads = np.concatenate([edges[:, 0], edges[:, 1]])
+    tails = np.concatenate([edges[:, 1], edges[:, 0]])
+    weights = np.concatenate([weights, weights])
+    strength = np.bincount(heads, weights=weights, minlength=n)
+    dangling = strength == 0
+    share = weights / strength[heads] if len(heads) else weights
+
+    ranks = np.full(n, 1.0 / n)
+    for _ in range(max_iterations):
+        previous = ranks
+        ranks = alpha * np.bincount(tails, weights=previous[heads] * share, minlength=n)
+        ranks += (alpha * previous[dangling].sum() + 1 - alpha) / n
+        if np.abs(ranks - previous).sum() < n * tol:
+            break
+    return ranks
+
+
+def betweenness(n: int, edges: np.ndarray, samples: int = BETWEENNESS_SAMPLES,
+                seed: int = 0) -> np.ndarray:
+    """
+    Centralité d'intermédiarité (algorithme de Brandes, arêtes non pondérées)
+    Avec `samples` < n, seules `samples` sources tirées au hasard sont
+    parcourues et le résultat est extrapolé (n / samples)
+    """
+    scores = np.zeros(n)
+    if n < 3 or len(edges) == 0:
+        return scores
+    if samples is None or samples >= n:
+        sources = np.arange(n)
+    else:
+        sources = np.random.default_rng(seed).choice(n, samples, replace=False)
+    indptr, neighbors = _adjacency(n, edges)
+
+    distance = np.full(n, -1, dtype=np.int64)
+    paths = np.zeros(n)
+    dependency = np.zeros(n)
+    slot = np.zeros(n, dtype=np.int64)
+    for source in sources.tolist():
+        distance[source] = 0
+        paths[source] = 1.0
+        frontier = np.array([source], dtype=np.int64)
+        reached = [frontier]
+        levels = []
+        depth = 0
+        # Parcours en largeur : nombre de plus courts chemins par niveau
+        while len(frontier):
+            owner, neighbor = _neighbor_pairs(indptr, neighbors, frontier)
+            found = neighbor[distance[neighbor] < 0]
+            # Dédoublonnage sans tri : une seule position retenue par nœud
+            positions = np.arange(len(found))
+            slot[found] = positions
+            found = found[slot[found] == positions]
+            distance[found] = depth + 1
+            on_path = distance[neighbor] == depth + 1
+            owner, neighbor = owner[on_path], neighbor[on_path]
+            np.add.at(paths, neighbor, paths[owner])
+            levels.append((owner, neighbor))
+            reached.append(found)
+            frontier = found
+            depth += 1
+
+        # Accumulation des dépendances du niveau le plus profond vers la source
+        for owner, neighbor in reversed(levels):
+            np.add.at(dependency, owner,
+                      paths[owner] / paths[neighbor] * (1.0 + dependency[neighbor]))
+        dependency[source] = 0.0
+        reached = np.concatenate(reached)
+        scores[reached] += dependency[reached]
+        distance[reached] = -1
+        paths[reached] = 0.0
+        dependency[reached] = 0.0
+
+    return scores * n / len(sources) / ((n - 1) * (n - 2))
+
+
+class GraphAnalytics:
+    """Métriques d'une révision d'un graphe, calculées au premier besoin"""
+
+    def __init__(self, graph: StoredGraph):
+        self.revision = graph.revision
+        self.columns: Dict[str, Column] = {}
+        self._locks = {metric: threading.Lock() for metric in METRICS}
+        self._edges = None
+
+    def column(self, graph: StoredGraph, metric: str) -> Column:
+        """Colonne d'une métrique (un seul calcul même en cas d'appels concurrents)"""
+        column = self.columns.get(metric)
+        if column is None:
+            with self._locks[metric]:
+                column = self.columns.get(metric)
+                if column is None:
+                    column = self.columns[metric] = self._compute(graph, metric)
+        return column
+
+    def _distinct_edges(self, graph: StoredGraph):
+        if self._edges is None:
+            edges, weights = graph.layout_edges()
+            self._edges = (edges.astype(np.int64), np.asarray(weights, dtype=np.float64))
+        return self._edges
+
+    def _compute(self, graph: StoredGraph, metric: str) -> Column:
+        n = graph.node_count
+        if metric == 'degree':
+            return Column(metric, 'int', graph.degrees().astype(np.int64))
+        if metric == 'weighted_degree':
+            return Column(metric, 'float', weighted_degrees(graph))
+        edges, weights = self._distinct_edges(graph)
+        if metric == 'component':
+            return Column(metric, 'int', connected_components(n, edges))
+        if metric == 'pagerank':
+            return Column(metric, 'float', pagerank(n, edges, weights))
+        return Column(metric, 'float', betweenness(n, edges))
+
+
+class AnalyticsService:
+    """Métriques des graphes stockés, conservées tant que le graphe ne change pas"""
+
+    def __init__(self, workers: int = None):
+        self._analytics = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.on_import = os.environ.get('ANALYTICS_ON_IMPORT', '1') != '0'
+        self.workers = workers or int(os.environ.get('ANALYTICS_WORKERS', 1))
+        self._executor = None
+
+    def analytics(self, graph: StoredGraph) -> GraphAnalytics:
+        """Métriques de la révision courante du graphe"""
+        with self._lock:
+            analytics = self._analytics.get(graph)
+            if analytics is None or analytics.revision != graph.revision:
+                analytics = self._analytics[graph] = GraphAnalytics(graph)
+            return analytics
+
+    def check_metric(self, metric: str) -> str:
+        if metric not in METRICS:
+            raise ValueError(f"Métrique inconnue: {metric} (disponibles: {', '.join(METRICS)})")
+        return metric
+
+    def column(self, graph: StoredGraph, metric: str) -> Column:
+        """Colonne d'une métrique, calculée si besoin"""
+        return self.analytics(graph).column(graph, self.check_metric(metric))
+
+    def compute_all(self, graph: StoredGraph):
+        analytics = self.analytics(graph)
+        for metric in METRICS:
+            analytics.column(graph, metric)
+
+    def schedule(self, graph: StoredGraph):
+        """Calcule toutes les métriques en arrière-plan (après un import)"""
+        if not self.on_import or graph.node_count == 0:
+            return
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix='analytics')
+            executor = self._executor
+        # Une erreur en arrière-plan est ignorée : la demande suivante recalcule
+        executor.submit(self.compute_all, graph)
+
+    def computed(self, graph: StoredGraph) -> List[str]:
+        """Métriques déjà disponibles pour la révision courante"""
+        with self._lock:
+            analytics = self._analytics.get(graph)
+        if analytics is None or analytics.revision != graph.revision:
+            return []
+        return [metric for metric in METRICS if metric in analytics.columns]
+
+    def values(self, graph: StoredGraph, metric: str) -> Dict[str, Any]:
+        """Valeurs d'une métrique dans l'ordre des nœuds, avec leurs bornes"""
+        values = self.column(graph, metric).values
+        return {
+            'metric': metric,
+            'revision': graph.revision,
+            'values': values.tolist(),
+            'min': values.min().item() if len(values) else None,
+            'max': values.max().item() if len(values) else None
+        }
+
+    def summary(self, graph: StoredGraph, top: int = TOP_COUNT) -> Dict[str, Any]:
+        """
+        Résumé : statistiques des degrés, composantes connexes et nœuds les
+        plus centraux (toutes les métriques sont calculées si besoin)
+        """
+        self.compute_all(graph)
+        degree = self.column(graph, 'degree').values
+        components = np.bincount(self.column(graph, 'component').values)
+
+        def ranking(metric: str) -> List[Dict[str, Any]]:
+            values = self.column(graph, metric).values
+            rows = np.argsort(-values, kind='stable')[:top]
+            return [{'id': graph.ids[row], 'value': values[row].item()}
+                    for row in rows.tolist()]
+
+        return {
+            'revision': graph.revision,
+            'node_count': graph.node_count,
+            'metrics': list(METRICS),
+            'degree': {
+                'min': int(degree.min()) if len(degree) else 0,
+                'max': int(degree.max()) if len(degree) else 0,
+                'mean': float(degree.mean()) if len(degree) else 0.0
+            },
+            'components': {
+                'count': len(components),
+                'largest': int(components[0]) if len(components) else 0,
+                'isolated': int((degree == 0).sum())
+            },
+            'top': {metric: ranking(metric)
+                    for metric in ('degree', 'pagerank', 'betweenness')}
+        }
+
+# Instance globale du service
+analytics_service = AnalyticsService()
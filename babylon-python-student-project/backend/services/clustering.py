@@ -0,0 +1,369 @@
+"""
+Hiérarchie de clusters (niveaux de détail) des graphes stockés
+
+Chaque niveau regroupe les éléments du niveau inférieur par propagation de
+labels vectorisée (NumPy) sur le graphe agrégé : le niveau 0 contient les
+nœuds, le niveau k des super-nœuds reliés par des super-arêtes pondérées
+par le nombre (ou le poids) des arêtes qu'elles résument. La construction
+s'arrête quand un niveau ne réduit plus assez le nombre d'éléments.
+
+Les positions des super-nœuds (barycentres) et leurs labels (nœud le plus
+connecté) sont calculés à la demande : ils suivent les changements de
+positions sans reconstruire la hiérarchie.
+
+La hiérarchie est construite en arrière-plan après l'import des graphes de
+plus de LOD_EDGE_BUDGET arêtes (LOD_ON_IMPORT), une seule fois par révision
+même si plusieurs requêtes la demandent en même temps. Le niveau servi par
+défaut est le plus détaillé dont les (super-)arêtes tiennent dans le budget ;
+si aucun n'y tient, le plus agrégé avec ses super-arêtes les plus lourdes.
+"""
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from typing import Any, Dict, List, Tuple
+
+from services.graph_store import StoredGraph
+from services.graph_traversal import _bounded_int
+
+MAX_LEVELS = 8
+MAX_ITERATIONS = 20
+# Un niveau est conservé s'il compte au plus cette fraction des éléments du niveau inférieur
+MIN_REDUCTION = 0.8
+# Arêtes servies par niveau (par défaut et au plus)
+LOD_EDGE_BUDGET = int(os.environ.get('LOD_EDGE_BUDGET', 20000))
+MAX_EDGE_BUDGET = 1000000
+
+
+def label_propagation(n: int, edges: np.ndarray, weights: np.ndarray,
+                      max_iterations: int = MAX_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """
+    Communautés par propagation de labels : chaque élément adopte le label
+    de poids maximal parmi ses voisins (égalités départagées au hasard,
+    le label courant étant conservé s'il fait partie des meilleurs).
+    Seuls les éléments dont un voisin a changé de label sont réévalués à
+    l'itération suivante. Retourne des labels compacts 0..k-1
+    """
+    labels = np.arange(n, dtype=np.int64)
+    if len(edges) == 0:
+        return labels
+
+    # Adjacence symétrique triée par élément (CSR)
+    heads = np.concatenate([edges[:, 0], edges[:, 1]]).astype(np.int64)
+    order = np.argsort(heads, kind='stable')
+    heads = heads[order]
+    tails = np.concatenate([edges[:, 1], edges[:, 0]]).astype(np.int64)[order]
+    weights = np.concatenate([weights, weights])[order]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(heads, minlength=n), out=indptr[1:])
+    rng = np.random.default_rng(seed)
+    entries = np.arange(len(heads))
+
+    for _ in range(max_iterations):
+        # Poids de chaque couple (élément, label voisin), triés par élément
+        keys = heads[entries] * n + labels[tails[entries]]
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        first = np.append(True, keys[1:] != keys[:-1])
+        scores = np.bincount(np.cumsum(first) - 1, weights=weights[entries[order]])
+        keys = keys[first]
+        owners, candidates = keys // n, keys % n
+
+        # Meilleur label par élément
+        starts = np.flatnonzero(np.append(True, owners[1:] != owners[:-1]))
+        segment = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(keys))))
+        tie = scores == np.maximum.reduceat(scores, starts)[segment]
+        noise = np.where(candidates == labels[owners], 2.0, rng.random(len(keys)))
+        noise[~tie] = -1.0
+        chosen = np.flatnonzero(noise == np.maximum.reduceat(noise, starts)[segment])
+        chosen = chosen[np.append(True, owners[chosen][1:] != owners[chosen][:-1])]
+        owners, candidates = owners[chosen], candidates[chosen]
+
+        moving = labels[owners] != candidates
+        if moving.sum() < max(1, n // 10000):
+            break
+        changed = owners[moving]
+        labels[changed] = candidates[moving]
+
+        # Éléments à réévaluer : voisins des éléments qui ont changé
+        active = np.zeros(n, dtype=bool)
+        active[tails[_segments(indptr, changed)]] = True
+        entries = _segments(indptr, np.flatnonzero(active))
+
+    return np.unique(labels, return_inverse=True)[1].astype(np.int64)
+
+
+def _segments(indptr: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Indices des entrées CSR des lignes demandées"""
+    starts, ends = indptr[rows], indptr[rows + 1]
+    counts = ends - starts
+    return np.repeat(starts - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts) \
+        + np.arange(int(counts.sum()))
+
+
+def aggregate_edges(edges: np.ndarray, weights: np.ndarray,
+                    parent: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Super-arêtes (k, 2) triées (min, max) et poids cumulés, sans boucles"""
+    a, b = parent[edges[:, 0]], parent[edges[:, 1]]
+    between = a != b
+    low = np.minimum(a, b)[between]
+    high = np.maximum(a, b)[between]
+    if len(low) == 0:
+        return np.zeros((0, 2), dtype=np.int64), np.zeros(0)
+    size = int(parent.max()) + 1
+    keys, inverse = np.unique(low * size + high, return_inverse=True)
+    return (np.stack([keys // size, keys % size], axis=1),
+            np.bincount(inverse, weights=weights[between]))
+
+
+class ClusterHierarchy:
+    """Niveaux de clusters d'un graphe (niveau 0 : les nœuds)"""
+
+    def __init__(self, graph: StoredGraph):
+        self.revision = graph.revision
+        edges, weights = graph.layout_edges()
+        edges = edges.astype(np.int64)
+        weights = np.asarray(weights, dtype=np.float64)
+
+        n = graph.node_count
+        self.parents = [None]            # niveau k-1 -> cluster du niveau k
+        self.membership = [np.arange(n)]  # nœud -> cluster du niveau k
+        self.counts = [n]
+        self.edges = [edges]
+        self.weights = [weights]
+
+        while len(self.counts) < MAX_LEVELS and self.counts[-1] > 1 and len(edges):
+            parent = label_propagation(self.counts[-1], edges, weights,
+                                       seed=len(self.counts))
+            count = int(parent.max()) + 1
+            if count > MIN_REDUCTION * self.counts[-1]:
+                break
+            edges, weights = aggregate_edges(edges, weights, parent)
+            self.parents.append(parent)
+            self.membership.append(parent[self.membership[-1]])
+            self.counts.append(count)
+            self.edges.append(edges)
+            self.weights.append(weights)
+
+        # Représentant (nœud le plus connecté) de chaque cluster
+        degrees = graph.degrees()
+        self.representatives = [np.arange(n)]
+        for level in range(1, len(self.counts)):
+            membership = self.membership[level]
+            order = np.lexsort((-degrees, membership))
+            first = np.insert(membership[order][1:] != membership[order][:-1], 0, True)
+            self.representatives.append(order[first])
+
+    @property
+    def levels(self) -> int:
+        return len(self.counts)
+
+    def sizes(self, level: int) -> np.ndarray:
+        """Nombre de nœuds de chaque cluster d'un niveau"""
+        return np.bincount(self.membership[level], minlength=self.counts[level])
+
+    def centroids(self, level: int, positions: np.ndarray) -> np.ndarray:
+        """Barycentres (k, 3) des clusters d'un niveau"""
+        membership = self.membership[level]
+        count = self.counts[level]
+        sizes = np.maximum(self.sizes(level), 1)
+        return np.stack([np.bincount(membership, weights=positions[:, axis], minlength=count)
+                         for axis in range(3)], axis=1) / sizes[:, None]
+
+    def nbytes(self) -> int:
+        arrays = self.membership[1:] + self.parents[1:] + self.edges[1:] \
+            + self.weights[1:] + self.representatives[1:]
+        return sum(array.nbytes for array in arrays)
+
+
+class LodService:
+    """Hiérarchies des graphes stockés, construites après l'import ou à la première demande"""
+
+    def __init__(self, workers: int = 1):
+        self._hierarchies = weakref.WeakKeyDictionary()
+        self._build_locks = weakref.WeakKeyDictionary()  # StoredGraph -> Lock
+        self._lock = threading.Lock()
+        self.on_import = os.environ.get('LOD_ON_IMPORT', '1') != '0'
+        self.workers = workers
+        self._executor = None
+
+    def hierarchy(self, graph: StoredGraph) -> ClusterHierarchy:
+        """
+        Hiérarchie du graphe (reconstruite seulement si sa structure change) ;
+        une demande pendant la construction attend son résultat
+        """
+        with self._lock:
+            hierarchy = self._hierarchies.get(graph)
+            if hierarchy is not None and hierarchy.revision == graph.revision:
+                return hierarchy
+            build_lock = self._build_locks.get(graph)
+            if build_lock is None:
+                build_lock = self._build_locks[graph] = threading.Lock()
+
+        with build_lock:
+            with self._lock:
+                hierarchy = self._hierarchies.get(graph)
+            if hierarchy is None or hierarchy.revision != graph.revision:
+                hierarchy = ClusterHierarchy(graph)
+                with self._lock:
+                    self._hierarchies[graph] = hierarchy
+        return hierarchy
+
+    def schedule(self, graph: StoredGraph):
+        """Construit la hiérarchie en arrière-plan (après l'import d'un grand graphe)"""
+        if not self.on_import or graph.edge_count <= LOD_EDGE_BUDGET:
+            return
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix='lod')
+            executor = self._executor
+        # Une erreur en arrière-plan est ignorée : la demande suivante recalcule
+        executor.submit(self.hierarchy, graph)
+
+    def level(self, graph: StoredGraph, level: Any = None,
+              max_edges: Any = None) -> Dict[str, Any]:
+        """
+        Vue d'un niveau de détail : super-nœuds {id 'niveau:cluster', label,
+        size, position} et super-arêtes {source, target, weight}, au plus
+        `max_edges` (les plus lourdes ; arêtes tirées au hasard au niveau 0).
+        Par défaut, le niveau le plus détaillé qui tient dans `max_edges`,
+        sinon le plus agrégé.
+        """
+        max_edges = _bounded_int(max_edges, 'max_edges', LOD_EDGE_BUDGET, 1, MAX_EDGE_BUDGET)
+        hierarchy = self.hierarchy(graph)
+        edge_counts = [graph.edge_count] + [len(edges) for edges in hierarchy.edges[1:]]
+        if level is None:
+            fitting = [k for k, count in enumerate(edge_counts) if count <= max_edges]
+            level = fitting[0] if fitting else hierarchy.levels - 1
+        level = self._check_level(hierarchy, level)
+        truncated = edge_counts[level] > max_edges
+
+        if level == 0:
+            rows = None
+            if truncated:
+                rng = np.random.default_rng(0)
+                rows = np.sort(rng.choice(graph.edge_count, max_edges, replace=False))
+            nodes, edges = graph.node_dicts(), graph.edge_dicts(rows)
+        else:
+            nodes = self._cluster_dicts(graph, hierarchy, level,
+                                        np.arange(hierarchy.counts[level]))
+            super_edges, weights = hierarchy.edges[level], hierarchy.weights[level]
+            if truncated:
+                kept = np.sort(np.argpartition(-weights, max_edges - 1)[:max_edges])
+                super_edges, weights = super_edges[kept], weights[kept]
+            edges = self._super_edge_dicts(hierarchy, level, super_edges, weights)
+        return {
+            'level': level,
+            'levels': hierarchy.levels,
+            'counts': hierarchy.counts,
+            'edge_counts': edge_counts,
+            'max_edges': max_edges,
+            'edges_truncated': truncated,
+            'nodes': nodes,
+            'edges': edges
+        }
+
+    def expand(self, graph: StoredGraph, cluster_id: str) -> Dict[str, Any]:
+        """
+        Contenu d'un cluster 'niveau:index' : ses éléments du niveau inférieur,
+        les arêtes entre eux et leurs liens (agrégés) vers les autres clusters
+        du niveau du cluster
+        """
+        hierarchy = self.hierarchy(graph)
+        try:
+            level, cluster = (int(part) for part in str(cluster_id).split(':'))
+        except ValueError:
+            raise ValueError(f"Identifiant de cluster invalide: {cluster_id} (attendu 'niveau:index')")
+        if level < 1:
+            raise ValueError("Seuls les clusters des niveaux >= 1 peuvent être développés")
+        level = self._check_level(hierarchy, level)
+        if not 0 <= cluster < hierarchy.counts[level]:
+            raise ValueError(f"Cluster inconnu: {cluster_id}")
+
+        parent = hierarchy.parents[level]
+        children = np.flatnonzero(parent == cluster)
+        edges, weights = hierarchy.edges[level - 1], hierarchy.weights[level - 1]
+        inside_a = parent[edges[:, 0]] == cluster
+        inside_b = parent[edges[:, 1]] == cluster
+
+        if level == 1:
+            nodes = graph.node_dicts(children)
+            kept = np.zeros(len(graph.ids), dtype=bool)
+            kept[children] = True
+            internal = graph.edge_dicts(np.flatnonzero(kept[graph.src] & kept[graph.dst]))
+            child_ids = graph.ids
+        else:
+            nodes = self._cluster_dicts(graph, hierarchy, level - 1, children)
+            internal = self._super_edge_dicts(hierarchy, level - 1,
+                                              edges[inside_a & inside_b],
+                                              weights[inside_a & inside_b])
+            child_ids = None
+
+        # Liens sortants : (élément du cluster, autre cluster du même niveau)
+        outgoing = inside_a ^ inside_b
+        inner = np.where(inside_a, edges[:, 0], edges[:, 1])[outgoing]
+        outer = parent[np.where(inside_a, edges[:, 1], edges[:, 0])[outgoing]]
+        links = []
+        if len(inner):
+            size = hierarchy.counts[level]
+            keys, inverse = np.unique(inner * size + outer, return_inverse=True)
+            totals = np.bincount(inverse, weights=weights[outgoing])
+            for key, weight in zip(keys.tolist(), totals.tolist()):
+                child, other = divmod(key, size)
+                links.append({
+                    'source': child_ids[child] if child_ids is not None else f'{level - 1}:{child}',
+                    'target': f'{level}:{other}',
+                    'weight': weight
+                })
+
+        return {
+            'cluster': f'{level}:{cluster}',
+            'level': level - 1,
+            'nodes': nodes,
+            'edges': internal,
+            'links': links
+        }
+
+    def _check_level(self, hierarchy: ClusterHierarchy, level: int) -> int:
+        try:
+            level = int(level)
+        except (TypeError, ValueError):
+            raise ValueError(f"Niveau invalide: {level}")
+        if not 0 <= level < hierarchy.levels:
+            raise ValueError(f"Niveau hors limites: {level} (0 à {hierarchy.levels - 1})")
+        return level
+
+    def _cluster_dicts(self, graph: StoredGraph, hierarchy: ClusterHierarchy,
+                       level: int, clusters: np.ndarray) -> List[Dict[str, Any]]:
+        sizes = hierarchy.sizes(level)[clusters].tolist()
+        representatives = hierarchy.representatives[level][clusters]
+        if graph.labels is not None:
+            labels = graph.labels.take(representatives).to_list()
+        else:
+            labels = [graph.ids[i] for i in representatives.tolist()]
+        positions = (hierarchy.centroids(level, graph.positions)[clusters].tolist()
+                     if graph.positions is not None else None)
+
+        nodes = []
+        for k, cluster in enumerate(clusters.tolist()):
+            node = {
+                'id': f'{level}:{cluster}',
+                'label': labels[k],
+                'level': level,
+                'size': sizes[k]
+            }
+            if positions is not None:
+                x, y, z = positions[k]
+                node['position'] = {'x': x, 'y': y, 'z': z}
+            nodes.append(node)
+        return nodes
+
+    def _super_edge_dicts(self, hierarchy: ClusterHierarchy, level: int,
+                          edges: np.ndarray, weights: np.ndarray) -> List[Dict[str, Any]]:
+        return [{'source': f'{level}:{a}', 'target': f'{level}:{b}', 'weight': w}
+                for (a, b), w in zip(edges.tolist(), weights.tolist())]
+
+# Instance globale du service
+lod_service = LodService()
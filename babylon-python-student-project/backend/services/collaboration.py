@@ -0,0 +1,324 @@
+"""
+Sessions collaboratives : membres, curseurs et sélections partagés
+
+Les curseurs et sélections ne sont pas relayés à chaque événement : seul le
+dernier état de chaque utilisateur est conservé (les mises à jour
+intermédiaires sont écrasées) et un tick à fréquence fixe
+(COLLAB_TICK_HZ) envoie à chaque membre un lot des états modifiés depuis
+son dernier lot.
+
+Contre-pression : chaque lot doit être acquitté par le client. Un membre
+qui a déjà MAX_IN_FLIGHT lots non acquittés est sauté ; il reçoit au tick
+suivant où il est prêt l'état le plus récent de tout ce qui a changé
+entre-temps, sans rattrapage des états intermédiaires. Un lot non acquitté
+après ACK_TIMEOUT secondes est considéré comme perdu.
+
+La description des sessions (nom, graphe, taille maximale) est conservée
+dans le catalogue persistant (services/graph_catalog.py) : elle survit aux
+redémarrages et est visible des autres processus ; utilisateurs et états
+restent propres à la connexion.
+"""
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.graph_catalog import graph_catalog
+
+TICK_HZ = float(os.environ.get('COLLAB_TICK_HZ', 20))
+MAX_IN_FLIGHT = 2
+ACK_TIMEOUT = 2.0
+# Taille maximale d'une session créée implicitement par join_session
+DEFAULT_MAX_USERS = 100
+
+
+class SessionFull(Exception):
+    """Levée quand une session a atteint son nombre maximal d'utilisateurs"""
+
+
+class Member:
+    """Connexion Socket.IO d'un utilisateur à une session"""
+
+    def __init__(self, sid: str, user_id: str):
+        self.sid = sid
+        self.user_id = user_id
+        self.sent_version = 0      # dernière version d'état envoyée
+        self.in_flight = {}        # tick -> heure d'envoi des lots non acquittés
+        self.skipped = 0           # ticks sautés faute d'acquittement
+
+
+class Session:
+    """Session collaborative : utilisateurs, membres connectés et états partagés"""
+
+    def __init__(self, session_id: str, name: str, graph_id: str = None,
+                 max_users: int = DEFAULT_MAX_USERS, created_at: Any = None):
+        self.id = session_id
+        self.name = name
+        self.graph_id = graph_id
+        self.max_users = max_users
+        self.created_at = created_at
+        self.users = {}      # user_id -> {id, name, joined_at}
+        self.members = {}    # sid -> Member
+        self.version = 0
+        # user_id -> (version, état) : dernier curseur / dernière sélection
+        self.cursors = {}
+        self.selections = {}
+
+    def describe(self) -> Dict[str, Any]:
+        """Description persistée (sans utilisateurs ni connexions)"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'graph_id': self.graph_id,
+            'max_users': self.max_users,
+            'created_at': self.created_at
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'name': self.name,
+            'graph_id': self.graph_id,
+            'max_users': self.max_users,
+            'users': list(self.users.values()),
+            'connected': len(self.members),
+            'created_at': self.created_at
+        }
+
+    def add_user(self, user_id: str, name: str, joined_at: Any = None) -> Dict[str, Any]:
+        user = self.users.get(user_id)
+        if user is None:
+            if len(self.users) >= self.max_users:
+                raise SessionFull('Session pleine')
+            user = self.users[user_id] = {'id': user_id, 'name': name, 'joined_at': joined_at}
+        return user
+
+
+class CollaborationService:
+    """Registre des sessions et file des états à diffuser"""
+
+    def __init__(self, catalog=graph_catalog):
+        self.sessions = {}   # session_id -> Session
+        self._sids = {}      # sid -> {session_id: user_id}
+        self._lock = threading.Lock()
+        self.tick = 0
+        self.catalog = catalog if catalog.enabled else None
+        if self.catalog is not None:
+            for data in self.catalog.load_sessions():
+                self.sessions[data['id']] = _restore(data)
+
+    # === SESSIONS (API REST) ===
+
+    def create_session(self, name: str = None, graph_id: str = None,
+                       max_users: int = 10, created_at: Any = None) -> Dict[str, Any]:
+        """Crée une session et retourne sa description"""
+        session_id = str(uuid.uuid4())
+        with self._lock:
+            session = self.sessions[session_id] = Session(
+                session_id, name or f'Session {len(self.sessions) + 1}',
+                graph_id, int(max_users), created_at
+            )
+        self._persist(session)
+        return session.to_dict()
+
+    def join_session(self, session_id: str, user_id: str, name: str,
+                     joined_at: Any = None) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Inscrit un utilisateur ; retourne (session, utilisateur) ou None si inconnue"""
+        self._lookup(session_id)
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return None
+            user = session.add_user(user_id, name, joined_at)
+            return session.to_dict(), user
+
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        self._lookup(session_id)
+        with self._lock:
+            session = self.sessions.get(session_id)
+            return session.to_dict() if session is not None else None
+
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        if self.catalog is not None:
+            for data in self.catalog.load_sessions():
+                with self._lock:
+                    if data['id'] not in self.sessions:
+                        self.sessions[data['id']] = _restore(data)
+        with self._lock:
+            return [session.to_dict() for session in self.sessions.values()]
+
+    def _lookup(self, session_id: str):
+        """Session créée par un autre processus : relue depuis le catalogue"""
+        if self.catalog is None or session_id in self.sessions:
+            return
+        for data in self.catalog.load_sessions(session_id):
+            with self._lock:
+                self.sessions.setdefault(session_id, _restore(data))
+
+    def _persist(self, session: Session):
+        if self.catalog is not None:
+            self.catalog.save_session(session.describe())
+
+    # === MEMBRES CONNECTÉS (Socket.IO) ===
+
+    def connect(self, session_id: str, sid: str, user_id: str,
+                name: str = None) -> Dict[str, Any]:
+        """
+        Associe une connexion à une session (créée si elle n'existe pas)
+        Retourne la session et l'état courant des autres utilisateurs
+        """
+        self._lookup(session_id)
+        created = None
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = created = self.sessions[session_id] = Session(session_id, session_id)
+            session.add_user(user_id, name or user_id)
+
+            member = session.members[sid] = Member(sid, user_id)
+            member.sent_version = session.version
+            self._sids.setdefault(sid, {})[session_id] = user_id
+            result = {
+                'session': session.to_dict(),
+                'cursors': _states(session.cursors, exclude=user_id),
+                'selections': _states(session.selections, exclude=user_id)
+            }
+        if created is not None:
+            self._persist(created)
+        return result
+
+    def disconnect(self, sid: str, session_id: str = None) -> List[Tuple[str, str]]:
+        """
+        Retire une connexion d'une session (ou de toutes) ; retourne les
+        couples (session, utilisateur) qui n'ont plus aucune connexion
+        """
+        left = []
+        with self._lock:
+            joined = self._sids.get(sid, {})
+            for sess_id in ([session_id] if session_id else list(joined)):
+                user_id = joined.pop(sess_id, None)
+                session = self.sessions.get(sess_id)
+                if user_id is None or session is None:
+                    continue
+                session.members.pop(sid, None)
+                if not any(m.user_id == user_id for m in session.members.values()):
+                    session.users.pop(user_id, None)
+                    session.cursors.pop(user_id, None)
+                    session.selections.pop(user_id, None)
+                    left.append((sess_id, user_id))
+            if not joined:
+                self._sids.pop(sid, None)
+        return left
+
+    def user_of(self, sid: str, session_id: str) -> Optional[str]:
+        """Utilisateur d'une connexion dans une session (None si non membre)"""
+        with self._lock:
+            return self._sids.get(sid, {}).get(session_id)
+
+    # === ÉTATS COALESCÉS ===
+
+    def update_cursor(self, sid: str, session_id: str, position: Any) -> bool:
+        """Dernière position du curseur d'un membre (écrase la précédente)"""
+        return self._update(sid, session_id, 'cursors', position)
+
+    def update_selection(self, sid: str, session_id: str, node_id: Any) -> bool:
+        """Dernier nœud sélectionné par un membre"""
+        return self._update(sid, session_id, 'selections', node_id)
+
+    def _update(self, sid: str, session_id: str, kind: str, value: Any) -> bool:
+        with self._lock:
+            user_id = self._sids.get(sid, {}).get(session_id)
+            session = self.sessions.get(session_id)
+            if user_id is None or session is None:
+                return False
+            session.version += 1
+            getattr(session, kind)[user_id] = (session.version, value)
+            return True
+
+    def collect(self, now: float = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Lots à envoyer pour ce tick : (sid, lot) pour chaque membre prêt
+        ayant des états modifiés depuis son dernier lot
+        Lot : {session_id, tick, cursors: [{user_id, position}],
+               selections: [{user_id, node_id}]}
+        """
+        now = time.monotonic() if now is None else now
+        batches = []
+        with self._lock:
+            self.tick += 1
+            for session in self.sessions.values():
+                if not session.members:
+                    continue
+                cursors = _changes(session.cursors)
+                selections = _changes(session.selections)
+                for member in session.members.values():
+                    if member.sent_version >= session.version:
+                        continue
+                    # Lots perdus : plus attendus au-delà du délai
+                    for tick, sent_at in list(member.in_flight.items()):
+                        if now - sent_at > ACK_TIMEOUT:
+                            del member.in_flight[tick]
+                    if len(member.in_flight) >= MAX_IN_FLIGHT:
+                        member.skipped += 1
+                        continue
+
+                    batch = {
+                        'session_id': session.id,
+                        'tick': self.tick,
+                        'cursors': [{'user_id': user_id, 'position': value}
+                                    for user_id, value in _since(cursors, member)],
+                        'selections': [{'user_id': user_id, 'node_id': value}
+                                       for user_id, value in _since(selections, member)]
+                    }
+                    member.sent_version = session.version
+                    if batch['cursors'] or batch['selections']:
+                        member.in_flight[self.tick] = now
+                        batches.append((member.sid, batch))
+        return batches
+
+    def ack(self, sid: str, session_id: str, tick: int):
+        """Acquittement d'un lot par un client"""
+        with self._lock:
+            session = self.sessions.get(session_id)
+            member = session.members.get(sid) if session is not None else None
+            if member is not None:
+                member.in_flight.pop(tick, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs : sessions, connexions, lots en attente et ticks sautés"""
+        with self._lock:
+            members = [m for s in self.sessions.values() for m in s.members.values()]
+            return {
+                'sessions': len(self.sessions),
+                'connections': len(members),
+                'in_flight': sum(len(m.in_flight) for m in members),
+                'skipped': sum(m.skipped for m in members),
+                'tick': self.tick,
+                'tick_hz': TICK_HZ
+            }
+
+
+def _restore(data: Dict[str, Any]) -> Session:
+    return Session(data['id'], data['name'], data.get('graph_id'),
+                   data.get('max_users', DEFAULT_MAX_USERS), data.get('created_at'))
+
+
+def _states(states: Dict[str, Tuple[int, Any]], exclude: str = None) -> Dict[str, Any]:
+    return {user_id: value for user_id, (_, value) in states.items() if user_id != exclude}
+
+
+def _changes(states: Dict[str, Tuple[int, Any]]) -> Tuple[List[int], List[Tuple[str, Any]]]:
+    """États triés par version (recherche dichotomique par membre)"""
+    items = sorted(states.items(), key=lambda item: item[1][0])
+    return [version for _, (version, _) in items], [(user_id, value) for user_id, (_, value) in items]
+
+
+def _since(changes, member: Member) -> List[Tuple[str, Any]]:
+    versions, items = changes
+    start = bisect_right(versions, member.sent_version)
+    return [(user_id, value) for user_id, value in items[start:] if user_id != member.user_id]
+
+# Instance globale du service
+collaboration = CollaborationService()
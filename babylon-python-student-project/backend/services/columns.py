@@ -0,0 +1,440 @@
+"""
+Colonnes de propriétés typées (stockage compact des propriétés de graphe)
+
+Une colonne stocke une propriété pour toutes les lignes (nœuds ou arêtes)
+dans un tableau NumPy typé plutôt que dans un dict par élément :
+- int / float / bool : tableau numérique
+- str : codes int32 + table de catégories (dictionnaire)
+- object : liste Python (valeurs imbriquées, types mélangés)
+Les valeurs absentes sont marquées dans un masque booléen optionnel.
+"""
+from array import array
+import math
+import sys
+import numpy as np
+from typing import Any, Dict, List, Optional
+
+# Ordre de promotion des types numériques
+_NUMERIC_RANK = {'bool': 0, 'int': 1, 'float': 2}
+
+# Origine d'une valeur numérique ajoutée à un ColumnBuilder : texte CSV
+# entier ou décimal (rendu exact si la colonne devient texte) ou valeur Python
+_FROM_VALUE, _FROM_INT_TEXT, _FROM_FLOAT_TEXT = 0, 1, 2
+
+# Type du tableau de construction -> type NumPy final
+_NUMPY_TYPES = {
+    'int': (np.int64, np.int64),
+    'float': (np.float64, np.float64),
+    'bool': (np.int8, np.bool_)
+}
+
+
+class Column:
+    """Colonne figée : valeurs typées + masque des valeurs présentes"""
+
+    def __init__(self, name: str, kind: str, values, categories: List[str] = None,
+                 mask: Optional[np.ndarray] = None):
+        self.name = name
+        self.kind = kind
+        self.values = values
+        self.categories = categories
+        self.mask = mask  # None : toutes les valeurs sont présentes
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def is_numeric(self) -> bool:
+        return self.kind in _NUMERIC_RANK
+
+    def get(self, i: int) -> Any:
+        """Valeur Python de la ligne i (None si absente)"""
+        if self.mask is not None and not self.mask[i]:
+            return None
+        value = self.values[i]
+        if self.kind == 'str':
+            return self.categories[value]
+        if self.kind == 'object':
+            return value
+        return value.item()
+
+    def to_list(self) -> List[Any]:
+        """Toutes les valeurs en objets Python (None si absentes)"""
+        if self.kind == 'str':
+            categories = self.categories
+            values = [categories[code] for code in self.values.tolist()]
+        elif self.kind == 'object':
+            values = list(self.values)
+        else:
+            values = self.values.tolist()
+
+        if self.mask is not None:
+            values = [v if present else None
+                      for v, present in zip(values, self.mask.tolist())]
+        return values
+
+    def take(self, indices: np.ndarray) -> 'Column':
+        """Sous-colonne restreinte aux lignes données"""
+        if self.kind == 'object':
+            values = [self.values[i] for i in indices.tolist()]
+        else:
+            values = self.values[indices]
+        mask = self.mask[indices] if self.mask is not None else None
+        return Column(self.name, self.kind, values, self.categories, mask)
+
+    def equals(self, value: Any) -> np.ndarray:
+        """Masque booléen des lignes dont la valeur vaut `value` (None : absente)"""
+        if value is None:
+            return ~self.mask if self.mask is not None else np.zeros(len(self), dtype=bool)
+
+        if self.kind == 'str':
+            try:
+                code = self.categories.index(value) if isinstance(value, str) else -1
+            except ValueError:
+                code = -1
+            result = self.values == code if code >= 0 else np.zeros(len(self), dtype=bool)
+        elif self.kind == 'object':
+            result = np.fromiter((v == value for v in self.values), dtype=bool,
+                                 count=len(self.values))
+        elif isinstance(value, (bool, int, float)):
+            result = self.values == value
+        else:
+            result = np.zeros(len(self), dtype=bool)
+
+        if self.mask is not None:
+            result &= self.mask
+        return result
+
+    def assign(self, rows: np.ndarray, value: Any) -> 'Column':
+        """
+        Nouvelle colonne où les lignes données valent `value` (None : absente)
+        La colonne d'origine n'est pas modifiée ; le type est promu au besoin
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        mask = self.mask.copy() if self.mask is not None else np.ones(len(self), dtype=bool)
+        if value is None:
+            mask[rows] = False
+            values = list(self.values) if self.kind == 'object' else self.values
+            return Column(self.name, self.kind, values, self.categories, mask)
+
+        kind = _kind_of(value)
+        if self.mask is not None and not self.mask.any() and kind != self.kind:
+            # Colonne encore vide : elle prend le type de la première valeur
+            return _missing_column(self.name, kind, len(self)).assign(rows, value)
+
+        mask[rows] = True
+        mask = None if mask.all() else mask
+        if self.kind == 'object':
+            values = list(self.values)
+            for row in rows.tolist():
+                values[row] = value
+            return Column(self.name, 'object', values, mask=mask)
+        if self.kind == 'str' and kind == 'str':
+            categories = self.categories
+            try:
+                code = categories.index(value)
+            except ValueError:
+                categories = categories + [value]
+                code = len(categories) - 1
+            values = self.values.copy()
+            values[rows] = code
+            return Column(self.name, 'str', values, categories, mask)
+        if self.is_numeric and kind in _NUMERIC_RANK:
+            target = max(self.kind, kind, key=_NUMERIC_RANK.get)
+            values = self.values.astype(_NUMPY_TYPES[target][1])
+            values[rows] = value
+            return Column(self.name, target, values, mask=mask)
+
+        # Changement de type (texte dans une colonne numérique...) : reconstruction
+        values = self.to_list()
+        for row in rows.tolist():
+            values[row] = value
+        return _rebuild(self.name, values)
+
+    def extend(self, values: List[Any]) -> 'Column':
+        """Nouvelle colonne avec des lignes ajoutées à la fin"""
+        tail = _rebuild(self.name, values)
+        if tail.mask is not None and not tail.mask.any():
+            tail = _missing_column(self.name, self.kind, len(values), self.categories)
+
+        mask = None
+        if self.mask is not None or tail.mask is not None:
+            mask = np.concatenate([
+                self.mask if self.mask is not None else np.ones(len(self), dtype=bool),
+                tail.mask if tail.mask is not None else np.ones(len(tail), dtype=bool)
+            ])
+
+        if self.kind == tail.kind == 'str':
+            categories = list(self.categories)
+            codes = {category: code for code, category in enumerate(categories)}
+            remap = np.zeros(max(len(tail.categories), 1), dtype=np.int32)
+            for code, category in enumerate(tail.categories):
+                if category not in codes:
+                    codes[category] = len(categories)
+                    categories.append(category)
+                remap[code] = codes[category]
+            tail_codes = remap[tail.values]
+            return Column(self.name, 'str', np.concatenate([self.values, tail_codes]),
+                          categories, mask)
+        if self.is_numeric and tail.is_numeric:
+            target = max(self.kind, tail.kind, key=_NUMERIC_RANK.get)
+            dtype = _NUMPY_TYPES[target][1]
+            return Column(self.name, target,
+                          np.concatenate([self.values.astype(dtype), tail.values.astype(dtype)]),
+                          mask=mask)
+        return _rebuild(self.name, self.to_list() + tail.to_list())
+
+    @property
+    def nbytes(self) -> int:
+        size = self.mask.nbytes if self.mask is not None else 0
+        if self.kind == 'object':
+            return size + sys.getsizeof(self.values) + 64 * len(self.values)
+        size += self.values.nbytes
+        if self.categories:
+            size += sum(len(c) + 49 for c in self.categories)
+        return size
+
+
+class ColumnBuilder:
+    """
+    Colonne construite ligne par ligne, type promu au besoin
+    bool -> int -> float, puis str (texte CSV) ou object (types mélangés)
+    """
+
+    def __init__(self, name: str, length: int = 0):
+        self.name = name
+        self.kind = None  # inconnu tant qu'aucune valeur n'est présente
+        self._values = None
+        self._present = bytearray()
+        self._origins = bytearray()  # origine de chaque ligne (_FROM_*)
+        self._missing = 0
+        self._categories = {}
+        self._category_list = []
+        self._category_bytes = 0
+        self.pad_to(length)
+
+    def __len__(self):
+        return len(self._present)
+
+    def pad_to(self, length: int):
+        """Complète avec des valeurs absentes jusqu'à `length` lignes"""
+        while len(self._present) < length:
+            self.append(None)
+
+    def append_text(self, raw: str):
+        """
+        Ajoute une valeur texte (CSV) en déduisant son type ; seul un texte
+        rendu à l'identique par le nombre ("12", "1.5", pas "01234", "1.10",
+        "1e3" ni "nan") devient un nombre, les autres restent du texte
+        """
+        if raw is None or raw == '':
+            self.append(None)
+            return
+        if self.kind in (None, 'int', 'float'):
+            value = _exact_number(raw)
+            if value is not None:
+                self._append(value, _FROM_INT_TEXT if isinstance(value, int) else _FROM_FLOAT_TEXT)
+                return
+        self.append(raw)
+
+    def append(self, value: Any):
+        """Ajoute une valeur Python (None = absente)"""
+        self._append(value, _FROM_VALUE)
+
+    def _append(self, value: Any, origin: int):
+        self._origins.append(origin)
+        if value is None:
+            self._present.append(0)
+            self._missing += 1
+            if self._values is not None:
+                self._values.append(self._empty())
+            return
+
+        kind = _kind_of(value)
+        if self.kind is None:
+            self._start(kind)
+        elif kind != self.kind:
+            self._promote(kind)
+
+        self._present.append(1)
+        self._values.append(self._encode(value))
+
+    def _start(self, kind: str):
+        """Premier type rencontré : crée le stockage et rattrape les absents"""
+        self.kind = kind
+        self._values = self._new_storage(kind)
+        for _ in range(len(self._present)):
+            self._values.append(self._empty())
+
+    def _promote(self, kind: str):
+        """Change le type de la colonne pour accueillir une nouvelle valeur"""
+        if self.kind in _NUMERIC_RANK and kind in _NUMERIC_RANK:
+            target = max(self.kind, kind, key=_NUMERIC_RANK.get)
+        elif self.kind == 'object':
+            return
+        elif kind == 'str' and self.kind in _NUMERIC_RANK:
+            target = 'str'
+        else:
+            target = 'object'
+        if target == self.kind:
+            return
+
+        old = self._decoded()
+        self.kind = target
+        self._categories, self._category_list, self._category_bytes = {}, [], 0
+        self._values = self._new_storage(target)
+        for value, present, origin in zip(old, self._present, self._origins):
+            if not present:
+                self._values.append(self._empty())
+            elif target == 'str':
+                self._values.append(self._encode(_number_text(value, origin)))
+            else:
+                self._values.append(self._encode(value))
+
+    def _new_storage(self, kind: str):
+        if kind == 'int':
+            return array('q')
+        if kind == 'float':
+            return array('d')
+        if kind == 'bool':
+            return array('b')
+        if kind == 'str':
+            return array('i')
+        return []
+
+    def _empty(self):
+        if self.kind == 'float':
+            return float('nan')
+        if self.kind == 'object':
+            return None
+        return 0
+
+    def _encode(self, value: Any):
+        if self.kind == 'str':
+            code = self._categories.get(value)
+            if code is None:
+                code = len(self._category_list)
+                self._categories[value] = code
+                self._category_list.append(value)
+                self._category_bytes += len(value) + 49
+            return code
+        if self.kind == 'float':
+            return float(value)
+        if self.kind == 'int':
+            return int(value)
+        return value
+
+    def _decoded(self) -> List[Any]:
+        if self.kind == 'str':
+            return [self._category_list[code] for code in self._values]
+        return list(self._values)
+
+    @property
+    def nbytes(self) -> int:
+        """Estimation de la mémoire occupée"""
+        size = len(self._present) + len(self._origins)
+        if self.kind == 'object':
+            return size + 64 * len(self._values)
+        if self._values is not None:
+            size += self._values.itemsize * len(self._values)
+        return size + self._category_bytes
+
+    def finish(self, length: int = None) -> Column:
+        """Fige la colonne en tableaux NumPy"""
+        if length is not None:
+            self.pad_to(length)
+
+        mask = None
+        if self._missing:
+            mask = np.frombuffer(bytes(self._present), dtype=np.uint8).astype(bool)
+
+        if self.kind is None:
+            return Column(self.name, 'object', [None] * len(self._present), mask=mask)
+        if self.kind == 'object':
+            return Column(self.name, 'object', self._values, mask=mask)
+        if self.kind == 'str':
+            return Column(self.name, 'str', np.frombuffer(self._values, dtype=np.int32).copy(),
+                          self._category_list, mask)
+
+        stored, dtype = _NUMPY_TYPES[self.kind]
+        values = np.frombuffer(self._values, dtype=stored).astype(dtype)
+        return Column(self.name, self.kind, values, mask=mask)
+
+
+def _kind_of(value: Any) -> str:
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, int):
+        return 'int' if -2**63 <= value < 2**63 else 'object'
+    if isinstance(value, float):
+        return 'float'
+    if isinstance(value, str):
+        return 'str'
+    return 'object'
+
+
+def _exact_number(raw: str) -> Optional[Any]:
+    """
+    Nombre dont le texte est exactement `raw` (int, ou float fini dont repr
+    vaut `raw`) ; None sinon. Les entiers au-delà de 2**53 restent du texte :
+    une colonne promue en float ne les rendrait plus à l'identique.
+    """
+    try:
+        value = int(raw)
+        return value if str(value) == raw and -2**53 <= value <= 2**53 else None
+    except ValueError:
+        pass
+    try:
+        value = float(raw)
+    except ValueError:
+        return None
+    return value if math.isfinite(value) and repr(value) == raw else None
+
+
+def _number_text(value: Any, origin: int = _FROM_VALUE) -> str:
+    """
+    Texte d'une valeur numérique déjà convertie : texte CSV d'origine
+    (entier ou décimal), sinon 1.0 -> '1'
+    """
+    if origin == _FROM_INT_TEXT:
+        return str(int(value))
+    if origin == _FROM_FLOAT_TEXT:
+        return repr(float(value))
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _rebuild(name: str, values: List[Any]) -> Column:
+    """Colonne typée à partir de valeurs Python (None : absente)"""
+    builder = ColumnBuilder(name)
+    for value in values:
+        builder.append(value)
+    return builder.finish(len(values))
+
+
+def _missing_column(name: str, kind: str, length: int,
+                    categories: List[str] = None) -> Column:
+    """Colonne de `length` valeurs absentes d'un type donné"""
+    mask = np.zeros(length, dtype=bool)
+    if kind == 'object':
+        return Column(name, 'object', [None] * length, mask=mask)
+    if kind == 'str':
+        return Column(name, 'str', np.zeros(length, dtype=np.int32),
+                      list(categories or []), mask)
+    dtype = _NUMPY_TYPES[kind][1]
+    values = np.full(length, np.nan) if kind == 'float' else np.zeros(length, dtype=dtype)
+    return Column(name, kind, values, mask=mask)
+
+
+def build_columns(rows: List[Dict[str, Any]]) -> Dict[str, Column]:
+    """Colonnes typées à partir d'une liste de dicts de propriétés"""
+    builders = {}
+    for i, properties in enumerate(rows):
+        for key, value in properties.items():
+            builder = builders.get(key)
+            if builder is None:
+                builder = builders[key] = ColumnBuilder(key, length=i)
+            builder.pad_to(i)
+            builder.append(value)
+    return {key: builder.finish(len(rows)) for key, builder in builders.items()}
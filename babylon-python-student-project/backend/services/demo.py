@@ -0,0 +1,36 @@
+"""
+Graphe de démonstration (données sociales), servi par GET /api/graph/demo
+"""
+from services.graph_service import graph_service
+from services.graph_store import StoredGraph
+from services.ingest import parse_json_data
+
+DEMO_GRAPH = {
+    "nodes": [
+        {"id": "Alice", "label": "Alice", "type": "person", "age": 30},
+        {"id": "Bob", "label": "Bob", "type": "person", "age": 25},
+        {"id": "Charlie", "label": "Charlie", "type": "person", "age": 35},
+        {"id": "David", "label": "David", "type": "person", "age": 28},
+        {"id": "Eve", "label": "Eve", "type": "person", "age": 32},
+        {"id": "Frank", "label": "Frank", "type": "person", "age": 40},
+        {"id": "Grace", "label": "Grace", "type": "person", "age": 27},
+        {"id": "Henry", "label": "Henry", "type": "person", "age": 33}
+    ],
+    "edges": [
+        {"source": "Alice", "target": "Bob", "relationship": "friend", "weight": 5},
+        {"source": "Alice", "target": "Charlie", "relationship": "colleague", "weight": 3},
+        {"source": "Bob", "target": "David", "relationship": "friend", "weight": 4},
+        {"source": "Charlie", "target": "Eve", "relationship": "friend", "weight": 5},
+        {"source": "David", "target": "Frank", "relationship": "family", "weight": 10},
+        {"source": "Eve", "target": "Grace", "relationship": "colleague", "weight": 3},
+        {"source": "Frank", "target": "Henry", "relationship": "friend", "weight": 4},
+        {"source": "Grace", "target": "Alice", "relationship": "friend", "weight": 5},
+        {"source": "Bob", "target": "Eve", "relationship": "friend", "weight": 4},
+        {"source": "Charlie", "target": "Frank", "relationship": "colleague", "weight": 2}
+    ]
+}
+
+
+def build_demo_graph() -> StoredGraph:
+    """Graphe de démonstration avec son layout force (servi par le cache de layouts)"""
+    return graph_service.layout_stored(parse_json_data(DEMO_GRAPH), 'force')
@@ -0,0 +1,121 @@
+"""
+Format binaire de transfert des graphes (GET /graph/<id> négocié)
+
+Les tableaux du graphe stocké sont envoyés tels quels, sans passer par
+des dicts ni par JSON ; le client les lit avec des vues typées
+(Float32Array, Uint32Array) directement transmissibles au GPU.
+
+Structure (little-endian, sections alignées sur 4 octets) :
+    en-tête 32 octets : magic 'GRPH', version u16, flags u16,
+                        node_count u32, id_count u32, edge_count u32,
+                        ids_size u32, labels_size u32, graph_version u32
+                        (version des opérations appliquées, services/graph_ops.py)
+    positions  float32[node_count * 3]     (si FLAG_POSITIONS)
+    sources    uint32[edge_count]          indices dans la table des ids
+    cibles     uint32[edge_count]
+    ids        table de chaînes (id_count entrées, ids_size octets)
+    labels     table de chaînes (node_count entrées, si FLAG_LABELS)
+Table de chaînes : offsets uint32[k + 1] puis octets UTF-8, complétés à 4.
+Les ids d'indice >= node_count sont des extrémités d'arêtes sans nœud.
+"""
+import struct
+import weakref
+import numpy as np
+from typing import Any, Dict, List, Tuple
+
+from services.graph_store import StoredGraph
+
+BINARY_MIMETYPE = 'application/x-graph-binary'
+
+MAGIC = b'GRPH'
+VERSION = 1
+FLAG_POSITIONS = 1
+FLAG_LABELS = 2
+
+HEADER = struct.Struct('<4sHHIIIIII')
+
+# Tables de chaînes encodées, par graphe (reconstruites si le graphe est modifié)
+_string_tables = weakref.WeakKeyDictionary()
+
+
+def encode_string_table(values: List[Any]) -> bytes:
+    """Table de chaînes : offsets uint32[k + 1] + octets UTF-8 alignés sur 4"""
+    encoded = [str(value).encode('utf-8') if value is not None else b''
+               for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype='<u4')
+    offsets[1:] = np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64,
+                                        count=len(encoded)))
+    data = b''.join(encoded)
+    return offsets.tobytes() + data + b'\0' * (-len(data) % 4)
+
+
+def _tables(graph: StoredGraph) -> Tuple[bytes, bytes]:
+    cached = _string_tables.get(graph)
+    if cached is None or cached[0] != graph.revision:
+        ids = encode_string_table(graph.ids)
+        labels = (encode_string_table(graph.labels.to_list())
+                  if graph.labels is not None else b'')
+        cached = _string_tables[graph] = (graph.revision, (ids, labels))
+    return cached[1]
+
+
+def encode_graph(graph: StoredGraph) -> List[bytes]:
+    """Morceaux de la réponse binaire (en-tête puis sections)"""
+    ids, labels = _tables(graph)
+    flags = 0
+    if graph.positions is not None:
+        flags |= FLAG_POSITIONS
+    if labels:
+        flags |= FLAG_LABELS
+
+    header = HEADER.pack(MAGIC, VERSION, flags, graph.node_count, len(graph.ids),
+                         graph.edge_count, len(ids), len(labels), graph.version)
+    chunks = [header]
+    if graph.positions is not None:
+        chunks.append(graph.positions.astype('<f4', copy=False).tobytes())
+    # int32 positifs : mêmes octets qu'en uint32
+    chunks.append(graph.src.astype('<i4', copy=False).tobytes())
+    chunks.append(graph.dst.astype('<i4', copy=False).tobytes())
+    chunks.append(ids)
+    if labels:
+        chunks.append(labels)
+    return chunks
+
+
+def decode_graph(data: bytes) -> Dict[str, Any]:
+    """Relit une réponse binaire (outil de vérification et de benchmark)"""
+    magic, version, flags, node_count, id_count, edge_count, ids_size, labels_size, \
+        graph_version = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Format binaire de graphe non reconnu")
+
+    offset = HEADER.size
+    positions = None
+    if flags & FLAG_POSITIONS:
+        positions = np.frombuffer(data, '<f4', node_count * 3, offset).reshape(-1, 3)
+        offset += node_count * 12
+    src = np.frombuffer(data, '<u4', edge_count, offset)
+    offset += edge_count * 4
+    dst = np.frombuffer(data, '<u4', edge_count, offset)
+    offset += edge_count * 4
+
+    ids = _decode_string_table(data, offset, id_count)
+    offset += ids_size
+    labels = _decode_string_table(data, offset, node_count) if flags & FLAG_LABELS else None
+
+    return {
+        'node_count': node_count,
+        'version': graph_version,
+        'ids': ids,
+        'labels': labels,
+        'positions': positions,
+        'sources': src,
+        'targets': dst
+    }
+
+
+def _decode_string_table(data: bytes, offset: int, count: int) -> List[str]:
+    offsets = np.frombuffer(data, '<u4', count + 1, offset).tolist()
+    start = offset + 4 * (count + 1)
+    return [data[start + a:start + b].decode('utf-8')
+            for a, b in zip(offsets[:-1], offsets[1:])]
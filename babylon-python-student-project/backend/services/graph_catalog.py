@@ -0,0 +1,346 @@
+"""
+Stockage persistant des graphes : fichiers .npy projetables en mémoire et
+catalogue SQLite
+
+Chaque graphe est écrit dans un répertoire <GRAPH_STORE_DIR>/<id>.<n> :
+- src.npy, dst.npy, positions.npy et les tableaux des colonnes typées
+  (valeurs, masque), relus avec np.load(mmap_mode='c') : aucune copie au
+  chargement, pages partagées entre processus par le cache du système,
+  écritures (déplacement de nœuds) privées au processus
+- strings.json : identifiants, catégories des colonnes str et valeurs des
+  colonnes object (listes Python)
+Le catalogue (catalog.sqlite, mode WAL) contient pour chaque graphe son
+manifeste (répertoire, colonnes, métadonnées, version, génération), le
+journal partagé des opérations appliquées depuis ce manifeste (graph_ops)
+ainsi que la description des sessions collaboratives. Un redémarrage ne
+relit que le catalogue ; les graphes sont ouverts au premier accès.
+
+Plusieurs processus (workers gunicorn) partagent le même catalogue :
+- chaque opération est journalisée au moment où elle est appliquée, sous
+  le verrou d'écriture de la base (locked()) ; un processus en retard
+  rejoue d'abord les opérations des autres (head(), ops_since())
+- load() rejoue le journal après le manifeste : un arrêt brutal avant
+  réécriture ne perd aucune opération
+- une réécriture (save) d'une version de la même génération purge le
+  journal jusqu'à cette version ; une nouvelle génération (save_graph)
+  remplace le graphe et son journal
+
+Une réécriture crée un nouveau répertoire puis bascule le catalogue :
+les processus qui projettent l'ancien le conservent jusqu'à fermeture.
+"""
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from services import graph_ops
+from services.columns import Column
+from services.graph_store import StoredGraph
+
+DEFAULT_STORE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'graphs'
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS graphs (
+    id TEXT PRIMARY KEY,
+    manifest TEXT NOT NULL,
+    node_count INTEGER,
+    edge_count INTEGER,
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS graph_ops (
+    graph_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    op TEXT NOT NULL,
+    PRIMARY KEY (graph_id, version)
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+"""
+
+
+class GraphCatalog:
+    """Catalogue SQLite et fichiers des graphes persistés"""
+
+    def __init__(self, store_dir: str = None):
+        self.store_dir = store_dir if store_dir is not None else os.environ.get(
+            'GRAPH_STORE_DIR', DEFAULT_STORE_DIR
+        )
+        self._lock = threading.Lock()
+        self._ready = False
+
+    @property
+    def enabled(self) -> bool:
+        """Persistance désactivée si GRAPH_STORE_DIR est vide"""
+        return bool(self.store_dir)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Une connexion par appel : utilisable depuis tous les threads
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    os.makedirs(self.store_dir, exist_ok=True)
+                    with closing(sqlite3.connect(self._catalog_path())) as db:
+                        db.execute('PRAGMA journal_mode=WAL')
+                        db.executescript(_SCHEMA)
+                    self._ready = True
+        return sqlite3.connect(self._catalog_path(), timeout=10)
+
+    def _catalog_path(self) -> str:
+        return os.path.join(self.store_dir, 'catalog.sqlite')
+
+    @contextmanager
+    def locked(self) -> Iterator[sqlite3.Connection]:
+        """
+        Transaction d'écriture exclusive entre processus (BEGIN IMMEDIATE) :
+        vérification de la version courante et journalisation atomiques
+        """
+        with closing(self._connect()) as db:
+            db.isolation_level = None
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                yield db
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+            db.execute('COMMIT')
+
+    # === GRAPHES ===
+
+    def save(self, graph_id: str, graph: StoredGraph, db: sqlite3.Connection = None,
+             rewrite: bool = False) -> Optional[float]:
+        """
+        Écrit un graphe (nouveau répertoire) ; retourne son horodatage
+        rewrite : réécriture d'une copie ouverte, abandonnée (None) si le
+        catalogue n'a plus sa génération ou a une version plus récente
+        db : transaction de locked() en cours, sinon une transaction propre
+        """
+        directory = f'{graph_id}.{time.time_ns()}'
+        path = os.path.join(self.store_dir, directory)
+        tmp = path + '.tmp'
+        os.makedirs(tmp)
+        try:
+            manifest = _write_graph(tmp, graph)
+            os.replace(tmp, path)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        manifest['directory'] = directory
+
+        if db is None:
+            with self.locked() as db:
+                return self._commit(db, graph_id, graph, manifest, rewrite)
+        return self._commit(db, graph_id, graph, manifest, rewrite)
+
+    def _commit(self, db: sqlite3.Connection, graph_id: str, graph: StoredGraph,
+                manifest: Dict[str, Any], rewrite: bool) -> Optional[float]:
+        row = db.execute('SELECT manifest FROM graphs WHERE id = ?', (graph_id,)).fetchone()
+        previous = json.loads(row[0]) if row is not None else None
+        same_generation = previous is not None and \
+            previous.get('generation') == graph.generation
+        if rewrite and (not same_generation or previous['version'] > graph.version):
+            self._remove_directory(manifest['directory'])
+            return None
+
+        updated_at = time.time()
+        db.execute(
+            'INSERT OR REPLACE INTO graphs (id, manifest, node_count, edge_count, updated_at) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (graph_id, json.dumps(manifest, default=str), graph.node_count,
+             graph.edge_count, updated_at)
+        )
+        if same_generation:
+            db.execute('DELETE FROM graph_ops WHERE graph_id = ? AND version <= ?',
+                       (graph_id, graph.version))
+        else:
+            db.execute('DELETE FROM graph_ops WHERE graph_id = ?', (graph_id,))
+        if previous is not None:
+            self._remove_directory(previous['directory'])
+        return updated_at
+
+    def load(self, graph_id: str) -> Optional[Tuple[StoredGraph, int]]:
+        """
+        Ouvre un graphe persisté (tableaux projetés en mémoire) et rejoue
+        les opérations journalisées depuis son manifeste
+        Retourne (graphe, version du manifeste) ou None si absent
+        """
+        with closing(self._connect()) as db:
+            # Lecture cohérente du manifeste et du journal
+            db.execute('BEGIN')
+            row = db.execute('SELECT manifest FROM graphs WHERE id = ?',
+                             (graph_id,)).fetchone()
+            if row is None:
+                return None
+            manifest = json.loads(row[0])
+            ops = self.ops_since(graph_id, manifest['version'], db)
+            db.execute('COMMIT')
+        graph = _read_graph(os.path.join(self.store_dir, manifest['directory']), manifest)
+        graph_ops.replay(graph, ops)
+        return graph, manifest['version']
+
+    def head(self, graph_id: str, db: sqlite3.Connection = None) -> Optional[Dict[str, Any]]:
+        """
+        État partagé d'un graphe (None si absent) :
+        {'generation', 'snapshot': version du manifeste,
+         'version': dernière version journalisée}
+        """
+        query = ("SELECT json_extract(manifest, '$.generation'), "
+                 "json_extract(manifest, '$.version'), "
+                 "(SELECT MAX(version) FROM graph_ops WHERE graph_id = ?) "
+                 "FROM graphs WHERE id = ?")
+        if db is None:
+            with closing(self._connect()) as db:
+                row = db.execute(query, (graph_id, graph_id)).fetchone()
+        else:
+            row = db.execute(query, (graph_id, graph_id)).fetchone()
+        if row is None:
+            return None
+        generation, snapshot, logged = row
+        return {'generation': generation, 'snapshot': snapshot,
+                'version': max(snapshot, logged or 0)}
+
+    def ops_since(self, graph_id: str, version: int,
+                  db: sqlite3.Connection = None) -> List[Dict[str, Any]]:
+        """Opérations journalisées de version > `version`, dans l'ordre"""
+        query = 'SELECT op FROM graph_ops WHERE graph_id = ? AND version > ? ORDER BY version'
+        if db is None:
+            with closing(self._connect()) as db:
+                rows = db.execute(query, (graph_id, version)).fetchall()
+        else:
+            rows = db.execute(query, (graph_id, version)).fetchall()
+        return [json.loads(op) for (op,) in rows]
+
+    def append_ops(self, db: sqlite3.Connection, graph_id: str, ops: List[Dict[str, Any]]):
+        """Journalise des opérations versionnées (transaction de locked())"""
+        db.executemany('INSERT INTO graph_ops (graph_id, version, op) VALUES (?, ?, ?)',
+                       [(graph_id, op['version'], json.dumps(op, default=str))
+                        for op in ops])
+
+    def delete(self, graph_id: str) -> bool:
+        with closing(self._connect()) as db, db:
+            row = db.execute('SELECT manifest FROM graphs WHERE id = ?',
+                             (graph_id,)).fetchone()
+            if row is None:
+                return False
+            db.execute('DELETE FROM graphs WHERE id = ?', (graph_id,))
+            db.execute('DELETE FROM graph_ops WHERE graph_id = ?', (graph_id,))
+        self._remove_directory(json.loads(row[0])['directory'])
+        return True
+
+    def list(self) -> List[Dict[str, Any]]:
+        """[{id, metadata}] de tous les graphes persistés"""
+        with closing(self._connect()) as db:
+            rows = db.execute('SELECT id, manifest FROM graphs').fetchall()
+        return [{'id': graph_id, 'metadata': json.loads(manifest)['metadata']}
+                for graph_id, manifest in rows]
+
+    def _remove_directory(self, directory: str):
+        # Les projections encore ouvertes restent valides (fichiers détachés)
+        shutil.rmtree(os.path.join(self.store_dir, directory), ignore_errors=True)
+
+    # === SESSIONS ===
+
+    def save_session(self, session: Dict[str, Any]):
+        """Description d'une session (sans les utilisateurs connectés)"""
+        with closing(self._connect()) as db, db:
+            db.execute('INSERT OR REPLACE INTO sessions (id, data) VALUES (?, ?)',
+                       (session['id'], json.dumps(session, default=str)))
+
+    def load_sessions(self, session_id: str = None) -> List[Dict[str, Any]]:
+        """Sessions persistées (toutes, ou celle demandée)"""
+        with closing(self._connect()) as db:
+            if session_id is None:
+                rows = db.execute('SELECT data FROM sessions').fetchall()
+            else:
+                rows = db.execute('SELECT data FROM sessions WHERE id = ?',
+                                  (session_id,)).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+
+def _write_graph(path: str, graph: StoredGraph) -> Dict[str, Any]:
+    """Écrit les tableaux d'un graphe ; retourne son manifeste"""
+    strings = {'ids': list(graph.ids), 'columns': {}}
+
+    def save(name: str, array: np.ndarray):
+        np.save(os.path.join(path, f'{name}.npy'), np.ascontiguousarray(array),
+                allow_pickle=False)
+
+    def column_entry(prefix: str, column: Column) -> Dict[str, Any]:
+        entry = {'name': column.name, 'kind': column.kind, 'file': prefix,
+                 'mask': column.mask is not None}
+        if column.kind == 'object':
+            strings['columns'][prefix] = list(column.values)
+        else:
+            save(prefix, column.values)
+        if column.kind == 'str':
+            strings['columns'][prefix] = list(column.categories)
+        if column.mask is not None:
+            save(f'{prefix}.mask', column.mask)
+        return entry
+
+    save('src', graph.src)
+    save('dst', graph.dst)
+    if graph.positions is not None:
+        save('positions', graph.positions)
+    manifest = {
+        'node_count': graph.node_count,
+        'positions': graph.positions is not None,
+        'labels': column_entry('labels', graph.labels) if graph.labels is not None else None,
+        'node_columns': [column_entry(f'node{i}', column)
+                         for i, column in enumerate(graph.node_columns.values())],
+        'edge_columns': [column_entry(f'edge{i}', column)
+                         for i, column in enumerate(graph.edge_columns.values())],
+        'metadata': graph.metadata,
+        'extra': graph.extra,
+        'version': graph.version,
+        'generation': graph.generation
+    }
+    with open(os.path.join(path, 'strings.json'), 'w', encoding='utf-8') as f:
+        json.dump(strings, f, default=str)
+    return manifest
+
+
+def _read_graph(path: str, manifest: Dict[str, Any]) -> StoredGraph:
+    """Reconstruit un graphe dont les tableaux sont projetés en mémoire"""
+    with open(os.path.join(path, 'strings.json'), encoding='utf-8') as f:
+        strings = json.load(f)
+
+    def load(name: str) -> np.ndarray:
+        return np.load(os.path.join(path, f'{name}.npy'), mmap_mode='c',
+                       allow_pickle=False)
+
+    def column(entry: Optional[Dict[str, Any]]) -> Optional[Column]:
+        if entry is None:
+            return None
+        prefix = entry['file']
+        mask = load(f'{prefix}.mask') if entry['mask'] else None
+        if entry['kind'] == 'object':
+            return Column(entry['name'], 'object', strings['columns'][prefix], mask=mask)
+        categories = strings['columns'][prefix] if entry['kind'] == 'str' else None
+        return Column(entry['name'], entry['kind'], load(prefix), categories, mask)
+
+    graph = StoredGraph(
+        strings['ids'], manifest['node_count'], load('src'), load('dst'),
+        labels=column(manifest['labels']),
+        node_columns={entry['name']: column(entry) for entry in manifest['node_columns']},
+        edge_columns={entry['name']: column(entry) for entry in manifest['edge_columns']},
+        positions=load('positions') if manifest['positions'] else None,
+        metadata=manifest['metadata'],
+        extra=manifest['extra']
+    )
+    graph.states = manifest.get('states', {})
+    graph.version = manifest['version']
+    graph.generation = manifest.get('generation')
+    return graph
+
+# Instance globale du catalogue
+graph_catalog = GraphCatalog()
@@ -0,0 +1,188 @@
+"""
+Opérations de modification des graphes stockés (édition collaborative)
+
+Une modification est une liste d'opérations compactes appliquées en place
+au graphe stocké ; chaque opération appliquée reçoit une version
+croissante et est conservée dans un journal borné (OPLOG_SIZE) pour que
+les clients rattrapent les versions manquées sans recharger le graphe.
+Avec persistance, elle est aussi journalisée dans le catalogue (journal
+partagé entre processus, voir services/graph_catalog.py).
+
+Opérations :
+    {"op": "add_node", "id": "n1", "label": "N1", "properties": {...}, "position": [x, y, z]}
+    {"op": "remove_node", "id": "n1"}                 (supprime aussi ses arêtes)
+    {"op": "move_node", "id": "n1", "position": [x, y, z]}
+    {"op": "update_node", "id": "n1", "label": "...", "properties": {"age": 31, "old": null}}
+    {"op": "add_edge", "source": "a", "target": "b", "properties": {...}}
+    {"op": "remove_edge", "source": "a", "target": "b"}   (toutes les arêtes a -> b)
+    {"op": "update_edge", "source": "a", "target": "b", "properties": {...}}
+Les positions acceptent aussi la forme {"x": .., "y": .., "z": ..}.
+"""
+from collections import deque
+from typing import Any, Dict, List
+
+import numpy as np
+
+from services.graph_store import StoredGraph
+
+OPLOG_SIZE = 10000
+
+OPERATIONS = ('add_node', 'remove_node', 'move_node', 'update_node',
+              'add_edge', 'remove_edge', 'update_edge')
+
+
+class OpLog:
+    """Journal borné des dernières opérations d'un graphe"""
+
+    def __init__(self, size: int = OPLOG_SIZE):
+        self.ops = deque(maxlen=size)
+
+    def append(self, op: Dict[str, Any]):
+        self.ops.append(op)
+
+    def since(self, version: int, current: int):
+        """Opérations de version > `version` ; None si le journal ne remonte pas assez loin"""
+        if version >= current:
+            return []
+        if not self.ops or self.ops[0]['version'] > version + 1:
+            return None
+        start = version + 1 - self.ops[0]['version']
+        return list(self.ops)[start:]
+
+
+def normalize(op: Any) -> Dict[str, Any]:
+    """Forme compacte validée d'une opération (ValueError si invalide)"""
+    if not isinstance(op, dict) or op.get('op') not in OPERATIONS:
+        raise ValueError(f"Opération inconnue: {op.get('op') if isinstance(op, dict) else op!r}")
+    kind = op['op']
+    result = {'op': kind}
+
+    if kind.endswith('_node'):
+        result['id'] = _node_id(op.get('id'), 'id')
+    else:
+        result['source'] = _node_id(op.get('source'), 'source')
+        result['target'] = _node_id(op.get('target'), 'target')
+
+    if kind in ('add_node', 'move_node') and (op.get('position') is not None or kind == 'move_node'):
+        result['position'] = _position(op.get('position'))
+    if kind in ('add_node', 'update_node') and 'label' in op:
+        result['label'] = op['label']
+    if kind in ('add_node', 'update_node', 'add_edge', 'update_edge'):
+        properties = op.get('properties') or {}
+        if not isinstance(properties, dict):
+            raise ValueError(f"{kind}: properties doit être un objet")
+        if properties or kind.startswith('update'):
+            result['properties'] = properties
+    return result
+
+
+def check(graph: StoredGraph, ops: List[Dict[str, Any]]):
+    """
+    Vérifie qu'une liste d'opérations normalisées s'applique entièrement
+    (nœuds et arêtes existants) avant toute modification du graphe
+    """
+    added, removed, removed_ever = set(), set(), set()
+    pairs = {}
+
+    def has_node(node_id):
+        if node_id in added:
+            return True
+        i = graph.index.get(node_id)
+        return i is not None and i < graph.node_count and node_id not in removed
+
+    def edge_count(source, target):
+        if (source, target) not in pairs:
+            base = 0
+            if source not in removed_ever and target not in removed_ever:
+                base = len(graph.edge_rows(source, target))
+            pairs[(source, target)] = base
+        return pairs[(source, target)]
+
+    for i, op in enumerate(ops):
+        kind = op['op']
+        if kind == 'add_node':
+            if has_node(op['id']):
+                raise ValueError(f"Opération {i}: le nœud {op['id']!r} existe déjà")
+            added.add(op['id'])
+            removed.discard(op['id'])
+        elif kind.endswith('_node'):
+            if not has_node(op['id']):
+                raise ValueError(f"Opération {i}: nœud inconnu {op['id']!r}")
+            if kind == 'move_node' and graph.positions is None:
+                raise ValueError(f"Opération {i}: graphe sans positions")
+            if kind == 'remove_node':
+                added.discard(op['id'])
+                removed.add(op['id'])
+                removed_ever.add(op['id'])
+                for pair in pairs:
+                    if op['id'] in pair:
+                        pairs[pair] = 0
+        elif kind == 'add_edge':
+            pairs[(op['source'], op['target'])] = edge_count(op['source'], op['target']) + 1
+        else:
+            if edge_count(op['source'], op['target']) == 0:
+                raise ValueError(f"Opération {i}: arête inconnue "
+                                 f"{op['source']!r} -> {op['target']!r}")
+            if kind == 'remove_edge':
+                pairs[(op['source'], op['target'])] = 0
+
+
+def apply(graph: StoredGraph, op: Dict[str, Any]):
+    """Applique une opération normalisée et vérifiée au graphe"""
+    kind = op['op']
+    if kind == 'add_node':
+        graph.add_node(op['id'], op.get('label'), op.get('properties'), op.get('position'))
+    elif kind == 'remove_node':
+        graph.remove_node(graph.index[op['id']])
+    elif kind == 'move_node':
+        graph.move_node(graph.index[op['id']], op['position'])
+    elif kind == 'update_node':
+        row = graph.index[op['id']]
+        if 'label' in op:
+            graph.set_label(row, op['label'])
+        if op.get('properties'):
+            graph.set_node_properties(row, op['properties'])
+    elif kind == 'add_edge':
+        graph.add_edge(op['source'], op['target'], op.get('properties'))
+    elif kind == 'remove_edge':
+        graph.remove_edges(graph.edge_rows(op['source'], op['target']))
+    elif op.get('properties'):
+        graph.set_edge_properties(graph.edge_rows(op['source'], op['target']),
+                                  op['properties'])
+
+
+def replay(graph: StoredGraph, ops: List[Dict[str, Any]]) -> List[int]:
+    """
+    Applique des opérations versionnées (vérifiées, ou relues du journal
+    partagé du catalogue) ; retourne les lignes des nœuds déplacés
+    """
+    moved = []
+    for op in ops:
+        apply(graph, op)
+        if op['op'] == 'move_node':
+            moved.append(graph.index[op['id']])
+        graph.version = op['version']
+    if ops:
+        if 'node_count' in graph.metadata:
+            graph.metadata['node_count'] = graph.node_count
+        if 'edge_count' in graph.metadata:
+            graph.metadata['edge_count'] = graph.edge_count
+    return moved
+
+
+def _node_id(value: Any, field: str):
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError(f"{field} manquant ou invalide")
+    return value
+
+
+def _position(value: Any) -> List[float]:
+    if isinstance(value, dict):
+        value = [value.get('x', 0), value.get('y', 0), value.get('z', 0)]
+    try:
+        position = np.asarray(value, dtype=np.float64)
+    except (TypeError, ValueError):
+        position = None
+    if position is None or position.shape != (3,) or not np.isfinite(position).all():
+        raise ValueError(f"Position invalide: {value!r}")
+    return position.tolist()
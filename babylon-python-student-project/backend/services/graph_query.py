@@ -0,0 +1,287 @@
+"""
+Moteur de filtrage indexé des graphes stockés (POST /graph/<id>/filter)
+
+Les index sont construits à la première requête portant sur une propriété
+puis conservés avec le graphe :
+- colonnes numériques : lignes triées par valeur (recherche dichotomique
+  pour les égalités et les intervalles)
+- colonnes texte (catégories) : table catégorie -> code et lignes groupées
+  par code ; les intervalles comparent les catégories numériques
+- colonnes d'objets : parcours de la colonne
+Le degré des nœuds (min_connections / max_connections) et les métriques
+précalculées (filters['metrics'], services/analytics.py) sont indexés de la
+même façon que les colonnes numériques.
+
+Prédicats acceptés pour une propriété :
+    "valeur"                      égalité (comportement historique)
+    ">5", ">=5", "<5", "<=5", "!=5"  comparaison (texte) ; "!=x" : différent
+                                  de x, ">x" ou "<x" non numérique : erreur
+    ["a", "b"]                    appartenance
+    {"$gt": 5, "$lte": 10}        opérateurs $eq $ne $gt $gte $lt $lte
+                                  $in $nin $between [min, max]
+"""
+import re
+import threading
+import weakref
+import numpy as np
+from typing import Any, Dict, Tuple
+
+from services.analytics import analytics_service
+from services.columns import Column
+from services.graph_store import StoredGraph
+
+_COMPARISON = re.compile(r'^\s*(>=|<=|!=|>|<)\s*(.+?)\s*$')
+
+_OPERATORS = ('$eq', '$ne', '$gt', '$gte', '$lt', '$lte', '$in', '$nin', '$between')
+
+
+class ColumnIndex:
+    """Index d'une colonne : lignes présentes triées par valeur ou par catégorie"""
+
+    def __init__(self, column: Column):
+        self.column = column
+        self.size = len(column)
+        present = (np.flatnonzero(column.mask) if column.mask is not None
+                   else np.arange(self.size))
+
+        if column.is_numeric:
+            values = column.values[present]
+            if column.kind == 'float':
+                # NaN : ni égal ni comparable à une valeur
+                finite = ~np.isnan(values)
+                present, values = present[finite], values[finite]
+            order = np.argsort(values, kind='stable')
+            self.rows = present[order]
+            self.sorted_values = values[order]
+        elif column.kind == 'str':
+            codes = column.values[present]
+            order = np.argsort(codes, kind='stable')
+            self.rows = present[order]
+            self.bounds = np.searchsorted(codes[order], np.arange(len(column.categories) + 1))
+            self.codes = {category: code for code, category in enumerate(column.categories)}
+            self._numeric_categories = None
+        else:
+            self.rows = None
+
+    def _mask(self, rows: np.ndarray) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        mask[rows] = True
+        return mask
+
+    def _present(self) -> np.ndarray:
+        return self.column.mask if self.column.mask is not None else np.ones(self.size, dtype=bool)
+
+    def equal(self, value: Any) -> np.ndarray:
+        """Lignes dont la valeur vaut `value`"""
+        column = self.column
+        if column.is_numeric:
+            if isinstance(value, (bool, int, float)):
+                return self.range(value, True, value, True)
+            return np.zeros(self.size, dtype=bool)
+        if column.kind == 'str':
+            code = self.codes.get(value) if isinstance(value, str) else None
+            if code is None:
+                return np.zeros(self.size, dtype=bool)
+            return self._mask(self.rows[self.bounds[code]:self.bounds[code + 1]])
+        return column.equals(value)
+
+    def isin(self, values) -> np.ndarray:
+        """Lignes dont la valeur appartient à `values`"""
+        mask = np.zeros(self.size, dtype=bool)
+        for value in values:
+            mask |= self.equal(value)
+        return mask
+
+    def range(self, low: Any = None, low_inclusive: bool = True,
+              high: Any = None, high_inclusive: bool = True) -> np.ndarray:
+        """Lignes dont la valeur numérique est dans l'intervalle (bornes None : ouvert)"""
+        low = _as_number(low)
+        high = _as_number(high)
+        column = self.column
+
+        if column.is_numeric:
+            values = self.sorted_values
+            start = 0 if low is None else np.searchsorted(
+                values, low, side='left' if low_inclusive else 'right')
+            end = len(values) if high is None else np.searchsorted(
+                values, high, side='right' if high_inclusive else 'left')
+            return self._mask(self.rows[start:max(start, end)])
+
+        if column.kind == 'str':
+            # Catégories numériques (CSV importé en texte) : "10" > "9"
+            numbers = self._category_numbers()
+            selected = ~np.isnan(numbers)
+            if low is not None:
+                selected &= numbers >= low if low_inclusive else numbers > low
+            if high is not None:
+                selected &= numbers <= high if high_inclusive else numbers < high
+            return selected[column.values] & self._present()
+
+        values = column.to_list()
+        return np.fromiter((_in_range(v, low, low_inclusive, high, high_inclusive)
+                            for v in values), dtype=bool, count=len(values))
+
+    def _category_numbers(self) -> np.ndarray:
+        if self._numeric_categories is None:
+            numbers = np.full(len(self.column.categories), np.nan)
+            for code, category in enumerate(self.column.categories):
+                number = _as_number(category, strict=False)
+                if number is not None:
+                    numbers[code] = number
+            self._numeric_categories = numbers
+        return self._numeric_categories
+
+    def match(self, predicate: Any) -> np.ndarray:
+        """Masque des lignes satisfaisant un prédicat (voir l'en-tête du module)"""
+        if isinstance(predicate, list):
+            return self.isin(predicate)
+
+        if isinstance(predicate, str):
+            comparison = _COMPARISON.match(predicate)
+            if comparison:
+                # Opérande texte : "!=x" devient $ne, ">x" une erreur (borne non numérique)
+                operand = comparison.group(2)
+                number = _as_number(operand, strict=False)
+                if number is not None and self.column.is_numeric:
+                    operand = number
+                predicate = {_SYMBOLS[comparison.group(1)]: operand}
+
+        if not isinstance(predicate, dict):
+            return self.equal(predicate)
+
+        mask = np.ones(self.size, dtype=bool)
+        for operator, operand in predicate.items():
+            if operator not in _OPERATORS:
+                raise ValueError(f"Opérateur de filtre inconnu: {operator}")
+            if operator == '$eq':
+                mask &= self.equal(operand)
+            elif operator == '$ne':
+                mask &= ~self.equal(operand)
+            elif operator == '$in':
+                mask &= self.isin(_as_list(operator, operand))
+            elif operator == '$nin':
+                mask &= ~self.isin(_as_list(operator, operand))
+            elif operator == '$between':
+                bounds = _as_list(operator, operand)
+                if len(bounds) != 2:
+                    raise ValueError("$between attend [min, max]")
+                mask &= self.range(bounds[0], True, bounds[1], True)
+            elif operator in ('$gt', '$gte'):
+                mask &= self.range(operand, operator == '$gte', None)
+            else:
+                mask &= self.range(None, True, operand, operator == '$lte')
+        return mask
+
+
+_SYMBOLS = {'>': '$gt', '>=': '$gte', '<': '$lt', '<=': '$lte', '!=': '$ne'}
+
+
+class FilterEngine:
+    """Filtrage des graphes stockés avec index conservés entre les requêtes"""
+
+    def __init__(self):
+        # graphe -> {(portée, propriété): ColumnIndex}
+        self._indexes = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def index(self, graph: StoredGraph, scope: str, name: str,
+              column: Column) -> ColumnIndex:
+        """Index d'une colonne, construit au premier usage"""
+        with self._lock:
+            indexes = self._indexes.setdefault(graph, {})
+            index = indexes.get((scope, name))
+            if index is None or index.column is not column:
+                index = indexes[(scope, name)] = ColumnIndex(column)
+            return index
+
+    def metric_index(self, graph: StoredGraph, metric: str) -> ColumnIndex:
+        """Index d'une métrique des nœuds (colonne recalculée à chaque révision)"""
+        return self.index(graph, 'metric', metric, analytics_service.column(graph, metric))
+
+    def degree_index(self, graph: StoredGraph) -> ColumnIndex:
+        """Index des degrés (nombre de connexions) des nœuds"""
+        return self.metric_index(graph, 'degree')
+
+    def filter(self, graph: StoredGraph,
+               filters: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Masques (nœuds, arêtes) retenus par les filtres
+        filters: {
+            'node_property': {'type': 'person', 'age': '>30'},
+            'edge_property': {'weight': {'$between': [2, 5]}},
+            'min_connections': 2,
+            'max_connections': 10,
+            'metrics': {'pagerank': {'$gt': 0.001}, 'component': 0}
+        }
+        Une arête est retenue si ses deux extrémités le sont
+        """
+        filters = filters or {}
+        node_mask = self._match(graph, 'node', graph.node_columns, graph.node_count,
+                                filters.get('node_property') or {})
+
+        low = filters.get('min_connections')
+        high = filters.get('max_connections')
+        if low is not None or high is not None:
+            node_mask &= self.degree_index(graph).range(low, True, high, True)
+        for metric, predicate in (filters.get('metrics') or {}).items():
+            node_mask &= self.metric_index(graph, metric).match(predicate)
+
+        kept = np.zeros(len(graph.ids), dtype=bool)
+        kept[:graph.node_count] = node_mask
+        edge_mask = kept[graph.src] & kept[graph.dst]
+        edge_mask &= self._match(graph, 'edge', graph.edge_columns, graph.edge_count,
+                                 filters.get('edge_property') or {})
+        return node_mask, edge_mask
+
+    def _match(self, graph: StoredGraph, scope: str, columns: Dict[str, Column],
+               count: int, predicates: Dict[str, Any]) -> np.ndarray:
+        mask = np.ones(count, dtype=bool)
+        for name, predicate in predicates.items():
+            column = columns.get(name)
+            if column is None:
+                # Propriété absente partout : seuls None et $ne / $nin correspondent
+                if predicate is not None and not _negative(predicate):
+                    mask[:] = False
+                continue
+            mask &= self.index(graph, scope, name, column).match(predicate)
+        return mask
+
+
+def _negative(predicate: Any) -> bool:
+    if isinstance(predicate, dict):
+        return all(operator in ('$ne', '$nin') for operator in predicate)
+    if isinstance(predicate, str):
+        return predicate.lstrip().startswith('!=')
+    return False
+
+
+def _as_list(operator: str, operand: Any) -> list:
+    if not isinstance(operand, (list, tuple)):
+        raise ValueError(f"{operator} attend une liste")
+    return list(operand)
+
+
+def _as_number(value: Any, strict: bool = True):
+    """Borne numérique (None conservé) ; ValueError si strict et non numérique"""
+    if value is None or isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        if strict:
+            raise ValueError(f"Valeur numérique attendue: {value!r}")
+        return None
+
+
+def _in_range(value: Any, low, low_inclusive: bool, high, high_inclusive: bool) -> bool:
+    number = _as_number(value, strict=False) if not isinstance(value, bool) else None
+    if number is None or number != number:
+        return False
+    if low is not None and (number < low if low_inclusive else number <= low):
+        return False
+    if high is not None and (number > high if high_inclusive else number >= high):
+        return False
+    return True
+
+# Instance globale du moteur
+filter_engine = FilterEngine()
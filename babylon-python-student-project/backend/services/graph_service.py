@@ -1,15 +1,61 @@
+import atexit
 import json
 import csv
 import io
-import networkx as nx
-from typing import Dict, List, Any
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import nullcontext
+import numpy as np
+from typing import Dict, List, Any, Callable, Optional, Union
+
+from services.layout_engine import force_layout, multilevel_layout, incremental_layout
+from services.graph_store import StoredGraph
+from services.graph_catalog import graph_catalog
+from services.layout_cache import layout_cache, layout_key, seed_from_key
+from services.graph_query import filter_engine
+from services.analytics import analytics_service
+from services.sampling import sampling_service
+from services.clustering import lod_service
+from services.metrics import metrics
+from services.response_cache import response_cache
+from services.spatial_index import spatial_index, box_planes
+from services.state_store import state_store
+from services import graph_ops
+
+# Budget d'itérations par défaut des layouts force-directed natifs
+NATIVE_LAYOUT_ITERATIONS = {
+    'force': 100,
+    'spring': 100,
+    'sphere': 50
+}
+
+# Budget d'itérations par défaut du layout incrémental (voisinage seulement)
+INCREMENTAL_ITERATIONS = 50
+
+# Opérations journalisées dans le catalogue avant réécriture du graphe
+SNAPSHOT_OPS = int(os.environ.get('GRAPH_SNAPSHOT_OPS', 1000))
 
 class GraphService:
     """Service pour gérer la création et manipulation de graphes"""
     
-    def __init__(self):
-        self.graphs = {}  # Stockage des graphes en mémoire
+    def __init__(self, catalog=graph_catalog, max_bytes: int = None):
+        # Graphes ouverts (LRU) ; les autres restent sur disque (catalogue)
+        self.graphs = OrderedDict()  # graph_id -> StoredGraph (stockage en colonnes)
+        self.catalog = catalog
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            float(os.environ.get('GRAPH_MEMORY_MB', 1024)) * 1024 * 1024
+        )
+        self._sizes = {}   # graph_id -> mémoire estimée
+        self._saved = {}   # graph_id -> version persistée (graphe non modifié depuis)
+        self._store_lock = threading.RLock()
+        self.evictions = 0
+        self.op_logs = weakref.WeakKeyDictionary()  # StoredGraph -> OpLog
+        self._ops_lock = threading.Lock()
         
+    @metrics.timed('parse_csv')
     def parse_csv_to_graph(self, csv_content: str, source_col: str = 'source', 
                           target_col: str = 'target') -> Dict[str, Any]:
         """
@@ -74,6 +120,7 @@ class GraphService:
         except Exception as e:
             raise ValueError(f"Erreur lors du parsing CSV: {str(e)}")
     
+    @metrics.timed('parse_json')
     def parse_json_to_graph(self, json_content: str) -> Dict[str, Any]:
         """
         Parse un JSON et génère un graphe
@@ -169,36 +216,39 @@ class GraphService:
             raise ValueError(f"Erreur lors du parsing JSON: {str(e)}")
     
     def compute_layout(self, graph_data: Dict[str, Any], 
-                      layout_type: str = 'force') -> Dict[str, Any]:
+                      layout_type: str = 'force',
+                      layout_params: Dict[str, Any] = None,
+                      callback: Callable[[float, np.ndarray], Optional[bool]] = None,
+                      callback_every: int = None,
+                      base: StoredGraph = None) -> Dict[str, Any]:
         """
         Calcule les positions 3D des nœuds selon un algorithme de layout
+        layout_params (optionnel, layouts force/spring/sphere/multilevel): {
+            'iterations': 100,  # budget d'itérations (niveau le plus grossier
+                                # pour multilevel)
+            'tol': 1e-4,        # seuil de convergence
+            'seed': 42,         # graine pour des positions reproductibles
+            'coarsest_size': 100  # multilevel : taille du plus petit niveau
+        }
+        callback (optionnel, layouts natifs): appelé pendant le calcul avec
+        (avancement dans [0, 1], positions brutes (n, 3) dans l'ordre des
+        nœuds) ; retourner False arrête le layout sur les positions courantes.
+        Layout force : appelé toutes les `callback_every` itérations (1/20e
+        du budget par défaut) ; multilevel : après chaque niveau
+        base (optionnel) : version précédente du graphe (réimport) ; les
+        nœuds conservés gardent leur position et seul le voisinage des
+        changements est relâché (voir incremental_positions)
         """
         try:
-            # Créer un graphe NetworkX
-            G = nx.Graph()
-            
-            # Ajouter les nœuds
-            for node in graph_data['nodes']:
-                G.add_node(node['id'], **node.get('properties', {}))
-            
-            # Ajouter les arêtes
-            for edge in graph_data['edges']:
-                G.add_edge(edge['source'], edge['target'], 
-                          **edge.get('properties', {}))
-            
-            # Calculer le layout selon le type
-            if layout_type == 'force' or layout_type == 'spring':
-                pos = nx.spring_layout(G, dim=3, iterations=100)
-            elif layout_type == 'circular':
-                pos_2d = nx.circular_layout(G)
-                pos = {node: [coords[0], 0, coords[1]] 
-                      for node, coords in pos_2d.items()}
-            elif layout_type == 'random':
-                pos = nx.random_layout(G, dim=3)
-            elif layout_type == 'sphere':
-                pos = nx.spring_layout(G, dim=3, iterations=50)
-            else:
-                pos = nx.spring_layout(G, dim=3)
+            node_ids = [node['id'] for node in graph_data['nodes']]
+            index = {node_id: i for i, node_id in enumerate(node_ids)}
+            edges, weights = self._edge_arrays(graph_data, index)
+            coords = self.compute_positions(
+                len(node_ids), edges, weights, layout_type, layout_params,
+                callback=callback, callback_every=callback_every,
+                node_ids=node_ids, base=base
+            )
+            pos = dict(zip(node_ids, coords))
             
             # Mettre à jour les positions dans le graph_data
             for node in graph_data['nodes']:
@@ -217,74 +267,735 @@ class GraphService:
         except Exception as e:
             raise ValueError(f"Erreur lors du calcul de layout: {str(e)}")
     
-    def save_graph(self, graph_id: str, graph_data: Dict[str, Any]):
-        """Sauvegarde un graphe en mémoire"""
-        self.graphs[graph_id] = graph_data
+    def compute_positions(self, n: int, edges: np.ndarray, weights: np.ndarray,
+                          layout_type: str = 'force',
+                          layout_params: Dict[str, Any] = None,
+                          callback: Callable[[float, np.ndarray], Optional[bool]] = None,
+                          callback_every: int = None,
+                          node_ids: List[Any] = None,
+                          base: StoredGraph = None) -> np.ndarray:
+        """
+        Positions brutes (n, 3) à partir des arêtes en tableaux d'indices
+        (voir compute_layout pour layout_params et callback)
+        Avec node_ids, le résultat passe par le cache de layouts (clé : hash
+        des nœuds, arêtes, type et paramètres) ; sans graine explicite, la
+        graine est dérivée de cette clé pour des positions reproductibles
+        Avec node_ids et base, layout incrémental à partir des positions de
+        base (hors cache)
+        """
+        if node_ids is not None and base is not None:
+            coords = self.incremental_positions(base, node_ids, edges, weights,
+                                                layout_params)
+            if coords is not None:
+                return coords
+        
+        if node_ids is None:
+            return self._run_layout(n, edges, weights, layout_type, layout_params,
+                                    callback, callback_every)
+        
+        layout_params = dict(layout_params or {})
+        key = layout_key(node_ids, edges, weights, layout_type, layout_params)
+        cached = layout_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        if layout_params.get('seed') is None:
+            layout_params['seed'] = seed_from_key(key)
+        
+        # Un layout interrompu par le callback n'est pas mis en cache
+        stopped = []
+        tracked = None
+        if callback is not None:
+            def tracked(fraction, coords):
+                result = callback(fraction, coords)
+                if result is False:
+                    stopped.append(fraction)
+                return result
+        
+        coords = self._run_layout(n, edges, weights, layout_type, layout_params,
+                                  tracked, callback_every)
+        if stopped:
+            return coords
+        return layout_cache.put(key, coords)
+    
+    def _run_layout(self, n: int, edges: np.ndarray, weights: np.ndarray,
+                    layout_type: str, layout_params: Dict[str, Any],
+                    callback: Callable[[float, np.ndarray], Optional[bool]],
+                    callback_every: Optional[int]) -> np.ndarray:
+        """Calcul effectif des positions (sans cache), chronométré par type"""
+        with metrics.span('layout', layout=layout_type):
+            return self._layout_positions(n, edges, weights, layout_type,
+                                          layout_params or {}, callback, callback_every)
+    
+    def _layout_positions(self, n, edges, weights, layout_type, layout_params,
+                          callback, callback_every) -> np.ndarray:
+        if layout_type in ('circular', 'random'):
+            return self._networkx_layout(n, layout_type, layout_params.get('seed'))
+        
+        if layout_type == 'multilevel':
+            # Grands graphes (100k+ nœuds) : contraction - layout - raffinement
+            return multilevel_layout(
+                n, edges, weights,
+                iterations=int(layout_params.get('iterations', 200)),
+                tol=float(layout_params.get('tol', 1e-4)),
+                seed=layout_params.get('seed'),
+                coarsest_size=int(layout_params.get('coarsest_size', 100)),
+                callback=callback
+            )
+        
+        iterations = int(layout_params.get(
+            'iterations', NATIVE_LAYOUT_ITERATIONS.get(layout_type, 50)
+        ))
+        progress = None
+        if callback is not None:
+            progress = lambda it, coords: callback(it / iterations, coords)
+        return force_layout(
+            n, edges, weights,
+            iterations=iterations,
+            tol=float(layout_params.get('tol', 1e-4)),
+            seed=layout_params.get('seed'),
+            callback=progress,
+            callback_every=callback_every or max(1, iterations // 20)
+        )
+    
+    def _networkx_layout(self, n: int, layout_type: str, seed: int = None) -> np.ndarray:
+        """Layouts géométriques simples délégués à NetworkX (ne dépendent pas des arêtes)"""
+        # Import au premier usage : networkx est long à charger au démarrage
+        import networkx as nx
+        
+        G = nx.empty_graph(n)
+        
+        if layout_type == 'circular':
+            pos_2d = nx.circular_layout(G)
+            return np.array([[pos_2d[i][0], 0, pos_2d[i][1]] for i in range(n)]).reshape(n, 3)
+        
+        pos_3d = nx.random_layout(G, dim=3, seed=seed)
+        return np.array([pos_3d[i] for i in range(n)]).reshape(n, 3)
+    
+    def layout_edge_table(self, table, layout_type: str = 'force',
+                          layout_params: Dict[str, Any] = None,
+                          callback: Callable[[float, np.ndarray], Optional[bool]] = None,
+                          base: StoredGraph = None) -> StoredGraph:
+        """
+        Calcule le layout d'un graphe issu de l'ingestion en flux (EdgeTable)
+        et retourne le graphe stocké correspondant
+        """
+        return self.layout_stored(StoredGraph.from_edge_table(table),
+                                  layout_type, layout_params, callback=callback,
+                                  base=base)
+    
+    def layout_stored(self, graph: StoredGraph, layout_type: str = 'force',
+                      layout_params: Dict[str, Any] = None,
+                      callback: Callable[[float, np.ndarray], Optional[bool]] = None,
+                      callback_every: int = None,
+                      base: StoredGraph = None) -> StoredGraph:
+        """Équivalent de compute_layout pour un graphe stocké (positions en place)"""
+        graph.set_positions(self._stored_positions(graph, layout_type, layout_params,
+                                                   callback, callback_every, base))
+        return graph
+
+    def _stored_positions(self, graph: StoredGraph, layout_type: str,
+                          layout_params: Optional[Dict[str, Any]], callback, callback_every,
+                          base: StoredGraph = None) -> np.ndarray:
+        """Positions à l'échelle d'affichage d'un graphe stocké, sans les écrire"""
+        try:
+            edges, weights = graph.layout_edges()
+            coords = self.compute_positions(
+                graph.node_count, edges, weights, layout_type, layout_params,
+                callback=callback, callback_every=callback_every,
+                node_ids=graph.ids[:graph.node_count], base=base
+            )
+            # Même échelle que compute_layout
+            return np.asarray(coords, dtype=np.float64) * 10
+        except Exception as e:
+            raise ValueError(f"Erreur lors du calcul de layout: {str(e)}")
+
+    def relayout_stored(self, graph_id: str, graph: StoredGraph, layout_type: str = 'force',
+                        layout_params: Dict[str, Any] = None,
+                        callback: Callable[[float, np.ndarray], Optional[bool]] = None,
+                        callback_every: int = None) -> Dict[str, Any]:
+        """
+        Recalcule le layout d'un graphe déjà enregistré : nouvelle version
+        (réécrite aussitôt dans le catalogue partagé, ETag et réponses en
+        cache renouvelés). Le journal des opérations repart de cette
+        version : un client ou un processus plus ancien recharge le graphe.
+        Si le graphe a été libéré (LRU) pendant le calcul, les positions
+        sont écrites dans l'exemplaire rouvert, s'il a les mêmes nœuds.
+        Retourne {'version': version courante, 'positions': positions écrites}
+        """
+        node_ids = list(graph.ids[:graph.node_count])
+        # Positions écrites à la fin : le graphe reste lisible et
+        # modifiable pendant le calcul
+        positions = self._stored_positions(graph, layout_type, layout_params,
+                                           callback, callback_every)
+        for _ in range(2):
+            with self._store_lock, self._ops_lock:
+                if self.graphs.get(graph_id) is graph:
+                    written = False
+                    try:
+                        with self._writing() as db:
+                            current = db is None or self._catch_up(graph_id, graph, db)
+                            if current:
+                                if list(graph.ids[:graph.node_count]) != node_ids:
+                                    raise ValueError("Graphe modifié pendant le calcul du layout")
+                                written = True
+                                graph.set_positions(positions)
+                                graph.version += 1
+                                if db is not None:
+                                    self.catalog.save(graph_id, graph, db, rewrite=True)
+                                    self._saved[graph_id] = graph.version
+                    except Exception:
+                        if written:
+                            # Positions écrites mais pas dans le catalogue : copie à relire
+                            self._close(graph_id)
+                        raise
+                    if current:
+                        self.op_logs[graph] = graph_ops.OpLog()
+                        response_cache.invalidate(graph_id)
+                        return {'version': graph.version, 'positions': graph.positions}
+                    self._close(graph_id)
+            # Graphe libéré pendant le calcul ou réécrit par un autre processus
+            graph = self.get_stored(graph_id)
+            if graph is None:
+                raise ValueError("Graphe supprimé pendant le calcul du layout")
+        raise ValueError("Graphe libéré pendant le calcul du layout")
+
+    def incremental_positions(self, base: StoredGraph, node_ids: List[Any],
+                              edges: np.ndarray, weights: np.ndarray,
+                              layout_params: Dict[str, Any] = None) -> Optional[np.ndarray]:
+        """
+        Positions brutes d'une nouvelle version d'un graphe à partir de
+        l'ancienne (réimport d'un jeu de données mis à jour)
+        layout_params: {
+            'mode': 'warm',   # 'fixed' : seuls les nouveaux nœuds bougent ;
+                              # 'warm' : voisinage des changements relâché
+            'hops': 1,        # rayon du voisinage relâché (mode warm)
+            'iterations': 50, 'tol': 1e-4, 'seed': 42
+        }
+        Un nœud est modifié s'il a gagné ou perdu une arête. Retourne None
+        si base ne partage aucun nœud positionné (layout complet à faire)
+        """
+        if base.positions is None or not node_ids:
+            return None
+        params = layout_params or {}
+        n = len(node_ids)
+        base_index = base.index
+        rows = np.fromiter((base_index.get(node_id, -1) for node_id in node_ids),
+                           dtype=np.int64, count=n)
+        placed = (rows >= 0) & (rows < base.node_count)
+        if not placed.any():
+            return None
+        
+        # Positions stockées à l'échelle d'affichage, layouts bruts dans [-1, 1]
+        pos = np.zeros((n, 3))
+        pos[placed] = base.positions[rows[placed]] / 10.0
+        
+        # Arêtes ajoutées ou retirées entre les deux versions (clés a * N + b)
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        base_edges = base.layout_edges()[0]
+        to_new = np.full(base.node_count, -1, dtype=np.int64)
+        to_new[rows[placed]] = np.flatnonzero(placed)
+        old_edges = to_new[base_edges]
+        old_edges = np.sort(old_edges[(old_edges >= 0).all(axis=1)], axis=1)
+        new_keys = edges.min(axis=1) * n + edges.max(axis=1)
+        old_keys = old_edges[:, 0] * n + old_edges[:, 1]
+        
+        changed = np.zeros(n, dtype=bool)
+        changed[edges[~np.isin(new_keys, old_keys)].ravel()] = True
+        changed[old_edges[~np.isin(old_keys, new_keys)].ravel()] = True
+        
+        return incremental_layout(
+            n, edges, weights, pos, placed, changed,
+            mode=params.get('mode', 'warm'),
+            hops=int(params.get('hops', 1)),
+            iterations=int(params.get('iterations', INCREMENTAL_ITERATIONS)),
+            tol=float(params.get('tol', 1e-4)),
+            seed=params.get('seed')
+        )
+    
+    def append_to_graph(self, graph_id: str, graph: StoredGraph, nodes: List[Dict[str, Any]],
+                        edges: List[Dict[str, Any]],
+                        layout_params: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Ajoute des nœuds et des arêtes à un graphe stocké avec layout
+        incrémental (layout_params : voir incremental_positions)
+        Les nœuds déjà présents sont ignorés, les extrémités inconnues des
+        arêtes deviennent des nœuds. Un seul lot d'opérations versionné :
+        add_node (positionnés), add_edge, puis move_node des nœuds existants
+        relâchés. Retourne {'version', 'ops'} comme apply_ops
+        """
+        if not isinstance(nodes, list) or not isinstance(edges, list):
+            raise ValueError("nodes et edges: listes attendues")
+        params = layout_params or {}
+        n0 = graph.node_count
+        index = graph.index
+        
+        def existing(node_id):
+            row = index.get(node_id)
+            return row is not None and row < n0
+        
+        added = {}  # id -> op add_node
+        for node in nodes:
+            if not isinstance(node, dict) or 'id' not in node:
+                raise ValueError("Nœud sans id")
+            if not existing(node['id']) and node['id'] not in added:
+                added[node['id']] = {'op': 'add_node', **node}
+        edge_ops = []
+        for edge in edges:
+            if not isinstance(edge, dict) or 'source' not in edge or 'target' not in edge:
+                raise ValueError("Arête sans source ou target")
+            for node_id in (edge['source'], edge['target']):
+                if not existing(node_id) and node_id not in added:
+                    added[node_id] = {'op': 'add_node', 'id': node_id}
+            edge_ops.append({'op': 'add_edge', 'source': edge['source'],
+                             'target': edge['target'],
+                             'properties': edge.get('properties') or {}})
+        
+        node_ops = list(added.values())
+        move_ops = []
+        if graph.positions is not None and node_ops and n0 > 0:
+            # Graphe étendu : nœuds existants (0..n0-1) puis nœuds ajoutés
+            row_of = {node_id: n0 + i for i, node_id in enumerate(added)}
+            n = n0 + len(node_ops)
+            pairs, weights = [], []
+            for op in edge_ops:
+                source = row_of.get(op['source'], index.get(op['source']))
+                target = row_of.get(op['target'], index.get(op['target']))
+                if source != target:
+                    pairs.append((source, target))
+                    weights.append(_edge_weight(op['properties']))
+            base_edges, base_weights = graph.layout_edges()
+            new_edges = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+            
+            pos = np.zeros((n, 3))
+            pos[:n0] = graph.positions
+            placed = np.zeros(n, dtype=bool)
+            placed[:n0] = True
+            for i, op in enumerate(node_ops):
+                if op.get('position') is not None:
+                    pos[n0 + i] = graph_ops.normalize(op)['position']
+                    placed[n0 + i] = True
+            changed = np.zeros(n, dtype=bool)
+            changed[new_edges.ravel()] = True
+            
+            coords = incremental_layout(
+                n, np.concatenate([base_edges, new_edges]),
+                np.concatenate([base_weights, weights]), pos, placed, changed,
+                mode=params.get('mode', 'warm'),
+                hops=int(params.get('hops', 1)),
+                iterations=int(params.get('iterations', INCREMENTAL_ITERATIONS)),
+                tol=float(params.get('tol', 1e-4)),
+                seed=params.get('seed')
+            )
+            for i, op in enumerate(node_ops):
+                op['position'] = coords[n0 + i].tolist()
+            moved = np.flatnonzero((coords[:n0] != pos[:n0]).any(axis=1))
+            move_ops = [{'op': 'move_node', 'id': graph.ids[row],
+                         'position': coords[row].tolist()} for row in moved]
+        
+        return self.apply_ops(graph_id, graph, node_ops + edge_ops + move_ops)
+    
+    @metrics.timed('edge_arrays')
+    def _edge_arrays(self, graph_data: Dict[str, Any], 
+                     index: Dict[str, int]):
+        """
+        Convertit les arêtes en tableau (m, 2) d'indices de nœuds et en poids
+        Les arêtes en double sont fusionnées (comme dans un nx.Graph), les
+        arêtes vers des nœuds inconnus ignorées
+        """
+        pairs = []
+        weights = []
+        for edge in graph_data['edges']:
+            source = index.get(edge['source'])
+            target = index.get(edge['target'])
+            if source is None or target is None or source == target:
+                continue
+            pairs.append((min(source, target), max(source, target)))
+            weights.append(_edge_weight(edge.get('properties', {})))
+        
+        if not pairs:
+            return np.zeros((0, 2), dtype=np.int64), np.zeros(0)
+        
+        edges, first = np.unique(np.array(pairs, dtype=np.int64), 
+                                 axis=0, return_index=True)
+        return edges, np.array(weights, dtype=np.float64)[first]
+    
+    # === STOCKAGE (MÉMOIRE + CATALOGUE PERSISTANT) ===
+    
+    def save_graph(self, graph_id: str, 
+                   graph_data: Union[Dict[str, Any], StoredGraph]):
+        """
+        Sauvegarde un graphe (converti en colonnes), écrit sur disque si
+        persistant ; ses métriques, son aperçu et ses niveaux de détail sont
+        calculés en arrière-plan
+        """
+        with metrics.span('store'):
+            if not isinstance(graph_data, StoredGraph):
+                graph_data = StoredGraph.from_graph_data(graph_data)
+            # Nouveau contenu : remplace le graphe et son journal dans le catalogue
+            graph_data.generation = time.time_ns()
+            if self.catalog.enabled:
+                self.catalog.save(graph_id, graph_data)
+            with self._store_lock:
+                self._open(graph_id, graph_data)
+        response_cache.invalidate(graph_id)
+        metrics.observe('graph_nodes', graph_data.node_count)
+        metrics.observe('graph_edges', graph_data.edge_count)
+        analytics_service.schedule(graph_data)
+        sampling_service.schedule(graph_data)
+        lod_service.schedule(graph_data)
         return graph_id
     
-    def get_graph(self, graph_id: str) -> Dict[str, Any]:
-        """Récupère un graphe sauvegardé"""
-        return self.graphs.get(graph_id)
+    def get_graph(self, graph_id: str) -> Optional[Dict[str, Any]]:
+        """Récupère un graphe sauvegardé (dicts nodes/edges produits à la demande)"""
+        graph = self.get_stored(graph_id)
+        return graph.to_dict() if graph is not None else None
+    
+    def get_stored(self, graph_id: str) -> Optional[StoredGraph]:
+        """
+        Récupère la représentation stockée d'un graphe, ouverte depuis le
+        disque si besoin. Avec persistance, la copie ouverte rattrape
+        d'abord les opérations journalisées par les autres processus ; elle
+        est rouverte si le graphe a été remplacé, réécrit au-delà de sa
+        version ou supprimé entre-temps
+        """
+        with self._store_lock:
+            graph = self.graphs.get(graph_id)
+            if not self.catalog.enabled:
+                return graph
+            if graph is not None:
+                self.graphs.move_to_end(graph_id)
+        
+        if graph is not None:
+            with self._ops_lock:
+                if self._catch_up(graph_id, graph):
+                    return graph
+            with self._store_lock:
+                if self.graphs.get(graph_id) is graph:
+                    self._close(graph_id)
+        
+        loaded = self.catalog.load(graph_id)
+        if loaded is None:
+            return None
+        with self._store_lock:
+            # Ouvert entre-temps par une autre requête : garder cette copie
+            if graph_id in self.graphs:
+                return self.graphs[graph_id]
+            self._open(graph_id, *loaded)
+            return loaded[0]
+    
+    def delete_graph(self, graph_id: str) -> bool:
+        """Supprime un graphe sauvegardé (mémoire et disque)"""
+        with self._store_lock:
+            deleted = self._close(graph_id)
+        if self.catalog.enabled:
+            deleted = self.catalog.delete(graph_id) or deleted
+        response_cache.invalidate(graph_id)
+        state_store.delete_graph(graph_id)
+        return deleted
     
     def list_graphs(self) -> List[Dict[str, Any]]:
-        """Liste tous les graphes sauvegardés"""
-        return [
-            {
-                'id': graph_id,
-                'metadata': graph_data.get('metadata', {})
+        """Liste tous les graphes sauvegardés (ouverts ou seulement sur disque)"""
+        graphs = {entry['id']: entry for entry in
+                  (self.catalog.list() if self.catalog.enabled else [])}
+        with self._store_lock:
+            for graph_id, graph in self.graphs.items():
+                graphs[graph_id] = {'id': graph_id, 'metadata': graph.metadata}
+        return list(graphs.values())
+    
+    def flush(self):
+        """Écrit sur disque les graphes modifiés depuis leur dernière sauvegarde"""
+        if not self.catalog.enabled:
+            return
+        with self._store_lock:
+            dirty = [graph_id for graph_id in self.graphs if self._is_dirty(graph_id)]
+        for graph_id in dirty:
+            self._persist(graph_id)
+    
+    def store_stats(self) -> Dict[str, Any]:
+        """Graphes ouverts, mémoire estimée et évictions"""
+        with self._store_lock:
+            return {
+                'open': len(self.graphs),
+                'dirty': sum(1 for graph_id in self.graphs if self._is_dirty(graph_id)),
+                'bytes': sum(self._sizes.values()),
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions,
+                'persistent': self.catalog.enabled
             }
-            for graph_id, graph_data in self.graphs.items()
-        ]
     
-    def filter_graph(self, graph_data: Dict[str, Any], 
-                    filters: Dict[str, Any]) -> Dict[str, Any]:
+    def _open(self, graph_id: str, graph: StoredGraph, saved: int = None):
         """
-        Filtre le graphe selon des critères
-        filters: {
-            'node_property': {'key': 'value'},
-            'edge_property': {'key': 'value'},
-            'min_connections': int
+        Ajoute un graphe aux graphes ouverts puis libère les moins récents
+        saved : version écrite sur disque (par défaut celle du graphe)
+        """
+        self._close(graph_id)
+        if graph.states:
+            # États enregistrés dans le graphe par les versions précédentes
+            state_store.import_states(graph_id, graph, graph.states)
+            graph.states = {}
+        self.graphs[graph_id] = graph
+        self._sizes[graph_id] = graph.nbytes
+        self._saved[graph_id] = graph.version if saved is None else saved
+        
+        # Sans persistance, un graphe fermé serait perdu : pas d'éviction
+        if not self.catalog.enabled:
+            return
+        while sum(self._sizes.values()) > self.max_bytes and len(self.graphs) > 1:
+            evicted = next(iter(self.graphs))
+            if self._is_dirty(evicted):
+                self._persist(evicted)
+            self._close(evicted)
+            self.evictions += 1
+    
+    def _close(self, graph_id: str) -> bool:
+        self._sizes.pop(graph_id, None)
+        self._saved.pop(graph_id, None)
+        return self.graphs.pop(graph_id, None) is not None
+    
+    def _is_dirty(self, graph_id: str) -> bool:
+        return self.graphs[graph_id].version != self._saved.get(graph_id)
+    
+    def _persist(self, graph_id: str):
+        """
+        Réécrit un graphe ouvert (opérations suspendues pendant l'écriture)
+        et purge le journal du catalogue jusqu'à sa version ; sans effet si
+        un autre processus a remplacé le graphe ou écrit une version plus
+        récente
+        """
+        with self._store_lock, self._ops_lock:
+            graph = self.graphs.get(graph_id)
+            if graph is None:
+                return
+            if self.catalog.save(graph_id, graph, rewrite=True) is not None:
+                self._saved[graph_id] = graph.version
+            self._sizes[graph_id] = graph.nbytes
+    
+    def _writing(self):
+        """Transaction d'écriture du catalogue partagé (sans persistance : aucune)"""
+        return self.catalog.locked() if self.catalog.enabled else nullcontext()
+    
+    def _catch_up(self, graph_id: str, graph: StoredGraph, db=None) -> bool:
+        """
+        Rejoue sur une copie ouverte les opérations journalisées par les
+        autres processus (appelé sous _ops_lock). Retourne False si la copie
+        ne peut pas être rattrapée : graphe supprimé ou remplacé, ou réécrit
+        au-delà de sa version (layout recalculé, journal purgé)
+        """
+        head = self.catalog.head(graph_id, db)
+        if head is None or head['generation'] != graph.generation:
+            return False
+        if graph.version == head['version']:
+            return True
+        if not head['snapshot'] <= graph.version < head['version']:
+            return False
+        ops = self.catalog.ops_since(graph_id, graph.version, db)
+        if not ops or ops[0]['version'] != graph.version + 1:
+            return False
+        self._replay(graph, ops)
+        return True
+    
+    def _replay(self, graph: StoredGraph, ops: List[Dict[str, Any]]):
+        """Applique des opérations versionnées (journal local, index spatial, cache)"""
+        moved = graph_ops.replay(graph, ops)
+        log = self.op_logs.get(graph)
+        if log is None:
+            log = self.op_logs[graph] = graph_ops.OpLog()
+        for op in ops:
+            log.append(op)
+        if moved:
+            spatial_index.update(graph, np.unique(moved))
+        response_cache.invalidate(graph=graph)
+    
+    @metrics.timed('viewport')
+    def viewport_query(self, graph: StoredGraph, box: Dict[str, Any] = None,
+                       frustum: List[List[float]] = None,
+                       camera: List[float] = None, budget: int = 2000,
+                       offset: int = 0) -> Dict[str, Any]:
+        """
+        Nœuds et arêtes visibles dans une boîte ou un frustum, du plus proche
+        au plus lointain de la caméra, par pages de `budget` nœuds
+        box: {'min': [x, y, z], 'max': [x, y, z]}
+        frustum: 6 plans [a, b, c, d] (intérieur : a·x + b·y + c·z + d >= 0)
+        Une arête est renvoyée avec la page de celle de ses extrémités qui
+        arrive en dernier dans l'ordre de distance
+        """
+        if frustum is not None:
+            planes = np.asarray(frustum, dtype=np.float64)
+            if planes.ndim != 2 or planes.shape[1] != 4:
+                raise ValueError("frustum: liste de plans [a, b, c, d] attendue")
+        elif box is not None:
+            try:
+                low, high = np.asarray(box['min'], float), np.asarray(box['max'], float)
+            except (KeyError, TypeError, ValueError):
+                raise ValueError("box: {'min': [x, y, z], 'max': [x, y, z]} attendu")
+            if low.shape != (3,) or high.shape != (3,):
+                raise ValueError("box: {'min': [x, y, z], 'max': [x, y, z]} attendu")
+            planes = box_planes(low, high)
+            if camera is None:
+                camera = (low + high) / 2
+        else:
+            raise ValueError("box ou frustum requis")
+        
+        budget = max(0, int(budget))
+        offset = max(0, int(offset))
+        rows, total = spatial_index.query(graph, planes, camera, limit=offset + budget)
+        page = rows[offset:offset + budget]
+        
+        # Rang de chaque nœud renvoyé jusqu'ici (-1 : pas encore renvoyé)
+        rank = np.full(graph.node_count, -1, dtype=np.int64)
+        rank[rows] = np.arange(len(rows))
+        indptr, neighbors, edge_ids = graph.csr()
+        starts, ends = indptr[page], indptr[page + 1]
+        counts = ends - starts
+        slots = np.repeat(starts - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts) \
+            + np.arange(int(counts.sum()))
+        owner_rank = np.repeat(rank[page], counts)
+        neighbor_rank = rank[neighbors[slots]]
+        keep = (neighbor_rank >= 0) & (neighbor_rank < owner_rank)
+        edge_rows = np.unique(edge_ids[slots][keep])
+        
+        next_offset = offset + len(page)
+        return {
+            'nodes': graph.node_dicts(page),
+            'edges': graph.edge_dicts(edge_rows),
+            'total': total,
+            'offset': offset,
+            'next_offset': next_offset if next_offset < total else None
         }
+    
+    def update_positions(self, graph_id: str, graph: StoredGraph,
+                         positions: Dict[str, Dict[str, float]]) -> Dict[str, Any]:
+        """
+        Déplace des nœuds ({id: {x, y, z}}) : opérations move_node versionnées
+        Retourne {'version', 'ops'} comme apply_ops
+        """
+        if not isinstance(positions, dict):
+            raise ValueError("positions: objet {id: {x, y, z}} attendu")
+        return self.apply_ops(graph_id, graph, [
+            {'op': 'move_node', 'id': node_id, 'position': position}
+            for node_id, position in positions.items()
+        ])
+    
+    @metrics.timed('apply_ops')
+    def apply_ops(self, graph_id: str, graph: StoredGraph,
+                  ops: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
-        filtered_nodes = []
-        filtered_edges = []
+        Applique en place une liste d'opérations (voir services/graph_ops.py)
+        Toutes les opérations sont vérifiées avant la première modification.
+        Avec persistance, sous le verrou d'écriture du catalogue : la copie
+        rattrape d'abord les opérations des autres processus (vérification
+        sur l'état à jour), puis les opérations sont journalisées dans le
+        catalogue ; ValueError si la copie ne peut pas être rattrapée
+        Retourne {'version': version courante, 'ops': opérations versionnées}
+        """
+        if not isinstance(ops, list):
+            raise ValueError("ops: liste d'opérations attendue")
+        ops = [graph_ops.normalize(op) for op in ops]
         
-        # Filtrer les nœuds
-        for node in graph_data['nodes']:
-            if self._match_filters(node, filters.get('node_property', {})):
-                filtered_nodes.append(node)
+        applied = False
+        try:
+            with self._ops_lock, self._writing() as db:
+                if db is not None and not self._catch_up(graph_id, graph, db):
+                    raise ValueError("Graphe supprimé ou réécrit par un autre processus : "
+                                     "recharger le graphe")
+                graph_ops.check(graph, ops)
+                for i, op in enumerate(ops):
+                    op['version'] = graph.version + 1 + i
+                if db is not None:
+                    self.catalog.append_ops(db, graph_id, ops)
+                applied = True
+                self._replay(graph, ops)
+                version = graph.version
+        except Exception:
+            if applied:
+                # Copie modifiée mais journal annulé : à relire du catalogue
+                with self._store_lock:
+                    if self.graphs.get(graph_id) is graph:
+                        self._close(graph_id)
+            raise
         
-        # Ne garder que les IDs des nœuds filtrés
-        node_ids = {node['id'] for node in filtered_nodes}
+        if self.catalog.enabled and version - self._saved.get(graph_id, version) >= SNAPSHOT_OPS:
+            self._persist(graph_id)
+        return {'version': version, 'ops': ops}
+    
+    def ops_since(self, graph: StoredGraph, version: int) -> Dict[str, Any]:
+        """
+        Opérations postérieures à `version` pour resynchroniser un client
+        {'version', 'ops'} ; {'version', 'resync': True} si le journal ne
+        remonte pas assez loin (recharger le graphe complet)
+        """
+        try:
+            version = int(version)
+        except (TypeError, ValueError):
+            raise ValueError(f"Version invalide: {version}")
+        with self._ops_lock:
+            log = self.op_logs.get(graph) or graph_ops.OpLog()
+            ops = log.since(version, graph.version)
+            if ops is None:
+                return {'version': graph.version, 'resync': True}
+            return {'version': graph.version, 'ops': ops}
+    
+    def add_state(self, graph_id: str, data: Dict[str, Any], name: str = None,
+                  timestamp: Any = None, parent_id: str = None) -> Optional[Dict[str, Any]]:
+        """
+        Sauvegarde un état (caméra, nœuds visibles, filtres...) d'un graphe
+        dans le stockage des états (voir services/state_store.py)
+        """
+        graph = self.get_stored(graph_id)
+        if graph is None:
+            return None
+        if name is None:
+            name = f'État {state_store.count(graph_id) + 1}'
+        return state_store.save(graph_id, graph, data, name=name, timestamp=timestamp,
+                                parent_id=parent_id)
+    
+    def get_state(self, graph_id: str, state_id: str) -> Optional[Dict[str, Any]]:
+        """Récupère un état sauvegardé d'un graphe"""
+        graph = self.get_stored(graph_id)
+        if graph is None:
+            return None
+        return state_store.load(graph_id, state_id, graph)
+    
+    @metrics.timed('filter')
+    def filter_graph(self, graph_data: Union[Dict[str, Any], StoredGraph], 
+                    filters: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Filtre le graphe selon des critères (voir services/graph_query.py)
+        filters: {
+            'node_property': {'key': 'value', 'age': '>30'},
+            'edge_property': {'weight': {'$gte': 2, '$lt': 5}},
+            'min_connections': int,
+            'max_connections': int,
+            'metrics': {'pagerank': {'$gt': 0.001}, 'component': 0}
+        }
+        """
+        graph = graph_data
+        if not isinstance(graph, StoredGraph):
+            graph = StoredGraph.from_graph_data(graph_data)
         
-        # Filtrer les arêtes
-        for edge in graph_data['edges']:
-            if (edge['source'] in node_ids and 
-                edge['target'] in node_ids and
-                self._match_filters(edge, filters.get('edge_property', {}))):
-                filtered_edges.append(edge)
+        node_mask, edge_mask = filter_engine.filter(graph, filters)
         
         return {
-            'nodes': filtered_nodes,
-            'edges': filtered_edges,
+            'nodes': graph.node_dicts(np.flatnonzero(node_mask)),
+            'edges': graph.edge_dicts(np.flatnonzero(edge_mask)),
             'metadata': {
-                **graph_data.get('metadata', {}),
+                **graph.metadata,
                 'filtered': True,
-                'original_node_count': len(graph_data['nodes']),
-                'original_edge_count': len(graph_data['edges'])
+                'original_node_count': graph.node_count,
+                'original_edge_count': graph.edge_count
             }
         }
-    
-    def _match_filters(self, item: Dict[str, Any], filters: Dict[str, Any]) -> bool:
-        """Vérifie si un item correspond aux filtres"""
-        if not filters:
-            return True
-        
-        properties = item.get('properties', {})
-        for key, value in filters.items():
-            if properties.get(key) != value:
-                return False
-        return True
+
+def _edge_weight(properties: Dict[str, Any]) -> float:
+    """Poids d'attraction d'une arête (propriété 'weight' si numérique)"""
+    try:
+        weight = float(properties.get('weight', 1))
+    except (TypeError, ValueError):
+        return 1.0
+    return weight if np.isfinite(weight) and weight > 0 else 1.0
 
 # Instance globale du service
 graph_service = GraphService()
+# Graphes modifiés écrits sur disque à l'arrêt du processus
+atexit.register(graph_service.flush)
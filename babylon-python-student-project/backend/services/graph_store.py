@@ -0,0 +1,435 @@
+"""
+Représentation compacte en colonnes des graphes stockés
+
+Un graphe stocké ne conserve pas de dict par nœud ou par arête :
+- identifiants internés : une table `ids` ; les `node_count` premières
+  entrées sont les nœuds, les suivantes les extrémités d'arêtes qui ne
+  correspondent à aucun nœud (conservées telles quelles, comme avant)
+- arêtes : deux tableaux int32 source / cible (indices dans `ids`)
+- adjacence CSR construite à la demande
+- positions : tableau float32 (n, 3) à l'échelle d'affichage
+- propriétés des nœuds et des arêtes : colonnes typées (services/columns.py)
+Les dicts nodes/edges de l'API sont produits à la demande par to_dict().
+"""
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional
+
+from services.columns import Column, ColumnBuilder, build_columns
+
+
+class StoredGraph:
+    """Graphe stocké en tableaux et colonnes typées"""
+
+    def __init__(self, ids: List[Any], node_count: int, src: np.ndarray, dst: np.ndarray,
+                 labels: Optional[Column] = None,
+                 node_columns: Dict[str, Column] = None,
+                 edge_columns: Dict[str, Column] = None,
+                 positions: Optional[np.ndarray] = None,
+                 metadata: Dict[str, Any] = None,
+                 extra: Dict[str, Any] = None):
+        self.ids = ids
+        self.node_count = node_count
+        self.src = src
+        self.dst = dst
+        self.labels = labels  # None : le label de chaque nœud est son id
+        self.node_columns = node_columns or {}
+        self.edge_columns = edge_columns or {}
+        self.positions = positions
+        self.metadata = metadata or {}
+        self.states = {}  # états des versions précédentes, repris par services/state_store.py
+        self.extra = extra or {}  # autres clés de premier niveau du graph_data
+        self.version = 0   # version des opérations appliquées (services/graph_ops.py)
+        self.revision = 0  # incrémentée à chaque changement de structure ou de propriété
+        self.layout_revision = 0  # incrémentée à chaque écriture des positions
+        self.generation = None  # contenu enregistré par save_graph (conservé par les réécritures)
+        self._index = None
+        self._csr = None
+
+    def __getstate__(self):
+        # Index et CSR sont reconstruits à la demande (transfert entre processus)
+        state = self.__dict__.copy()
+        state['_index'] = None
+        state['_csr'] = None
+        return state
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.src)
+
+    # === CONSTRUCTION ===
+
+    @classmethod
+    def from_graph_data(cls, graph_data: Dict[str, Any]) -> 'StoredGraph':
+        """Convertit la représentation nodes/edges (dicts) en colonnes"""
+        nodes = graph_data.get('nodes', [])
+        edges = graph_data.get('edges', [])
+
+        ids = [node['id'] for node in nodes]
+        index = {}
+        for i, node_id in enumerate(ids):
+            index.setdefault(node_id, i)
+
+        def intern(node_id):
+            i = index.get(node_id)
+            if i is None:
+                i = index[node_id] = len(ids)
+                ids.append(node_id)
+            return i
+
+        src = np.fromiter((intern(edge['source']) for edge in edges),
+                          dtype=np.int32, count=len(edges))
+        dst = np.fromiter((intern(edge['target']) for edge in edges),
+                          dtype=np.int32, count=len(edges))
+
+        labels = None
+        if any(node.get('label') != node['id'] for node in nodes):
+            builder = ColumnBuilder('label')
+            for node in nodes:
+                builder.append(node.get('label'))
+            labels = builder.finish(len(nodes))
+
+        positions = None
+        if nodes and all('position' in node for node in nodes):
+            positions = np.array([
+                (node['position'].get('x', 0), node['position'].get('y', 0),
+                 node['position'].get('z', 0))
+                for node in nodes
+            ], dtype=np.float32)
+
+        graph = cls(
+            ids, len(nodes), src, dst, labels,
+            build_columns([node.get('properties', {}) for node in nodes]),
+            build_columns([edge.get('properties', {}) for edge in edges]),
+            positions,
+            dict(graph_data.get('metadata', {})),
+            {k: v for k, v in graph_data.items()
+             if k not in ('nodes', 'edges', 'metadata', 'states', 'version')}
+        )
+        graph.states = dict(graph_data.get('states', {}))
+        graph._index = index
+        return graph
+
+    @classmethod
+    def from_edge_table(cls, table) -> 'StoredGraph':
+        """Graphe issu de l'ingestion CSV en flux (EdgeTable) ; aucune copie"""
+        return cls(
+            table.node_ids, table.node_count, table.src, table.dst,
+            edge_columns=table.edge_columns,
+            metadata={
+                'node_count': table.node_count,
+                'edge_count': table.edge_count,
+                'format': table.format
+            }
+        )
+
+    # === ACCÈS ===
+
+    @property
+    def index(self) -> Dict[Any, int]:
+        """id -> indice dans `ids` (première occurrence), construit à la demande"""
+        if self._index is None:
+            index = {}
+            for i, node_id in enumerate(self.ids):
+                index.setdefault(node_id, i)
+            self._index = index
+        return self._index
+
+    def csr(self):
+        """
+        Adjacence non orientée au format CSR : (indptr, voisins, arêtes)
+        voisins[indptr[i]:indptr[i + 1]] sont les voisins du nœud i et
+        arêtes[...] les indices des arêtes correspondantes ; les arêtes vers
+        des extrémités qui ne sont pas des nœuds sont ignorées
+        """
+        if self._csr is None:
+            n = self.node_count
+            valid = np.flatnonzero((self.src < n) & (self.dst < n)).astype(np.int32)
+            heads = np.concatenate([self.src[valid], self.dst[valid]])
+            tails = np.concatenate([self.dst[valid], self.src[valid]])
+            edge_ids = np.concatenate([valid, valid])
+
+            order = np.argsort(heads, kind='stable')
+            indptr = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(np.bincount(heads, minlength=n), out=indptr[1:])
+            self._csr = (indptr, tails[order].astype(np.int32),
+                         edge_ids[order].astype(np.int32))
+        return self._csr
+
+    def degrees(self) -> np.ndarray:
+        """Nombre de connexions de chaque nœud"""
+        indptr = self.csr()[0]
+        return np.diff(indptr)
+
+    def layout_edges(self):
+        """
+        Arêtes distinctes (m, 2) triées (min, max) et poids d'attraction pour
+        le moteur de layout (boucles et extrémités inconnues ignorées)
+        """
+        return canonical_edges(self.src, self.dst, self.node_count,
+                               self.edge_columns.get('weight'))
+
+    def set_positions(self, positions: np.ndarray):
+        """Positions à l'échelle d'affichage (n, 3)"""
+        self.positions = np.ascontiguousarray(positions, dtype=np.float32)
+        self.layout_revision += 1
+
+    @property
+    def nbytes(self) -> int:
+        """Estimation de la mémoire occupée (hors index et CSR)"""
+        size = self.src.nbytes + self.dst.nbytes
+        size += sum(len(str(node_id)) + 57 for node_id in self.ids)
+        if self.positions is not None:
+            size += self.positions.nbytes
+        if self.labels is not None:
+            size += self.labels.nbytes
+        for column in list(self.node_columns.values()) + list(self.edge_columns.values()):
+            size += column.nbytes
+        return size
+
+    # === MUTATIONS ===
+    # Les tableaux et colonnes modifiés sont remplacés (copie) plutôt que
+    # modifiés en place : les index construits sur l'ancienne version
+    # (filtres, octree, tables binaires) détectent le changement. Seul le
+    # déplacement d'un nœud écrit directement dans `positions`.
+
+    def _changed(self, edges: bool = False, nodes: bool = False):
+        """
+        Graphe modifié : les caches comparant `revision` se reconstruisent ;
+        CSR invalidée si les arêtes changent, index des ids si les nœuds changent
+        """
+        self.revision += 1
+        if edges or nodes:
+            self._csr = None
+        if nodes:
+            self._index = None
+
+    def _remap(self, remap: np.ndarray, ids: List[Any]):
+        """Renumérote les extrémités des arêtes (ancien indice -> nouveau)"""
+        self.ids = ids
+        self.src = remap[self.src].astype(np.int32)
+        self.dst = remap[self.dst].astype(np.int32)
+
+    def add_node(self, node_id: Any, label: Any = None,
+                 properties: Dict[str, Any] = None, position: Any = None):
+        """Ajoute un nœud (une extrémité d'arête sans nœud devient un nœud)"""
+        n = self.node_count
+        remap = np.arange(len(self.ids), dtype=np.int64)
+        existing = self.index.get(node_id)
+        ids = list(self.ids)
+        if existing is None:
+            remap[n:] += 1
+            ids.insert(n, node_id)
+        else:
+            # Extrémité sans nœud déplacée juste après les nœuds
+            remap[n:existing] += 1
+            remap[existing] = n
+            ids.insert(n, ids.pop(existing))
+        self._remap(remap, ids)
+
+        if self.labels is not None or (label is not None and label != node_id):
+            labels = self.labels if self.labels is not None else \
+                Column('label', 'object', list(self.ids[:n]))
+            self.labels = labels.extend([label if label is not None else node_id])
+
+        properties = properties or {}
+        for name in set(self.node_columns) | set(properties):
+            column = self.node_columns.get(name)
+            if column is None:
+                column = Column(name, 'object', [None] * n, mask=np.zeros(n, dtype=bool))
+            self.node_columns[name] = column.extend([properties.get(name)])
+
+        if self.positions is not None:
+            row = np.asarray(position if position is not None else (0, 0, 0),
+                             dtype=np.float32).reshape(1, 3)
+            self.positions = np.concatenate([self.positions, row])
+        self.node_count = n + 1
+        self._changed(nodes=True)
+
+    def remove_node(self, row: int):
+        """Supprime un nœud et ses arêtes"""
+        self.remove_edges(np.flatnonzero((self.src == row) | (self.dst == row)))
+        kept = np.delete(np.arange(self.node_count), row)
+        remap = np.arange(len(self.ids), dtype=np.int64)
+        remap[row + 1:] -= 1
+        ids = list(self.ids)
+        del ids[row]
+        self._remap(remap, ids)
+
+        if self.labels is not None:
+            self.labels = self.labels.take(kept)
+        self.node_columns = {name: column.take(kept)
+                             for name, column in self.node_columns.items()}
+        if self.positions is not None:
+            self.positions = self.positions[kept]
+        self.node_count -= 1
+        self._changed(nodes=True)
+
+    def move_node(self, row: int, position: Any):
+        """Déplace un nœud (écriture en place dans `positions`)"""
+        self.positions[row] = position
+        self.layout_revision += 1
+
+    def set_node_properties(self, row: int, properties: Dict[str, Any]):
+        """Modifie des propriétés d'un nœud (None : supprime la propriété)"""
+        self.node_columns = _assign(self.node_columns, self.node_count, row, properties)
+        self._changed()
+
+    def set_label(self, row: int, label: Any):
+        """Modifie le label d'un nœud"""
+        labels = self.labels if self.labels is not None else \
+            Column('label', 'object', list(self.ids[:self.node_count]))
+        self.labels = labels.assign([row], label)
+        self._changed()
+
+    def add_edge(self, source: Any, target: Any, properties: Dict[str, Any] = None):
+        """Ajoute une arête (extrémités inconnues conservées comme identifiants)"""
+        ends = []
+        for node_id in (source, target):
+            i = self.index.get(node_id)
+            if i is None:
+                i = len(self.ids)
+                self.ids = self.ids + [node_id]
+                self._index[node_id] = i
+            ends.append(i)
+        m = self.edge_count
+        self.src = np.append(self.src, np.int32(ends[0]))
+        self.dst = np.append(self.dst, np.int32(ends[1]))
+
+        properties = properties or {}
+        for name in set(self.edge_columns) | set(properties):
+            column = self.edge_columns.get(name)
+            if column is None:
+                column = Column(name, 'object', [None] * m, mask=np.zeros(m, dtype=bool))
+            self.edge_columns[name] = column.extend([properties.get(name)])
+        self._changed(edges=True)
+
+    def remove_edges(self, rows: np.ndarray):
+        """Supprime des arêtes"""
+        if len(rows) == 0:
+            return
+        kept = np.delete(np.arange(self.edge_count), rows)
+        self.src = self.src[kept]
+        self.dst = self.dst[kept]
+        self.edge_columns = {name: column.take(kept)
+                             for name, column in self.edge_columns.items()}
+        self._changed(edges=True)
+
+    def set_edge_properties(self, rows: np.ndarray, properties: Dict[str, Any]):
+        """Modifie des propriétés d'arêtes (None : supprime la propriété)"""
+        self.edge_columns = _assign(self.edge_columns, self.edge_count, rows, properties)
+        self._changed()
+
+    def edge_rows(self, source: Any, target: Any) -> np.ndarray:
+        """Lignes des arêtes source -> target"""
+        s, t = self.index.get(source), self.index.get(target)
+        if s is None or t is None:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero((self.src == s) & (self.dst == t))
+
+    # === REPRÉSENTATION API ===
+
+    def node_dicts(self, rows: Iterable[int] = None) -> List[Dict[str, Any]]:
+        """Dicts nœuds {id, label, properties, position} des lignes demandées"""
+        rows = np.arange(self.node_count) if rows is None else np.asarray(rows, dtype=np.int64)
+        ids = self.ids
+        labels = self.labels.take(rows).to_list() if self.labels is not None else None
+        columns = [(name, column.take(rows).to_list())
+                   for name, column in self.node_columns.items()]
+        positions = self.positions[rows].tolist() if self.positions is not None else None
+
+        nodes = []
+        for k, i in enumerate(rows.tolist()):
+            node = {
+                'id': ids[i],
+                'label': labels[k] if labels is not None else ids[i],
+                'properties': {name: values[k] for name, values in columns
+                               if values[k] is not None}
+            }
+            if positions is not None:
+                x, y, z = positions[k]
+                node['position'] = {'x': x, 'y': y, 'z': z}
+            nodes.append(node)
+        return nodes
+
+    def edge_dicts(self, rows: Iterable[int] = None) -> List[Dict[str, Any]]:
+        """Dicts arêtes {source, target, properties} des lignes demandées"""
+        rows = np.arange(self.edge_count) if rows is None else np.asarray(rows, dtype=np.int64)
+        ids = self.ids
+        columns = [(name, column.take(rows).to_list())
+                   for name, column in self.edge_columns.items()]
+
+        edges = []
+        for k, (source, target) in enumerate(zip(self.src[rows].tolist(),
+                                                 self.dst[rows].tolist())):
+            edges.append({
+                'source': ids[source],
+                'target': ids[target],
+                'properties': {name: values[k] for name, values in columns
+                               if values[k] is not None}
+            })
+        return edges
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Représentation nodes/edges complète (réponse de GET /graph/<id>)"""
+        graph_data = dict(self.extra)
+        graph_data.update({
+            'nodes': self.node_dicts(),
+            'edges': self.edge_dicts(),
+            'metadata': dict(self.metadata),
+            'version': self.version
+        })
+        return graph_data
+
+
+def canonical_edges(src: np.ndarray, dst: np.ndarray, node_count: int,
+                    weight_column: Optional[Column] = None):
+    """
+    Arêtes distinctes (min, max) et poids (propriété 'weight' si numérique
+    et positive, 1 sinon ; première occurrence en cas de doublon)
+    """
+    src = src.astype(np.int64)
+    dst = dst.astype(np.int64)
+    weights = edge_weights(weight_column, len(src))
+
+    keep = (src != dst) & (src < node_count) & (dst < node_count)
+    if not keep.any():
+        return np.zeros((0, 2), dtype=np.int64), np.zeros(0)
+
+    pairs = np.stack([np.minimum(src, dst), np.maximum(src, dst)], axis=1)[keep]
+    edges, first = np.unique(pairs, axis=0, return_index=True)
+    return edges, weights[keep][first]
+
+
+def edge_weights(weight_column: Optional[Column], count: int) -> np.ndarray:
+    """Poids de chaque arête : propriété 'weight' si numérique et positive, 1 sinon"""
+    if weight_column is None:
+        return np.ones(count)
+    if weight_column.is_numeric:
+        weights = weight_column.values.astype(np.float64)
+        if weight_column.mask is not None:
+            weights = np.where(weight_column.mask, weights, 1.0)
+    else:
+        weights = np.array([_as_weight(w) for w in weight_column.to_list()])
+    weights[~np.isfinite(weights) | (weights <= 0)] = 1.0
+    return weights
+
+
+def _assign(columns: Dict[str, Column], length: int, rows,
+            properties: Dict[str, Any]) -> Dict[str, Column]:
+    """Colonnes avec les propriétés affectées aux lignes données"""
+    columns = dict(columns)
+    for name, value in properties.items():
+        column = columns.get(name)
+        if column is None:
+            if value is None:
+                continue
+            column = Column(name, 'object', [None] * length, mask=np.zeros(length, dtype=bool))
+        columns[name] = column.assign(np.atleast_1d(rows), value)
+    return columns
+
+
+def _as_weight(value: Any) -> float:
+    try:
+        return float(value if value is not None else 1)
+    except (TypeError, ValueError):
+        return 1.0
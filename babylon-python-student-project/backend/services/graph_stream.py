@@ -0,0 +1,116 @@
+"""
+Lecture paginée et en flux (NDJSON) des graphes stockés
+
+Les dicts nodes/edges ne sont produits que par tranches : la mémoire
+utilisée par une réponse ne dépend plus de la taille du graphe.
+
+Pagination : GET /graph/<id>/nodes?cursor=...&limit=... retourne une page et
+le curseur (opaque) de la suivante ; chaque page porte la version du graphe
+pour détecter une modification en cours de parcours (rattrapage par
+GET /graph/<id>/ops?since=N).
+
+Flux NDJSON (Accept: application/x-ndjson ou ?format=ndjson), une ligne JSON
+par tranche :
+    {"type": "graph", "graph_id", "version", "metadata", "node_count", "edge_count", ...}
+    {"type": "nodes", "offset": 0, "nodes": [...]}        (tranches successives)
+    {"type": "edges", "offset": 0, "edges": [...]}
+    {"type": "end", "version": N}
+"""
+import base64
+import binascii
+import json
+from typing import Any, Dict, Iterator
+
+import numpy as np
+
+from services.graph_store import StoredGraph
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+DEFAULT_PAGE_SIZE = 5000
+MAX_PAGE_SIZE = 100000
+
+# Éléments par ligne du flux NDJSON
+STREAM_CHUNK_SIZE = 5000
+
+KINDS = ('nodes', 'edges')
+
+
+def encode_cursor(kind: str, offset: int) -> str:
+    """Curseur opaque d'une position dans les nœuds ou les arêtes"""
+    return base64.urlsafe_b64encode(f'{kind}:{offset}'.encode('ascii')).decode('ascii')
+
+
+def decode_cursor(cursor: str, kind: str) -> int:
+    """Position encodée dans un curseur (ValueError si invalide)"""
+    try:
+        decoded = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('ascii')
+        cursor_kind, offset = decoded.split(':')
+        offset = int(offset)
+    except (ValueError, UnicodeError, binascii.Error):
+        raise ValueError(f"Curseur invalide: {cursor!r}")
+    if cursor_kind != kind or offset < 0:
+        raise ValueError(f"Curseur invalide pour {kind}: {cursor!r}")
+    return offset
+
+
+def page(graph: StoredGraph, kind: str, cursor: str = None,
+         limit: int = DEFAULT_PAGE_SIZE) -> Dict[str, Any]:
+    """
+    Page de nœuds ou d'arêtes à partir d'un curseur
+    {kind: [...], 'total', 'version', 'next_cursor' (None en fin de parcours)}
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Type inconnu: {kind}")
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError(f"limit invalide: {limit}")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit doit être compris entre 1 et {MAX_PAGE_SIZE}")
+
+    offset = decode_cursor(cursor, kind) if cursor else 0
+    total = graph.node_count if kind == 'nodes' else graph.edge_count
+    rows = np.arange(min(offset, total), min(offset + limit, total))
+    items = graph.node_dicts(rows) if kind == 'nodes' else graph.edge_dicts(rows)
+    stop = offset + len(rows)
+    return {
+        kind: items,
+        'total': total,
+        'version': graph.version,
+        'next_cursor': encode_cursor(kind, stop) if stop < total else None
+    }
+
+
+def iter_ndjson(graph: StoredGraph, graph_id: str = None,
+                chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Lignes NDJSON d'un graphe complet, produites tranche par tranche"""
+    header = dict(graph.extra)
+    header.update({
+        'type': 'graph',
+        'graph_id': graph_id,
+        'version': graph.version,
+        'metadata': dict(graph.metadata),
+        'node_count': graph.node_count,
+        'edge_count': graph.edge_count
+    })
+    yield _line(header)
+
+    for kind in KINDS:
+        offset = 0
+        while True:
+            # Bornes relues à chaque tranche : le graphe peut être modifié
+            # pendant l'envoi (la version de fin le signale)
+            total = graph.node_count if kind == 'nodes' else graph.edge_count
+            rows = np.arange(offset, min(offset + chunk_size, total))
+            if not len(rows):
+                break
+            items = graph.node_dicts(rows) if kind == 'nodes' else graph.edge_dicts(rows)
+            yield _line({'type': kind, 'offset': offset, kind: items})
+            offset += len(rows)
+
+    yield _line({'type': 'end', 'version': graph.version})
+
+
+def _line(record: Dict[str, Any]) -> bytes:
+    return json.dumps(record, separators=(',', ':'), default=str).encode('utf-8') + b'\n'
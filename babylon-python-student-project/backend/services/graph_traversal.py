@@ -0,0 +1,202 @@
+"""
+Parcours des graphes stockés sur l'adjacence CSR (StoredGraph.csr)
+
+La CSR est construite une fois par graphe (puis à chaque changement des
+arêtes) ; un parcours ne touche que les nœuds atteints :
+- voisinage à k sauts (réseau ego) en largeur, niveau par niveau, borné par
+  un budget de nœuds (le dernier niveau est tronqué au besoin)
+- plus court chemin (nombre de sauts) par parcours en largeur
+  bidirectionnel : à chaque étape, le front le plus petit est étendu
+Les tableaux de travail de taille n sont alloués à zéro (pages non
+touchées) : le coût dépend de la taille du voisinage exploré, pas du graphe.
+"""
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from services.graph_store import StoredGraph
+
+DEFAULT_HOPS = 1
+MAX_HOPS = 10
+
+DEFAULT_NODE_BUDGET = 1000
+MAX_NODE_BUDGET = 100000
+
+
+def node_row(graph: StoredGraph, node_id: Any) -> int:
+    """
+    Ligne d'un nœud ; les identifiants reçus en texte (URL) sont aussi
+    cherchés sous forme numérique. ValueError si le nœud est inconnu
+    """
+    row = graph.index.get(node_id)
+    if row is None and isinstance(node_id, str):
+        for cast in (int, float):
+            try:
+                row = graph.index.get(cast(node_id))
+            except ValueError:
+                continue
+            if row is not None:
+                break
+    if row is None or row >= graph.node_count:
+        raise ValueError(f"Nœud inconnu: {node_id!r}")
+    return row
+
+
+def _bounded_int(value: Any, name: str, default: int, low: int, high: int) -> int:
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} invalide: {value!r}")
+    if not low <= value <= high:
+        raise ValueError(f"{name} doit être compris entre {low} et {high}")
+    return value
+
+
+def _expand(indptr: np.ndarray, neighbors: np.ndarray, edge_ids: np.ndarray,
+            rows: np.ndarray):
+    """Entrées CSR (nœud, voisin, arête) de tous les voisins des nœuds demandés"""
+    lengths = indptr[rows + 1] - indptr[rows]
+    entries = np.repeat(indptr[rows] - np.cumsum(lengths) + lengths, lengths) \
+        + np.arange(int(lengths.sum()))
+    return np.repeat(rows, lengths), neighbors[entries], edge_ids[entries]
+
+
+def _first(values: np.ndarray, slot: np.ndarray) -> np.ndarray:
+    """Positions de la première occurrence de chaque valeur (sans tri)"""
+    positions = np.arange(len(values))
+    slot[values[::-1]] = positions[::-1]
+    return positions[slot[values] == positions]
+
+
+def neighborhood(graph: StoredGraph, node_id: Any, hops: Any = None,
+                 budget: Any = None) -> Dict[str, Any]:
+    """
+    Réseau ego d'un nœud : nœuds à au plus `hops` sauts (avec leur distance
+    'hops') et arêtes entre eux, au plus `budget` nœuds
+    {center, hops, nodes, edges, truncated}
+    """
+    hops = _bounded_int(hops, 'hops', DEFAULT_HOPS, 0, MAX_HOPS)
+    budget = _bounded_int(budget, 'budget', DEFAULT_NODE_BUDGET, 1, MAX_NODE_BUDGET)
+    center = node_row(graph, node_id)
+    indptr, neighbors, edge_ids = graph.csr()
+    n = graph.node_count
+
+    seen = np.zeros(n, dtype=bool)
+    slot = np.zeros(n, dtype=np.int64)
+    seen[center] = True
+    levels = [np.array([center], dtype=np.int64)]
+    count = 1
+    truncated = False
+    while len(levels) <= hops and count < budget:
+        _, found, _ = _expand(indptr, neighbors, edge_ids, levels[-1])
+        found = found[~seen[found]]
+        found = found[_first(found, slot)]
+        if not len(found):
+            break
+        if count + len(found) > budget:
+            found = found[:budget - count]
+            truncated = True
+        seen[found] = True
+        levels.append(found.astype(np.int64))
+        count += len(found)
+    if count >= budget and len(levels) <= hops and not truncated:
+        # Budget atteint exactement : tronqué s'il restait des voisins à ajouter
+        _, rest, _ = _expand(indptr, neighbors, edge_ids, levels[-1])
+        truncated = bool((~seen[rest]).any())
+
+    rows = np.concatenate(levels)
+    # Arêtes du sous-graphe induit, chacune une fois
+    _, other, edges = _expand(indptr, neighbors, edge_ids, rows)
+    edges = np.unique(edges[seen[other]])
+
+    nodes = graph.node_dicts(rows)
+    for depth, level in enumerate(levels):
+        start = sum(len(previous) for previous in levels[:depth])
+        for node in nodes[start:start + len(level)]:
+            node['hops'] = depth
+    return {
+        'center': graph.ids[center],
+        'hops': hops,
+        'nodes': nodes,
+        'edges': graph.edge_dicts(edges),
+        'truncated': truncated
+    }
+
+
+def shortest_path(graph: StoredGraph, source: Any, target: Any,
+                  max_hops: Any = None) -> Dict[str, Any]:
+    """
+    Plus court chemin (en sauts) entre deux nœuds par parcours en largeur
+    bidirectionnel ; {found, length, nodes, edges, visited} où nodes et
+    edges sont dans l'ordre du chemin (vides si aucun chemin en au plus
+    `max_hops` sauts)
+    """
+    n = graph.node_count
+    max_hops = _bounded_int(max_hops, 'max_hops', n, 0, max(n, 1))
+    start, goal = node_row(graph, source), node_row(graph, target)
+    indptr, neighbors, edge_ids = graph.csr()
+
+    # side : 0 non atteint, 1 depuis la source, 2 depuis la cible ;
+    # parent / parent_edge : prédécesseur vers l'extrémité de départ de chaque côté
+    side = np.zeros(n, dtype=np.int8)
+    parent = np.zeros(n, dtype=np.int64)
+    parent_edge = np.zeros(n, dtype=np.int64)
+    slot = np.zeros(n, dtype=np.int64)
+    side[start] = 1
+    side[goal] = 2
+    fronts = {1: np.array([start], dtype=np.int64), 2: np.array([goal], dtype=np.int64)}
+    visited = 2 if start != goal else 1
+    meeting = (start, start, -1) if start == goal else None
+    length = 0
+
+    while meeting is None and length < max_hops and len(fronts[1]) and len(fronts[2]):
+        # Étendre le front dont les voisins sont les moins nombreux
+        cost = {s: int((indptr[fronts[s] + 1] - indptr[fronts[s]]).sum()) for s in (1, 2)}
+        current = 1 if cost[1] <= cost[2] else 2
+        owner, found, edges = _expand(indptr, neighbors, edge_ids, fronts[current])
+        length += 1
+
+        contact = side[found] == 3 - current
+        if contact.any():
+            k = int(np.flatnonzero(contact)[0])
+            a, b = int(owner[k]), int(found[k])
+            meeting = (a, b, int(edges[k])) if current == 1 else (b, a, int(edges[k]))
+            break
+
+        new = side[found] == 0
+        owner, found, edges = owner[new], found[new], edges[new]
+        first = _first(found, slot)
+        owner, found, edges = owner[first], found[first], edges[first]
+        side[found] = current
+        parent[found] = owner
+        parent_edge[found] = edges
+        fronts[current] = found
+        visited += len(found)
+
+    if meeting is None:
+        return {'found': False, 'length': None, 'nodes': [], 'edges': [], 'visited': visited}
+
+    # meeting = (nœud côté source, nœud côté cible, arête qui les relie)
+    left, right, bridge = meeting
+    rows, path_edges = [left], []
+    while rows[-1] != start:
+        path_edges.append(int(parent_edge[rows[-1]]))
+        rows.append(int(parent[rows[-1]]))
+    rows.reverse()
+    path_edges.reverse()
+    if bridge >= 0:
+        path_edges.append(bridge)
+        rows.append(right)
+        while rows[-1] != goal:
+            path_edges.append(int(parent_edge[rows[-1]]))
+            rows.append(int(parent[rows[-1]]))
+
+    return {
+        'found': True,
+        'length': len(path_edges),
+        'nodes': graph.node_dicts(rows),
+        'edges': graph.edge_dicts(path_edges),
+        'visited': visited
+    }
@@ -0,0 +1,489 @@
+"""
+Ingestion en flux des fichiers de graphes
+
+Le fichier est lu par morceaux depuis le flux de la requête (corps brut
+ou fichier multipart) sans jamais être chargé entier en mémoire :
+- identifiants de nœuds internés (une seule copie par nœud, index entier)
+- arêtes stockées en deux tableaux int32 source / cible
+- autres colonnes stockées en colonnes typées (voir services/columns.py)
+La mémoire occupée est estimée au fil de l'eau et bornée par `max_bytes`.
+
+CSV : lu ligne par ligne (parse_csv_stream -> EdgeTable).
+JSON : les tableaux nodes / vertices et edges / links sont parcourus
+élément par élément (un seul nœud ou une seule arête décodé à la fois) et
+normalisés comme dans graph_service.parse_json_to_graph, directement en
+colonnes (parse_json_stream -> StoredGraph). Un JSON déjà décodé (corps
+de requête) passe par le même chemin sans être réencodé (parse_json_data).
+"""
+import csv
+import io
+import json
+import os
+import re
+from array import array
+import numpy as np
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, TextIO
+
+from services.columns import Column, ColumnBuilder
+from services.graph_store import StoredGraph
+from services.metrics import metrics
+
+# Plafond mémoire par défaut d'un import en flux
+DEFAULT_MAX_BYTES = int(os.environ.get('IMPORT_MAX_MEMORY_MB', 2048)) * 1024 * 1024
+
+# Fréquence (en lignes) de la vérification du plafond mémoire
+MEMORY_CHECK_ROWS = 65536
+
+# Surcoût estimé d'un identifiant interné (objet str + entrée de dict + liste)
+_NODE_ID_OVERHEAD = 49 + 100 + 8
+
+# Taille (en caractères) des morceaux lus dans un flux JSON
+JSON_CHUNK_CHARS = 1 << 20
+
+
+class EdgeTable:
+    """Graphe en colonnes produit par l'ingestion en flux"""
+
+    def __init__(self, node_ids: List[str], src: np.ndarray, dst: np.ndarray,
+                 edge_columns: Dict[str, Column], source_format: str):
+        self.node_ids = node_ids
+        self.src = src
+        self.dst = dst
+        self.edge_columns = edge_columns
+        self.format = source_format
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.src)
+
+    def to_graph_data(self, positions: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """Représentation nodes/edges habituelle (même format que parse_csv_to_graph)"""
+        nodes = []
+        for i, node_id in enumerate(self.node_ids):
+            node = {'id': node_id, 'label': node_id, 'properties': {}}
+            if positions is not None:
+                x, y, z = positions[i].tolist()
+                node['position'] = {'x': x, 'y': y, 'z': z}
+            nodes.append(node)
+
+        columns = [(name, column.to_list()) for name, column in self.edge_columns.items()]
+        node_ids = self.node_ids
+        edges = []
+        for e, (source, target) in enumerate(zip(self.src.tolist(), self.dst.tolist())):
+            edges.append({
+                'source': node_ids[source],
+                'target': node_ids[target],
+                'properties': {name: values[e] for name, values in columns
+                               if values[e] is not None}
+            })
+
+        return {
+            'nodes': nodes,
+            'edges': edges,
+            'metadata': {
+                'node_count': len(nodes),
+                'edge_count': len(edges),
+                'format': self.format
+            }
+        }
+
+
+@metrics.timed('ingest_csv')
+def parse_csv_stream(stream: BinaryIO, source_col: str = 'source',
+                     target_col: str = 'target',
+                     max_bytes: int = DEFAULT_MAX_BYTES) -> EdgeTable:
+    """
+    Parse un CSV (flux binaire UTF-8) ligne par ligne
+    Les lignes sans source ou cible sont ignorées, comme parse_csv_to_graph
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+
+    header = next(reader, None)
+    if not header:
+        raise ValueError("Erreur lors du parsing CSV: fichier vide")
+
+    missing = [col for col in (source_col, target_col) if col not in header]
+    if missing:
+        raise ValueError(f"Erreur lors du parsing CSV: colonnes absentes {missing}")
+
+    source_index = header.index(source_col)
+    target_index = header.index(target_col)
+    properties = [(j, ColumnBuilder(name)) for j, name in enumerate(header)
+                  if j not in (source_index, target_index)]
+    width = len(header)
+
+    index = {}
+    node_ids = []
+    node_bytes = 0
+    src = array('i')
+    dst = array('i')
+
+    try:
+        for row_number, row in enumerate(reader, 1):
+            if len(row) < width:
+                row = row + [''] * (width - len(row))
+
+            source = row[source_index]
+            target = row[target_index]
+            if not source or not target:
+                continue
+
+            source_id = index.get(source)
+            if source_id is None:
+                source_id = index[source] = len(node_ids)
+                node_ids.append(source)
+                node_bytes += len(source) + _NODE_ID_OVERHEAD
+            target_id = index.get(target)
+            if target_id is None:
+                target_id = index[target] = len(node_ids)
+                node_ids.append(target)
+                node_bytes += len(target) + _NODE_ID_OVERHEAD
+
+            src.append(source_id)
+            dst.append(target_id)
+            for j, builder in properties:
+                builder.append_text(row[j])
+
+            if row_number % MEMORY_CHECK_ROWS == 0:
+                used = node_bytes + 8 * len(src) + sum(b.nbytes for _, b in properties)
+                if used > max_bytes:
+                    raise ValueError(
+                        f"Import trop volumineux: plafond mémoire de "
+                        f"{max_bytes // (1024 * 1024)} Mo atteint à la ligne {row_number}"
+                    )
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise ValueError(f"Erreur lors du parsing CSV: {str(e)}")
+    finally:
+        # Ne pas fermer le flux de la requête avec le wrapper texte
+        text.detach()
+
+    edge_count = len(src)
+    return EdgeTable(
+        node_ids,
+        np.frombuffer(src, dtype=np.int32).copy(),
+        np.frombuffer(dst, dtype=np.int32).copy(),
+        {builder.name: builder.finish(edge_count) for _, builder in properties},
+        'csv'
+    )
+
+
+# === JSON ===
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_DECODER = json.JSONDecoder()
+
+
+class _JsonReader:
+    """
+    Lecture incrémentale d'un document JSON depuis un flux texte
+    Seule la structure de premier niveau est parcourue à la main ; chaque
+    valeur (nœud, arête, autre clé) est décodée par json en une fois
+    """
+
+    def __init__(self, text: TextIO, chunk_chars: int = JSON_CHUNK_CHARS):
+        self.text = text
+        self.chunk_chars = chunk_chars
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, minimum: int) -> bool:
+        """Lit au moins `minimum` caractères de plus ; False en fin de flux"""
+        if self.eof:
+            return False
+        parts = [self.buffer[self.pos:]]
+        read = 0
+        while read < minimum:
+            chunk = self.text.read(self.chunk_chars)
+            if not chunk:
+                self.eof = True
+                break
+            parts.append(chunk)
+            read += len(chunk)
+        self.buffer = ''.join(parts)
+        self.pos = 0
+        return read > 0
+
+    def peek(self) -> Optional[str]:
+        """Prochain caractère significatif (None en fin de document)"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill(self.chunk_chars):
+                return None
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"JSON invalide: '{char}' attendu, "
+                             f"{'fin du document' if found is None else repr(found)} trouvé")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Décode la valeur suivante (lit la suite du flux si elle est incomplète)"""
+        self.peek()
+        missing = self.chunk_chars
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                if self._fill(missing):
+                    missing *= 2  # grande valeur : lectures de plus en plus larges
+                    continue
+                raise ValueError(f"JSON invalide: {e.msg}")
+            # Un nombre en fin de tampon peut se poursuivre dans le morceau suivant
+            if end == len(self.buffer) and self._fill(missing):
+                continue
+            self.pos = end
+            return value
+
+    def items(self) -> Iterable[str]:
+        """Clés d'un objet ; la valeur de chaque clé doit être lue avant la suivante"""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError("JSON invalide: clé d'objet attendue")
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect('}')
+            return
+
+    def elements(self) -> Iterable[Any]:
+        """Éléments d'un tableau, décodés un par un"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect(']')
+            return
+
+
+class _GraphBuilder:
+    """
+    Graphe en colonnes construit nœud par nœud et arête par arête, avec la
+    normalisation de graph_service.parse_json_to_graph
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.reset_nodes()
+        self.reset_edges()
+
+    def reset_nodes(self):
+        self.ids = []
+        self.labels = ColumnBuilder('label')
+        self.labels_differ = False
+        self.node_properties = {}
+        self.node_bytes = 0
+
+    def reset_edges(self):
+        # Extrémités internées à part : les nœuds peuvent suivre les arêtes
+        self.endpoint_index = {}
+        self.endpoints = []
+        self.src = array('i')
+        self.dst = array('i')
+        self.edge_properties = {}
+        self.edge_bytes = 0
+
+    def add_node(self, node_id: Any, label: Any, properties: Dict[str, Any]):
+        row = len(self.ids)
+        self.ids.append(node_id)
+        self.labels.append(label)
+        self.labels_differ = self.labels_differ or label != node_id
+        _append_properties(self.node_properties, row, properties)
+        self.node_bytes += _NODE_ID_OVERHEAD + len(str(node_id))
+        if row % MEMORY_CHECK_ROWS == MEMORY_CHECK_ROWS - 1:
+            self._check_memory()
+
+    def add_json_node(self, node: Any, i: int):
+        if isinstance(node, dict):
+            node_id = node.get('id', node.get('name', f'node_{i}'))
+            self.add_node(node_id, node.get('label', node.get('name', node_id)),
+                          {k: v for k, v in node.items() if k not in ('id', 'label', 'name')})
+        else:
+            self.add_node(str(node), str(node), {})
+
+    def add_json_edge(self, edge: Any):
+        if not isinstance(edge, dict):
+            return
+        row = len(self.src)
+        self.src.append(self._endpoint(str(edge.get('source', edge.get('from')))))
+        self.dst.append(self._endpoint(str(edge.get('target', edge.get('to')))))
+        _append_properties(self.edge_properties, row,
+                           {k: v for k, v in edge.items()
+                            if k not in ('source', 'target', 'from', 'to')})
+        if row % MEMORY_CHECK_ROWS == MEMORY_CHECK_ROWS - 1:
+            self._check_memory()
+
+    def _endpoint(self, node_id: str) -> int:
+        i = self.endpoint_index.get(node_id)
+        if i is None:
+            i = self.endpoint_index[node_id] = len(self.endpoints)
+            self.endpoints.append(node_id)
+            self.edge_bytes += _NODE_ID_OVERHEAD + len(node_id)
+        return i
+
+    def _check_memory(self):
+        used = (self.node_bytes + self.edge_bytes + 8 * len(self.src) + self.labels.nbytes
+                + sum(b.nbytes for b in self.node_properties.values())
+                + sum(b.nbytes for b in self.edge_properties.values()))
+        if used > self.max_bytes:
+            raise ValueError(
+                f"Import trop volumineux: plafond mémoire de "
+                f"{self.max_bytes // (1024 * 1024)} Mo atteint "
+                f"({len(self.ids)} nœuds, {len(self.src)} arêtes lus)"
+            )
+
+    def finish(self) -> StoredGraph:
+        """Résout les extrémités des arêtes (mêmes indices que StoredGraph.from_graph_data)"""
+        ids = self.ids
+        node_count = len(ids)
+        index = {}
+        for i, node_id in enumerate(ids):
+            index.setdefault(node_id, i)
+        remap = np.empty(len(self.endpoints), dtype=np.int32)
+        for temporary, node_id in enumerate(self.endpoints):
+            i = index.get(node_id)
+            if i is None:
+                i = index[node_id] = len(ids)
+                ids.append(node_id)
+            remap[temporary] = i
+        self.endpoint_index = self.endpoints = None
+
+        edge_count = len(self.src)
+        graph = StoredGraph(
+            ids, node_count,
+            remap[np.frombuffer(self.src, dtype=np.int32)],
+            remap[np.frombuffer(self.dst, dtype=np.int32)],
+            self.labels.finish(node_count) if self.labels_differ else None,
+            {key: b.finish(node_count) for key, b in self.node_properties.items()},
+            {key: b.finish(edge_count) for key, b in self.edge_properties.items()},
+            metadata={'node_count': node_count, 'edge_count': edge_count, 'format': 'json'}
+        )
+        graph._index = index
+        return graph
+
+
+def _append_properties(builders: Dict[str, ColumnBuilder], row: int,
+                       properties: Dict[str, Any]):
+    """Ajoute une ligne de propriétés (même résultat que columns.build_columns)"""
+    for key, value in properties.items():
+        builder = builders.get(key)
+        if builder is None:
+            builder = builders[key] = ColumnBuilder(key, length=row)
+        builder.pad_to(row)
+        builder.append(value)
+
+
+def _add_items(builder: _GraphBuilder, items: Iterable[Any]):
+    """Format liste d'objets : un nœud par id (le dernier objet l'emporte), sans arêtes"""
+    nodes = {}
+    for item in items:
+        if isinstance(item, dict):
+            node_id = item.get('id', item.get('name'))
+            if node_id:
+                nodes[node_id] = item
+    for node_id, item in nodes.items():
+        builder.add_node(node_id, item.get('label', item.get('name', node_id)), item)
+
+
+def _json_error(e: Exception) -> ValueError:
+    message = str(e)
+    if message.startswith('JSON invalide') or message.startswith('Import trop volumineux'):
+        return ValueError(message)
+    return ValueError(f"Erreur lors du parsing JSON: {message}")
+
+
+@metrics.timed('ingest_json')
+def parse_json_data(data: Any, max_bytes: int = DEFAULT_MAX_BYTES) -> StoredGraph:
+    """
+    Graphe en colonnes à partir d'un JSON déjà décodé (dict nodes/edges ou
+    liste d'objets), sans le réencoder ni construire de dicts intermédiaires
+    """
+    builder = _GraphBuilder(max_bytes)
+    try:
+        if isinstance(data, dict) and ('nodes' in data or 'vertices' in data):
+            for i, node in enumerate(data.get('nodes', data.get('vertices', []))):
+                builder.add_json_node(node, i)
+            for edge in data.get('edges', data.get('links', [])):
+                builder.add_json_edge(edge)
+        elif isinstance(data, list):
+            _add_items(builder, data)
+        else:
+            raise ValueError("Format JSON non reconnu")
+        return builder.finish()
+    except Exception as e:
+        raise _json_error(e)
+
+
+@metrics.timed('ingest_json')
+def parse_json_stream(stream: BinaryIO, max_bytes: int = DEFAULT_MAX_BYTES,
+                      encoding: Optional[str] = 'utf-8-sig') -> StoredGraph:
+    """
+    Parse un JSON (flux binaire UTF-8, ou flux texte avec encoding=None)
+    en une seule passe : les tableaux de nœuds et d'arêtes ne sont jamais
+    décodés en entier ; formats acceptés : ceux de parse_json_data
+    """
+    text = io.TextIOWrapper(stream, encoding=encoding, newline='') if encoding else stream
+    reader = _JsonReader(text)
+    builder = _GraphBuilder(max_bytes)
+    try:
+        first = reader.peek()
+        if first == '{':
+            # 'nodes' l'emporte sur 'vertices', 'edges' sur 'links' (comme dict.get)
+            node_key = edge_key = None
+            for key in reader.items():
+                if key in ('nodes', 'vertices') and node_key != 'nodes':
+                    if node_key is not None:
+                        builder.reset_nodes()
+                    node_key = key
+                    nodes = reader.elements() if reader.peek() == '[' else reader.value()
+                    for i, node in enumerate(nodes):
+                        builder.add_json_node(node, i)
+                elif key in ('edges', 'links') and edge_key != 'edges':
+                    if edge_key is not None:
+                        builder.reset_edges()
+                    edge_key = key
+                    edges = reader.elements() if reader.peek() == '[' else reader.value()
+                    for edge in edges:
+                        builder.add_json_edge(edge)
+                else:
+                    reader.value()
+            if node_key is None:
+                raise ValueError("Format JSON non reconnu")
+        elif first == '[':
+            _add_items(builder, reader.elements())
+        elif first is None:
+            raise ValueError("JSON invalide: document vide")
+        else:
+            reader.value()
+            raise ValueError("Format JSON non reconnu")
+        if reader.peek() is not None:
+            raise ValueError("JSON invalide: données après la fin du document")
+        return builder.finish()
+    except UnicodeDecodeError as e:
+        raise ValueError(f"JSON invalide: {str(e)}")
+    except Exception as e:
+        raise _json_error(e)
+    finally:
+        if encoding:
+            # Ne pas fermer le flux de la requête avec le wrapper texte
+            text.detach()
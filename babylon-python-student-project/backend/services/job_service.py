@@ -0,0 +1,288 @@
+import io
+import os
+import threading
+import time
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, CancelledError
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+
+from services.graph_service import graph_service
+from services.graph_store import StoredGraph
+from services.ingest import parse_json_stream
+from services.layout_engine import force_layout
+from services.metrics import metrics
+
+# Phases d'un job d'import
+PHASE_QUEUED = 'queued'
+PHASE_PARSING = 'parsing'
+PHASE_LAYOUT = 'layout'
+PHASE_SAVING = 'saving'
+PHASE_DONE = 'done'
+PHASE_FAILED = 'failed'
+PHASE_CANCELLED = 'cancelled'
+
+ACTIVE_PHASES = (PHASE_QUEUED, PHASE_PARSING, PHASE_LAYOUT, PHASE_SAVING)
+
+
+class JobQueueFull(Exception):
+    """Levée quand le nombre maximal de jobs simultanés est atteint"""
+
+
+class JobCancelled(Exception):
+    """Levée dans le worker quand le job a été annulé"""
+
+
+def _run_import_job(job_id: str, kind: str, payload: Dict[str, Any],
+                    layout_type: str, layout_params: Dict[str, Any],
+                    progress, cancelled) -> Tuple[StoredGraph, List]:
+    """
+    Exécuté dans un processus du pool : graphe produit et étapes
+    chronométrées, enregistrées ensuite dans les métriques du serveur
+    """
+    with metrics.capture() as stages:
+        graph = _import_graph(job_id, kind, payload, layout_type, layout_params,
+                              progress, cancelled)
+    return graph, stages
+
+
+def _import_graph(job_id: str, kind: str, payload: Dict[str, Any],
+                  layout_type: str, layout_params: Dict[str, Any],
+                  progress, cancelled) -> StoredGraph:
+    """
+    Exécuté dans un processus du pool : parsing + layout d'un graphe
+    progress / cancelled sont des dictionnaires partagés (Manager) qui
+    remontent l'avancement et transmettent les demandes d'annulation
+    """
+    last = {'phase': None, 'percent': -1}
+
+    def write(phase: str, percent: int):
+        # Limiter les échanges inter-processus aux changements visibles
+        if phase != last['phase'] or percent != last['percent']:
+            progress[job_id] = {'phase': phase, 'percent': percent}
+            last.update(phase=phase, percent=percent)
+
+    def report(phase: str, percent: int):
+        if cancelled.get(job_id):
+            raise JobCancelled(job_id)
+        write(phase, percent)
+
+    # Le layout occupe la plage 10% - 95%. Le callback ne lève pas
+    # JobCancelled (le layout l'envelopperait dans une ValueError) : il
+    # interrompt le calcul, l'annulation est levée au report suivant
+    def on_layout_progress(fraction: float, positions) -> bool:
+        if cancelled.get(job_id):
+            return False
+        write(PHASE_LAYOUT, 10 + int(85 * fraction))
+        return True
+
+    if kind == 'table':
+        # CSV déjà parsé en flux par la route (EdgeTable)
+        report(PHASE_LAYOUT, 10)
+        graph_data = graph_service.layout_edge_table(
+            payload['table'], layout_type, layout_params, callback=on_layout_progress,
+            base=payload.get('base')
+        )
+        report(PHASE_SAVING, 95)
+        return graph_data
+
+    if kind in ('json', 'graph'):
+        # JSON texte parsé ici en une passe, ou déjà en colonnes (StoredGraph)
+        graph = payload.get('graph')
+        if graph is None:
+            report(PHASE_PARSING, 0)
+            graph = parse_json_stream(io.StringIO(payload['json_content']), encoding=None)
+        report(PHASE_LAYOUT, 10)
+        graph = graph_service.layout_stored(
+            graph, layout_type, layout_params, callback=on_layout_progress,
+            base=payload.get('base')
+        )
+        report(PHASE_SAVING, 95)
+        return graph
+
+    report(PHASE_PARSING, 0)
+    graph_data = graph_service.parse_csv_to_graph(
+        payload['csv_content'],
+        payload.get('source_col', 'source'),
+        payload.get('target_col', 'target')
+    )
+
+    report(PHASE_LAYOUT, 10)
+    graph_data = graph_service.compute_layout(
+        graph_data, layout_type, layout_params, callback=on_layout_progress,
+        base=payload.get('base')
+    )
+
+    report(PHASE_SAVING, 95)
+    # Conversion en colonnes dans le worker : transfert compact vers le serveur
+    return StoredGraph.from_graph_data(graph_data)
+
+
+def _warm_worker() -> int:
+    """Exécuté dans un processus du pool : premier calcul de layout (initialisations paresseuses)"""
+    force_layout(3, np.array([[0, 1], [1, 2]]), iterations=1, seed=0)
+    return os.getpid()
+
+
+class JobService:
+    """
+    File de jobs d'import exécutés dans un pool de processus
+    Les routes retournent immédiatement un graph_id ; le graphe est ajouté à
+    graph_service.graphs à la fin du job, comme pour un import synchrone.
+    """
+
+    def __init__(self, max_workers: int = None, max_jobs: int = None):
+        self.max_workers = max_workers or int(
+            os.environ.get('LAYOUT_WORKERS', min(4, os.cpu_count() or 1))
+        )
+        # Jobs simultanés (en attente + en cours) au-delà desquels on refuse
+        self.max_jobs = max_jobs or int(os.environ.get('MAX_LAYOUT_JOBS', 8))
+        # Jobs terminés conservés (état consultable) : les JOB_HISTORY
+        # derniers, pendant au plus JOB_TTL secondes
+        self.history = int(os.environ.get('JOB_HISTORY', 100))
+        self.ttl = float(os.environ.get('JOB_TTL', 3600))
+        self.jobs = {}  # job_id -> état du job
+        self.active = 0  # jobs en attente ou en cours
+        self._finished = deque()  # job_ids terminés, du plus ancien au plus récent
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._manager = None
+        self._progress = None
+        self._cancelled = None
+
+    def _ensure_pool(self):
+        """Démarre le pool et le Manager au premier job"""
+        if self._executor is None:
+            self._manager = multiprocessing.Manager()
+            self._progress = self._manager.dict()
+            self._cancelled = self._manager.dict()
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+    def prewarm(self) -> int:
+        """
+        Démarre le pool avant le premier job, un worker par place ;
+        retourne le nombre de workers prêts
+        """
+        with self._lock:
+            self._ensure_pool()
+            # Soumissions rapprochées : aucun worker n'est encore libre,
+            # chacune démarre un nouveau processus
+            futures = [self._executor.submit(_warm_worker) for _ in range(self.max_workers)]
+        return len({future.result() for future in futures})
+
+    def submit(self, job_id: str, kind: str, payload: Dict[str, Any],
+               layout_type: str = 'force',
+               layout_params: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Soumet un import (kind: 'csv', 'json', 'table' pour un CSV déjà
+        parsé en flux ou 'graph' pour un JSON déjà converti en colonnes) ;
+        job_id sert aussi de graph_id
+        payload['base'] (optionnel) : version précédente du graphe pour un
+        layout incrémental
+        """
+        with self._lock:
+            if self.active >= self.max_jobs:
+                raise JobQueueFull(
+                    f"Trop de jobs en cours ({self.active}/{self.max_jobs}), réessayez plus tard"
+                )
+
+            self._ensure_pool()
+            self.jobs[job_id] = {
+                'id': job_id,
+                'graph_id': job_id,
+                'kind': kind,
+                'layout': layout_type,
+                'phase': PHASE_QUEUED,
+                'percent': 0,
+                'error': None,
+                'created_at': time.time(),
+                'finished_at': None
+            }
+            future = self._executor.submit(
+                _run_import_job, job_id, kind, payload, layout_type,
+                layout_params or {}, self._progress, self._cancelled
+            )
+            self._futures[job_id] = future
+            self.active += 1
+
+        future.add_done_callback(lambda f: self._on_done(job_id, f))
+        return self.get_status(job_id)
+
+    def _on_done(self, job_id: str, future):
+        """Enregistre le graphe produit (thread du pool, hors requête)"""
+        job = self.jobs[job_id]
+        try:
+            graph_data, stages = future.result()
+            metrics.record_stages(stages)
+            graph_service.save_graph(job_id, graph_data)
+            outcome = {'phase': PHASE_DONE, 'percent': 100}
+        except (JobCancelled, CancelledError):
+            outcome = {'phase': PHASE_CANCELLED}
+        except Exception as e:
+            outcome = {'phase': PHASE_FAILED, 'error': str(e)}
+        
+        with self._lock:
+            job.update(outcome, finished_at=time.time())
+            self.active -= 1
+            self._futures.pop(job_id, None)
+            self._finished.append(job_id)
+            self._prune()
+        metrics.observe('import_job_seconds', job['finished_at'] - job['created_at'],
+                        kind=job['kind'], phase=job['phase'])
+        self._progress.pop(job_id, None)
+        self._cancelled.pop(job_id, None)
+    
+    def _prune(self):
+        """Oublie les jobs terminés au-delà de JOB_HISTORY ou plus anciens que JOB_TTL (verrou pris)"""
+        expired = time.time() - self.ttl
+        while self._finished and (len(self._finished) > self.history or
+                                  self.jobs[self._finished[0]]['finished_at'] < expired):
+            del self.jobs[self._finished.popleft()]
+
+    def get_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Retourne l'état d'un job (phase et pourcentage)"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+
+        if job['phase'] in ACTIVE_PHASES and self._progress is not None:
+            progress = self._progress.get(job_id)
+            # Job terminé pendant la lecture : ne pas revenir à une phase active
+            with self._lock:
+                if progress and job['phase'] in ACTIVE_PHASES:
+                    job.update(progress)
+        return dict(job)
+
+    def list_jobs(self):
+        """Liste les jobs en cours et les derniers jobs terminés"""
+        with self._lock:
+            self._prune()
+            job_ids = list(self.jobs)
+        return [job for job in map(self.get_status, job_ids) if job is not None]
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Annule un job : retiré de la file s'il n'a pas démarré, sinon le
+        worker s'arrête au prochain point de contrôle
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+
+        if job['phase'] in ACTIVE_PHASES:
+            future = self._futures.get(job_id)
+            if future is not None and not future.cancel():
+                self._cancelled[job_id] = True
+        return self.get_status(job_id)
+
+    def shutdown(self):
+        """Arrête le pool (jobs en attente annulés)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._manager.shutdown()
+            self._executor = None
+
+# Instance globale du service
+job_service = JobService()
@@ -0,0 +1,155 @@
+"""
+Cache des layouts calculés, indexé par un hash du contenu du graphe
+
+La clé couvre les identifiants des nœuds (dans l'ordre), les arêtes
+canoniques et leurs poids, le type de layout et ses paramètres : un
+graphe réimporté à l'identique retrouve ses positions sans recalcul.
+Sans graine explicite, la graine du layout est dérivée de la clé, ce qui
+rend les positions reproductibles même en cas d'absence du cache.
+
+Éviction LRU sous un budget mémoire (LAYOUT_CACHE_MB) ; persistance
+optionnelle en fichiers .npy dans LAYOUT_CACHE_DIR (partagée entre les
+processus du pool de jobs, qui ont chacun leur cache en mémoire).
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from typing import Any, Dict, Iterable, Optional
+
+# Surcoût estimé d'une entrée (clé, tableau NumPy, entrée de dict)
+_ENTRY_OVERHEAD = 256
+
+
+def layout_key(node_ids: Iterable[Any], edges: np.ndarray, weights: np.ndarray,
+               layout_type: str, layout_params: Dict[str, Any] = None) -> str:
+    """Hash canonique (sha256 hex) d'un graphe et d'un layout demandé"""
+    digest = hashlib.sha256()
+    digest.update(layout_type.encode('utf-8'))
+    digest.update(json.dumps(layout_params or {}, sort_keys=True, default=str).encode('utf-8'))
+
+    ids = [str(node_id) for node_id in node_ids]
+    digest.update(len(ids).to_bytes(8, 'little'))
+    digest.update('\0'.join(ids).encode('utf-8'))
+
+    digest.update(np.ascontiguousarray(edges, dtype='<i8').tobytes())
+    digest.update(np.ascontiguousarray(weights, dtype='<f8').tobytes())
+    return digest.hexdigest()
+
+
+def seed_from_key(key: str) -> int:
+    """Graine déterministe dérivée d'une clé de cache"""
+    return int(key[:8], 16)
+
+
+class LayoutCache:
+    """Cache LRU de positions (n, 3) sous budget mémoire"""
+
+    def __init__(self, max_bytes: int = None, cache_dir: str = None):
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            float(os.environ.get('LAYOUT_CACHE_MB', 256)) * 1024 * 1024
+        )
+        self.cache_dir = cache_dir if cache_dir is not None else os.environ.get('LAYOUT_CACHE_DIR')
+        self._entries = OrderedDict()  # clé -> positions float32 (lecture seule)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Positions en cache (mémoire puis disque), None si absentes"""
+        with self._lock:
+            positions = self._entries.get(key)
+            if positions is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return positions
+
+        positions = self._load(key)
+        with self._lock:
+            if positions is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._insert(key, positions)
+        return positions
+
+    def put(self, key: str, positions: np.ndarray) -> np.ndarray:
+        """Ajoute des positions ; retourne la copie float32 conservée"""
+        positions = np.array(positions, dtype=np.float32)
+        positions.setflags(write=False)
+        with self._lock:
+            self._insert(key, positions)
+        self._save(key, positions)
+        return positions
+
+    def _insert(self, key: str, positions: np.ndarray):
+        size = positions.nbytes + _ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.nbytes + _ENTRY_OVERHEAD
+        self._entries[key] = positions
+        self._bytes += size
+
+        # Éviction des entrées les moins récemment utilisées
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes + _ENTRY_OVERHEAD
+            self.evictions += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f'{key}.npy')
+
+    def _load(self, key: str) -> Optional[np.ndarray]:
+        if not self.cache_dir:
+            return None
+        try:
+            positions = np.load(self._path(key), allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+        positions.setflags(write=False)
+        return positions
+
+    def _save(self, key: str, positions: np.ndarray):
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Écriture atomique : fichier temporaire puis renommage
+            tmp = self._path(key) + f'.{os.getpid()}.tmp'
+            with open(tmp, 'wb') as f:
+                np.save(f, positions, allow_pickle=False)
+            os.replace(tmp, self._path(key))
+        except OSError:
+            pass
+
+    def clear(self):
+        """Vide le cache en mémoire (les fichiers persistés sont conservés)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs du cache"""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'persistent': bool(self.cache_dir)
+            }
+
+# Instance globale du cache
+layout_cache = LayoutCache()
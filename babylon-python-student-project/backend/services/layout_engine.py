@@ -0,0 +1,565 @@
+"""
+Moteur de layout 3D force-directed vectorisé (NumPy)
+
+Algorithme de Fruchterman-Reingold (mêmes conventions que nx.spring_layout)
+avec une approximation par grille pour la répulsion :
+- les nœuds sont répartis dans une grille 3D dont l'origine est décalée
+  aléatoirement à chaque itération (évite les artefacts de bord de cellule)
+- la répulsion entre nœuds d'une même cellule est calculée exactement
+  (échantillonnée dans les cellules surpeuplées)
+- les autres cellules agissent via leur barycentre pondéré par la masse
+- l'attraction est calculée en un seul passage sur le tableau des arêtes
+
+Coût par itération ~ O(n * (cellules + cap) + m) au lieu de O(n²).
+
+Pour les très grands graphes, multilevel_layout contracte le graphe par
+couplages successifs, calcule le layout du plus petit niveau puis
+interpole et affine niveau par niveau jusqu'au graphe complet.
+
+incremental_layout place les nœuds ajoutés à un layout existant et ne
+relâche que leur voisinage, les autres nœuds restant à leur position.
+"""
+import numpy as np
+from typing import Callable, Optional
+
+# En dessous de ce nombre de nœuds, la répulsion exacte O(n²) reste plus rapide
+EXACT_THRESHOLD = 500
+
+# Nombre maximal d'éléments (paires nœud/cellule) traités par bloc
+CHUNK_SIZE = 1 << 21
+
+# Modes du layout incrémental : nœuds existants fixes ou voisinage relâché
+INCREMENTAL_MODES = ('fixed', 'warm')
+
+
+def force_layout(n: int, edges: np.ndarray, weights: Optional[np.ndarray] = None,
+                 pos: Optional[np.ndarray] = None, iterations: int = 100,
+                 tol: float = 1e-4, seed: Optional[int] = None,
+                 mass: Optional[np.ndarray] = None,
+                 fixed: Optional[np.ndarray] = None,
+                 temperature: Optional[float] = None,
+                 k: Optional[float] = None,
+                 max_cells: int = 2048, near_cap: int = 32,
+                 rescale: bool = True,
+                 callback: Optional[Callable[[int, np.ndarray], Optional[bool]]] = None,
+                 callback_every: int = 1) -> np.ndarray:
+    """
+    Calcule des positions 3D force-directed
+
+    n: nombre de nœuds
+    edges: tableau (m, 2) d'indices de nœuds
+    weights: poids des arêtes (force d'attraction), 1 par défaut
+    pos: positions initiales (n, 3), aléatoires dans [0, 1)³ sinon
+    iterations / tol: budget d'itérations et seuil de convergence
+        (déplacement moyen par nœud, comme nx.spring_layout)
+    mass: masse des nœuds pour la répulsion (utilisée par le multilevel)
+    fixed: masque booléen des nœuds à ne pas déplacer
+    temperature: déplacement maximal initial (10% de l'étendue sinon)
+    k: distance optimale entre nœuds (sqrt(1 / n) par défaut, comme networkx)
+    rescale: recentre et normalise les positions dans [-1, 1]
+    callback: appelé toutes les `callback_every` itérations avec
+        (itération, positions) ; retourner False interrompt le calcul
+
+    Retourne un tableau float64 (n, 3)
+    """
+    rng = np.random.default_rng(seed)
+
+    if pos is None:
+        pos = rng.random((n, 3))
+    else:
+        pos = np.array(pos, dtype=np.float64, copy=True)
+
+    if n == 0:
+        return pos
+    if n == 1:
+        return np.zeros((1, 3)) if rescale else pos
+
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    if weights is None:
+        weights = np.ones(len(edges))
+    else:
+        weights = np.asarray(weights, dtype=np.float64)
+    if mass is None:
+        mass = np.ones(n)
+    else:
+        mass = np.asarray(mass, dtype=np.float64)
+
+    movable = None
+    if fixed is not None:
+        movable = ~np.asarray(fixed, dtype=bool)
+        if not movable.any():
+            return _rescale(pos) if rescale else pos
+
+    # Distance optimale entre nœuds (même valeur que networkx)
+    if k is None:
+        k = np.sqrt(1.0 / n)
+
+    if temperature is None:
+        temperature = 0.1 * max(float(np.ptp(pos, axis=0).max()), 1e-9)
+    dt = temperature / float(iterations + 1)
+
+    src, dst = edges[:, 0], edges[:, 1]
+
+    for iteration in range(iterations):
+        if n <= EXACT_THRESHOLD:
+            disp = _exact_repulsion(pos, mass, k)
+        else:
+            disp = _grid_repulsion(pos, mass, k, rng, max_cells, near_cap)
+
+        if len(edges):
+            delta = pos[src] - pos[dst]
+            dist = np.sqrt((delta * delta).sum(axis=1))
+            force = delta * (weights * dist / k)[:, None]
+            for axis in range(3):
+                disp[:, axis] -= np.bincount(src, weights=force[:, axis], minlength=n)
+                disp[:, axis] += np.bincount(dst, weights=force[:, axis], minlength=n)
+
+        if movable is not None:
+            disp[~movable] = 0.0
+
+        length = np.sqrt((disp * disp).sum(axis=1))
+        length = np.where(length < 0.01, 0.1, length)
+        delta_pos = disp * (temperature / length)[:, None]
+        if movable is not None:
+            delta_pos[~movable] = 0.0
+        pos += delta_pos
+
+        temperature -= dt
+
+        if callback is not None and (iteration + 1) % callback_every == 0:
+            if callback(iteration + 1, pos) is False:
+                break
+
+        if np.linalg.norm(delta_pos) / n < tol:
+            break
+
+    return _rescale(pos) if rescale else pos
+
+
+def multilevel_layout(n: int, edges: np.ndarray,
+                      weights: Optional[np.ndarray] = None,
+                      iterations: int = 200, tol: float = 1e-4,
+                      seed: Optional[int] = None, coarsest_size: int = 100,
+                      max_levels: int = 30,
+                      callback: Optional[Callable[[int, np.ndarray], Optional[bool]]] = None
+                      ) -> np.ndarray:
+    """
+    Layout multiniveau (contraction - layout - raffinement)
+
+    Le graphe est contracté par couplage d'arêtes lourdes jusqu'à
+    `coarsest_size` nœuds (ou jusqu'à ce que la contraction ne progresse
+    plus). Le niveau le plus grossier reçoit `iterations` itérations, puis
+    chaque niveau plus fin part des positions de son parent (plus un léger
+    bruit) et n'est affiné que sur un petit nombre d'itérations à
+    température réduite.
+
+    callback: appelé après chaque niveau avec (avancement dans [0, 1],
+        positions projetées sur les n nœuds) ; retourner False interrompt
+        le calcul
+
+    Retourne un tableau float64 (n, 3) normalisé dans [-1, 1]
+    """
+    rng = np.random.default_rng(seed)
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    if weights is None:
+        weights = np.ones(len(edges))
+    else:
+        weights = np.asarray(weights, dtype=np.float64)
+
+    if n <= coarsest_size:
+        return force_layout(n, edges, weights, iterations=iterations,
+                            tol=tol, seed=seed)
+
+    # Hiérarchie de graphes : (taille, arêtes, poids, masse, parent)
+    levels = []
+    level_n, level_edges, level_weights = n, edges, weights
+    level_mass = np.ones(n)
+    while level_n > coarsest_size and len(levels) < max_levels:
+        parent, coarse_n = _coarsen(level_n, level_edges, level_weights,
+                                    level_mass, rng)
+        if coarse_n > 0.9 * level_n:
+            break
+        levels.append((level_n, level_edges, level_weights, level_mass, parent))
+        level_edges, level_weights = _contract_edges(parent, level_edges,
+                                                     level_weights)
+        level_mass = np.bincount(parent, weights=level_mass, minlength=coarse_n)
+        level_n = coarse_n
+
+    # Correspondance nœud fin -> nœud du niveau courant (pour le callback)
+    to_level = np.arange(n)
+    for _, _, _, _, parent in levels:
+        to_level = parent[to_level]
+
+    pos = force_layout(level_n, level_edges, level_weights, iterations=iterations,
+                       tol=tol, seed=rng.integers(1 << 31), mass=level_mass,
+                       rescale=False)
+    step = 0
+    n_steps = max(len(levels), 1)
+    if callback is not None and callback(step / n_steps, pos[to_level]) is False:
+        return _rescale(pos[to_level])
+
+    for level_n, level_edges, level_weights, level_mass, parent in reversed(levels):
+        # Interpolation : chaque nœud part de la position de son parent, dans
+        # une boîte [0, 1]³ comme un layout initialisé aléatoirement
+        pos = pos - pos.min(axis=0)
+        pos /= max(float(pos.max()), 1e-9)
+        pos = pos[parent]
+        k = np.sqrt(1.0 / level_n)
+        pos += (rng.random(pos.shape) - 0.5) * k
+
+        refine_iterations = int(np.clip(50.0 * np.sqrt(1000.0 / level_n), 10, 50))
+        pos = force_layout(level_n, level_edges, level_weights, pos=pos,
+                           iterations=refine_iterations, tol=tol,
+                           seed=rng.integers(1 << 31), mass=level_mass,
+                           temperature=2.0 * k, rescale=False)
+
+        step += 1
+        to_level = np.arange(n)
+        for _, _, _, _, finer_parent in levels[:len(levels) - step]:
+            to_level = finer_parent[to_level]
+        if callback is not None and callback(step / n_steps, pos[to_level]) is False:
+            return _rescale(pos[to_level])
+
+    return _rescale(pos)
+
+
+def incremental_layout(n: int, edges: np.ndarray, weights: Optional[np.ndarray],
+                       pos: np.ndarray, placed: np.ndarray,
+                       changed: Optional[np.ndarray] = None, mode: str = 'warm',
+                       hops: int = 1, iterations: int = 50, tol: float = 1e-4,
+                       seed: Optional[int] = None) -> np.ndarray:
+    """
+    Layout incrémental : complète un layout existant sans le recalculer
+
+    pos: positions courantes (n, 3), ignorées pour les nœuds non placés
+    placed: masque des nœuds dont la position est connue (au moins un)
+    changed: masque des nœuds placés dont les arêtes ont changé
+    mode: 'fixed' - seuls les nœuds non placés bougent ;
+          'warm' - les nœuds modifiés et leur voisinage à `hops` sauts
+          sont aussi relâchés, à partir de leurs positions actuelles
+    iterations / tol: budget d'itérations et seuil de convergence
+
+    Les nœuds non placés partent du barycentre de leurs voisins placés
+    (propagé de proche en proche), ceux sans aucun voisin placé d'un point
+    aléatoire de la boîte englobante. Seul le sous-graphe des nœuds mobiles
+    et de leurs voisins (fixes) est relâché, avec pour distance optimale la
+    longueur médiane des arêtes déjà placées : le coût dépend de la taille
+    du changement, pas de celle du graphe.
+
+    Retourne un tableau float64 (n, 3) à la même échelle que `pos`
+    """
+    if mode not in INCREMENTAL_MODES:
+        raise ValueError(f"Mode de layout incrémental inconnu: {mode!r}")
+    rng = np.random.default_rng(seed)
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    if weights is None:
+        weights = np.ones(len(edges))
+    else:
+        weights = np.asarray(weights, dtype=np.float64)
+    pos = np.array(pos, dtype=np.float64, copy=True).reshape(n, 3)
+    placed = np.asarray(placed, dtype=bool)
+    if not placed.any():
+        raise ValueError("Layout incrémental : aucun nœud placé")
+
+    moving = ~placed
+    if mode == 'warm' and changed is not None:
+        moving |= np.asarray(changed, dtype=bool)
+    if not moving.any():
+        return pos
+
+    indptr, neighbors = _adjacency(n, edges)
+    k = _edge_length(pos, edges, placed)
+    _place(pos, placed, indptr, neighbors, k, rng)
+
+    if mode == 'warm':
+        frontier = moving.copy()
+        for _ in range(max(0, int(hops))):
+            owner, nb = _neighbor_pairs(indptr, neighbors, np.flatnonzero(frontier))
+            frontier = np.zeros(n, dtype=bool)
+            frontier[nb[~moving[nb]]] = True
+            if not frontier.any():
+                break
+            moving |= frontier
+
+    # Sous-graphe relâché : nœuds mobiles et leurs voisins, qui servent d'ancres
+    active = moving.copy()
+    active[_neighbor_pairs(indptr, neighbors, np.flatnonzero(moving))[1]] = True
+    sub = np.flatnonzero(active)
+    local = np.full(n, -1, dtype=np.int64)
+    local[sub] = np.arange(len(sub))
+    inside = active[edges[:, 0]] & active[edges[:, 1]]
+
+    pos[sub] = force_layout(
+        len(sub), local[edges[inside]], weights[inside], pos=pos[sub],
+        iterations=iterations, tol=tol * k, seed=rng.integers(1 << 31),
+        fixed=~moving[sub], temperature=2.0 * k, k=k, rescale=False
+    )
+    return pos
+
+
+def _adjacency(n: int, edges: np.ndarray):
+    """Adjacence non orientée au format CSR (indptr, voisins)"""
+    heads = np.concatenate([edges[:, 0], edges[:, 1]])
+    tails = np.concatenate([edges[:, 1], edges[:, 0]])
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(heads, minlength=n), out=indptr[1:])
+    return indptr, tails[np.argsort(heads, kind='stable')]
+
+
+def _neighbor_pairs(indptr: np.ndarray, neighbors: np.ndarray, rows: np.ndarray):
+    """Couples (position dans rows, voisin) de tous les voisins des lignes demandées"""
+    lengths = indptr[rows + 1] - indptr[rows]
+    owner = np.repeat(np.arange(len(rows)), lengths)
+    offsets = np.arange(len(owner)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return owner, neighbors[np.repeat(indptr[rows], lengths) + offsets]
+
+
+def _edge_length(pos: np.ndarray, edges: np.ndarray, placed: np.ndarray) -> float:
+    """Longueur médiane des arêtes entre nœuds placés (échelle du layout existant)"""
+    both = placed[edges[:, 0]] & placed[edges[:, 1]]
+    if both.any():
+        delta = pos[edges[both, 0]] - pos[edges[both, 1]]
+        lengths = np.sqrt((delta * delta).sum(axis=1))
+        lengths = lengths[lengths > 0]
+        if len(lengths):
+            return float(np.median(lengths))
+    span = float(np.ptp(pos[placed], axis=0).max())
+    return span / max(np.cbrt(placed.sum()), 1.0) if span > 0 else 1.0
+
+
+def _place(pos: np.ndarray, placed: np.ndarray, indptr: np.ndarray,
+           neighbors: np.ndarray, k: float, rng: np.random.Generator):
+    """Positions initiales des nœuds non placés (barycentre des voisins placés)"""
+    known = placed.copy()
+    while True:
+        todo = np.flatnonzero(~known)
+        if not len(todo):
+            return
+        owner, nb = _neighbor_pairs(indptr, neighbors, todo)
+        keep = known[nb]
+        owner, nb = owner[keep], nb[keep]
+        counts = np.bincount(owner, minlength=len(todo))
+        ready = counts > 0
+        if not ready.any():
+            break
+        centers = np.stack([np.bincount(owner, weights=pos[nb, axis], minlength=len(todo))
+                            for axis in range(3)], axis=1)
+        rows = todo[ready]
+        pos[rows] = centers[ready] / counts[ready, None]
+        pos[rows] += (rng.random((len(rows), 3)) - 0.5) * k
+        known[rows] = True
+
+    # Composantes sans aucun nœud placé
+    lo = pos[placed].min(axis=0)
+    span = np.maximum(pos[placed].max(axis=0) - lo, k)
+    pos[todo] = lo + rng.random((len(todo), 3)) * span
+
+
+def _coarsen(n: int, edges: np.ndarray, weights: np.ndarray, mass: np.ndarray,
+             rng: np.random.Generator, rounds: int = 3):
+    """
+    Un niveau de contraction par couplage d'arêtes lourdes (handshake)
+
+    Chaque nœud non couplé propose son voisin de meilleur score
+    w / (masse_i * masse_j) ; les propositions réciproques forment des
+    paires. Les nœuds restés seuls rejoignent le groupe d'un voisin et
+    les nœuds isolés sont regroupés deux à deux.
+
+    Retourne (parent, nombre de nœuds du niveau grossier)
+    """
+    rep = np.arange(n)
+    matched = np.zeros(n, dtype=bool)
+
+    a = np.concatenate([edges[:, 0], edges[:, 1]])
+    b = np.concatenate([edges[:, 1], edges[:, 0]])
+    w = np.concatenate([weights, weights])
+    loops = a == b
+    a, b, w = a[~loops], b[~loops], w[~loops]
+
+    for _ in range(rounds):
+        free = ~matched[a] & ~matched[b]
+        if not free.any():
+            break
+        fa, fb = a[free], b[free]
+        score = w[free] / (mass[fa] * mass[fb]) * (1.0 + 1e-3 * rng.random(len(fa)))
+
+        order = np.lexsort((-score, fa))
+        first = np.concatenate(([True], fa[order][1:] != fa[order][:-1]))
+        proposal = np.full(n, -1)
+        proposal[fa[order][first]] = fb[order][first]
+
+        proposers = np.flatnonzero(proposal >= 0)
+        mutual = proposers[proposal[proposal[proposers]] == proposers]
+        partners = proposal[mutual]
+        rep[mutual] = np.minimum(mutual, partners)
+        matched[mutual] = True
+
+    degree = np.bincount(a, minlength=n)
+
+    # Nœuds restés seuls : rattachés au groupe de leur meilleur voisin couplé
+    # (sinon la contraction stagne sur les étoiles et les nœuds lourds)
+    alone = ~matched[a] & matched[b]
+    if alone.any():
+        la, lb = a[alone], b[alone]
+        score = w[alone] / mass[lb]
+        order = np.lexsort((-score, la))
+        first = np.concatenate(([True], la[order][1:] != la[order][:-1]))
+        rep[la[order][first]] = rep[lb[order][first]]
+        matched[la[order][first]] = True
+
+    # Feuilles restantes (voisin lui-même seul) : rattachées à ce voisin
+    leaves = np.flatnonzero(~matched & (degree == 1))
+    if len(leaves):
+        leaf_edge = np.isin(a, leaves)
+        neighbor = np.full(n, -1)
+        neighbor[a[leaf_edge]] = b[leaf_edge]
+        targets = neighbor[leaves]
+        # Deux feuilles voisines l'une de l'autre ne se rattachent qu'une fois
+        keep = ~((neighbor[targets] == leaves) & (leaves > targets))
+        rep[leaves[keep]] = rep[targets[keep]]
+
+    # Nœuds isolés regroupés deux à deux
+    isolated = np.flatnonzero(degree == 0)
+    if len(isolated) > 1:
+        rep[isolated[1::2]] = isolated[0:len(isolated) - 1:2]
+
+    _, parent = np.unique(rep, return_inverse=True)
+    return parent, int(parent.max()) + 1
+
+
+def _contract_edges(parent: np.ndarray, edges: np.ndarray, weights: np.ndarray):
+    """Arêtes du niveau grossier : doublons fusionnés (poids sommés), sans boucles"""
+    coarse = parent[edges]
+    coarse.sort(axis=1)
+    keep = coarse[:, 0] != coarse[:, 1]
+    coarse, weights = coarse[keep], weights[keep]
+    if not len(coarse):
+        return coarse, weights
+
+    unique, inverse = np.unique(coarse, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    return unique, np.bincount(inverse, weights=weights, minlength=len(unique))
+
+
+def _exact_repulsion(pos: np.ndarray, mass: np.ndarray, k: float) -> np.ndarray:
+    """Répulsion exacte k²/d entre toutes les paires, par blocs de lignes"""
+    n = len(pos)
+    disp = np.zeros((n, 3))
+    block = max(1, CHUNK_SIZE // n)
+
+    for start in range(0, n, block):
+        stop = min(n, start + block)
+        w = (k * k) * mass[None, :] / _squared_distances(pos[start:stop], pos)
+        w[np.arange(stop - start), np.arange(start, stop)] = 0.0
+        disp[start:stop] = _weighted_push(pos[start:stop], pos, w)
+
+    return disp
+
+
+def _grid_repulsion(pos: np.ndarray, mass: np.ndarray, k: float,
+                    rng: np.random.Generator, max_cells: int,
+                    near_cap: int) -> np.ndarray:
+    """Répulsion approchée : exacte dans la cellule, barycentres au-delà"""
+    n = len(pos)
+    disp = np.zeros((n, 3))
+
+    # Environ sqrt(n) cellules non vides : équilibre champ proche / lointain
+    target_cells = int(min(max(np.sqrt(n), 8), max_cells))
+    g = max(1, int(np.ceil(target_cells ** (1.0 / 3.0))))
+
+    lo = pos.min(axis=0)
+    span = max(float((pos.max(axis=0) - lo).max()), 1e-9)
+    cell_size = span / g * (1.0 + 1.0 / g)
+    shift = rng.random(3) * cell_size
+
+    coords = np.floor((pos - lo + shift) / cell_size).astype(np.int64)
+    np.clip(coords, 0, g - 1, out=coords)
+    cell_key = (coords[:, 0] * g + coords[:, 1]) * g + coords[:, 2]
+
+    _, cell, counts = np.unique(cell_key, return_inverse=True, return_counts=True)
+    n_cells = len(counts)
+
+    cell_mass = np.bincount(cell, weights=mass, minlength=n_cells)
+    centroid = np.empty((n_cells, 3))
+    for axis in range(3):
+        centroid[:, axis] = np.bincount(
+            cell, weights=mass * pos[:, axis], minlength=n_cells
+        ) / cell_mass
+
+    # Champ lointain : chaque nœud contre le barycentre des autres cellules
+    block = max(1, CHUNK_SIZE // n_cells)
+    for start in range(0, n, block):
+        stop = min(n, start + block)
+        w = (k * k) * cell_mass[None, :] / _squared_distances(pos[start:stop], centroid)
+        w[np.arange(stop - start), cell[start:stop]] = 0.0
+        disp[start:stop] = _weighted_push(pos[start:stop], centroid, w)
+
+    # Champ proche : paires de la même cellule, échantillonnées au-delà de
+    # near_cap. Les nœuds sont triés par cellule pour que chaque cellule
+    # occupe une plage contiguë (accès mémoire locaux)
+    order = np.argsort(cell, kind='stable')
+    sorted_pos = np.ascontiguousarray(pos[order].T)
+    sorted_mass = mass[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    sorted_cell = cell[order]
+    node_count = counts[sorted_cell]
+    node_start = starts[sorted_cell]
+    reps = np.minimum(node_count, near_cap)
+    bounds = np.concatenate(([0], np.cumsum(reps)))
+
+    near = np.zeros((3, n))
+    start = 0
+    while start < n:
+        stop = int(np.searchsorted(bounds, bounds[start] + CHUNK_SIZE, side='right')) - 1
+        stop = min(n, max(stop, start + 1))
+
+        chunk_reps = reps[start:stop]
+        total = int(bounds[stop] - bounds[start])
+        i_idx = np.repeat(np.arange(start, stop), chunk_reps)
+        local = np.arange(total) - np.repeat(bounds[start:stop] - bounds[start], chunk_reps)
+
+        crowded = np.repeat(node_count[start:stop] > near_cap, chunk_reps)
+        if crowded.any():
+            cell_n = node_count[i_idx[crowded]]
+            local[crowded] = (rng.random(len(cell_n)) * cell_n).astype(np.int64)
+        j_idx = node_start[i_idx] + local
+
+        w = (k * k) * sorted_mass[j_idx] * (node_count / reps)[i_idx]
+        delta = sorted_pos[:, i_idx] - sorted_pos[:, j_idx]
+        d2 = np.einsum('ij,ij->j', delta, delta)
+        np.maximum(d2, 1e-4, out=d2)
+        w /= d2
+        w[i_idx == j_idx] = 0.0
+        for axis in range(3):
+            near[axis, start:stop] = np.bincount(
+                i_idx - start, weights=delta[axis] * w, minlength=stop - start
+            )
+
+        start = stop
+
+    disp[order] += near.T
+    return disp
+
+
+def _squared_distances(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Matrice (len(a), len(b)) des distances au carré, bornée par le bas"""
+    d2 = (a * a).sum(axis=1)[:, None] + (b * b).sum(axis=1)[None, :]
+    d2 -= 2.0 * (a @ b.T)
+    return np.maximum(d2, 1e-4, out=d2)
+
+
+def _weighted_push(a: np.ndarray, b: np.ndarray, w: np.ndarray) -> np.ndarray:
+    """
+    Somme pondérée sum_j w_ij (a_i - b_j), calculée en produit matriciel
+    (a_i * sum_j w_ij - w @ b) pour profiter de BLAS
+    """
+    return a * w.sum(axis=1)[:, None] - w @ b
+
+
+def _rescale(pos: np.ndarray) -> np.ndarray:
+    """Recentre et normalise dans [-1, 1] (équivalent de nx.rescale_layout)"""
+    pos = pos - pos.mean(axis=0)
+    lim = np.abs(pos).max()
+    if lim > 0:
+        pos *= 1.0 / lim
+    return pos
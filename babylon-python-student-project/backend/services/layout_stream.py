@@ -0,0 +1,114 @@
+"""
+Encodage des trames de positions pour le streaming de layout (Socket.IO)
+
+Les positions sont ramenées dans le cube d'affichage [-scale, scale]³
+(même échelle que compute_layout), quantifiées sur 16 bits par axe puis
+encodées en delta par rapport à la trame précédente : seuls les nœuds dont
+la position quantifiée a changé sont envoyés. La transformation (centre,
+facteur) est conservée d'une trame à l'autre pour que les nœuds stables
+ne produisent pas de delta ; elle n'est recalculée, avec une trame
+complète (keyframe), que si le layout sort du cube ou s'y tasse trop.
+Une keyframe est aussi envoyée quand le delta n'est pas plus compact.
+
+Format d'une trame (buffers binaires little-endian) :
+    keyframe: positions = uint16[n * 3]
+    delta:    indices = uint32[k], deltas = int16[k * 3] (ou int32)
+Décodage : p = q / 65535 * 2 * scale - scale
+"""
+import numpy as np
+from typing import Dict, Any, Optional
+
+QUANT_MAX = 65535
+
+# Une nouvelle transformation place le layout à 80% du cube : il peut
+# s'étendre de 25% (ou se tasser jusqu'à 40%) avant la keyframe suivante
+FIT_RATIO = 0.8
+MIN_RATIO = 0.4
+
+
+class PositionFrameEncoder:
+    """Encode les positions successives d'un layout en trames compactes"""
+
+    def __init__(self, graph_id: str, scale: float = 10.0):
+        self.graph_id = graph_id
+        self.scale = scale
+        self.seq = 0
+        self._previous = None
+        self._center = None
+        self._factor = None
+
+    def normalize(self, positions: np.ndarray) -> np.ndarray:
+        """
+        Ramène des positions brutes du moteur dans le cube d'affichage
+        La transformation précédente est réutilisée tant qu'elle convient
+        """
+        if self._center is not None:
+            pos = (positions - self._center) * self._factor
+            lim = np.abs(pos).max() if len(pos) else 0.0
+            if MIN_RATIO * self.scale <= lim <= self.scale:
+                return pos
+
+        # Nouvelle transformation : la trame suivante sera une keyframe
+        self._center = positions.mean(axis=0)
+        pos = positions - self._center
+        lim = np.abs(pos).max() if len(pos) else 0.0
+        self._factor = FIT_RATIO * self.scale / lim if lim > 0 else 1.0
+        self._previous = None
+        return pos * self._factor
+
+    def quantize(self, positions: np.ndarray) -> np.ndarray:
+        """Positions d'affichage -> entiers 16 bits dans le cube [-scale, scale]³"""
+        q = (positions + self.scale) * (QUANT_MAX / (2.0 * self.scale))
+        return np.clip(np.rint(q), 0, QUANT_MAX).astype(np.int32)
+
+    def encode(self, positions: np.ndarray, progress: float = None,
+               normalize: bool = True, keyframe: bool = False) -> Dict[str, Any]:
+        """
+        Encode une trame ; positions brutes (normalize=True) ou déjà à
+        l'échelle d'affichage (positions finales de compute_layout)
+        """
+        if normalize:
+            positions = self.normalize(np.asarray(positions, dtype=np.float64))
+        q = self.quantize(positions)
+
+        frame = {
+            'graph_id': self.graph_id,
+            'seq': self.seq,
+            'progress': progress,
+            'count': len(q),
+            'scale': self.scale,
+            'bits': 16
+        }
+
+        delta = self._encode_delta(q) if not keyframe else None
+        if delta is None:
+            frame['keyframe'] = True
+            frame['positions'] = q.astype('<u2').tobytes()
+        else:
+            frame['keyframe'] = False
+            frame.update(delta)
+
+        self._previous = q
+        self.seq += 1
+        return frame
+
+    def _encode_delta(self, q: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Delta par rapport à la trame précédente, None si une keyframe est plus compacte"""
+        if self._previous is None or len(self._previous) != len(q):
+            return None
+
+        diff = q - self._previous
+        changed = np.flatnonzero(diff.any(axis=1))
+        diff = diff[changed]
+
+        small = len(diff) == 0 or np.abs(diff).max() < 32768
+        delta_type = '<i2' if small else '<i4'
+        delta_size = len(changed) * (4 + 3 * np.dtype(delta_type).itemsize)
+        if delta_size >= q.size * 2:
+            return None
+
+        return {
+            'indices': changed.astype('<u4').tobytes(),
+            'deltas': diff.astype(delta_type).tobytes(),
+            'delta_type': 'int16' if small else 'int32'
+        }
@@ -0,0 +1,225 @@
+"""
+Instrumentation du serveur : compteurs, histogrammes et étapes chronométrées
+
+- metrics.span('layout', layout='force') / @metrics.timed('parse_csv') :
+  durée d'une étape, observée dans l'histogramme graph_stage_seconds et
+  ajoutée aux étapes de la requête en cours (en-tête Server-Timing, profils)
+- metrics.inc / metrics.observe : compteurs et histogrammes nommés,
+  déclarés par metrics.describe (type, aide, bornes des histogrammes)
+- metrics.collector(fonction) : valeurs lues au moment de l'export
+  (statistiques des caches, du stockage, des jobs)
+- metrics.render() : format texte Prometheus (GET /api/metrics)
+
+Les étapes exécutées dans un processus du pool (imports asynchrones) sont
+capturées par metrics.capture() puis rejouées dans le processus serveur
+avec metrics.record_stages().
+"""
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                    1, 2.5, 5, 10, 30, 60, 120)
+BYTES_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9)
+COUNT_BUCKETS = (10, 100, 1e3, 1e4, 1e5, 1e6, 1e7)
+
+# Étape : (nom, labels, durée en secondes)
+Stage = Tuple[str, Dict[str, str], float]
+
+
+class Histogram:
+    """Histogramme cumulatif d'une série (un jeu de labels)"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Séries de métriques du processus, exportées au format Prometheus"""
+
+    def __init__(self):
+        self._definitions = {}  # nom -> (type, aide, bornes)
+        self._series = {}       # nom -> {labels triés: valeur ou Histogram}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Processus du pool créés par fork pendant qu'un autre thread
+        # enregistrait une mesure : verrou recréé libre
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_lock)
+
+    def _reset_lock(self):
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, kind: str, help_text: str,
+                 buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        """Déclare une métrique ('counter', 'gauge' ou 'histogram')"""
+        self._definitions[name] = (kind, help_text, buckets)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _labels_key(labels)
+        with self._lock:
+            series = self._series.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        buckets = self._definitions.get(name, ('histogram', '', DURATION_BUCKETS))[2]
+        key = _labels_key(labels)
+        with self._lock:
+            series = self._series.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def collector(self, collect: Callable[[], List[Tuple[str, str, str, float, Dict[str, Any]]]]):
+        """
+        Enregistre une fonction appelée à chaque export, retournant des
+        échantillons (nom, type, aide, valeur, labels)
+        """
+        self._collectors.append(collect)
+        return collect
+
+    # === ÉTAPES ===
+
+    @contextmanager
+    def span(self, stage: str, **labels) -> Iterator[None]:
+        """Chronomètre une étape (histogramme graph_stage_seconds{stage, ...})"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stages([(stage, labels, time.perf_counter() - start)])
+
+    def timed(self, stage: str):
+        """Décorateur : chronomètre chaque appel de la fonction"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record_stages(self, stages: List[Stage]):
+        """Observe des étapes (mesurées ici ou dans un autre processus)"""
+        captures = getattr(self._local, 'captures', ())
+        for stage, labels, seconds in stages:
+            self.observe('graph_stage_seconds', seconds, stage=stage, **labels)
+            for captured in captures:
+                captured.append((stage, dict(labels), seconds))
+
+    def begin_capture(self) -> List[Stage]:
+        """Commence à relever les étapes exécutées par le thread courant"""
+        stages = []
+        self._local.captures = getattr(self._local, 'captures', ()) + (stages,)
+        return stages
+
+    def end_capture(self, stages: List[Stage]):
+        """Arrête le relevé commencé par begin_capture (sans effet s'il est déjà arrêté)"""
+        captures = getattr(self._local, 'captures', ())
+        self._local.captures = tuple(c for c in captures if c is not stages)
+
+    @contextmanager
+    def capture(self) -> Iterator[List[Stage]]:
+        """Liste des étapes exécutées par le thread courant dans le bloc"""
+        stages = self.begin_capture()
+        try:
+            yield stages
+        finally:
+            self.end_capture(stages)
+
+    # === EXPORT ===
+
+    def render(self) -> str:
+        """Toutes les séries au format texte Prometheus (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            snapshot = {name: dict(series) for name, series in self._series.items()}
+
+        for name in sorted(snapshot):
+            kind, help_text, _ = self._definitions.get(name, ('untyped', '', None))
+            if isinstance(next(iter(snapshot[name].values()), None), Histogram):
+                kind = 'histogram'
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for key, value in sorted(snapshot[name].items()):
+                labels = dict(key)
+                if isinstance(value, Histogram):
+                    cumulative = 0
+                    for bound, count in zip(value.buckets + (float('inf'),), value.counts):
+                        cumulative += count
+                        le = _number(bound)
+                        lines.append(f'{name}_bucket{_format_labels({**labels, "le": le})} {cumulative}')
+                    lines.append(f'{name}_sum{_format_labels(labels)} {_number(value.sum)}')
+                    lines.append(f'{name}_count{_format_labels(labels)} {value.count}')
+                else:
+                    lines.append(f'{name}{_format_labels(labels)} {_number(value)}')
+
+        described = set()
+        for collect in self._collectors:
+            for name, kind, help_text, value, labels in collect():
+                if name not in described:
+                    lines.append(f'# HELP {name} {help_text}')
+                    lines.append(f'# TYPE {name} {kind}')
+                    described.add(name)
+                lines.append(f'{name}{_format_labels(labels)} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels_key(labels: Dict[str, Any]):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ''
+    pairs = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{key}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _number(value: float) -> str:
+    """Valeur au format texte Prometheus (+Inf, -Inf et NaN compris)"""
+    value = float(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return str(int(value)) if value.is_integer() else repr(value)
+
+# Instance globale des métriques
+metrics = MetricsRegistry()
+
+metrics.describe('graph_stage_seconds', 'histogram',
+                 "Durée des étapes de traitement des graphes (parsing, layout, sérialisation...)")
+metrics.describe('http_requests_total', 'counter', "Requêtes HTTP par route, méthode et statut")
+metrics.describe('http_request_seconds', 'histogram', "Durée des requêtes HTTP par route")
+metrics.describe('http_request_bytes', 'histogram', "Taille des corps de requête",
+                 BYTES_BUCKETS)
+metrics.describe('http_response_bytes', 'histogram', "Taille des corps de réponse (hors flux)",
+                 BYTES_BUCKETS)
+metrics.describe('import_job_seconds', 'histogram', "Durée des imports asynchrones par issue")
+metrics.describe('graph_nodes', 'histogram', "Nombre de nœuds des graphes enregistrés",
+                 COUNT_BUCKETS)
+metrics.describe('graph_edges', 'histogram', "Nombre d'arêtes des graphes enregistrés",
+                 COUNT_BUCKETS)
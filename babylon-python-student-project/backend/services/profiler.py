@@ -0,0 +1,134 @@
+"""
+Profilage par échantillonnage des requêtes lentes (opt-in)
+
+Un thread unique relève toutes les PROFILE_INTERVAL_MS millisecondes la
+pile des threads qui traitent une requête suivie (sys._current_frames) ;
+les requêtes ne sont pas ralenties en dehors de ce relevé. À la fin d'une
+requête, le profil n'est conservé que si elle a duré plus de
+PROFILE_SLOW_MS (ou si ?profile=1 a été demandé) : piles agrégées au
+format "collapsed" (une ligne par pile, lisible par flamegraph.pl ou
+speedscope) et étapes chronométrées (services/metrics.py).
+
+Variables d'environnement :
+- PROFILE_REQUESTS : 1 pour suivre toutes les requêtes (défaut 0 : seules
+  les requêtes avec ?profile=1 sont profilées)
+- PROFILE_SLOW_MS : durée au-delà de laquelle un profil est conservé (1000)
+- PROFILE_INTERVAL_MS : intervalle d'échantillonnage (5)
+- PROFILE_KEEP : nombre de profils conservés (les plus récents, 50)
+"""
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional
+
+MAX_DEPTH = 64
+
+
+class RequestProfile:
+    """Piles échantillonnées d'une requête en cours"""
+
+    def __init__(self, thread_id: int, method: str, path: str, forced: bool):
+        self.id = uuid.uuid4().hex[:12]
+        self.thread_id = thread_id
+        self.method = method
+        self.path = path
+        self.forced = forced
+        self.started_at = time.time()
+        self.stacks = Counter()
+        self.samples = 0
+
+
+class ProfilerService:
+    """Échantillonneur partagé et derniers profils de requêtes lentes"""
+
+    def __init__(self):
+        self.enabled = os.environ.get('PROFILE_REQUESTS', '0') == '1'
+        self.slow_seconds = float(os.environ.get('PROFILE_SLOW_MS', 1000)) / 1000
+        self.interval = float(os.environ.get('PROFILE_INTERVAL_MS', 5)) / 1000
+        self.profiles = deque(maxlen=int(os.environ.get('PROFILE_KEEP', 50)))
+        self._active = {}  # thread_id -> RequestProfile
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, method: str, path: str, forced: bool = False) -> Optional[RequestProfile]:
+        """Suit la requête du thread courant (None si le profilage est inactif)"""
+        if not (self.enabled or forced):
+            return None
+        profile = RequestProfile(threading.get_ident(), method, path, forced)
+        with self._lock:
+            self._active[profile.thread_id] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample, name='profiler',
+                                                daemon=True)
+                self._thread.start()
+        return profile
+
+    def finish(self, profile: Optional[RequestProfile], seconds: float, status: int,
+               stages: List) -> Optional[str]:
+        """Arrête le suivi ; identifiant du profil s'il est conservé"""
+        if profile is None:
+            return None
+        with self._lock:
+            self._active.pop(profile.thread_id, None)
+        if not profile.forced and seconds < self.slow_seconds:
+            return None
+        self.profiles.append({
+            'id': profile.id,
+            'method': profile.method,
+            'path': profile.path,
+            'status': status,
+            'started_at': profile.started_at,
+            'seconds': seconds,
+            'samples': profile.samples,
+            'interval_ms': self.interval * 1000,
+            'stages': [{'stage': stage, **labels, 'seconds': duration}
+                       for stage, labels, duration in stages],
+            'stacks': dict(profile.stacks.most_common())
+        })
+        return profile.id
+
+    def _sample(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active.values())
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for profile in active:
+                frame = frames.get(profile.thread_id)
+                if frame is not None:
+                    profile.stacks[_collapse(frame)] += 1
+                    profile.samples += 1
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        """Résumé des profils conservés (le plus récent en premier)"""
+        return [{key: value for key, value in profile.items() if key != 'stacks'}
+                for profile in reversed(self.profiles)]
+
+    def get_profile(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        for profile in self.profiles:
+            if profile['id'] == profile_id:
+                return profile
+        return None
+
+    @staticmethod
+    def collapsed(profile: Dict[str, Any]) -> str:
+        """Piles au format collapsed ('a;b;c nombre' par ligne)"""
+        return ''.join(f'{stack} {count}\n' for stack, count in profile['stacks'].items())
+
+
+def _collapse(frame) -> str:
+    """Pile d'un thread, de la racine vers la fonction en cours"""
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+# Instance globale du service
+profiler = ProfilerService()
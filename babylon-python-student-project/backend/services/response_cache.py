@@ -0,0 +1,202 @@
+"""
+Cache des réponses sérialisées des graphes, compressées à l'avance
+
+Une réponse (graphe complet en JSON ou en binaire, résultat d'un filtre)
+est identifiée par (graph_id, format, variante) ; sa version est un ETag
+faible dérivé de la version des opérations du graphe (persistée avec
+lui) et de ses révisions de structure et de positions (une écriture des
+positions hors opérations change aussi l'ETag) : un client qui renvoie cet ETag
+(If-None-Match) reçoit 304 sans que le graphe soit sérialisé.
+
+Le corps est conservé tel quel et, à la première demande de chaque
+encodage (gzip, et br / zstd si les modules brotli / zstandard sont
+installés), compressé une fois puis conservé : les requêtes suivantes ne
+font qu'une copie mémoire. Les entrées d'un graphe sont invalidées quand
+il est modifié (opérations) ou supprimé ; éviction LRU sous un budget mémoire (RESPONSE_CACHE_MB).
+"""
+import gzip
+import hashlib
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from services.graph_store import StoredGraph
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Corps plus petits : envoyés sans compression
+MIN_COMPRESS_BYTES = 1024
+
+GZIP_LEVEL = int(os.environ.get('RESPONSE_GZIP_LEVEL', 6))
+
+# Surcoût estimé d'une entrée (clé, ETag, dict des encodages)
+_ENTRY_OVERHEAD = 512
+
+
+def _compressors() -> Dict[str, Callable[[bytes], bytes]]:
+    """Encodages disponibles, du plus efficace au plus répandu"""
+    compressors = {}
+    if zstandard is not None:
+        compressors['zstd'] = zstandard.ZstdCompressor(level=9).compress
+    if brotli is not None:
+        compressors['br'] = lambda body: brotli.compress(body, quality=5)
+    compressors['gzip'] = lambda body: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return compressors
+
+COMPRESSORS = _compressors()
+
+
+def graph_etag(graph_id: str, graph: StoredGraph, response_format: str,
+               variant: str = '') -> str:
+    """
+    ETag (sans guillemets) d'une représentation d'un graphe ; change à
+    chaque opération appliquée, changement de structure ou de propriété et
+    écriture des positions, même sans nouvelle version. La génération
+    distingue deux contenus de même version (graphe remplacé par un autre
+    processus partageant le catalogue)
+    """
+    digest = hashlib.blake2b(digest_size=12)
+    state = f'{graph.generation}:{graph.version}:{graph.revision}:{graph.layout_revision}'
+    for part in (graph_id, state, response_format, variant):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class CachedResponse:
+    """Corps d'une réponse et ses versions compressées"""
+
+    def __init__(self, key: Tuple[str, str, str], graph: StoredGraph, etag: str,
+                 body: bytes):
+        self.key = key
+        self.graph = weakref.ref(graph)
+        self.etag = etag
+        self.bodies = {'identity': body}
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(body) for body in self.bodies.values()) + _ENTRY_OVERHEAD
+
+
+class ResponseCache:
+    """Cache LRU de réponses sérialisées sous budget mémoire"""
+
+    def __init__(self, max_bytes: int = None):
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            float(os.environ.get('RESPONSE_CACHE_MB', 256)) * 1024 * 1024
+        )
+        self._entries = OrderedDict()  # (graph_id, format, variante) -> CachedResponse
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.compressions = 0
+        self.evictions = 0
+
+    def get(self, graph_id: str, graph: StoredGraph, response_format: str,
+            build: Callable[[], bytes], variant: str = '') -> CachedResponse:
+        """Réponse en cache pour la version courante du graphe, sinon construite par build()"""
+        key = (graph_id, response_format, variant)
+        etag = graph_etag(graph_id, graph, response_format, variant)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.etag == etag:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        entry = CachedResponse(key, graph, etag, build())
+        with self._lock:
+            self._insert(key, entry)
+        return entry
+
+    def encode(self, entry: CachedResponse,
+               accepted: Iterable[str]) -> Tuple[bytes, Optional[str]]:
+        """
+        (corps, Content-Encoding) pour le premier encodage accepté parmi
+        `accepted` (dans l'ordre de préférence) ; compression faite une fois
+        """
+        body = entry.bodies['identity']
+        if len(body) < MIN_COMPRESS_BYTES:
+            return body, None
+        for encoding in accepted:
+            if encoding not in COMPRESSORS:
+                continue
+            compressed = entry.bodies.get(encoding)
+            if compressed is None:
+                compressed = COMPRESSORS[encoding](body)
+                with self._lock:
+                    self.compressions += 1
+                    if encoding in entry.bodies:  # compressé entre-temps par une autre requête
+                        compressed = entry.bodies[encoding]
+                    else:
+                        entry.bodies[encoding] = compressed
+                        if self._entries.get(entry.key) is entry:
+                            self._bytes += len(compressed)
+                            self._evict()
+            return compressed, encoding
+        return body, None
+
+    def _insert(self, key, entry: CachedResponse):
+        if entry.nbytes > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.nbytes
+        self._entries[key] = entry
+        self._bytes += entry.nbytes
+        self._evict()
+
+    def _evict(self):
+        # Éviction des entrées les moins récemment utilisées
+        while self._bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def invalidate(self, graph_id: str = None, graph: StoredGraph = None):
+        """
+        Retire les réponses d'un graphe, désigné par son id ou par l'objet
+        (modifié, supprimé) ; les entrées périmées ne sont
+        de toute façon jamais servies (ETag différent)
+        """
+        with self._lock:
+            stale = [key for key, entry in self._entries.items()
+                     if key[0] == graph_id or (graph is not None and entry.graph() is graph)]
+            for key in stale:
+                self._bytes -= self._entries.pop(key).nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs du cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'compressions': self.compressions,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'encodings': list(COMPRESSORS)
+            }
+
+# Instance globale du cache
+response_cache = ResponseCache()
@@ -0,0 +1,346 @@
+"""
+Échantillons représentatifs des graphes stockés (aperçu avant le graphe complet)
+
+Un échantillon compte au plus `budget` nœuds, avec leurs positions, et
+les arêtes du sous-graphe qu'ils induisent (au plus `max_edges`, tirées au
+hasard au-delà). Stratégies :
+- top_degree : les nœuds les plus connectés
+- random_walk : marcheurs en parallèle sur l'adjacence CSR, départs tirés
+  selon le degré, saut vers un nouveau départ avec une probabilité
+  RANDOM_WALK_JUMP (ou sur un nœud isolé) ; nœuds retenus dans l'ordre de
+  leur première visite
+- forest_fire : feu de forêt (Leskovec et Faloutsos) : chaque nœud brûlé
+  embrase un nombre géométrique de ses voisins non brûlés (moyenne
+  p / (1 - p), p = FOREST_FIRE_FORWARD) ; un nouveau foyer est tiré
+  quand le feu s'éteint
+- stratified : strates d'une propriété des nœuds ou d'une métrique
+  (services/analytics.py) : une par valeur (texte, booléen, entier peu
+  varié), sinon par quantile (`strata` classes), plus une pour les valeurs
+  absentes ; budget réparti proportionnellement (au moins un nœud par
+  strate), nœuds les plus connectés de chaque strate
+Les tirages dépendent de `seed` et sont reproductibles. Les lignes
+échantillonnées sont conservées pour la révision courante du graphe (les
+positions sont lues à chaque réponse) ; l'aperçu par défaut est calculé en
+arrière-plan après l'import (PREVIEW_ON_IMPORT).
+"""
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+from services.analytics import analytics_service, METRICS
+from services.graph_store import StoredGraph
+from services.graph_traversal import _bounded_int, _expand
+
+STRATEGIES = ('top_degree', 'random_walk', 'forest_fire', 'stratified')
+
+DEFAULT_STRATEGY = 'top_degree'
+DEFAULT_BUDGET = int(os.environ.get('PREVIEW_BUDGET', 2000))
+MAX_BUDGET = 100000
+
+# Arêtes conservées par défaut : EDGE_RATIO fois le budget de nœuds
+EDGE_RATIO = 4
+MAX_EDGES = 1000000
+
+DEFAULT_STRATA = 10
+MAX_STRATA = 100
+
+RANDOM_WALK_JUMP = 0.15
+RANDOM_WALK_WALKERS = 64
+# Pas de marche au plus, en multiple du budget
+RANDOM_WALK_MAX_STEPS = 100
+
+FOREST_FIRE_FORWARD = 0.7
+
+# Échantillons conservés par graphe (les moins récemment demandés sont oubliés)
+SAMPLES_PER_GRAPH = 16
+
+
+def _degree_order(degrees: np.ndarray) -> np.ndarray:
+    """Lignes par degré décroissant (ordre des lignes en cas d'égalité)"""
+    return np.argsort(-degrees, kind='stable')
+
+
+def top_degree(graph: StoredGraph, budget: int) -> np.ndarray:
+    degrees = graph.degrees()
+    if budget < len(degrees):
+        # Sélection partielle puis tri des seuls nœuds retenus
+        threshold = np.partition(-degrees, budget - 1)[budget - 1]
+        candidates = np.flatnonzero(-degrees <= threshold)
+        return candidates[_degree_order(degrees[candidates])][:budget]
+    return _degree_order(degrees)
+
+
+def _start_sampler(degrees: np.ndarray, rng: np.random.Generator):
+    """Tirage de nœuds de départ proportionnellement à (degré + 1)"""
+    cumulative = np.cumsum(degrees + 1.0)
+    return lambda count: np.searchsorted(cumulative, rng.random(count) * cumulative[-1],
+                                         side='right')
+
+
+def _unseen(seen: np.ndarray, rng: np.random.Generator) -> int:
+    """Nœud tiré au hasard parmi ceux qui ne sont pas encore retenus"""
+    for _ in range(32):
+        row = int(rng.integers(len(seen)))
+        if not seen[row]:
+            return row
+    unseen = np.flatnonzero(~seen)
+    return int(unseen[rng.integers(len(unseen))])
+
+
+def _add_new(rows: np.ndarray, seen: np.ndarray, sample: list, count: int,
+             budget: int) -> int:
+    """
+    Ajoute à `sample` les nœuds non encore retenus (ordre de première
+    apparition, dans la limite du budget) ; retourne le nombre retenu
+    """
+    rows = rows[~seen[rows]]
+    if len(rows):
+        _, first = np.unique(rows, return_index=True)
+        rows = rows[np.sort(first)][:budget - count]
+        seen[rows] = True
+        sample.append(rows)
+        count += len(rows)
+    return count
+
+
+def random_walk(graph: StoredGraph, budget: int, seed: int) -> np.ndarray:
+    n = graph.node_count
+    indptr, neighbors, _ = graph.csr()
+    degrees = np.diff(indptr)
+    rng = np.random.default_rng(seed)
+    starts = _start_sampler(degrees, rng)
+    seen = np.zeros(n, dtype=bool)
+    sample = []
+
+    walkers = starts(min(RANDOM_WALK_WALKERS, budget))
+    count = _add_new(walkers, seen, sample, 0, budget)
+    for _ in range(RANDOM_WALK_MAX_STEPS * budget // len(walkers) + 1):
+        if count >= budget:
+            break
+        d = degrees[walkers]
+        jump = (d == 0) | (rng.random(len(walkers)) < RANDOM_WALK_JUMP)
+        moving = ~jump
+        offsets = (rng.random(int(moving.sum())) * d[moving]).astype(np.int64)
+        walkers = walkers.copy()
+        walkers[moving] = neighbors[indptr[walkers[moving]] + offsets]
+        if jump.any():
+            walkers[jump] = starts(int(jump.sum()))
+        count = _add_new(walkers, seen, sample, count, budget)
+    return np.concatenate(sample)
+
+
+def forest_fire(graph: StoredGraph, budget: int, seed: int,
+                forward: float = FOREST_FIRE_FORWARD) -> np.ndarray:
+    n = graph.node_count
+    indptr, neighbors, edge_ids = graph.csr()
+    rng = np.random.default_rng(seed)
+    seen = np.zeros(n, dtype=bool)
+    sample = []
+    count = 0
+
+    while count < budget:
+        # Nouveau foyer parmi les nœuds non brûlés
+        front = np.array([_unseen(seen, rng)], dtype=np.int64)
+        count = _add_new(front, seen, sample, count, budget)
+        while count < budget:
+            owner, found, _ = _expand(indptr, neighbors, edge_ids, front)
+            keep = ~seen[found]
+            owner, found = owner[keep], found[keep]
+            if not len(found):
+                break
+            # Voisins de chaque nœud dans un ordre aléatoire, les `burn` premiers embrasés
+            order = np.lexsort((rng.random(len(found)), owner))
+            owner, found = owner[order], found[order]
+            starts = np.flatnonzero(np.r_[True, owner[1:] != owner[:-1]])
+            lengths = np.diff(np.r_[starts, len(owner)])
+            rank = np.arange(len(owner)) - np.repeat(starts, lengths)
+            burn = rng.geometric(1 - forward, size=len(starts)) - 1
+            before = count
+            count = _add_new(found[rank < np.repeat(burn, lengths)], seen, sample,
+                             count, budget)
+            if count == before:
+                break
+            front = sample[-1]
+    return np.concatenate(sample)
+
+
+def _strata(graph: StoredGraph, prop: str, strata: int) -> np.ndarray:
+    """Strate de chaque nœud pour une propriété ou une métrique"""
+    column = graph.node_columns.get(prop)
+    if column is None and prop in METRICS:
+        column = analytics_service.column(graph, prop)
+    if column is None:
+        raise ValueError(f"Propriété inconnue: {prop}")
+
+    n = graph.node_count
+    present = np.ones(n, dtype=bool) if column.mask is None else np.asarray(column.mask[:n])
+    labels = np.zeros(n, dtype=np.int64)
+    if column.kind == 'object':
+        _, codes = np.unique([str(value) for value in column.values[:n]], return_inverse=True)
+        labels[:] = codes
+    else:
+        values = np.asarray(column.values[:n])
+        distinct = np.unique(values[present])
+        if column.kind in ('str', 'bool') or len(distinct) <= strata:
+            labels[present] = np.searchsorted(distinct, values[present])
+        else:
+            edges = np.unique(np.quantile(values[present].astype(np.float64),
+                                          np.linspace(0, 1, strata + 1)[1:-1]))
+            labels[present] = np.searchsorted(edges, values[present], side='right')
+    # Valeurs absentes : strate à part
+    labels[~present] = labels.max(initial=-1) + 1
+    return labels
+
+
+def stratified(graph: StoredGraph, budget: int, prop: str, strata: int) -> np.ndarray:
+    labels = _strata(graph, prop, strata)
+    sizes = np.bincount(labels)
+    occupied = np.flatnonzero(sizes)
+
+    # Répartition proportionnelle (plus forts restes), au moins un nœud par strate
+    quota = np.zeros(len(sizes), dtype=np.int64)
+    if budget >= len(occupied):
+        quota[occupied] = 1
+    share = (budget - quota.sum()) * sizes / sizes.sum()
+    quota += np.minimum(np.floor(share).astype(np.int64), sizes - quota)
+    remainder = np.argsort(-(share - np.floor(share)), kind='stable')
+    while quota.sum() < budget:
+        for stratum in remainder.tolist():
+            if quota.sum() >= budget:
+                break
+            if quota[stratum] < sizes[stratum]:
+                quota[stratum] += 1
+
+    degrees = graph.degrees()
+    order = np.lexsort((-degrees, labels))
+    starts = np.r_[0, np.cumsum(sizes)[:-1]]
+    rank = np.arange(len(order)) - starts[labels[order]]
+    rows = order[rank < quota[labels[order]]]
+    return rows[_degree_order(degrees[rows])]
+
+
+def induced_edges(graph: StoredGraph, rows: np.ndarray, max_edges: int,
+                  seed: int) -> Tuple[np.ndarray, bool]:
+    """Arêtes entre les nœuds retenus (au plus max_edges, tirées au hasard) ; tronqué ?"""
+    member = np.zeros(len(graph.ids), dtype=bool)
+    member[rows] = True
+    edges = np.flatnonzero(member[graph.src] & member[graph.dst])
+    if len(edges) <= max_edges:
+        return edges, False
+    chosen = np.random.default_rng(seed).choice(len(edges), size=max_edges, replace=False)
+    return edges[np.sort(chosen)], True
+
+
+class GraphSamples:
+    """Échantillons d'une révision d'un graphe"""
+
+    def __init__(self, graph: StoredGraph):
+        self.revision = graph.revision
+        self.samples = OrderedDict()  # paramètres -> (lignes des nœuds, arêtes, tronqué)
+        self.lock = threading.Lock()
+
+
+class SamplingService:
+    """Aperçus des graphes stockés, conservés tant que leur structure ne change pas"""
+
+    def __init__(self, workers: int = 1):
+        self._samples = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.on_import = os.environ.get('PREVIEW_ON_IMPORT', '1') != '0'
+        self.workers = workers
+        self._executor = None
+
+    def params(self, strategy: Any = None, budget: Any = None, prop: Any = None,
+               strata: Any = None, seed: Any = None, max_edges: Any = None) -> Dict[str, Any]:
+        """Paramètres d'un échantillon, validés et complétés (ValueError)"""
+        strategy = strategy or DEFAULT_STRATEGY
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Stratégie inconnue: {strategy} "
+                             f"(disponibles: {', '.join(STRATEGIES)})")
+        budget = _bounded_int(budget, 'budget', DEFAULT_BUDGET, 1, MAX_BUDGET)
+        params = {
+            'strategy': strategy,
+            'budget': budget,
+            'max_edges': _bounded_int(max_edges, 'max_edges',
+                                      min(budget * EDGE_RATIO, MAX_EDGES), 0, MAX_EDGES),
+            'seed': _bounded_int(seed, 'seed', 0, 0, 2 ** 32 - 1)
+        }
+        if strategy == 'stratified':
+            if not prop:
+                raise ValueError("Paramètre property requis pour la stratégie stratified")
+            params['property'] = prop
+            params['strata'] = _bounded_int(strata, 'strata', DEFAULT_STRATA, 1, MAX_STRATA)
+        return params
+
+    def sample_rows(self, graph: StoredGraph, params: Dict[str, Any]):
+        """(lignes des nœuds, arêtes, arêtes tronquées ?) pour des paramètres validés"""
+        with self._lock:
+            samples = self._samples.get(graph)
+            if samples is None or samples.revision != graph.revision:
+                samples = self._samples[graph] = GraphSamples(graph)
+        key = tuple(sorted(params.items()))
+        # Un seul calcul par échantillon même en cas d'appels concurrents
+        with samples.lock:
+            result = samples.samples.get(key)
+            if result is None:
+                result = self._compute(graph, params)
+                samples.samples[key] = result
+                while len(samples.samples) > SAMPLES_PER_GRAPH:
+                    samples.samples.popitem(last=False)
+            samples.samples.move_to_end(key)
+        return result
+
+    def _compute(self, graph: StoredGraph, params: Dict[str, Any]):
+        budget = params['budget']
+        strategy = params['strategy']
+        if budget >= graph.node_count:
+            rows = np.arange(graph.node_count)
+        elif strategy == 'top_degree':
+            rows = top_degree(graph, budget)
+        elif strategy == 'random_walk':
+            rows = random_walk(graph, budget, params['seed'])
+        elif strategy == 'forest_fire':
+            rows = forest_fire(graph, budget, params['seed'])
+        else:
+            rows = stratified(graph, budget, params['property'], params['strata'])
+        edges, truncated = induced_edges(graph, rows, params['max_edges'], params['seed'])
+        return rows, edges, truncated
+
+    def preview(self, graph: StoredGraph, params: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Échantillon du graphe pour des paramètres validés par params() :
+        {strategy, budget, ..., nodes (avec positions), edges, node_count,
+        edge_count (graphe complet), complete, edges_truncated}
+        """
+        params = params or self.params()
+        rows, edges, truncated = self.sample_rows(graph, params)
+        return {
+            **params,
+            'revision': graph.revision,
+            'node_count': graph.node_count,
+            'edge_count': graph.edge_count,
+            'complete': len(rows) == graph.node_count and len(edges) == graph.edge_count,
+            'edges_truncated': truncated,
+            'nodes': graph.node_dicts(rows),
+            'edges': graph.edge_dicts(edges)
+        }
+
+    def schedule(self, graph: StoredGraph):
+        """Calcule l'aperçu par défaut en arrière-plan (après un import)"""
+        if not self.on_import or graph.node_count <= DEFAULT_BUDGET:
+            return
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix='sampling')
+            executor = self._executor
+        # Une erreur en arrière-plan est ignorée : la demande suivante recalcule
+        executor.submit(self.sample_rows, graph, self.params())
+
+# Instance globale du service
+sampling_service = SamplingService()
@@ -0,0 +1,219 @@
+"""
+Index spatial (octree linéaire) des positions d'un graphe stocké
+
+Les positions sont quantifiées sur 21 bits par axe dans le cube englobant
+et converties en codes de Morton (z-order) triés : chaque cellule de
+l'octree correspond à un intervalle contigu du tableau trié. Les requêtes
+descendent l'arbre niveau par niveau de façon vectorisée :
+- cellule hors de la région : ignorée
+- cellule entièrement dans la région : tous ses points sont retenus
+- cellule partielle : subdivisée, ou ses points testés un par un quand
+  elle en contient peu (LEAF_SIZE)
+Une région est un ensemble de demi-espaces a·x + b·y + c·z + d >= 0 :
+boîte englobante (6 plans) ou frustum de caméra.
+"""
+import threading
+import weakref
+import numpy as np
+from typing import Optional, Sequence, Tuple
+
+from services.graph_store import StoredGraph
+
+MORTON_BITS = 21
+LEAF_SIZE = 128
+
+
+def _spread_bits(v: np.ndarray) -> np.ndarray:
+    """Intercale deux zéros entre chaque bit (21 bits -> 63 bits)"""
+    v = v.astype(np.uint64) & np.uint64(0x1FFFFF)
+    v = (v | (v << np.uint64(32))) & np.uint64(0x1F00000000FFFF)
+    v = (v | (v << np.uint64(16))) & np.uint64(0x1F0000FF0000FF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x100F00F00F00F00F)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x10C30C30C30C30C3)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x1249249249249249)
+    return v
+
+
+def box_planes(low: Sequence[float], high: Sequence[float]) -> np.ndarray:
+    """Boîte [low, high] en 6 demi-espaces"""
+    planes = np.zeros((6, 4))
+    for axis in range(3):
+        planes[2 * axis, axis] = 1.0
+        planes[2 * axis, 3] = -float(low[axis])
+        planes[2 * axis + 1, axis] = -1.0
+        planes[2 * axis + 1, 3] = float(high[axis])
+    return planes
+
+
+def _ranges_to_indices(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatène les intervalles [start, end) en un tableau d'indices"""
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+    return offsets + np.arange(total)
+
+
+class Octree:
+    """Octree linéaire (codes de Morton triés) sur des positions (n, 3)"""
+
+    def __init__(self, positions: np.ndarray):
+        self.positions = positions
+        n = len(positions)
+        if n:
+            low = positions.min(axis=0).astype(np.float64)
+            high = positions.max(axis=0).astype(np.float64)
+        else:
+            low = high = np.zeros(3)
+        # Cube englobant avec une marge pour absorber de petits déplacements
+        size = max(float((high - low).max()), 1e-6)
+        self.origin = (low + high) / 2 - size
+        self.size = 2 * size
+        self.codes = self._encode(positions)
+        self._sort()
+
+    def _encode(self, points: np.ndarray) -> np.ndarray:
+        scale = (1 << MORTON_BITS) / self.size
+        q = np.floor((np.asarray(points, dtype=np.float64) - self.origin) * scale)
+        q = np.clip(q, 0, (1 << MORTON_BITS) - 1).astype(np.uint64)
+        return (_spread_bits(q[:, 0])
+                | (_spread_bits(q[:, 1]) << np.uint64(1))
+                | (_spread_bits(q[:, 2]) << np.uint64(2)))
+
+    def _sort(self):
+        self.order = np.argsort(self.codes, kind='stable')
+        self.sorted_codes = self.codes[self.order]
+
+    def contains(self, points: np.ndarray) -> bool:
+        """Vrai si les points restent dans le cube de l'octree"""
+        points = np.asarray(points, dtype=np.float64)
+        return bool(np.all(points >= self.origin) and np.all(points < self.origin + self.size))
+
+    def update(self, rows: np.ndarray) -> bool:
+        """
+        Réindexe des points déplacés (positions déjà modifiées en place)
+        Retourne False si un point sort du cube : reconstruction nécessaire
+        """
+        points = self.positions[rows]
+        if not self.contains(points):
+            return False
+        self.codes[rows] = self._encode(points)
+        # Tableau presque trié : le tri stable (timsort) reste quasi linéaire
+        self._sort()
+        return True
+
+    def query(self, planes: np.ndarray) -> np.ndarray:
+        """Indices des points dans l'intersection des demi-espaces"""
+        planes = np.asarray(planes, dtype=np.float64).reshape(-1, 4)
+        normals, offsets = planes[:, :3], planes[:, 3]
+        n = len(self.sorted_codes)
+        if n == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        # Frontière : cellules (coordonnées entières) et intervalles triés
+        cells = np.zeros((1, 3), dtype=np.int64)
+        starts = np.array([0])
+        ends = np.array([n])
+        prefixes = np.zeros(1, dtype=np.uint64)
+        whole, partial = [], []
+
+        for level in range(MORTON_BITS + 1):
+            width = self.size / (1 << level)
+            low = self.origin + cells * width
+            high = low + width
+            # Coin le plus favorable / défavorable de chaque cellule pour chaque plan
+            best = (np.maximum(low[:, None, :] * normals, high[:, None, :] * normals).sum(axis=2)
+                    + offsets)
+            worst = (np.minimum(low[:, None, :] * normals, high[:, None, :] * normals).sum(axis=2)
+                     + offsets)
+            outside = (best < 0).any(axis=1)
+            inside = (worst >= 0).all(axis=1) & ~outside
+
+            whole.append((starts[inside], ends[inside]))
+            rest = ~outside & ~inside
+            small = rest & ((ends - starts <= LEAF_SIZE) | (level == MORTON_BITS))
+            partial.append((starts[small], ends[small]))
+
+            split = rest & ~small
+            if not split.any():
+                break
+
+            # Subdivision : 8 enfants par cellule, bornes par recherche dichotomique
+            shift = np.uint64(3 * (MORTON_BITS - level - 1))
+            child_prefixes = (prefixes[split][:, None] * np.uint64(8)
+                              + np.arange(9, dtype=np.uint64)[None, :])
+            bounds = np.searchsorted(self.sorted_codes, (child_prefixes << shift).ravel())
+            bounds = bounds.reshape(-1, 9)
+            child = np.arange(8)
+            bits = np.stack([child & 1, (child >> 1) & 1, (child >> 2) & 1], axis=1)
+
+            cells = (cells[split][:, None, :] * 2 + bits[None, :, :]).reshape(-1, 3)
+            prefixes = child_prefixes[:, :8].ravel()
+            starts = bounds[:, :8].ravel()
+            ends = bounds[:, 1:].ravel()
+            nonempty = ends > starts
+            cells, prefixes = cells[nonempty], prefixes[nonempty]
+            starts, ends = starts[nonempty], ends[nonempty]
+
+        selected = self.order[_ranges_to_indices(
+            np.concatenate([s for s, _ in whole]), np.concatenate([e for _, e in whole])
+        )]
+        candidates = self.order[_ranges_to_indices(
+            np.concatenate([s for s, _ in partial]), np.concatenate([e for _, e in partial])
+        )]
+        if len(candidates):
+            points = self.positions[candidates].astype(np.float64)
+            keep = ((points @ normals.T + offsets) >= 0).all(axis=1)
+            selected = np.concatenate([selected, candidates[keep]])
+        return selected
+
+
+class SpatialIndexService:
+    """Octrees des graphes stockés, construits à la première requête"""
+
+    def __init__(self):
+        self._trees = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self, graph: StoredGraph) -> Octree:
+        """Octree à jour du graphe (reconstruit si les positions ont été remplacées)"""
+        if graph.positions is None:
+            raise ValueError("Graphe sans positions : calculer un layout d'abord")
+        with self._lock:
+            tree = self._trees.get(graph)
+            if tree is None or tree.positions is not graph.positions:
+                tree = self._trees[graph] = Octree(graph.positions)
+            return tree
+
+    def update(self, graph: StoredGraph, rows: np.ndarray):
+        """Mise à jour incrémentale après déplacement de quelques nœuds"""
+        with self._lock:
+            tree = self._trees.get(graph)
+            if tree is None or tree.positions is not graph.positions:
+                return
+            if not tree.update(rows):
+                self._trees[graph] = Octree(graph.positions)
+
+    def query(self, graph: StoredGraph, planes: np.ndarray,
+              camera: Optional[Sequence[float]] = None,
+              limit: int = None) -> Tuple[np.ndarray, int]:
+        """
+        Nœuds dans la région, du plus proche au plus lointain de la caméra
+        (ordre des nœuds sans caméra) ; seuls les `limit` premiers sont
+        triés et retournés. Retourne (lignes, nombre total dans la région)
+        """
+        rows = self.get(graph).query(planes)
+        total = len(rows)
+        if camera is None:
+            rows = np.sort(rows)
+            return (rows[:limit] if limit is not None else rows), total
+
+        distances = ((graph.positions[rows] - np.asarray(camera, dtype=np.float32)) ** 2).sum(axis=1)
+        if limit is not None and limit < total:
+            nearest = np.argpartition(distances, limit - 1)[:limit] if limit > 0 else []
+            rows, distances = rows[nearest], distances[nearest]
+        return rows[np.argsort(distances, kind='stable')], total
+
+# Instance globale du service
+spatial_index = SpatialIndexService()
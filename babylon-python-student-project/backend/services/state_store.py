@@ -0,0 +1,388 @@
+"""
+Stockage des états sauvegardés des graphes (caméra, nœuds visibles, filtres)
+
+Les états ne font plus partie du graphe : ni de sa mémoire, ni de ses
+réponses. Ils sont conservés dans une base SQLite à part (states.sqlite
+dans GRAPH_STORE_DIR, en mémoire si la persistance est désactivée) :
+- snapshots : une ligne par état (nom, dates, taille), lue seule pour les
+  listes ; le contenu est dans un blob
+- blobs : contenus compressés, identifiés par le hash du contenu (un état
+  identique à un état existant réutilise son blob), avec compteur de
+  références
+Encodage d'un état :
+- visible_nodes : liste d'ids si l'ensemble est petit, sinon bitset sur la
+  table des ids du graphe (blob partagé par tous les états d'une même
+  version des nœuds) ; ordre et doublons ne sont pas conservés
+- delta par rapport à l'état parent (le précédent du graphe par défaut) :
+  champs modifiés / supprimés, bitset en XOR ; au plus MAX_DELTA_DEPTH
+  deltas successifs, le chargement reste proportionnel à la taille de l'état
+Au-delà de STATE_RETENTION états par graphe, les plus anciens sont
+supprimés (un blob reste tant qu'un delta s'appuie dessus).
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.graph_catalog import graph_catalog
+from services.graph_store import StoredGraph
+
+# Deltas successifs au plus avant un état complet
+MAX_DELTA_DEPTH = 8
+
+# Bitset utilisé au-delà d'un nœud visible sur BITSET_DENSITY
+BITSET_DENSITY = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id TEXT PRIMARY KEY,
+    graph_id TEXT NOT NULL,
+    name TEXT,
+    timestamp TEXT,
+    created_at REAL,
+    blob TEXT NOT NULL,
+    size INTEGER,
+    visible_count INTEGER
+);
+CREATE INDEX IF NOT EXISTS snapshots_graph ON snapshots (graph_id, created_at);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    base TEXT,
+    ids TEXT,
+    depth INTEGER NOT NULL,
+    body BLOB NOT NULL,
+    refs INTEGER NOT NULL
+);
+"""
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _canonical(value: Any) -> bytes:
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def _pack(header: Dict[str, Any], payload: bytes = b'') -> bytes:
+    text = _canonical(header)
+    return zlib.compress(len(text).to_bytes(4, 'little') + text + payload)
+
+
+def _unpack(body: bytes) -> Tuple[Dict[str, Any], bytes]:
+    raw = zlib.decompress(body)
+    size = int.from_bytes(raw[:4], 'little')
+    return json.loads(raw[4:4 + size]), raw[4 + size:]
+
+
+class StateStore:
+    """États sauvegardés par graphe, dédupliqués et encodés en delta"""
+
+    def __init__(self, catalog=graph_catalog, retention: int = None):
+        self.catalog = catalog
+        self.retention = retention or int(os.environ.get('STATE_RETENTION', 100))
+        self._db = None
+        self._lock = threading.RLock()
+        self._id_tables = weakref.WeakKeyDictionary()  # StoredGraph -> (revision, hash, bytes)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connexion unique partagée entre les threads (accès sous verrou)
+        if self._db is None:
+            path = ':memory:'
+            if self.catalog.enabled:
+                os.makedirs(self.catalog.store_dir, exist_ok=True)
+                path = os.path.join(self.catalog.store_dir, 'states.sqlite')
+            db = sqlite3.connect(path, timeout=10, check_same_thread=False)
+            if path != ':memory:':
+                db.execute('PRAGMA journal_mode=WAL')
+            db.executescript(_SCHEMA)
+            self._db = db
+        return self._db
+
+    # === ÉCRITURE ===
+
+    def save(self, graph_id: str, graph: StoredGraph, data: Dict[str, Any],
+             name: str = None, timestamp: Any = None, parent_id: str = None,
+             state_id: str = None, created_at: float = None) -> Dict[str, Any]:
+        """
+        Enregistre un état ; parent_id : état de référence du delta (par
+        défaut le dernier état du graphe). Retourne sa description
+        """
+        if not isinstance(data, dict):
+            raise ValueError("État invalide: objet JSON attendu")
+        visible = data.get('visible_nodes')
+        if visible is not None and not isinstance(visible, list):
+            raise ValueError("visible_nodes: liste d'identifiants attendue")
+
+        fields = {key: value for key, value in data.items() if key != 'visible_nodes'}
+        members = None if visible is None else sorted({json.dumps(node_id, default=str)
+                                                        for node_id in visible})
+        content_hash = _digest(_canonical([fields, members]))
+        state_id = state_id or str(uuid.uuid4())
+        created_at = created_at or time.time()
+
+        with self._lock, self._connect() as db:
+            existing = db.execute('SELECT id, name, timestamp, created_at, size, visible_count '
+                                  'FROM snapshots WHERE id = ?', (state_id,)).fetchone()
+            if existing is not None:
+                return self._describe(existing)
+            if parent_id is not None:
+                parent = db.execute('SELECT blob FROM snapshots WHERE id = ? AND graph_id = ?',
+                                    (parent_id, graph_id)).fetchone()
+                if parent is None:
+                    raise ValueError(f"État parent inconnu: {parent_id}")
+            else:
+                parent = db.execute('SELECT blob FROM snapshots WHERE graph_id = ? '
+                                    'ORDER BY created_at DESC LIMIT 1', (graph_id,)).fetchone()
+
+            row = db.execute('SELECT length(body) FROM blobs WHERE hash = ?',
+                             (content_hash,)).fetchone()
+            if row is not None:
+                # Contenu déjà stocké : blob partagé
+                db.execute('UPDATE blobs SET refs = refs + 1 WHERE hash = ?', (content_hash,))
+                size = row[0]
+            else:
+                size = self._write_blob(db, content_hash, graph, fields, visible,
+                                        parent[0] if parent else None)
+
+            db.execute(
+                'INSERT INTO snapshots (id, graph_id, name, timestamp, created_at, blob, size, '
+                'visible_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (state_id, graph_id, name, None if timestamp is None else str(timestamp),
+                 created_at, content_hash, size, None if visible is None else len(visible))
+            )
+            self._apply_retention(db, graph_id)
+        return self._describe((state_id, name, timestamp, created_at, size,
+                               None if visible is None else len(visible)))
+
+    def _write_blob(self, db: sqlite3.Connection, content_hash: str, graph: StoredGraph,
+                    fields: Dict[str, Any], visible: Optional[List[Any]],
+                    parent_hash: Optional[str]) -> int:
+        """Encode un état (delta si possible) ; retourne la taille stockée"""
+        base = None
+        if parent_hash is not None:
+            row = db.execute('SELECT depth, ids FROM blobs WHERE hash = ?',
+                             (parent_hash,)).fetchone()
+            if row is not None and row[0] < MAX_DELTA_DEPTH:
+                base = (parent_hash, row[0], row[1])
+
+        header = {}
+        payload = b''
+        ids_hash = None
+        base_fields, base_bits = ({}, None) if base is None else self._decode(db, base[0], raw=True)
+
+        if base is None:
+            header['fields'] = fields
+        else:
+            header['set'] = {key: value for key, value in fields.items()
+                             if key not in base_fields or _canonical(base_fields[key]) != _canonical(value)}
+            header['unset'] = [key for key in base_fields if key not in fields]
+
+        if visible is not None:
+            index = graph.index
+            rows = [index.get(node_id) for node_id in visible]
+            header['missing'] = [node_id for node_id, row in zip(visible, rows)
+                                 if row is None or row >= graph.node_count]
+            rows = np.array([row for row in rows if row is not None and row < graph.node_count],
+                            dtype=np.int64)
+            if len(rows) * BITSET_DENSITY < graph.node_count:
+                header['visible'] = [graph.ids[row] for row in np.unique(rows).tolist()]
+            else:
+                ids_hash = self._id_table(db, graph)
+                bits = np.zeros(graph.node_count, dtype=bool)
+                bits[rows] = True
+                packed = np.packbits(bits)
+                header['bitset'] = graph.node_count
+                if base is not None and base[2] == ids_hash and base_bits is not None \
+                        and len(base_bits) == len(packed):
+                    header['xor'] = True
+                    packed = packed ^ base_bits
+                payload = packed.tobytes()
+
+        body = _pack(header, payload)
+        db.execute('INSERT INTO blobs (hash, base, ids, depth, body, refs) VALUES (?, ?, ?, ?, ?, 1)',
+                   (content_hash, base[0] if base else None, ids_hash,
+                    base[1] + 1 if base else 0, body))
+        if base is not None:
+            db.execute('UPDATE blobs SET refs = refs + 1 WHERE hash = ?', (base[0],))
+        if ids_hash is not None:
+            db.execute('UPDATE blobs SET refs = refs + 1 WHERE hash = ?', (ids_hash,))
+        return len(body)
+
+    def _id_hash(self, graph: StoredGraph) -> Tuple[str, bytes]:
+        """(hash, JSON) de la table des ids du graphe, recalculés à chaque révision"""
+        cached = self._id_tables.get(graph)
+        if cached is None or cached[0] != graph.revision:
+            text = _canonical(list(graph.ids[:graph.node_count]))
+            cached = (graph.revision, 'ids:' + _digest(text), text)
+            self._id_tables[graph] = cached
+        return cached[1:]
+
+    def _id_table(self, db: sqlite3.Connection, graph: StoredGraph) -> str:
+        """Hash de la table des ids du graphe (écrite une fois par contenu)"""
+        ids_hash, text = self._id_hash(graph)
+        if db.execute('SELECT 1 FROM blobs WHERE hash = ?', (ids_hash,)).fetchone() is None:
+            db.execute('INSERT INTO blobs (hash, base, ids, depth, body, refs) VALUES (?, NULL, NULL, 0, ?, 0)',
+                       (ids_hash, zlib.compress(text)))
+        return ids_hash
+
+    # === LECTURE ===
+
+    def _decode(self, db: sqlite3.Connection, blob_hash: str, raw: bool = False):
+        """
+        (champs, bitset compressé ou ids visibles) d'un blob, deltas résolus
+        (au plus MAX_DELTA_DEPTH blobs lus)
+        """
+        chain = []
+        while blob_hash is not None:
+            base, ids_hash, body = db.execute('SELECT base, ids, body FROM blobs WHERE hash = ?',
+                                              (blob_hash,)).fetchone()
+            chain.append((ids_hash, body))
+            blob_hash = base
+
+        fields, bits, visible, ids_hash = {}, None, None, None
+        for ids_hash, body in reversed(chain):
+            header, payload = _unpack(body)
+            if 'fields' in header:
+                fields = dict(header['fields'])
+            else:
+                fields.update(header['set'])
+                for key in header['unset']:
+                    fields.pop(key, None)
+            if 'bitset' in header:
+                packed = np.frombuffer(payload, dtype=np.uint8)
+                bits = packed ^ bits if header.get('xor') else packed
+                visible = (header['missing'], header['bitset'])
+            elif 'visible' in header:
+                bits = None
+                visible = (header['missing'], header['visible'])
+            else:
+                bits, visible = None, None
+        if raw:
+            return fields, bits
+        return fields, bits, visible, ids_hash
+
+    def load(self, graph_id: str, state_id: str,
+             graph: StoredGraph = None) -> Optional[Dict[str, Any]]:
+        """État complet {id, name, timestamp, created_at, data} (None si inconnu)"""
+        with self._lock:
+            db = self._connect()
+            row = db.execute('SELECT id, name, timestamp, created_at, size, visible_count, blob '
+                             'FROM snapshots WHERE id = ? AND graph_id = ?',
+                             (state_id, graph_id)).fetchone()
+            if row is None:
+                return None
+            fields, bits, visible, ids_hash = self._decode(db, row[6])
+            if visible is not None and bits is not None:
+                missing, node_count = visible
+                rows = np.flatnonzero(np.unpackbits(bits, count=node_count))
+                ids = self._ids_for(db, graph, ids_hash)
+                fields['visible_nodes'] = [ids[r] for r in rows.tolist()] + missing
+            elif visible is not None:
+                missing, ids = visible
+                fields['visible_nodes'] = ids + missing
+
+        state = self._describe(row[:6])
+        state['data'] = fields
+        return state
+
+    def _ids_for(self, db: sqlite3.Connection, graph: Optional[StoredGraph],
+                 ids_hash: str) -> List[Any]:
+        """Table des ids d'un bitset : celle du graphe ouvert si elle n'a pas changé"""
+        if graph is not None and self._id_hash(graph)[0] == ids_hash:
+            return graph.ids
+        body = db.execute('SELECT body FROM blobs WHERE hash = ?', (ids_hash,)).fetchone()[0]
+        return json.loads(zlib.decompress(body))
+
+    def import_states(self, graph_id: str, graph: StoredGraph, states: Dict[str, Any]):
+        """
+        Reprend les états enregistrés dans le graphe par les versions
+        précédentes ({id: {id, name, timestamp, data}}) ; sans effet pour
+        ceux déjà repris
+        """
+        for state_id, state in states.items():
+            self.save(graph_id, graph, state.get('data') or {}, name=state.get('name'),
+                      timestamp=state.get('timestamp'), state_id=state_id)
+
+    def list(self, graph_id: str) -> List[Dict[str, Any]]:
+        """États d'un graphe, du plus ancien au plus récent (sans leur contenu)"""
+        with self._lock:
+            rows = self._connect().execute(
+                'SELECT id, name, timestamp, created_at, size, visible_count FROM snapshots '
+                'WHERE graph_id = ? ORDER BY created_at', (graph_id,)).fetchall()
+        return [self._describe(row) for row in rows]
+
+    def count(self, graph_id: str) -> int:
+        with self._lock:
+            return self._connect().execute('SELECT COUNT(*) FROM snapshots WHERE graph_id = ?',
+                                           (graph_id,)).fetchone()[0]
+
+    @staticmethod
+    def _describe(row) -> Dict[str, Any]:
+        state_id, name, timestamp, created_at, size, visible_count = row
+        return {'id': state_id, 'name': name, 'timestamp': timestamp,
+                'created_at': created_at, 'size': size, 'visible_count': visible_count}
+
+    # === SUPPRESSION ===
+
+    def delete(self, graph_id: str, state_id: str) -> bool:
+        with self._lock, self._connect() as db:
+            row = db.execute('SELECT blob FROM snapshots WHERE id = ? AND graph_id = ?',
+                             (state_id, graph_id)).fetchone()
+            if row is None:
+                return False
+            db.execute('DELETE FROM snapshots WHERE id = ?', (state_id,))
+            self._release(db, row[0])
+            return True
+
+    def delete_graph(self, graph_id: str):
+        """Supprime tous les états d'un graphe"""
+        with self._lock, self._connect() as db:
+            rows = db.execute('SELECT blob FROM snapshots WHERE graph_id = ?',
+                              (graph_id,)).fetchall()
+            db.execute('DELETE FROM snapshots WHERE graph_id = ?', (graph_id,))
+            for (blob_hash,) in rows:
+                self._release(db, blob_hash)
+
+    def _apply_retention(self, db: sqlite3.Connection, graph_id: str):
+        """Supprime les états les plus anciens au-delà de `retention`"""
+        rows = db.execute('SELECT id, blob FROM snapshots WHERE graph_id = ? '
+                          'ORDER BY created_at DESC LIMIT -1 OFFSET ?',
+                          (graph_id, self.retention)).fetchall()
+        for state_id, blob_hash in rows:
+            db.execute('DELETE FROM snapshots WHERE id = ?', (state_id,))
+            self._release(db, blob_hash)
+
+    def _release(self, db: sqlite3.Connection, blob_hash: Optional[str]):
+        """Retire une référence ; un blob sans référence libère sa base et sa table d'ids"""
+        pending = [blob_hash]
+        while pending:
+            blob_hash = pending.pop()
+            if blob_hash is None:
+                continue
+            db.execute('UPDATE blobs SET refs = refs - 1 WHERE hash = ?', (blob_hash,))
+            row = db.execute('SELECT refs, base, ids FROM blobs WHERE hash = ?',
+                             (blob_hash,)).fetchone()
+            if row is not None and row[0] <= 0:
+                db.execute('DELETE FROM blobs WHERE hash = ?', (blob_hash,))
+                pending.extend(row[1:])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            db = self._connect()
+            snapshots = db.execute('SELECT COUNT(*) FROM snapshots').fetchone()[0]
+            blobs, size = db.execute('SELECT COUNT(*), COALESCE(SUM(length(body)), 0) '
+                                     'FROM blobs').fetchone()
+        return {'snapshots': snapshots, 'blobs': blobs, 'bytes': size,
+                'retention': self.retention}
+
+# Instance globale du service
+state_store = StateStore()
@@ -0,0 +1,100 @@
+"""
+Démarrage à chaud (WARM_START=1) et mesures du démarrage
+
+Sans WARM_START, le processus serveur ne fait rien à l'avance : il répond
+à /api/health dès l'import de l'application, et les bibliothèques lourdes
+(networkx), le pool de processus des imports et le layout du graphe de
+démonstration sont chargés ou calculés par la première requête qui en a
+besoin. Avec WARM_START=1, ils sont préparés dès le démarrage :
+- pool : pool de processus des imports démarré, un worker par place
+  (LAYOUT_WORKERS) déjà prêt avant le premier import asynchrone ; fait
+  avant la première requête, depuis le thread principal (un fork pendant
+  qu'un autre thread tient un verrou le laisserait pris dans le worker)
+- demo : layout du graphe de démonstration calculé (cache de layouts)
+- imports : bibliothèques importées à la première utilisation (DEFERRED_IMPORTS)
+Les deux dernières étapes sont faites par un thread d'arrière-plan, sans
+retarder les premières requêtes.
+Durées relevées (stats(), /api/health, /api/metrics) : import de
+l'application, étapes de préparation, première requête servie.
+"""
+import importlib
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Bibliothèques dont l'import est différé jusqu'à leur premier usage
+DEFERRED_IMPORTS = ('networkx',)
+
+
+class WarmupService:
+    """Préparation en arrière-plan du processus serveur"""
+
+    def __init__(self):
+        self.enabled = os.environ.get('WARM_START', '0') == '1'
+        self.import_seconds = None
+        self.ready_seconds = None
+        self.steps = {}  # étape -> durée en secondes
+        self.errors = {}
+        self.first_request = None
+        self._started = None
+        self._thread = None
+
+    def start(self, import_seconds: float = None):
+        """
+        Appelé une fois l'application importée (durée de l'import relevée
+        par app.py) ; lance la préparation si WARM_START=1
+        """
+        self.import_seconds = import_seconds
+        self._started = time.perf_counter()
+        if not self.enabled or self._thread is not None:
+            return
+        from services.job_service import job_service
+
+        self._step('pool', job_service.prewarm)
+        self._thread = threading.Thread(target=self._run, name='warmup', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        from services.demo import build_demo_graph
+
+        self._step('demo', build_demo_graph)
+        for module in DEFERRED_IMPORTS:
+            self._step(f'import:{module}', importlib.import_module, module)
+        self.ready_seconds = time.perf_counter() - self._started
+
+    def _step(self, name: str, func, *args):
+        start = time.perf_counter()
+        try:
+            func(*args)
+        except Exception as e:
+            # Une étape manquée sera faite par la première requête
+            self.errors[name] = str(e)
+        self.steps[name] = time.perf_counter() - start
+
+    def request_done(self, path: str, seconds: float):
+        """Relève la première requête servie par le processus"""
+        if self.first_request is None and self._started is not None:
+            self.first_request = {
+                'path': path,
+                'seconds': seconds,
+                'after_start_seconds': time.perf_counter() - self._started
+            }
+
+    @property
+    def ready(self) -> bool:
+        return not self.enabled or self.ready_seconds is not None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'warm_start': self.enabled,
+            'ready': self.ready,
+            'import_seconds': self.import_seconds,
+            'ready_seconds': self.ready_seconds,
+            'steps': dict(self.steps),
+            'errors': dict(self.errors),
+            'first_request': self.first_request
+        }
+
+# Instance globale du service
+warmup = WarmupService()
@@ -0,0 +1,72 @@
+"""
+Filtres du moteur indexé (services/graph_query.py) sur le graphe de démonstration
+
+Usage (depuis le dossier backend) :
+    python -m unittest tests.test_graph_query
+"""
+import os
+import unittest
+
+import numpy as np
+
+# Sans persistance (services.demo importe graph_service)
+os.environ['GRAPH_STORE_DIR'] = ''
+
+from services.demo import DEMO_GRAPH
+from services.graph_query import FilterEngine
+from services.ingest import parse_json_data
+
+
+class FilterEngineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = parse_json_data(DEMO_GRAPH)
+        self.engine = FilterEngine()
+
+    def nodes(self, filters):
+        node_mask, _ = self.engine.filter(self.graph, filters)
+        return sorted(self.graph.ids[i] for i in np.flatnonzero(node_mask))
+
+    def edges(self, filters):
+        _, edge_mask = self.engine.filter(self.graph, filters)
+        return int(edge_mask.sum())
+
+    def test_numeric_comparisons(self):
+        self.assertEqual(self.nodes({'node_property': {'age': '>33'}}), ['Charlie', 'Frank'])
+        self.assertEqual(self.nodes({'node_property': {'age': '<=27'}}), ['Bob', 'Grace'])
+        self.assertEqual(self.nodes({'node_property': {'age': {'$between': [28, 30]}}}),
+                         ['Alice', 'David'])
+        self.assertEqual(len(self.nodes({'node_property': {'age': '!=30'}})), 7)
+        self.assertEqual(self.edges({'edge_property': {'weight': {'$gte': 5}}}), 4)
+
+    def test_text_comparisons(self):
+        self.assertEqual(self.edges({'edge_property': {'relationship': '!=friend'}}), 4)
+        self.assertEqual(self.edges({'edge_property': {'relationship': '!=friend'}}),
+                         self.edges({'edge_property': {'relationship': {'$ne': 'friend'}}}))
+        self.assertEqual(self.edges({'edge_property': {'relationship': 'family'}}), 1)
+        # Propriété absente : seule la négation correspond
+        self.assertEqual(len(self.nodes({'node_property': {'city': '!=Paris'}})), 8)
+        self.assertEqual(self.nodes({'node_property': {'city': 'Paris'}}), [])
+
+    def test_text_range_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.engine.filter(self.graph, {'edge_property': {'relationship': '>friend'}})
+        with self.assertRaises(ValueError):
+            self.engine.filter(self.graph, {'node_property': {'age': {'$lt': 'old'}}})
+
+    def test_membership(self):
+        self.assertEqual(self.edges({'edge_property': {'relationship': ['family', 'colleague']}}), 4)
+        self.assertEqual(self.edges({'edge_property': {'relationship': {'$in': ['family']}}}), 1)
+        self.assertEqual(self.edges({'edge_property': {'relationship': {'$nin': ['friend']}}}), 4)
+        self.assertEqual(self.nodes({'node_property': {'age': {'$in': [25, 40]}}}), ['Bob', 'Frank'])
+
+    def test_connections(self):
+        self.assertEqual(self.nodes({'min_connections': 3}),
+                         ['Alice', 'Bob', 'Charlie', 'Eve', 'Frank'])
+        self.assertEqual(self.nodes({'max_connections': 1}), ['Henry'])
+        # Une arête n'est retenue que si ses deux extrémités le sont
+        self.assertEqual(self.edges({'min_connections': 3}), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
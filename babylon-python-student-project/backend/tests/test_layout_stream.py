@@ -0,0 +1,90 @@
+"""
+Un layout diffusé (stream_layout) produit une nouvelle version du graphe :
+les ETags des réponses en cache changent (pas de 304 sur les anciennes
+positions)
+
+Usage (depuis le dossier backend) :
+    python -m unittest tests.test_layout_stream
+"""
+import os
+import time
+import unittest
+
+# Sans persistance ni calculs en arrière-plan après l'import
+os.environ['GRAPH_STORE_DIR'] = ''
+os.environ['LAYOUT_CACHE_DIR'] = ''
+os.environ['ANALYTICS_ON_IMPORT'] = '0'
+os.environ['PREVIEW_ON_IMPORT'] = '0'
+os.environ['LOD_ON_IMPORT'] = '0'
+
+from app import app, socketio
+from services.graph_service import graph_service
+from services.response_cache import graph_etag
+
+N = 60
+
+
+class LayoutStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = app.test_client()
+        response = self.client.post('/api/graph/import/json', json={
+            'json_content': {
+                'nodes': [{'id': str(i)} for i in range(N)],
+                'edges': [{'source': str(i), 'target': str((i + 1) % N)} for i in range(N)]
+            },
+            'layout': 'random'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.graph_id = response.get_json()['graph_id']
+
+    def tearDown(self):
+        graph_service.delete_graph(self.graph_id)
+
+    def _stream_layout(self):
+        socket = socketio.test_client(app)
+        ack = socket.emit('stream_layout', {'graph_id': self.graph_id, 'layout': 'force'},
+                          callback=True)
+        self.assertTrue(ack.get('success'), ack)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            for message in socket.get_received():
+                if message['name'] == 'layout_error':
+                    self.fail(message['args'])
+                if message['name'] == 'layout_done':
+                    socket.disconnect()
+                    return message['args'][0]
+            time.sleep(0.02)
+        self.fail("layout_done non reçu")
+
+    def test_stream_layout_renews_cached_responses(self):
+        urls = [f'/api/graph/{self.graph_id}',
+                f'/api/graph/{self.graph_id}?format=binary',
+                f'/api/graph/{self.graph_id}/preview?budget=10']
+        etags = {url: self.client.get(url).headers['ETag'] for url in urls}
+        before = self.client.get(urls[0]).get_json()
+        for url, etag in etags.items():
+            self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+
+        frame = self._stream_layout()
+        self.assertEqual(frame['version'], before['version'] + 1)
+
+        for url, etag in etags.items():
+            response = self.client.get(url, headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 200, url)
+            self.assertNotEqual(response.headers['ETag'], etag, url)
+
+        after = self.client.get(urls[0]).get_json()
+        self.assertEqual(after['version'], frame['version'])
+        self.assertNotEqual([node['position'] for node in after['nodes']],
+                            [node['position'] for node in before['nodes']])
+
+    def test_etag_follows_positions(self):
+        graph = graph_service.get_stored(self.graph_id)
+        etag = graph_etag(self.graph_id, graph, 'application/json')
+        graph.set_positions(graph.positions + 1)
+        self.assertNotEqual(graph_etag(self.graph_id, graph, 'application/json'), etag)
+
+
+if __name__ == '__main__':
+    unittest.main()
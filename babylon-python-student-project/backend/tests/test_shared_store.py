@@ -0,0 +1,113 @@
+"""
+Deux processus (workers gunicorn) partageant le même GRAPH_STORE_DIR :
+opérations journalisées dans le catalogue, rattrapées par l'autre copie,
+conservées après un arrêt sans réécriture
+
+Usage (depuis le dossier backend) :
+    python -m unittest tests.test_shared_store
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+# Service global sans persistance (chaque test crée ses propres services)
+os.environ['GRAPH_STORE_DIR'] = ''
+os.environ['ANALYTICS_ON_IMPORT'] = '0'
+os.environ['PREVIEW_ON_IMPORT'] = '0'
+os.environ['LOD_ON_IMPORT'] = '0'
+
+from services.demo import DEMO_GRAPH
+from services.graph_catalog import GraphCatalog
+from services.graph_service import GraphService
+from services.ingest import parse_json_data
+from services.response_cache import graph_etag
+
+GRAPH_ID = 'shared'
+
+
+class SharedStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store_dir = tempfile.mkdtemp()
+        self.a = self.service()
+        self.b = self.service()
+        self.a.save_graph(GRAPH_ID, parse_json_data(DEMO_GRAPH))
+
+    def tearDown(self):
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+
+    def service(self):
+        """Un service par processus : catalogue propre, même répertoire"""
+        return GraphService(catalog=GraphCatalog(self.store_dir))
+
+    def add_node(self, service, node_id):
+        graph = service.get_stored(GRAPH_ID)
+        return service.apply_ops(GRAPH_ID, graph, [{'op': 'add_node', 'id': node_id}])
+
+    def node_ids(self, service):
+        graph = service.get_stored(GRAPH_ID)
+        return set(graph.ids[:graph.node_count])
+
+    def test_edits_from_both_instances_survive(self):
+        # B ouvre le graphe avant les modifications de A
+        self.assertEqual(self.b.get_stored(GRAPH_ID).version, 0)
+        self.assertEqual(self.add_node(self.a, 'fromA')['version'], 1)
+        self.assertEqual(self.add_node(self.b, 'fromB')['version'], 2)
+
+        for service in (self.a, self.b):
+            self.assertTrue({'fromA', 'fromB'} <= self.node_ids(service))
+            self.assertEqual(service.get_stored(GRAPH_ID).version, 2)
+
+        # Réécritures dans les deux ordres : aucune ne perd l'autre modification
+        self.b.flush()
+        self.a.flush()
+        self.assertTrue({'fromA', 'fromB'} <= self.node_ids(self.service()))
+
+    def test_stale_copy_is_rebased_before_check(self):
+        graph_b = self.b.get_stored(GRAPH_ID)
+        self.add_node(self.a, 'fromA')
+        # Copie de B en retard : rattrapée avant vérification
+        with self.assertRaises(ValueError):
+            self.b.apply_ops(GRAPH_ID, graph_b, [{'op': 'add_node', 'id': 'fromA'}])
+        result = self.b.apply_ops(GRAPH_ID, graph_b,
+                                  [{'op': 'add_edge', 'source': 'fromA', 'target': 'Alice'}])
+        self.assertEqual(result['version'], 2)
+        self.assertEqual(len(self.a.get_stored(GRAPH_ID).edge_rows('fromA', 'Alice')), 1)
+
+    def test_ops_survive_without_flush(self):
+        self.add_node(self.a, 'fromA')
+        self.add_node(self.b, 'fromB')
+        # Arrêt brutal : aucun flush, un nouveau processus relit le journal
+        graph = self.service().get_stored(GRAPH_ID)
+        self.assertEqual(graph.version, 2)
+        self.assertTrue({'fromA', 'fromB'} <= set(graph.ids[:graph.node_count]))
+
+    def test_etags_differ_for_different_content(self):
+        graph_a = self.a.get_stored(GRAPH_ID)
+        graph_b = self.b.get_stored(GRAPH_ID)
+        self.add_node(self.a, 'fromA')
+        etag_a = graph_etag(GRAPH_ID, graph_a, 'application/json')
+        self.assertNotEqual(etag_a, graph_etag(GRAPH_ID, graph_b, 'application/json'))
+
+        # Graphe remplacé par B : même version, contenu différent
+        self.b.save_graph(GRAPH_ID, parse_json_data({'nodes': [{'id': 'x'}], 'edges': []}))
+        self.add_node(self.b, 'fromB')
+        replaced = self.b.get_stored(GRAPH_ID)
+        self.assertEqual(replaced.version, 1)
+        self.assertNotEqual(graph_etag(GRAPH_ID, replaced, 'application/json'), etag_a)
+        self.assertEqual(self.node_ids(self.a), {'x', 'fromB'})
+
+    def test_relayout_is_written_through(self):
+        graph = self.a.get_stored(GRAPH_ID)
+        self.b.get_stored(GRAPH_ID)
+        result = self.a.relayout_stored(GRAPH_ID, graph, 'random')
+        positions = self.b.get_stored(GRAPH_ID).positions
+        self.assertEqual(self.b.get_stored(GRAPH_ID).version, result['version'])
+        self.assertEqual(positions.tolist(), result['positions'].tolist())
+        self.assertEqual(self.add_node(self.b, 'fromB')['version'], result['version'] + 1)
+        self.assertIn('fromB', self.node_ids(self.a))
+
+
+if __name__ == '__main__':
+    unittest.main()
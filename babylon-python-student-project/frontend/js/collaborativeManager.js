@@ -86,25 +86,80 @@ class CollaborativeManager {
             }
         });
 
-        // Position de curseur d'un autre utilisateur
-        this.socket.on('cursor_update', (data) => {
-            if (data.user_id !== this.userId) {
-                this.updateUserCursor(data.user_id, data.position);
+        // Lot coalescé du serveur (tick fixe) : derniers curseurs et sélections
+        // des autres membres ; l'acquittement autorise l'envoi du lot suivant
+        this.socket.on('session_batch', (batch, ack) => {
+            this.applySessionBatch(batch);
+            if (ack) ack();
+        });
+
+        // Opérations appliquées au graphe par un autre client (deltas versionnés)
+        this.socket.on('graph_ops', (data) => {
+            if (data.graph_id === this.graphManager.currentGraphId) {
+                this.receiveGraphOps(data.ops);
             }
         });
 
-        // Nœud sélectionné par un autre utilisateur
-        this.socket.on('node_selected', (data) => {
-            if (data.user_id !== this.userId) {
-                this.highlightRemoteSelection(data.node_id, data.user_id);
+        // Trames de positions d'un layout en cours de calcul
+        this.socket.on('layout_frame', (frame) => {
+            this.graphManager.applyLayoutFrame(frame);
+        });
+
+        // Positions finales du layout (nouvelle version du graphe)
+        this.socket.on('layout_done', (frame) => {
+            this.graphManager.applyLayoutFrame(frame, true);
+            this.graphManager.setLayoutVersion(frame);
+        });
+
+        // Layout recalculé par un autre client : positions à recharger
+        this.socket.on('graph_version', (data) => {
+            if (data.graph_id === this.graphManager.currentGraphId &&
+                data.version > this.graphManager.graphVersion()) {
+                this.resync();
             }
         });
 
-        // État du graphe mis à jour
-        this.socket.on('graph_updated', (data) => {
-            console.log('Graphe mis à jour par:', data.user_id);
-            if (data.user_id !== this.userId && data.graph_data) {
-                this.graphManager.renderGraph(data.graph_data);
+        this.socket.on('layout_error', (data) => {
+            console.error('Erreur layout:', data.error);
+            if (window.uiManager) {
+                window.uiManager.showToast(`Erreur layout: ${data.error}`, 'error');
+            }
+        });
+    }
+
+    /**
+     * Se connecte si nécessaire et attend la connexion
+     */
+    async ensureConnected() {
+        if (this.isConnected) return;
+        
+        this.connect();
+        await new Promise(resolve => {
+            const checkConnection = setInterval(() => {
+                if (this.isConnected) {
+                    clearInterval(checkConnection);
+                    resolve();
+                }
+            }, 100);
+        });
+    }
+
+    /**
+     * Demande au serveur un layout diffusé progressivement (trames layout_frame)
+     * Les autres membres de la session reçoivent aussi les trames
+     */
+    async requestLayoutStream(graphId, layout = 'multilevel', options = {}) {
+        await this.ensureConnected();
+
+        this.socket.emit('stream_layout', {
+            graph_id: graphId,
+            layout: layout,
+            layout_params: options.layoutParams || {},
+            session_id: this.sessionId,
+            frame_interval: options.frameInterval || 5
+        }, (ack) => {
+            if (ack && ack.error) {
+                console.error('Streaming layout refusé:', ack.error);
             }
         });
     }
@@ -113,26 +168,37 @@ class CollaborativeManager {
      * Crée ou rejoint une session collaborative
      */
     async createOrJoinSession(sessionName) {
-        if (!this.isConnected) {
-            this.connect();
-            // Attendre la connexion
-            await new Promise(resolve => {
-                const checkConnection = setInterval(() => {
-                    if (this.isConnected) {
-                        clearInterval(checkConnection);
-                        resolve();
-                    }
-                }, 100);
-            });
-        }
+        await this.ensureConnected();
 
         this.socket.emit('join_session', {
             session_id: sessionName,
             user_id: this.userId,
             username: 'Utilisateur_' + this.userId.substr(-4)
+        }, (ack) => {
+            if (!ack || ack.error) {
+                console.error('Session refusée:', ack && ack.error);
+                if (window.uiManager && ack) {
+                    window.uiManager.showToast(ack.error, 'error');
+                }
+                return;
+            }
+            // État courant des autres membres
+            ack.session.users.forEach(user => {
+                if (user.id !== this.userId) {
+                    this.connectedUsers.set(user.id, user);
+                    this.createUserCursor(user.id, user.name || user.id);
+                }
+            });
+            this.applySessionBatch({
+                cursors: Object.entries(ack.cursors || {}).map(
+                    ([user_id, position]) => ({ user_id, position })),
+                selections: Object.entries(ack.selections || {}).map(
+                    ([user_id, node_id]) => ({ user_id, node_id }))
+            });
         });
 
         this.sessionId = sessionName;
+        this.watchGraph();
         console.log('Session rejointe:', sessionName);
     }
 
@@ -152,8 +218,25 @@ class CollaborativeManager {
         console.log('Session quittée');
     }
 
+    /**
+     * Applique un lot d'états distants (curseurs puis sélections)
+     */
+    applySessionBatch(batch) {
+        (batch.cursors || []).forEach(({ user_id, position }) => {
+            if (user_id !== this.userId) {
+                this.updateUserCursor(user_id, position);
+            }
+        });
+        (batch.selections || []).forEach(({ user_id, node_id }) => {
+            if (user_id !== this.userId && node_id !== null && node_id !== undefined) {
+                this.highlightRemoteSelection(node_id, user_id);
+            }
+        });
+    }
+
     /**
      * Envoie la position du curseur
+     * Le serveur ne conserve que la dernière position avant chaque tick
      */
     sendCursorPosition(position) {
         if (!this.socket || !this.sessionId) return;
@@ -179,15 +262,76 @@ class CollaborativeManager {
     }
 
     /**
-     * Envoie une mise à jour du graphe
+     * Suit les modifications du graphe affiché (événements graph_ops)
      */
-    sendGraphUpdate(graphData) {
-        if (!this.socket || !this.sessionId) return;
+    async watchGraph(graphId = this.graphManager.currentGraphId) {
+        if (!graphId) return;
+        await this.ensureConnected();
+
+        this.socket.emit('watch_graph', { graph_id: graphId }, (ack) => {
+            if (ack && ack.error) {
+                console.error('Suivi du graphe refusé:', ack.error);
+            } else if (ack && ack.version > this.graphManager.graphVersion()) {
+                this.resync();
+            }
+        });
+    }
 
-        this.socket.emit('update_graph', {
-            session_id: this.sessionId,
+    /**
+     * Envoie des opérations (add_node, move_node, add_edge...) au serveur
+     * Elles sont appliquées localement au retour, avec leur version
+     */
+    sendGraphOps(ops) {
+        if (!this.socket || !this.graphManager.currentGraphId) return;
+
+        this.socket.emit('graph_ops', {
+            graph_id: this.graphManager.currentGraphId,
             user_id: this.userId,
-            graph_data: graphData
+            ops: ops
+        }, (ack) => {
+            if (!ack || ack.error) {
+                console.error('Opérations refusées:', ack && ack.error);
+                if (window.uiManager && ack) {
+                    window.uiManager.showToast(ack.error, 'error');
+                }
+                return;
+            }
+            this.receiveGraphOps(ack.ops);
+        });
+    }
+
+    /**
+     * Applique des opérations reçues dans l'ordre des versions ;
+     * une version manquante déclenche une resynchronisation
+     */
+    receiveGraphOps(ops) {
+        const current = this.graphManager.graphVersion();
+        const fresh = (ops || []).filter(op => op.version > current);
+        if (!fresh.length) return;
+
+        if (fresh[0].version !== current + 1) {
+            this.resync();
+            return;
+        }
+        this.graphManager.applyGraphOps(fresh);
+    }
+
+    /**
+     * Demande les opérations manquées ; recharge le graphe si le journal
+     * du serveur ne remonte pas assez loin
+     */
+    resync() {
+        const graphId = this.graphManager.currentGraphId;
+        const since = this.graphManager.graphVersion();
+
+        this.socket.emit('resync', { graph_id: graphId, since: since }, (ack) => {
+            if (!ack || ack.error || graphId !== this.graphManager.currentGraphId) return;
+            if (ack.resync) {
+                this.graphManager.loadGraph(graphId);
+            } else if (ack.ops.length && ack.ops[0].version === since + 1) {
+                this.graphManager.applyGraphOps(
+                    ack.ops.filter(op => op.version > this.graphManager.graphVersion()));
+            }
         });
     }
 
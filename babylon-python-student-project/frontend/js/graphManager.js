@@ -7,12 +7,227 @@ class GraphManager {
         this.scene = scene;
         this.engine = engine;
         this.currentGraph = null;
+        this.currentGraphId = null;
+        this.layoutFrameState = null;
+        this.binaryGraph = null;
         this.graphMeshes = {
             nodes: [],
             edges: []
         };
+        // Rendu instancié (grands graphes reçus au format binaire)
+        this.instancedMeshes = null;
         this.selectedNodes = [];
         this.API_BASE = 'http://127.0.0.1:5000/api';
+        // Au-delà de cette taille, l'import est calculé en arrière-plan (job)
+        this.ASYNC_IMPORT_THRESHOLD = 5 * 1024 * 1024;
+        // Format binaire de GET /graph/<id> (voir backend/services/graph_binary.py)
+        this.BINARY_MIMETYPE = 'application/x-graph-binary';
+        // Flux NDJSON de GET /graph/<id> (voir backend/services/graph_stream.py)
+        this.NDJSON_MIMETYPE = 'application/x-ndjson';
+        // Au-delà de ce nombre de nœuds : rendu instancié (pas de mesh par nœud)
+        this.INSTANCED_RENDER_THRESHOLD = 2000;
+    }
+
+    /**
+     * Attend la fin d'un job d'import asynchrone en interrogeant son état
+     */
+    async waitForJob(jobId, onProgress = null, interval = 500) {
+        while (true) {
+            const response = await fetch(`${this.API_BASE}/jobs/${jobId}`);
+            const job = await response.json();
+            
+            if (job.error && !job.phase) {
+                throw new Error(job.error);
+            }
+            
+            if (onProgress) {
+                onProgress(job);
+            }
+            
+            if (job.phase === 'done') {
+                return job;
+            }
+            if (job.phase === 'failed' || job.phase === 'cancelled') {
+                throw new Error(job.error || `Job ${job.phase}`);
+            }
+            
+            await new Promise(resolve => setTimeout(resolve, interval));
+        }
+    }
+
+    /**
+     * Termine un import : attend le job si le serveur a répondu 202, puis
+     * récupère le graphe (l'import ne renvoie qu'un résumé)
+     */
+    async finishImport(result) {
+        if (result.error || result.graph_data) {
+            return result;
+        }
+        
+        if (result.job) {
+            await this.waitForJob(result.graph_id, (job) => {
+                console.log(`Import ${job.phase}: ${job.percent}%`);
+            });
+        }
+        
+        const binary = await this.fetchGraphBinary(result.graph_id);
+        if (binary.nodeCount > this.INSTANCED_RENDER_THRESHOLD) {
+            result.binary = binary;
+            result.graph_data = this.binaryToGraphData(binary);
+            return result;
+        }
+        
+        result.graph_data = await this.fetchGraphStream(result.graph_id);
+        return result;
+    }
+
+    /**
+     * Récupère un graphe en flux NDJSON (une ligne par tranche de nœuds ou
+     * d'arêtes, voir backend/services/graph_stream.py) ; onChunk reçoit
+     * chaque tranche dès sa réception
+     */
+    async fetchGraphStream(graphId, onChunk = null) {
+        const response = await fetch(`${this.API_BASE}/graph/${graphId}`, {
+            headers: { 'Accept': this.NDJSON_MIMETYPE }
+        });
+        if (!response.ok) {
+            const result = await response.json();
+            throw new Error(result.error || `Erreur ${response.status}`);
+        }
+
+        const graphData = { nodes: [], edges: [] };
+        const handle = (line) => {
+            if (!line.trim()) return;
+            const record = JSON.parse(line);
+            if (record.type === 'graph') {
+                const { type, graph_id, node_count, edge_count, ...header } = record;
+                Object.assign(graphData, header);
+            } else if (record.type === 'nodes' || record.type === 'edges') {
+                record[record.type].forEach(item => graphData[record.type].push(item));
+            } else if (record.type === 'end') {
+                graphData.version = record.version;
+            }
+            if (onChunk) onChunk(record, graphData);
+        };
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let pending = '';
+        while (true) {
+            const { done, value } = await reader.read();
+            pending += decoder.decode(value || new Uint8Array(), { stream: !done });
+            const lines = pending.split('\n');
+            pending = lines.pop();
+            lines.forEach(handle);
+            if (done) break;
+        }
+        handle(pending);
+        return graphData;
+    }
+
+    /**
+     * Récupère un graphe au format binaire (tableaux typés)
+     */
+    async fetchGraphBinary(graphId) {
+        const response = await fetch(`${this.API_BASE}/graph/${graphId}`, {
+            headers: { 'Accept': this.BINARY_MIMETYPE }
+        });
+        if (response.headers.get('Content-Type') !== this.BINARY_MIMETYPE) {
+            const result = await response.json();
+            throw new Error(result.error || 'Réponse binaire attendue');
+        }
+        return this.parseGraphBinary(await response.arrayBuffer());
+    }
+
+    /**
+     * Décode la réponse binaire : vues typées sur le buffer, sans copie
+     * En-tête : magic 'GRPH', version u16, flags u16, node_count, id_count,
+     * edge_count, ids_size, labels_size, graph_version (u32), puis les sections
+     */
+    parseGraphBinary(buffer) {
+        const view = new DataView(buffer);
+        const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+        if (magic !== 'GRPH' || view.getUint16(4, true) !== 1) {
+            throw new Error('Format binaire de graphe non reconnu');
+        }
+        
+        const flags = view.getUint16(6, true);
+        const nodeCount = view.getUint32(8, true);
+        const idCount = view.getUint32(12, true);
+        const edgeCount = view.getUint32(16, true);
+        const idsSize = view.getUint32(20, true);
+        const version = view.getUint32(28, true);
+        let offset = 32;
+        
+        let positions = null;
+        if (flags & 1) {
+            positions = new Float32Array(buffer, offset, nodeCount * 3);
+            offset += nodeCount * 12;
+        }
+        const sources = new Uint32Array(buffer, offset, edgeCount);
+        offset += edgeCount * 4;
+        const targets = new Uint32Array(buffer, offset, edgeCount);
+        offset += edgeCount * 4;
+        
+        const ids = this.decodeStringTable(buffer, offset, idCount);
+        offset += idsSize;
+        const labels = (flags & 2) ? this.decodeStringTable(buffer, offset, nodeCount) : null;
+        
+        return { nodeCount, edgeCount, version, ids, labels, positions, sources, targets };
+    }
+
+    /**
+     * Table de chaînes : offsets uint32[k + 1] puis octets UTF-8
+     */
+    decodeStringTable(buffer, offset, count) {
+        const offsets = new Uint32Array(buffer, offset, count + 1);
+        const bytes = new Uint8Array(buffer, offset + 4 * (count + 1), offsets[count]);
+        const decoder = new TextDecoder();
+        const strings = new Array(count);
+        for (let i = 0; i < count; i++) {
+            strings[i] = decoder.decode(bytes.subarray(offsets[i], offsets[i + 1]));
+        }
+        return strings;
+    }
+
+    /**
+     * Représentation nodes/edges allégée d'un graphe binaire (stats, filtres)
+     */
+    binaryToGraphData(binary) {
+        const nodes = new Array(binary.nodeCount);
+        for (let i = 0; i < binary.nodeCount; i++) {
+            const position = binary.positions ? {
+                x: binary.positions[i * 3],
+                y: binary.positions[i * 3 + 1],
+                z: binary.positions[i * 3 + 2]
+            } : undefined;
+            nodes[i] = {
+                id: binary.ids[i],
+                label: binary.labels ? binary.labels[i] : binary.ids[i],
+                properties: {},
+                position: position
+            };
+        }
+        
+        const edges = new Array(binary.edgeCount);
+        for (let e = 0; e < binary.edgeCount; e++) {
+            edges[e] = {
+                source: binary.ids[binary.sources[e]],
+                target: binary.ids[binary.targets[e]],
+                properties: {}
+            };
+        }
+        
+        return {
+            nodes: nodes,
+            edges: edges,
+            metadata: {
+                node_count: binary.nodeCount,
+                edge_count: binary.edgeCount,
+                format: 'binary'
+            },
+            version: binary.version
+        };
     }
 
     /**
@@ -20,15 +235,22 @@ class GraphManager {
      */
     async loadGraph(graphId) {
         try {
-            const response = await fetch(`${this.API_BASE}/graph/${graphId}`);
-            const graphData = await response.json();
-            
-            if (graphData.error) {
-                throw new Error(graphData.error);
+            // Grands graphes : format binaire et rendu instancié
+            const binary = await this.fetchGraphBinary(graphId);
+            if (binary.nodeCount > this.INSTANCED_RENDER_THRESHOLD) {
+                this.currentGraphId = graphId;
+                this.renderBinaryGraph(binary);
+                this.watchGraph(graphId);
+                console.log('Graphe chargé (binaire):', this.currentGraph.metadata);
+                return this.currentGraph;
             }
             
+            const graphData = await this.fetchGraphStream(graphId);
+            
             this.currentGraph = graphData;
+            this.currentGraphId = graphId;
             this.renderGraph(graphData);
+            this.watchGraph(graphId);
             
             console.log('Graphe chargé:', graphData.metadata);
             return graphData;
@@ -40,8 +262,11 @@ class GraphManager {
 
     /**
      * Importe un graphe depuis un fichier CSV
+     * baseGraphId : version précédente du graphe (positions conservées,
+     * layout incrémental)
      */
-    async importCSV(csvContent, sourceCol = 'source', targetCol = 'target', layout = 'force') {
+    async importCSV(csvContent, sourceCol = 'source', targetCol = 'target', layout = 'force',
+                    baseGraphId = null) {
         try {
             const response = await fetch(`${this.API_BASE}/graph/import/csv`, {
                 method: 'POST',
@@ -52,18 +277,71 @@ class GraphManager {
                     csv_content: csvContent,
                     source_col: sourceCol,
                     target_col: targetCol,
-                    layout: layout
+                    layout: layout,
+                    async: csvContent.length > this.ASYNC_IMPORT_THRESHOLD,
+                    base_graph_id: baseGraphId
                 })
             });
             
-            const result = await response.json();
+            const result = await this.finishImport(await response.json());
             
             if (result.error) {
                 throw new Error(result.error);
             }
             
             this.currentGraph = result.graph_data;
-            this.renderGraph(result.graph_data);
+            this.currentGraphId = result.graph_id;
+            if (result.binary) {
+                this.renderBinaryGraph(result.binary);
+            } else {
+                this.renderGraph(result.graph_data);
+            }
+            
+            console.log('Graphe CSV importé:', result.graph_id);
+            return result;
+        } catch (error) {
+            console.error('Erreur import CSV:', error);
+            throw error;
+        }
+    }
+
+    /**
+     * Importe un fichier CSV en l'envoyant tel quel (multipart) :
+     * le serveur le lit ligne par ligne sans le charger en mémoire
+     */
+    async importCSVFile(file, sourceCol = 'source', targetCol = 'target', layout = 'force',
+                        baseGraphId = null) {
+        try {
+            const formData = new FormData();
+            formData.append('file', file);
+            formData.append('source_col', sourceCol);
+            formData.append('target_col', targetCol);
+            formData.append('layout', layout);
+            if (file.size > this.ASYNC_IMPORT_THRESHOLD) {
+                formData.append('async', '1');
+            }
+            if (baseGraphId) {
+                formData.append('base_graph_id', baseGraphId);
+            }
+            
+            const response = await fetch(`${this.API_BASE}/graph/import/csv`, {
+                method: 'POST',
+                body: formData
+            });
+            
+            const result = await this.finishImport(await response.json());
+            
+            if (result.error) {
+                throw new Error(result.error);
+            }
+            
+            this.currentGraph = result.graph_data;
+            this.currentGraphId = result.graph_id;
+            if (result.binary) {
+                this.renderBinaryGraph(result.binary);
+            } else {
+                this.renderGraph(result.graph_data);
+            }
             
             console.log('Graphe CSV importé:', result.graph_id);
             return result;
@@ -76,7 +354,7 @@ class GraphManager {
     /**
      * Importe un graphe depuis un fichier JSON
      */
-    async importJSON(jsonContent, layout = 'force') {
+    async importJSON(jsonContent, layout = 'force', baseGraphId = null) {
         try {
             const response = await fetch(`${this.API_BASE}/graph/import/json`, {
                 method: 'POST',
@@ -85,18 +363,68 @@ class GraphManager {
                 },
                 body: JSON.stringify({
                     json_content: jsonContent,
-                    layout: layout
+                    layout: layout,
+                    async: jsonContent.length > this.ASYNC_IMPORT_THRESHOLD,
+                    base_graph_id: baseGraphId
                 })
             });
             
-            const result = await response.json();
+            const result = await this.finishImport(await response.json());
             
             if (result.error) {
                 throw new Error(result.error);
             }
             
             this.currentGraph = result.graph_data;
-            this.renderGraph(result.graph_data);
+            this.currentGraphId = result.graph_id;
+            if (result.binary) {
+                this.renderBinaryGraph(result.binary);
+            } else {
+                this.renderGraph(result.graph_data);
+            }
+            
+            console.log('Graphe JSON importé:', result.graph_id);
+            return result;
+        } catch (error) {
+            console.error('Erreur import JSON:', error);
+            throw error;
+        }
+    }
+
+    /**
+     * Importe un fichier JSON en l'envoyant tel quel (multipart) :
+     * le serveur le parcourt en une passe, nœud par nœud et arête par arête
+     */
+    async importJSONFile(file, layout = 'force', baseGraphId = null) {
+        try {
+            const formData = new FormData();
+            formData.append('file', file);
+            formData.append('layout', layout);
+            if (file.size > this.ASYNC_IMPORT_THRESHOLD) {
+                formData.append('async', '1');
+            }
+            if (baseGraphId) {
+                formData.append('base_graph_id', baseGraphId);
+            }
+            
+            const response = await fetch(`${this.API_BASE}/graph/import/json`, {
+                method: 'POST',
+                body: formData
+            });
+            
+            const result = await this.finishImport(await response.json());
+            
+            if (result.error) {
+                throw new Error(result.error);
+            }
+            
+            this.currentGraph = result.graph_data;
+            this.currentGraphId = result.graph_id;
+            if (result.binary) {
+                this.renderBinaryGraph(result.binary);
+            } else {
+                this.renderGraph(result.graph_data);
+            }
             
             console.log('Graphe JSON importé:', result.graph_id);
             return result;
@@ -119,6 +447,7 @@ class GraphManager {
             }
             
             this.currentGraph = result.graph_data;
+            this.currentGraphId = result.graph_id;
             this.renderGraph(result.graph_data);
             
             console.log('Graphe de démo chargé');
@@ -188,6 +517,109 @@ class GraphManager {
         console.log('Graphe rendu avec succès');
     }
 
+    /**
+     * Rend un graphe binaire : une sphère en instances fines (une matrice
+     * par nœud) et un seul mesh de lignes dont les buffers sont les
+     * positions et les indices d'arêtes reçus
+     */
+    renderBinaryGraph(binary) {
+        this.clearGraph();
+        
+        const n = binary.nodeCount;
+        if (!binary.positions) {
+            binary.positions = new Float32Array(n * 3);
+        }
+        this.binaryGraph = binary;
+        this.currentGraph = this.binaryToGraphData(binary);
+        this.originalGraph = null;
+        
+        console.log(`Rendu instancié de ${n} nœuds et ${binary.edgeCount} arêtes`);
+        
+        // Nœuds : matrices de translation + couleurs (angle d'or) en un buffer
+        const sphere = BABYLON.MeshBuilder.CreateSphere(
+            'graph_nodes',
+            { diameter: 0.6, segments: 8 },
+            this.scene
+        );
+        const nodeMaterial = new BABYLON.StandardMaterial('graphNodesMat', this.scene);
+        nodeMaterial.diffuseColor = new BABYLON.Color3(1, 1, 1);
+        sphere.material = nodeMaterial;
+        sphere.isPickable = false;
+        
+        const matrices = new Float32Array(n * 16);
+        const colors = new Float32Array(n * 4);
+        for (let i = 0; i < n; i++) {
+            const m = i * 16;
+            matrices[m] = matrices[m + 5] = matrices[m + 10] = matrices[m + 15] = 1;
+            
+            const color = this.hslToRgb(((i * 137.5) % 360) / 360, 0.7, 0.6);
+            colors[i * 4] = color.r;
+            colors[i * 4 + 1] = color.g;
+            colors[i * 4 + 2] = color.b;
+            colors[i * 4 + 3] = 1;
+        }
+        sphere.thinInstanceSetBuffer('matrix', matrices, 16, false);
+        sphere.thinInstanceSetBuffer('color', colors, 4, true);
+        
+        // Arêtes : sommets = positions des nœuds, indices = paires d'arêtes
+        const edgeMesh = new BABYLON.Mesh('graph_edges', this.scene);
+        const vertexData = new BABYLON.VertexData();
+        vertexData.positions = binary.positions;
+        vertexData.indices = this.binaryEdgeIndices(binary);
+        vertexData.applyToMesh(edgeMesh, true);
+        
+        const edgeMaterial = new BABYLON.StandardMaterial('graphEdgesMat', this.scene);
+        edgeMaterial.emissiveColor = new BABYLON.Color3(0.4, 0.6, 0.9);
+        edgeMaterial.disableLighting = true;
+        edgeMaterial.alpha = 0.5;
+        edgeMaterial.fillMode = BABYLON.Material.LineListDrawMode;
+        edgeMesh.material = edgeMaterial;
+        edgeMesh.isPickable = false;
+        
+        this.instancedMeshes = { nodes: sphere, edges: edgeMesh, matrices: matrices, colors: colors };
+        this.updateInstancedPositions();
+        
+        if (window.uiManager) {
+            window.uiManager.updateStats();
+        }
+    }
+
+    /**
+     * Indices de lignes (source, cible) entrelacés, arêtes vers des
+     * extrémités sans nœud exclues
+     */
+    binaryEdgeIndices(binary) {
+        const indices = new Uint32Array(binary.edgeCount * 2);
+        let k = 0;
+        for (let e = 0; e < binary.edgeCount; e++) {
+            const source = binary.sources[e];
+            const target = binary.targets[e];
+            if (source < binary.nodeCount && target < binary.nodeCount) {
+                indices[k++] = source;
+                indices[k++] = target;
+            }
+        }
+        return indices.subarray(0, k);
+    }
+
+    /**
+     * Recopie binaryGraph.positions dans les matrices d'instances et le
+     * buffer de sommets des arêtes
+     */
+    updateInstancedPositions() {
+        const positions = this.binaryGraph.positions;
+        const { nodes, edges, matrices } = this.instancedMeshes;
+        for (let i = 0; i < this.binaryGraph.nodeCount; i++) {
+            matrices[i * 16 + 12] = positions[i * 3];
+            matrices[i * 16 + 13] = positions[i * 3 + 1];
+            matrices[i * 16 + 14] = positions[i * 3 + 2];
+        }
+        nodes.thinInstanceBufferUpdated('matrix');
+        nodes.thinInstanceRefreshBoundingInfo();
+        edges.updateVerticesData(BABYLON.VertexBuffer.PositionKind, positions);
+        edges.refreshBoundingInfo();
+    }
+
     /**
      * Crée un nœud 3D avec matériaux PBR de haute qualité
      */
@@ -475,6 +907,120 @@ class GraphManager {
         }
     }
 
+    /**
+     * Affiche le voisinage à `hops` sauts d'un nœud, chargé depuis le
+     * serveur sans télécharger le graphe complet
+     */
+    async showNeighborhood(nodeId, hops = 1, budget = 1000) {
+        const params = new URLSearchParams({ node: nodeId, hops: hops, budget: budget });
+        const response = await fetch(`${this.API_BASE}/graph/${this.currentGraphId}/neighborhood?${params}`);
+        const result = await response.json();
+        if (!response.ok) {
+            throw new Error(result.error || 'Erreur lors du chargement du voisinage');
+        }
+        
+        // Le graphe complet reste la référence pour la réinitialisation des filtres
+        if (!this.originalGraph && this.currentGraph) {
+            this.originalGraph = this.currentGraph;
+        }
+        this.renderGraph({
+            nodes: result.nodes,
+            edges: result.edges,
+            metadata: { center: result.center, hops: result.hops, truncated: result.truncated }
+        });
+        return result;
+    }
+
+    /**
+     * Met en évidence le plus court chemin entre deux nœuds (nœuds du
+     * chemin affichés en surbrillance verte)
+     */
+    async highlightPath(sourceId, targetId) {
+        const params = new URLSearchParams({ source: sourceId, target: targetId });
+        const response = await fetch(`${this.API_BASE}/graph/${this.currentGraphId}/path?${params}`);
+        const result = await response.json();
+        if (!response.ok) {
+            throw new Error(result.error || 'Erreur lors du calcul du chemin');
+        }
+        if (!result.found) {
+            return result;
+        }
+        
+        if (!this.highlightLayer) {
+            this.highlightLayer = new BABYLON.HighlightLayer("highlightLayer", this.scene);
+            this.highlightLayer.blurHorizontalSize = 1.0;
+            this.highlightLayer.blurVerticalSize = 1.0;
+        }
+        const pathIds = new Set(result.nodes.map(node => node.id));
+        this.graphMeshes.nodes.forEach(mesh => {
+            if (pathIds.has(mesh.metadata.nodeData.id)) {
+                this.highlightLayer.addMesh(mesh, BABYLON.Color3.Green());
+            }
+        });
+        return result;
+    }
+
+    /**
+     * Colore et dimensionne les nœuds selon une métrique calculée par le
+     * serveur (GET /graph/<id>/analytics/<metric>) : dégradé bleu -> rouge
+     * et taille croissante, couleur par composante pour 'component'
+     */
+    async applyMetric(metric) {
+        if (!this.currentGraphId) {
+            console.error('Aucun graphe chargé');
+            return;
+        }
+        
+        const response = await fetch(`${this.API_BASE}/graph/${this.currentGraphId}/analytics/${metric}`);
+        const result = await response.json();
+        if (!response.ok) {
+            throw new Error(result.error || 'Erreur lors du calcul de la métrique');
+        }
+        
+        const { values, min, max } = result;
+        const span = (max - min) || 1;
+        const style = (value) => {
+            if (metric === 'component') {
+                return { color: this.hslToRgb(((value * 137.5) % 360) / 360, 0.7, 0.6), scale: 1 };
+            }
+            // Racine : les centralités sont très concentrées sur quelques nœuds
+            const t = Math.sqrt((value - min) / span);
+            return { color: this.hslToRgb((1 - t) * 0.66, 0.8, 0.55), scale: 0.6 + 1.4 * t };
+        };
+        
+        if (this.instancedMeshes) {
+            // Ordre des nœuds binaires = ordre des valeurs
+            const { nodes, matrices, colors } = this.instancedMeshes;
+            const n = Math.min(values.length, this.binaryGraph.nodeCount);
+            for (let i = 0; i < n; i++) {
+                const { color, scale } = style(values[i]);
+                colors[i * 4] = color.r;
+                colors[i * 4 + 1] = color.g;
+                colors[i * 4 + 2] = color.b;
+                const m = i * 16;
+                matrices[m] = matrices[m + 5] = matrices[m + 10] = scale;
+            }
+            nodes.thinInstanceBufferUpdated('color');
+            nodes.thinInstanceBufferUpdated('matrix');
+            nodes.thinInstanceRefreshBoundingInfo();
+            return;
+        }
+        
+        // Meshes : valeurs indexées par id dans l'ordre du graphe complet
+        const order = (this.originalGraph || this.currentGraph).nodes;
+        const byId = new Map();
+        order.forEach((node, i) => byId.set(node.id, values[i]));
+        
+        this.graphMeshes.nodes.forEach(mesh => {
+            const value = byId.get(mesh.metadata.nodeData.id);
+            if (value === undefined) return;
+            const { color, scale } = style(value);
+            mesh.material.baseColor = new BABYLON.Color3(color.r, color.g, color.b);
+            mesh.material.emissiveColor = new BABYLON.Color3(color.r * 0.2, color.g * 0.2, color.b * 0.2);
+            mesh.scaling.setAll(scale);
+        });
+    }
+
     /**
      * Filtre le graphe selon des critères - Version côté client
      */
@@ -487,19 +1033,28 @@ class GraphManager {
         try {
             // Créer une copie du graphe original pour le filtrage
             const originalGraph = this.currentGraph;
+            // Graphe binaire : conservé comme référence (réinitialisation, métriques)
+            if (!this.originalGraph) {
+                this.originalGraph = originalGraph;
+            }
             const filteredGraph = {
                 nodes: [],
                 edges: []
             };
             
+            // Degré de chaque nœud, calculé en un seul parcours des arêtes
+            const degrees = new Map();
+            originalGraph.edges.forEach(edge => {
+                degrees.set(edge.source, (degrees.get(edge.source) || 0) + 1);
+                degrees.set(edge.target, (degrees.get(edge.target) || 0) + 1);
+            });
+            
             // Filtrer les nœuds
             originalGraph.nodes.forEach(node => {
                 let keep = true;
                 
                 // Filtrer par nombre de connexions
-                const connections = originalGraph.edges.filter(
-                    edge => edge.source === node.id || edge.target === node.id
-                ).length;
+                const connections = degrees.get(node.id) || 0;
                 
                 if (connections < filters.min_connections || connections > filters.max_connections) {
                     keep = false;
@@ -556,6 +1111,14 @@ class GraphManager {
         
         this.graphMeshes = { nodes: [], edges: [] };
         this.selectedNodes = [];
+        
+        // Rendu instancié
+        if (this.instancedMeshes) {
+            this.instancedMeshes.nodes.dispose();
+            this.instancedMeshes.edges.dispose();
+            this.instancedMeshes = null;
+        }
+        this.binaryGraph = null;
     }
 
     /**
@@ -643,10 +1206,10 @@ class GraphManager {
                 break;
 
             case 'force':
+            case 'multilevel':
             default:
-                // Force-directed reste celui par défaut du backend
-                // On pourrait recalculer ici ou redemander au serveur
-                console.log("Layout force-directed: utilise les positions actuelles du serveur");
+                // Force-directed : recalculé par le serveur et diffusé en continu
+                this.streamServerLayout(layoutType === 'force' ? 'force' : 'multilevel');
                 return;
         }
 
@@ -679,6 +1242,264 @@ class GraphManager {
         }, 1100);
     }
 
+    /**
+     * Demande un layout serveur diffusé en trames (Socket.IO)
+     */
+    streamServerLayout(layoutType) {
+        if (!this.currentGraphId) {
+            console.log("Layout serveur: graphe non enregistré côté serveur");
+            return;
+        }
+        
+        if (!window.collaborativeManager) {
+            window.collaborativeManager = new CollaborativeManager(this, this.scene);
+        }
+        window.collaborativeManager.requestLayoutStream(this.currentGraphId, layoutType);
+    }
+
+    /**
+     * Applique une trame de positions quantifiées (keyframe ou delta)
+     * Positions : q / 65535 * 2 * scale - scale
+     */
+    applyLayoutFrame(frame, isFinal = false) {
+        if (frame.graph_id !== this.currentGraphId) return;
+        
+        if (frame.keyframe) {
+            this.layoutFrameState = Int32Array.from(new Uint16Array(frame.positions));
+        } else if (this.layoutFrameState) {
+            const indices = new Uint32Array(frame.indices);
+            const deltas = frame.delta_type === 'int32'
+                ? new Int32Array(frame.deltas)
+                : new Int16Array(frame.deltas);
+            for (let i = 0; i < indices.length; i++) {
+                const base = indices[i] * 3;
+                this.layoutFrameState[base] += deltas[i * 3];
+                this.layoutFrameState[base + 1] += deltas[i * 3 + 1];
+                this.layoutFrameState[base + 2] += deltas[i * 3 + 2];
+            }
+        } else {
+            // Delta reçu sans keyframe de référence
+            return;
+        }
+        
+        const q = this.layoutFrameState;
+        const factor = (2 * frame.scale) / 65535;
+        
+        // Rendu instancié : positions écrites directement dans les buffers
+        if (this.binaryGraph && this.binaryGraph.nodeCount === frame.count) {
+            const positions = this.binaryGraph.positions;
+            for (let i = 0; i < q.length; i++) {
+                positions[i] = q[i] * factor - frame.scale;
+            }
+            this.updateInstancedPositions();
+            if (isFinal) {
+                this.layoutFrameState = null;
+            }
+            return;
+        }
+        
+        const nodes = this.currentGraph ? this.currentGraph.nodes : [];
+        // Les trames suivent l'ordre des nœuds du graphe complet
+        if (nodes.length !== frame.count || this.graphMeshes.nodes.length !== frame.count) {
+            if (isFinal) {
+                this.loadGraph(this.currentGraphId);
+            }
+            return;
+        }
+        
+        this.graphMeshes.nodes.forEach((nodeMesh, i) => {
+            const position = {
+                x: q[i * 3] * factor - frame.scale,
+                y: q[i * 3 + 1] * factor - frame.scale,
+                z: q[i * 3 + 2] * factor - frame.scale
+            };
+            nodeMesh.position.set(position.x, position.y, position.z);
+            nodes[i].position = position;
+        });
+        
+        // Les arêtes sont reconstruites une fois le layout terminé
+        if (isFinal) {
+            this.updateEdges();
+            this.layoutFrameState = null;
+        }
+    }
+
+    /**
+     * Ajoute des nœuds et des arêtes au graphe courant : seul le voisinage
+     * des ajouts est relâché (layoutParams : mode 'fixed' | 'warm', hops,
+     * iterations), les opérations produites sont appliquées localement
+     */
+    async appendToGraph(nodes, edges, layoutParams = {}) {
+        const response = await fetch(`${this.API_BASE}/graph/${this.currentGraphId}/append`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ nodes: nodes, edges: edges, layout_params: layoutParams })
+        });
+        const result = await response.json();
+        if (result.error) {
+            throw new Error(result.error);
+        }
+
+        const fresh = result.ops.filter(op => op.version > this.graphVersion());
+        if (fresh.length && fresh[0].version !== this.graphVersion() + 1) {
+            await this.loadGraph(this.currentGraphId);
+        } else {
+            this.applyGraphOps(fresh);
+        }
+        return result;
+    }
+
+    /**
+     * Abonne la session collaborative active aux modifications du graphe
+     */
+    watchGraph(graphId) {
+        const collab = window.collaborativeManager;
+        if (collab && collab.sessionId) {
+            collab.watchGraph(graphId);
+        }
+    }
+
+    /**
+     * Version du graphe après un layout reçu en entier (layout_done) ;
+     * ignorée s'il manque des opérations antérieures (resynchronisation)
+     */
+    setLayoutVersion(frame) {
+        if (frame.graph_id === this.currentGraphId && this.currentGraph &&
+            frame.version === this.graphVersion() + 1) {
+            this.currentGraph.version = frame.version;
+        }
+    }
+
+    /**
+     * Version des opérations déjà appliquées au graphe affiché
+     */
+    graphVersion() {
+        return (this.currentGraph && this.currentGraph.version) || 0;
+    }
+
+    /**
+     * Applique des opérations versionnées (voir backend/services/graph_ops.py)
+     * Déplacements et propriétés : mise à jour des meshes existants ;
+     * ajouts / suppressions : scène reconstruite à partir des données locales
+     * (rendu instancié : graphe rechargé)
+     */
+    applyGraphOps(ops) {
+        const graph = this.currentGraph;
+        if (!graph || !ops.length) return;
+
+        const toPosition = p => ({ x: p[0], y: p[1], z: p[2] });
+        const findNode = id => graph.nodes.find(node => node.id === id);
+        const applyProperties = (target, properties) => {
+            Object.entries(properties || {}).forEach(([key, value]) => {
+                if (value === null) {
+                    delete target.properties[key];
+                } else {
+                    target.properties[key] = value;
+                }
+            });
+        };
+        let structural = false;
+        const moved = new Set();
+
+        ops.forEach(op => {
+            switch (op.op) {
+                case 'add_node':
+                    graph.nodes.push({
+                        id: op.id,
+                        label: op.label !== undefined && op.label !== null ? op.label : op.id,
+                        properties: op.properties || {},
+                        position: toPosition(op.position || [0, 0, 0])
+                    });
+                    structural = true;
+                    break;
+                case 'remove_node':
+                    graph.nodes = graph.nodes.filter(node => node.id !== op.id);
+                    graph.edges = graph.edges.filter(
+                        edge => edge.source !== op.id && edge.target !== op.id);
+                    structural = true;
+                    break;
+                case 'move_node': {
+                    const node = findNode(op.id);
+                    if (node) {
+                        node.position = toPosition(op.position);
+                        moved.add(op.id);
+                    }
+                    break;
+                }
+                case 'update_node': {
+                    const node = findNode(op.id);
+                    if (node) {
+                        if ('label' in op) node.label = op.label;
+                        applyProperties(node, op.properties);
+                    }
+                    break;
+                }
+                case 'add_edge':
+                    graph.edges.push({
+                        source: op.source,
+                        target: op.target,
+                        properties: op.properties || {}
+                    });
+                    structural = true;
+                    break;
+                case 'remove_edge':
+                    graph.edges = graph.edges.filter(
+                        edge => edge.source !== op.source || edge.target !== op.target);
+                    structural = true;
+                    break;
+                case 'update_edge':
+                    graph.edges
+                        .filter(edge => edge.source === op.source && edge.target === op.target)
+                        .forEach(edge => applyProperties(edge, op.properties));
+                    break;
+            }
+            graph.version = op.version;
+        });
+        graph.metadata.node_count = graph.nodes.length;
+        graph.metadata.edge_count = graph.edges.length;
+
+        if (this.binaryGraph) {
+            this.applyBinaryGraphOps(ops, structural);
+        } else if (structural) {
+            this.renderGraph(graph);
+        } else if (moved.size) {
+            this.graphMeshes.nodes.forEach(mesh => {
+                const node = mesh.metadata && mesh.metadata.nodeData;
+                if (node && moved.has(node.id)) {
+                    const current = findNode(node.id);
+                    mesh.position = new BABYLON.Vector3(
+                        current.position.x, current.position.y, current.position.z);
+                }
+            });
+            this.updateEdges();
+        }
+    }
+
+    /**
+     * Rendu instancié : déplacements appliqués aux buffers, autres
+     * changements de structure par rechargement du graphe
+     */
+    applyBinaryGraphOps(ops, structural) {
+        if (structural) {
+            this.loadGraph(this.currentGraphId);
+            return;
+        }
+        const binary = this.binaryGraph;
+        if (!binary.indexById) {
+            binary.indexById = new Map(binary.ids.slice(0, binary.nodeCount).map((id, i) => [id, i]));
+        }
+        ops.filter(op => op.op === 'move_node').forEach(op => {
+            const i = binary.indexById.get(String(op.id));
+            if (i !== undefined) {
+                binary.positions.set(op.position, i * 3);
+            }
+        });
+        binary.version = this.currentGraph.version;
+        this.updateInstancedPositions();
+    }
+
     /**
      * Met à jour les positions des arêtes
      */
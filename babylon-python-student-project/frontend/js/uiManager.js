@@ -120,6 +120,7 @@ class UIManager {
                 <label class="control-label">${this.getIcon('graph')} Layout</label>
                 <select id="layout-select" class="select-minimal">
                     <option value="force">Force</option>
+                    <option value="multilevel">Multiniveau (grands graphes)</option>
                     <option value="circular">Circulaire</option>
                     <option value="sphere">Sphère</option>
                     <option value="random">Aléatoire</option>
@@ -457,8 +458,36 @@ class UIManager {
         }
 
         html += `</div>`;
+        
+        // Exploration côté serveur : voisinage et chemin depuis le nœud sélectionné avant
+        const selected = this.graphManager ? this.graphManager.selectedNodes : [];
+        const previous = selected.length >= 2 ? selected[selected.length - 2].metadata.nodeData : null;
+        html += `
+            <div style="margin-top: 16px; display: flex; gap: 12px; flex-wrap: wrap;">
+                <button class="btn" id="btn-node-neighborhood">Voisinage (2 sauts)</button>
+                ${previous ? `<button class="btn" id="btn-node-path">Chemin depuis ${previous.label || previous.id}</button>` : ''}
+            </div>
+        `;
         content.innerHTML = html;
         modal.classList.add('visible');
+        
+        document.getElementById('btn-node-neighborhood').addEventListener('click', () => {
+            this.graphManager.showNeighborhood(detail.node.id, 2).then(result => {
+                const suffix = result.truncated ? ' (tronqué)' : '';
+                this.showToast(`Voisinage : ${result.nodes.length} nœuds${suffix}`, 'success');
+            }).catch(error => this.showToast(error.message, 'error'));
+        });
+        if (previous) {
+            document.getElementById('btn-node-path').addEventListener('click', () => {
+                this.graphManager.highlightPath(previous.id, detail.node.id).then(result => {
+                    if (result.found) {
+                        this.showToast(`Chemin de ${result.length} saut(s)`, 'success');
+                    } else {
+                        this.showToast('Aucun chemin entre ces nœuds', 'info');
+                    }
+                }).catch(error => this.showToast(error.message, 'error'));
+            });
+        }
     }
 
     hideNodeInfo() {
@@ -521,6 +550,23 @@ class UIManager {
             
             this.showToast('Import en cours...', 'info');
             
+            // CSV / JSON : envoi du fichier brut, parsé en flux par le serveur
+            if (file.name.endsWith('.csv') || file.name.endsWith('.json')) {
+                try {
+                    const result = file.name.endsWith('.csv')
+                        ? await this.graphManager.importCSVFile(file)
+                        : await this.graphManager.importJSONFile(file);
+                    this.updateStats(
+                        result.graph_data.metadata.node_count, 
+                        result.graph_data.metadata.edge_count
+                    );
+                    this.showToast('Fichier importé avec succès', 'success');
+                } catch (error) {
+                    this.showToast('Erreur lors de l\'import: ' + error.message, 'error');
+                }
+                return;
+            }
+            
             const reader = new FileReader();
             reader.onload = async (event) => {
                 const content = event.target.result;
@@ -584,6 +630,16 @@ class UIManager {
                         <div class="control-label" style="margin-top: 16px;">Recherche par nom</div>
                         <input type="text" id="filter-search" placeholder="Rechercher..." class="filter-input">
                         
+                        <div class="control-label" style="margin-top: 16px;">Colorer et dimensionner par</div>
+                        <select id="filter-metric" class="filter-select">
+                            <option value="">Aucune métrique</option>
+                            <option value="degree">Degré</option>
+                            <option value="weighted_degree">Degré pondéré</option>
+                            <option value="component">Composante connexe</option>
+                            <option value="pagerank">PageRank</option>
+                            <option value="betweenness">Centralité d'intermédiarité</option>
+                        </select>
+                        
                         <div style="margin-top: 24px; display: flex; gap: 12px;">
                             <button class="btn btn-primary" id="btn-apply-filters">
                                 ${this.getIcon('filter')} Appliquer
@@ -645,7 +701,15 @@ class UIManager {
             filters.search_term = searchTerm;
         }
         
-        this.graphManager.filterGraph(filters);
+        const metric = document.getElementById('filter-metric').value;
+        
+        this.graphManager.filterGraph(filters).then(() => {
+            if (metric) {
+                return this.graphManager.applyMetric(metric);
+            }
+        }).catch(error => {
+            this.showToast(error.message, 'error');
+        });
         this.hideFilterDialog();
         this.showToast('Filtres appliqués', 'success');
     }
@@ -657,6 +721,7 @@ class UIManager {
         document.getElementById('filter-max-connections-value').textContent = '20';
         document.getElementById('filter-node-type').value = '';
         document.getElementById('filter-search').value = '';
+        document.getElementById('filter-metric').value = '';
         
         // Recharger le graphe original sauvegardé
         if (this.graphManager.originalGraph) {